@@ -2,8 +2,10 @@ from .sentiment_analyzer import SentimentAnalyzer
 from .news_processor import NewsProcessor
 from .social_media_monitor import SocialMediaMonitor
 from .llm_integration import LLMIntegration
+from .llm_executor import LLMExecutor
 from .nlp_processor import NLPProcessor
 from .sentiment_factor import SentimentFactorCalculator
+from .sentiment_stream import SentimentAggregator
 from .langchain_agent import LangChainAgent
 
 __all__ = [
@@ -11,7 +13,9 @@ __all__ = [
     'NewsProcessor', 
     'SocialMediaMonitor', 
     'LLMIntegration',
+    'LLMExecutor',
     'NLPProcessor',
     'SentimentFactorCalculator',
+    'SentimentAggregator',
     'LangChainAgent'
 ] 
\ No newline at end of file
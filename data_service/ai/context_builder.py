@@ -0,0 +1,248 @@
+"""
+Retrieval-augmented prompt context
+
+Builds the data part of an LLM prompt within a fixed token budget: numeric
+frames are reduced to a few summary statistics per column, relevant news and
+documents are retrieved from a VectorStore, ranked by similarity and recency
+and deduplicated, and sections are packed in priority order until the budget
+is spent. Prompt size therefore stays flat as the history grows.
+"""
+
+import hashlib
+import math
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .llm_executor import hashing_embedding
+
+try:
+    from ..vector_db.vector_store import VectorStore, VectorDocument
+    VECTOR_STORE_AVAILABLE = True
+except ImportError:
+    VECTOR_STORE_AVAILABLE = False
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text: str) -> int:
+    """Fast token count estimate: the larger of word/punctuation pieces and characters / 4"""
+    if not text:
+        return 0
+    return max(len(_TOKEN_PATTERN.findall(text)), math.ceil(len(text) / 4))
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to roughly ``max_tokens`` on a word boundary"""
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    low, high = 0, len(words)
+    # Longest word prefix that fits, by binary search on the estimate
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(" ".join(words[:middle]) + " ...") <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low]) + " ..." if low else ""
+
+def _format_number(value: Any) -> str:
+    if isinstance(value, (float, np.floating)):
+        if not np.isfinite(value):
+            return "nan"
+        return f"{value:.4g}"
+    return str(value)
+
+def summarize_frame(frame: pd.DataFrame, name: str = "data", max_columns: int = 12,
+                    recent_periods: int = 20) -> str:
+    """Compact numeric summary of a frame whose size does not depend on its length
+
+    One line per numeric column (up to ``max_columns``) with the last value,
+    the change over the last ``recent_periods`` rows, mean, standard
+    deviation, minimum and maximum.
+    """
+    if frame is None or frame.empty:
+        return f"{name}: no data"
+
+    numeric = frame.select_dtypes(include=[np.number])
+    lines = [f"{name}: {len(frame)} rows"]
+    if isinstance(frame.index, pd.DatetimeIndex) and len(frame.index):
+        lines[0] += f", {frame.index.min().date()} to {frame.index.max().date()}"
+
+    columns = list(numeric.columns[:max_columns])
+    if columns:
+        values = numeric[columns]
+        last = values.iloc[-1]
+        base = values.iloc[-min(recent_periods + 1, len(values))]
+        stats = values.agg(['mean', 'std', 'min', 'max'])
+        for column in columns:
+            base_value = base[column]
+            change = last[column] / base_value - 1 if pd.notna(base_value) and base_value != 0 else np.nan
+            lines.append(
+                f"- {column}: last {_format_number(last[column])}, "
+                f"{recent_periods}-period change {_format_number(change)}, "
+                f"mean {_format_number(stats.at['mean', column])}, std {_format_number(stats.at['std', column])}, "
+                f"range {_format_number(stats.at['min', column])} to {_format_number(stats.at['max', column])}"
+            )
+    if numeric.shape[1] > max_columns:
+        lines.append(f"- ... {numeric.shape[1] - max_columns} more numeric columns")
+    return "\n".join(lines)
+
+@dataclass
+class ContextSection:
+    """A titled block of prompt context; lower priority values are packed first"""
+    title: str
+    text: str
+    priority: int = 0
+    truncatable: bool = True
+
+@dataclass
+class RetrievedDocument:
+    """A document selected for the context with its ranking score"""
+    id: str
+    content: str
+    source: str
+    timestamp: datetime
+    similarity: float
+    score: float
+
+class ContextBuilder:
+    """Assemble prompt context from frame summaries and retrieved documents within a token budget"""
+
+    def __init__(self, vector_store: 'VectorStore' = None,
+                 collection: str = "news",
+                 embedding_fn: Callable[[str], np.ndarray] = None,
+                 token_budget: int = 1500,
+                 top_k: int = 8,
+                 similarity_threshold: float = 0.1,
+                 dedup_threshold: float = 0.9,
+                 recency_half_life_hours: float = 72.0,
+                 max_document_tokens: int = 200):
+        self.vector_store = vector_store
+        self.collection = collection
+        self.embedding_fn = embedding_fn or hashing_embedding
+        self.token_budget = token_budget
+        self.top_k = top_k
+        self.similarity_threshold = similarity_threshold
+        self.dedup_threshold = dedup_threshold
+        self.recency_half_life_hours = recency_half_life_hours
+        self.max_document_tokens = max_document_tokens
+        self.logger = logging.getLogger(__name__)
+
+    def add_documents(self, documents: List[Dict[str, Any]]) -> int:
+        """Index news/document dicts (content or title+text, source, timestamp, metadata)"""
+        if self.vector_store is None:
+            raise ValueError("ContextBuilder has no vector store to index documents in")
+
+        added = 0
+        for item in documents:
+            content = item.get('content') or " ".join(filter(None, [item.get('title'), item.get('text')]))
+            if not content:
+                continue
+            timestamp = item.get('timestamp') or datetime.now()
+            if not isinstance(timestamp, datetime):
+                timestamp = pd.Timestamp(timestamp).to_pydatetime()
+            document = VectorDocument(
+                id=item.get('id') or hashlib.sha256(content.encode()).hexdigest()[:32],
+                content=content,
+                metadata=item.get('metadata', {}),
+                embedding=self.embedding_fn(content),
+                timestamp=timestamp,
+                source=item.get('source', 'news')
+            )
+            added += bool(self.vector_store.add_document(document, collection=self.collection))
+        return added
+
+    def retrieve(self, query: str, top_k: int = None, as_of: datetime = None) -> List[RetrievedDocument]:
+        """Most relevant documents for a query, ranked by similarity x recency, near-duplicates removed"""
+        if self.vector_store is None or not query:
+            return []
+        top_k = top_k or self.top_k
+        as_of = as_of or datetime.now()
+
+        query_embedding = self.embedding_fn(query)
+        # Over-fetch so deduplication and recency re-ranking still leave top_k
+        matches = self.vector_store.search_similar(query_embedding, collection=self.collection,
+                                                   top_k=top_k * 4, similarity_threshold=self.similarity_threshold)
+        ranked = []
+        for document, similarity in matches:
+            age_hours = max((as_of - document.timestamp).total_seconds() / 3600, 0.0)
+            recency = 0.5 ** (age_hours / self.recency_half_life_hours) if self.recency_half_life_hours else 1.0
+            ranked.append((similarity * recency, similarity, document))
+        ranked.sort(key=lambda item: item[0], reverse=True)
+
+        selected: List[RetrievedDocument] = []
+        kept_embeddings: List[np.ndarray] = []
+        seen_content = set()
+        for score, similarity, document in ranked:
+            content_key = re.sub(r'\s+', ' ', document.content).strip().lower()
+            if content_key in seen_content:
+                continue
+            embedding = np.asarray(document.embedding, dtype=float)
+            norm = np.linalg.norm(embedding)
+            embedding = embedding / norm if norm > 0 else embedding
+            if any(float(embedding @ kept) >= self.dedup_threshold for kept in kept_embeddings):
+                continue
+            seen_content.add(content_key)
+            kept_embeddings.append(embedding)
+            selected.append(RetrievedDocument(id=document.id, content=document.content, source=document.source,
+                                              timestamp=document.timestamp, similarity=similarity, score=score))
+            if len(selected) >= top_k:
+                break
+        return selected
+
+    def document_section(self, query: str, title: str = "Relevant news", priority: int = 2,
+                         as_of: datetime = None) -> Optional[ContextSection]:
+        """Retrieved documents as one section, each capped at max_document_tokens"""
+        documents = self.retrieve(query, as_of=as_of)
+        if not documents:
+            return None
+        lines = [
+            f"- [{document.timestamp:%Y-%m-%d %H:%M} {document.source}] "
+            f"{truncate_to_tokens(document.content, self.max_document_tokens)}"
+            for document in documents
+        ]
+        return ContextSection(title, "\n".join(lines), priority)
+
+    def frame_section(self, frame: pd.DataFrame, title: str, priority: int = 1, **summary_kwargs) -> ContextSection:
+        """Summary statistics of a frame as a section"""
+        return ContextSection(title, summarize_frame(frame, name=title, **summary_kwargs), priority)
+
+    def pack(self, sections: List[ContextSection], token_budget: int = None) -> str:
+        """Join sections in priority order, truncating or dropping what exceeds the budget"""
+        budget = self.token_budget if token_budget is None else token_budget
+        parts = []
+        used = 0
+        for section in sorted((s for s in sections if s is not None), key=lambda s: s.priority):
+            header = f"{section.title}:\n" if not section.text.startswith(section.title) else ""
+            block = header + section.text
+            cost = estimate_tokens(block)
+            if used + cost > budget:
+                if not section.truncatable:
+                    continue
+                block = truncate_to_tokens(block, budget - used)
+                cost = estimate_tokens(block)
+                if not block:
+                    continue
+            parts.append(block)
+            used += cost
+        return "\n\n".join(parts)
+
+    def build(self, query: str = None,
+              frames: Dict[str, pd.DataFrame] = None,
+              extra_sections: List[ContextSection] = None,
+              token_budget: int = None,
+              as_of: datetime = None) -> str:
+        """Context for a prompt: frame summaries, then retrieved documents, within the budget"""
+        sections = list(extra_sections or [])
+        for title, frame in (frames or {}).items():
+            sections.append(self.frame_section(frame, title))
+        if query:
+            sections.append(self.document_section(query, as_of=as_of))
+        return self.pack(sections, token_budget)
@@ -4,8 +4,14 @@ from typing import Dict, List, Any, Optional, Callable
 import logging
 from datetime import datetime, timedelta
 import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from dataclasses import dataclass
 
+from ..strategies.result_cache import frame_fingerprint
+
 @dataclass
 class StrategyRecommendation:
     """Strategy recommendation from LLM agent"""
@@ -36,10 +42,28 @@ class MarketAnalysis:
 class LangChainAgent:
     """LangChain agent for intelligent trading analysis"""
     
-    def __init__(self, llm_integration, nlp_processor=None):
+    def __init__(self, llm_integration, nlp_processor=None,
+                 max_workers: int = 8, tool_cache_size: int = 1024):
         self.llm_integration = llm_integration
         self.nlp_processor = nlp_processor
         self.logger = logging.getLogger(__name__)
+        self.max_workers = max_workers
+        
+        # Per-symbol data the tools read; the version is a content fingerprint of the data
+        self._datasets: Dict[str, Dict[str, Any]] = {}
+        self._data_lock = threading.Lock()
+        
+        # Tool outputs memoized by (tool, query, data version)
+        self.tool_cache_size = tool_cache_size
+        self._tool_cache: "OrderedDict[tuple, str]" = OrderedDict()
+        self._tool_cache_lock = threading.Lock()
+        self.tool_stats = {'calls': 0, 'cache_hits': 0}
+        self.tool_functions: Dict[str, Callable[..., str]] = {
+            'market_analysis': self._analyze_market_data,
+            'sentiment_analysis': self._analyze_sentiment,
+            'technical_analysis': self._perform_technical_analysis,
+            'risk_assessment': self._assess_risk
+        }
         
         # Initialize LangChain components
         self._init_langchain()
@@ -76,7 +100,7 @@ class LangChainAgent:
             # Market data analysis tool
             market_tool = Tool(
                 name="market_analysis",
-                func=self._analyze_market_data,
+                func=partial(self.run_tool, 'market_analysis'),
                 description="Analyze market data and identify trends"
             )
             tools.append(market_tool)
@@ -84,7 +108,7 @@ class LangChainAgent:
             # Sentiment analysis tool
             sentiment_tool = Tool(
                 name="sentiment_analysis",
-                func=self._analyze_sentiment,
+                func=partial(self.run_tool, 'sentiment_analysis'),
                 description="Analyze sentiment from news and social media"
             )
             tools.append(sentiment_tool)
@@ -92,7 +116,7 @@ class LangChainAgent:
             # Technical analysis tool
             technical_tool = Tool(
                 name="technical_analysis",
-                func=self._perform_technical_analysis,
+                func=partial(self.run_tool, 'technical_analysis'),
                 description="Perform technical analysis on price data"
             )
             tools.append(technical_tool)
@@ -100,7 +124,7 @@ class LangChainAgent:
             # Risk assessment tool
             risk_tool = Tool(
                 name="risk_assessment",
-                func=self._assess_risk,
+                func=partial(self.run_tool, 'risk_assessment'),
                 description="Assess portfolio and market risk"
             )
             tools.append(risk_tool)
@@ -121,7 +145,7 @@ class LangChainAgent:
             prompt = self._create_strategy_prompt(market_data, sentiment_data, portfolio_data, symbols)
             
             # Get LLM response
-            response = self.llm_integration.provider.generate_response(prompt)
+            response = self.llm_integration.executor.generate(prompt)
             
             # Parse response
             strategy = self._parse_strategy_response(response.content, symbols)
@@ -142,7 +166,7 @@ class LangChainAgent:
             prompt = self._create_market_analysis_prompt(news_data, social_data, market_data)
             
             # Get LLM response
-            response = self.llm_integration.provider.generate_response(prompt)
+            response = self.llm_integration.executor.generate(prompt)
             
             # Parse response
             analysis = self._parse_market_analysis_response(response.content)
@@ -163,7 +187,7 @@ class LangChainAgent:
             prompt = self._create_report_prompt(strategy_results, market_analysis, performance_metrics)
             
             # Get LLM response
-            response = self.llm_integration.provider.generate_response(prompt)
+            response = self.llm_integration.executor.generate(prompt)
             
             return response.content
             
@@ -178,12 +202,14 @@ class LangChainAgent:
         """Create prompt for strategy generation"""
         
         # Market data summary
+        stats = self._market_statistics(market_data)
         market_summary = f"""
         Market Data Summary:
         - Symbols: {symbols}
-        - Data points: {len(market_data)}
-        - Date range: {market_data.index.min()} to {market_data.index.max()}
-        - Price volatility: {market_data['close'].pct_change().std():.3f}
+        - Data points: {stats['observations']}
+        - Date range: {stats['start']} to {stats['end']}
+        - Price volatility: {stats['volatility']:.3f}
+        - Returns (1d/5d/20d): {stats['return_1d']:.3f} / {stats['return_5d']:.3f} / {stats['return_20d']:.3f}
         """
         
         # Sentiment summary
@@ -448,19 +474,253 @@ class LangChainAgent:
             timestamp=datetime.now()
         )
     
+    # Data registration and tool execution
+    def register_data(self, symbol: str, market_data: pd.DataFrame = None,
+                      sentiment_data: pd.DataFrame = None):
+        """Set the data the tools analyze for a symbol
+        
+        Cached tool outputs stay valid while the content is the same, so
+        re-registering identical frames keeps hitting the cache.
+        """
+        fingerprints = {}
+        if market_data is not None:
+            fingerprints['market_data'] = frame_fingerprint(market_data)
+        if sentiment_data is not None:
+            fingerprints['sentiment_data'] = frame_fingerprint(sentiment_data)
+        
+        with self._data_lock:
+            current = self._datasets.get(symbol, {})
+            dataset = dict(current)
+            if market_data is not None:
+                dataset['market_data'] = market_data
+            if sentiment_data is not None:
+                dataset['sentiment_data'] = sentiment_data
+            dataset['fingerprints'] = {**current.get('fingerprints', {}), **fingerprints}
+            dataset['version'] = ':'.join(dataset['fingerprints'].get(name, 'none')
+                                          for name in ('market_data', 'sentiment_data'))
+            # Replaced rather than mutated, so snapshots handed to tools stay consistent
+            self._datasets[symbol] = dataset
+    
+    def _dataset(self, symbol: str) -> Dict[str, Any]:
+        with self._data_lock:
+            return self._datasets.get(symbol, {'version': 'none:none'})
+    
+    def run_tool(self, tool_name: str, query: str) -> str:
+        """Run one tool, reusing its output while the symbol's data is unchanged"""
+        symbol = query.strip()
+        # One snapshot for both the cache key and the tool, so the output matches its version
+        dataset = self._dataset(symbol)
+        key = (tool_name, symbol, dataset['version'])
+        with self._tool_cache_lock:
+            self.tool_stats['calls'] += 1
+            if key in self._tool_cache:
+                self._tool_cache.move_to_end(key)
+                self.tool_stats['cache_hits'] += 1
+                return self._tool_cache[key]
+        
+        output = self.tool_functions[tool_name](symbol, dataset)
+        
+        with self._tool_cache_lock:
+            self._tool_cache[key] = output
+            self._tool_cache.move_to_end(key)
+            while len(self._tool_cache) > self.tool_cache_size:
+                self._tool_cache.popitem(last=False)
+        return output
+    
+    def run_tools(self, calls: List[tuple]) -> List[str]:
+        """Run independent (tool_name, query) calls concurrently, in call order"""
+        if len(calls) <= 1 or self.max_workers <= 1:
+            return [self.run_tool(tool_name, query) for tool_name, query in calls]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(lambda call: self.run_tool(*call), calls))
+    
+    def generate_strategy_recommendations(self,
+                                          market_data: Dict[str, pd.DataFrame],
+                                          sentiment_data: pd.DataFrame = None,
+                                          portfolio_data: Dict[str, Any] = None) -> Dict[str, StrategyRecommendation]:
+        """Strategy recommendations for many symbols
+        
+        All tools run concurrently on every symbol, each prompt carries the
+        tools' summary statistics instead of raw rows, and the LLM calls are
+        issued through the integration's concurrent executor.
+        """
+        symbols = list(market_data)
+        sentiment_by_symbol = {}
+        if sentiment_data is not None and not sentiment_data.empty and 'symbol' in sentiment_data.columns:
+            sentiment_by_symbol = dict(tuple(sentiment_data.groupby('symbol', sort=False)))
+        for symbol in symbols:
+            self.register_data(symbol, market_data[symbol], sentiment_by_symbol.get(symbol, pd.DataFrame()))
+        
+        tool_names = list(self.tool_functions)
+        outputs = self.run_tools([(tool_name, symbol) for symbol in symbols for tool_name in tool_names])
+        prompts = []
+        for i, symbol in enumerate(symbols):
+            tool_outputs = dict(zip(tool_names, outputs[i * len(tool_names):(i + 1) * len(tool_names)]))
+            prompts.append(self._create_symbol_strategy_prompt(symbol, tool_outputs, portfolio_data or {}))
+        
+        recommendations = {}
+        for symbol, response in zip(symbols, self.llm_integration.executor.generate_many(prompts)):
+            if isinstance(response, Exception):
+                self.logger.error(f"Error generating strategy recommendation for {symbol}: {response}")
+                recommendations[symbol] = self._create_default_strategy_recommendation([symbol])
+            else:
+                recommendations[symbol] = self._parse_strategy_response(response.content, [symbol])
+        return recommendations
+    
+    def generate_universe_report(self,
+                                 market_data: Dict[str, pd.DataFrame],
+                                 sentiment_data: pd.DataFrame = None,
+                                 portfolio_data: Dict[str, Any] = None,
+                                 performance_metrics: Dict[str, float] = None,
+                                 news_data: List[Dict[str, Any]] = None,
+                                 social_data: List[Dict[str, Any]] = None) -> str:
+        """Automated report over many symbols: concurrent recommendations, market analysis, report"""
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            recommendations = pool.submit(self.generate_strategy_recommendations,
+                                          market_data, sentiment_data, portfolio_data)
+            analysis = pool.submit(self.analyze_market_intelligence, news_data or [], social_data or [],
+                                   self._composite_market_data(market_data))
+            strategy_results = sorted(recommendations.result().values(),
+                                      key=lambda recommendation: recommendation.confidence, reverse=True)
+            market_analysis = analysis.result()
+        return self.generate_automated_report(strategy_results, market_analysis, performance_metrics or {})
+    
+    def get_tool_stats(self) -> Dict[str, Any]:
+        """Tool call and cache statistics"""
+        with self._tool_cache_lock:
+            stats = dict(self.tool_stats)
+            stats['cache_size'] = len(self._tool_cache)
+        stats['cache_hit_rate'] = stats['cache_hits'] / stats['calls'] if stats['calls'] else 0.0
+        return stats
+    
+    def _create_symbol_strategy_prompt(self, symbol: str, tool_outputs: Dict[str, str],
+                                       portfolio_data: Dict[str, Any]) -> str:
+        """Strategy prompt for one symbol built from the tools' summary statistics"""
+        sections = "\n".join(f"{name}: {output}" for name, output in tool_outputs.items())
+        return f"""
+        You are an expert quantitative trading strategist. Based on the following analysis of {symbol}, generate a trading strategy recommendation.
+        
+        {sections}
+        
+        Portfolio: total value ${portfolio_data.get('total_value', 0):,.2f}, cash ${portfolio_data.get('cash', 0):,.2f}, risk level {portfolio_data.get('risk_level', 'medium')}
+        
+        Respond in JSON with keys: strategy_name, description, symbols, signal (buy/sell/hold), confidence (0-1),
+        reasoning, parameters, risk_level (low/medium/high), expected_return, time_horizon (short/medium/long).
+        """
+    
+    def _composite_market_data(self, market_data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """Equal-weighted index of the symbols' normalized closes and their total volume"""
+        closes = pd.DataFrame({symbol: frame['close'] / frame['close'].iloc[0]
+                               for symbol, frame in market_data.items() if len(frame)})
+        composite = pd.DataFrame({'close': closes.mean(axis=1)})
+        volumes = [frame['volume'] for frame in market_data.values() if 'volume' in frame.columns]
+        composite['volume'] = pd.concat(volumes, axis=1).sum(axis=1) if volumes else 0.0
+        return composite
+    
+    def _market_statistics(self, market_data: pd.DataFrame) -> Dict[str, Any]:
+        """Summary statistics of a price frame, memoized by its content"""
+        key = ('market_statistics', frame_fingerprint(market_data))
+        with self._tool_cache_lock:
+            if key in self._tool_cache:
+                return self._tool_cache[key]
+        
+        close = market_data['close']
+        returns = close.pct_change().dropna()
+        
+        def trailing_return(periods: int) -> float:
+            return float(close.iloc[-1] / close.iloc[-periods - 1] - 1) if len(close) > periods else 0.0
+        
+        stats = {
+            'observations': len(market_data),
+            'start': market_data.index.min(),
+            'end': market_data.index.max(),
+            'last_close': float(close.iloc[-1]) if len(close) else 0.0,
+            'return_1d': trailing_return(1),
+            'return_5d': trailing_return(5),
+            'return_20d': trailing_return(20),
+            'volatility': float(returns.std()) if len(returns) > 1 else 0.0,
+            'trend': 'upward' if len(close) > 1 and close.iloc[-1] > close.iloc[-min(20, len(close))] else 'downward'
+        }
+        if 'volume' in market_data.columns and len(market_data) >= 20:
+            volume = market_data['volume']
+            stats['volume_trend'] = 'increasing' if volume.iloc[-5:].mean() > volume.iloc[-20:-5].mean() else 'decreasing'
+        
+        with self._tool_cache_lock:
+            self._tool_cache[key] = stats
+            while len(self._tool_cache) > self.tool_cache_size:
+                self._tool_cache.popitem(last=False)
+        return stats
+    
+    @staticmethod
+    def _tool_output(values: Dict[str, Any]) -> str:
+        """Compact JSON of a tool's statistics"""
+        rounded = {key: round(value, 4) if isinstance(value, float) else value for key, value in values.items()}
+        return json.dumps(rounded, default=str)
+    
     # Tool functions for LangChain agent
-    def _analyze_market_data(self, query: str) -> str:
+    def _analyze_market_data(self, query: str, dataset: Dict[str, Any] = None) -> str:
         """Tool for market data analysis"""
-        return "Market data analysis tool - implementation needed"
+        market_data = (dataset or self._dataset(query)).get('market_data')
+        if market_data is None or market_data.empty:
+            return self._tool_output({'symbol': query, 'error': 'no market data'})
+        return self._tool_output({'symbol': query, **self._market_statistics(market_data)})
     
-    def _analyze_sentiment(self, query: str) -> str:
+    def _analyze_sentiment(self, query: str, dataset: Dict[str, Any] = None) -> str:
         """Tool for sentiment analysis"""
-        return "Sentiment analysis tool - implementation needed"
+        sentiment_data = (dataset or self._dataset(query)).get('sentiment_data')
+        if sentiment_data is None or sentiment_data.empty:
+            return self._tool_output({'symbol': query, 'sentiment_items': 0})
+        
+        if 'timestamp' in sentiment_data.columns:
+            sentiment_data = sentiment_data.sort_values('timestamp')
+        scores = sentiment_data['sentiment_score']
+        recent = scores.iloc[-5:].mean()
+        earlier = scores.iloc[:-5].mean() if len(scores) > 5 else recent
+        return self._tool_output({
+            'symbol': query,
+            'sentiment_items': len(scores),
+            'average_sentiment': float(scores.mean()),
+            'positive_share': float((scores > 0).mean()),
+            'sentiment_change': float(recent - earlier),
+            'sources': int(sentiment_data['source'].nunique()) if 'source' in sentiment_data.columns else 0
+        })
     
-    def _perform_technical_analysis(self, query: str) -> str:
+    def _perform_technical_analysis(self, query: str, dataset: Dict[str, Any] = None) -> str:
         """Tool for technical analysis"""
-        return "Technical analysis tool - implementation needed"
+        market_data = (dataset or self._dataset(query)).get('market_data')
+        if market_data is None or market_data.empty:
+            return self._tool_output({'symbol': query, 'error': 'no market data'})
+        
+        close = market_data['close']
+        last = float(close.iloc[-1])
+        delta = close.diff()
+        gain = delta.clip(lower=0).iloc[-14:].mean()
+        loss = (-delta.clip(upper=0)).iloc[-14:].mean()
+        rsi = 100 - 100 / (1 + gain / loss) if loss > 0 else 100.0
+        
+        values = {'symbol': query, 'rsi_14': float(rsi),
+                  'distance_from_high': float(last / close.iloc[-252:].max() - 1)}
+        for window in (20, 50):
+            if len(close) >= window:
+                sma = float(close.iloc[-window:].mean())
+                values[f'sma_{window}'] = sma
+                values[f'price_vs_sma_{window}'] = last / sma - 1
+        return self._tool_output(values)
     
-    def _assess_risk(self, query: str) -> str:
+    def _assess_risk(self, query: str, dataset: Dict[str, Any] = None) -> str:
         """Tool for risk assessment"""
-        return "Risk assessment tool - implementation needed" 
\ No newline at end of file
+        market_data = (dataset or self._dataset(query)).get('market_data')
+        if market_data is None or len(market_data) < 2:
+            return self._tool_output({'symbol': query, 'error': 'not enough market data'})
+        
+        close = market_data['close']
+        returns = close.pct_change().dropna()
+        drawdown = close / close.cummax() - 1
+        downside = returns[returns < 0]
+        return self._tool_output({
+            'symbol': query,
+            'annualized_volatility': float(returns.std() * np.sqrt(252)) if len(returns) > 1 else 0.0,
+            'max_drawdown': float(drawdown.min()),
+            'value_at_risk_95': float(-returns.quantile(0.05)),
+            'downside_deviation': float(downside.std() * np.sqrt(252)) if len(downside) > 1 else 0.0
+        })
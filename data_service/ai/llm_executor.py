@@ -0,0 +1,414 @@
+"""
+LLM execution layer
+
+Runs provider calls with bounded concurrency, retries transient failures
+with exponential backoff and keeps two response caches: an exact-match
+prompt cache and an optional semantic cache that reuses the response of a
+sufficiently similar earlier prompt of the same scope (cosine similarity of
+prompt embeddings held in a VectorStore, one collection per scope). Both
+caches expire entries after a TTL and evict the oldest beyond their size.
+Identical prompts in flight at the same time share one provider call.
+"""
+
+import asyncio
+import dataclasses
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable, Tuple
+import logging
+
+import numpy as np
+
+from .llm_integration import LLMProvider, LLMResponse
+
+try:
+    from ..vector_db.vector_store import VectorStore, VectorDocument
+    VECTOR_STORE_AVAILABLE = True
+except ImportError:
+    VECTOR_STORE_AVAILABLE = False
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so indentation differences do not miss the cache"""
+    return re.sub(r'\s+', ' ', prompt).strip()
+
+def prompt_cache_key(prompt: str, model: str, params: Dict[str, Any]) -> str:
+    """Exact-match key of a prompt for one model and generation parameters"""
+    payload = json.dumps([model, normalize_prompt(prompt), sorted(params.items())], default=repr)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def hashing_embedding(text: str, dimension: int = 512) -> np.ndarray:
+    """Dependency-free text embedding: L2-normalized hashed word and bigram counts"""
+    words = re.findall(r'[a-z0-9_.%-]+', text.lower())
+    vector = np.zeros(dimension)
+    for token in words + [f'{a} {b}' for a, b in zip(words, words[1:])]:
+        digest = hashlib.md5(token.encode()).digest()
+        index = int.from_bytes(digest[:4], 'little') % dimension
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+# Provider SDK exceptions (openai, anthropic, httpx, ...) recognized by class name,
+# so no SDK needs to be installed
+_TRANSIENT_ERROR_NAMES = {
+    'RateLimitError', 'APITimeoutError', 'APIConnectionError', 'InternalServerError',
+    'ServiceUnavailableError', 'Timeout', 'TimeoutException', 'ConnectTimeout', 'ReadTimeout',
+    'OverloadedError'
+}
+
+def is_transient_error(error: BaseException) -> bool:
+    """Whether a failed provider call may succeed when retried
+
+    Timeouts, connection failures, rate limits (429) and server errors (5xx)
+    are transient; authentication, permission and bad-request errors are not.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ in _TRANSIENT_ERROR_NAMES for cls in type(error).__mro__):
+        return True
+    status = getattr(error, 'status_code', None) or getattr(error, 'status', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    try:
+        status = int(status)
+    except (TypeError, ValueError):
+        return False
+    return status == 429 or status >= 500
+
+class PromptCache:
+    """Bounded LRU of responses keyed by exact prompt, with a TTL"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, LLMResponse]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[LLMResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, response = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return response
+
+    def set(self, key: str, response: LLMResponse):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class SemanticResponseCache:
+    """Responses of earlier prompts looked up by embedding similarity in a VectorStore
+
+    A hit needs cosine similarity of at least ``similarity_threshold`` with a
+    cached prompt of the same model and parameters. Prompts that differ only
+    in a symbol or a number embed very closely, so keep the threshold high.
+    """
+
+    collection = 'llm_response_cache'
+
+    def __init__(self, vector_store: 'VectorStore' = None,
+                 embedding_fn: Callable[[str], np.ndarray] = None,
+                 similarity_threshold: float = 0.97,
+                 max_size: int = 512,
+                 ttl: float = 3600):
+        if vector_store is None:
+            if not VECTOR_STORE_AVAILABLE:
+                raise ImportError("VectorStore not available for the semantic cache")
+            vector_store = VectorStore(':memory:')
+        self.vector_store = vector_store
+        self.embedding_fn = embedding_fn or hashing_embedding
+        self.similarity_threshold = similarity_threshold
+        self.max_size = max_size
+        self.ttl = ttl
+        # Insertion order of cached documents, for eviction
+        self._documents: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.logger = logging.getLogger(__name__)
+
+    def _collection(self, scope: str) -> str:
+        """One collection per scope, so closer prompts of other scopes cannot crowd out a hit"""
+        return f"{self.collection}:{hashlib.sha256(scope.encode()).hexdigest()[:16]}"
+
+    def get(self, prompt: str, scope: str) -> Optional[Tuple[LLMResponse, float]]:
+        """Most similar cached response within ``scope`` (model and parameters) and its similarity"""
+        embedding = self.embedding_fn(normalize_prompt(prompt))
+        with self._lock:
+            matches = self.vector_store.search_similar(embedding, collection=self._collection(scope),
+                                                       top_k=5, similarity_threshold=self.similarity_threshold)
+            now = time.time()
+            for document, similarity in matches:
+                metadata = document.metadata
+                if metadata.get('expires_at', 0) < now:
+                    self._delete(document.id)
+                    continue
+                if metadata.get('scope') != scope:
+                    continue
+                return self._response_from_dict(metadata['response']), similarity
+        return None
+
+    def set(self, prompt: str, scope: str, response: LLMResponse):
+        normalized = normalize_prompt(prompt)
+        document_id = hashlib.sha256(f'{scope}\x1f{normalized}'.encode()).hexdigest()
+        expires_at = time.time() + self.ttl
+        document = VectorDocument(
+            id=document_id,
+            content=normalized,
+            metadata={'scope': scope, 'expires_at': expires_at, 'response': self._response_to_dict(response)},
+            embedding=self.embedding_fn(normalized),
+            timestamp=datetime.now(),
+            source='llm_cache'
+        )
+        with self._lock:
+            self.vector_store.add_document(document, collection=self._collection(scope))
+            self._documents[document_id] = expires_at
+            self._documents.move_to_end(document_id)
+            while len(self._documents) > self.max_size:
+                oldest, _ = self._documents.popitem(last=False)
+                self.vector_store.delete_document(oldest)
+                self.evictions += 1
+
+    def _delete(self, document_id: str):
+        self.vector_store.delete_document(document_id)
+        self._documents.pop(document_id, None)
+
+    def clear(self):
+        with self._lock:
+            for document_id in list(self._documents):
+                self._delete(document_id)
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    @staticmethod
+    def _response_to_dict(response: LLMResponse) -> Dict[str, Any]:
+        data = dataclasses.asdict(response)
+        data['timestamp'] = response.timestamp.isoformat()
+        return json.loads(json.dumps(data, default=str))
+
+    @staticmethod
+    def _response_from_dict(data: Dict[str, Any]) -> LLMResponse:
+        data = dict(data)
+        data['timestamp'] = datetime.fromisoformat(data['timestamp'])
+        return LLMResponse(**data)
+
+class LLMExecutor:
+    """Cached, retried and concurrency-bounded calls to an LLMProvider
+
+    ``generate`` is the blocking entry point and ``agenerate``/``agenerate_many``
+    the asyncio ones; all share the caches, the in-flight deduplication and
+    the ``max_concurrency`` bound on simultaneous provider calls.
+    """
+
+    def __init__(self, provider: LLMProvider,
+                 max_concurrency: int = 4,
+                 max_retries: int = 3,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 8.0,
+                 cache_size: int = 1024,
+                 cache_ttl: float = 3600,
+                 semantic_cache: Optional[SemanticResponseCache] = None):
+        self.provider = provider
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cache = PromptCache(cache_size, cache_ttl) if cache_size > 0 else None
+        self.semantic_cache = semantic_cache
+        self.logger = logging.getLogger(__name__)
+
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='llm')
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'provider_calls': 0,
+            'exact_cache_hits': 0,
+            'semantic_cache_hits': 0,
+            'deduplicated': 0,
+            'retries': 0,
+            'failures': 0,
+            'tokens_used': 0,
+            'cost': 0.0,
+            'tokens_saved': 0,
+            'cost_saved': 0.0
+        }
+
+    def _count(self, **increments):
+        with self._stats_lock:
+            for name, value in increments.items():
+                self.stats[name] += value
+
+    def _model(self) -> str:
+        return self.provider.get_model_info().get('model', '')
+
+    def generate(self, prompt: str, use_cache: bool = True, cache_scope: str = '', **kwargs) -> LLMResponse:
+        """Response for a prompt from the caches or the provider
+
+        ``cache_scope`` names what the prompt is about (e.g. its symbols);
+        semantic hits are only taken from prompts with the same scope, since
+        prompts about different subjects can embed almost identically.
+        """
+        self._count(requests=1)
+        key = prompt_cache_key(prompt, self._model(), kwargs)
+
+        if use_cache:
+            cached = self._lookup(prompt, key, cache_scope, kwargs)
+            if cached is not None:
+                return cached
+
+        # Join an identical request already in flight
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                # An owner that finished since our lookup has cached its response before leaving
+                response = self.cache.get(key) if use_cache and self.cache is not None else None
+                if response is not None:
+                    self._count(exact_cache_hits=1, tokens_saved=response.tokens_used, cost_saved=response.cost)
+                    return self._tagged(response, 'exact')
+                future = self._inflight[key] = Future()
+        if not owner:
+            self._count(deduplicated=1)
+            response = future.result()
+            self._count(tokens_saved=response.tokens_used, cost_saved=response.cost)
+            return self._tagged(response, 'inflight')
+
+        try:
+            response = self._call_with_retries(prompt, **kwargs)
+            # Cached before the in-flight entry goes, so a duplicate always finds one or the other
+            if use_cache:
+                if self.cache is not None:
+                    self.cache.set(key, response)
+                if self.semantic_cache is not None:
+                    try:
+                        self.semantic_cache.set(prompt, self._scope(cache_scope, kwargs), response)
+                    except Exception as e:
+                        self.logger.warning(f"Could not store response in semantic cache: {e}")
+            future.set_result(response)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+        return response
+
+    def _lookup(self, prompt: str, key: str, cache_scope: str, kwargs: Dict[str, Any]) -> Optional[LLMResponse]:
+        """Exact then semantic cache lookup, counting the tokens and cost saved"""
+        response = self.cache.get(key) if self.cache is not None else None
+        source = 'exact'
+        if response is None and self.semantic_cache is not None:
+            try:
+                match = self.semantic_cache.get(prompt, self._scope(cache_scope, kwargs))
+            except Exception as e:
+                self.logger.warning(f"Semantic cache lookup failed: {e}")
+                match = None
+            if match is not None:
+                response, similarity = match
+                source = 'semantic'
+        if response is None:
+            return None
+
+        self._count(**{f'{source}_cache_hits': 1},
+                    tokens_saved=response.tokens_used, cost_saved=response.cost)
+        return self._tagged(response, source)
+
+    def _scope(self, cache_scope: str, kwargs: Dict[str, Any]) -> str:
+        return json.dumps([self._model(), cache_scope, sorted(kwargs.items())], default=repr)
+
+    @staticmethod
+    def _tagged(response: LLMResponse, source: str) -> LLMResponse:
+        """Copy of a shared response marked with where it came from"""
+        return dataclasses.replace(response, metadata={**response.metadata, 'cache': source})
+
+    def _call_with_retries(self, prompt: str, **kwargs) -> LLMResponse:
+        """Provider call within the concurrency bound, retried with exponential backoff and jitter"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._slots:
+                    self._count(provider_calls=1)
+                    response = self.provider.generate_response(prompt, **kwargs)
+                self._count(tokens_used=response.tokens_used, cost=response.cost)
+                return response
+            except Exception as e:
+                if attempt == self.max_retries or not is_transient_error(e):
+                    self._count(failures=1)
+                    raise
+                delay = min(self.backoff_base * 2 ** attempt, self.backoff_max)
+                delay *= 1 + random.random() * 0.1
+                self._count(retries=1)
+                self.logger.warning(f"LLM call failed ({e}); retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                time.sleep(delay)
+
+    def generate_many(self, prompts: List[str], cache_scopes: Optional[List[str]] = None,
+                      **kwargs) -> List[Any]:
+        """Responses for several prompts, at most ``max_concurrency`` provider calls at a time
+
+        A failed prompt yields its exception in place of a response.
+        """
+        cache_scopes = cache_scopes or [''] * len(prompts)
+        futures = [self._pool.submit(self.generate, prompt, cache_scope=scope, **kwargs)
+                   for prompt, scope in zip(prompts, cache_scopes)]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    async def agenerate(self, prompt: str, **kwargs) -> LLMResponse:
+        """Async response for a prompt; the provider call runs on the executor's thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, lambda: self.generate(prompt, **kwargs))
+
+    async def agenerate_many(self, prompts: List[str], **kwargs) -> List[Any]:
+        """Async responses for several prompts; failures are returned as exceptions"""
+        return await asyncio.gather(*(self.agenerate(prompt, **kwargs) for prompt in prompts),
+                                    return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Request, cache and token statistics"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        hits = stats['exact_cache_hits'] + stats['semantic_cache_hits'] + stats['deduplicated']
+        stats['cache_hit_rate'] = hits / stats['requests'] if stats['requests'] else 0.0
+        stats['cache_size'] = len(self.cache) if self.cache is not None else 0
+        stats['semantic_cache_size'] = len(self.semantic_cache) if self.semantic_cache is not None else 0
+        return stats
+
+    def clear_cache(self):
+        """Drop all cached responses"""
+        if self.cache is not None:
+            self.cache.clear()
+        if self.semantic_cache is not None:
+            self.semantic_cache.clear()
+
+    def close(self):
+        """Shut down the worker threads"""
+        self._pool.shutdown(wait=True)
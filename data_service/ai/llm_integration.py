@@ -1,9 +1,11 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, List, Any, Optional, Union, Iterator
 import logging
 from datetime import datetime, timedelta
 import json
+import time
+import threading
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
 
@@ -106,66 +108,153 @@ class OpenAIProvider(LLMProvider):
                 usage.completion_tokens * model_costs['output']) / 1000
 
 class LocalLLMProvider(LLMProvider):
-    """Local LLM provider using transformers"""
+    """Local LLM provider using transformers
+
+    Generation runs on the process-wide LocalInferenceEngine for the model,
+    so every provider (and LLMIntegration, LangChainAgent or API server using
+    one) shares a single loaded model, and concurrent prompts are batched.
+    """
     
-    def __init__(self, model_name: str = "microsoft/DialoGPT-medium"):
+    def __init__(self, model_name: str = "microsoft/DialoGPT-medium", **engine_kwargs):
         self.model_name = model_name
         self.logger = logging.getLogger(__name__)
         
-        try:
-            from transformers import AutoTokenizer, AutoModelForCausalLM
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForCausalLM.from_pretrained(model_name)
-            self.tokenizer.pad_token = self.tokenizer.eos_token
-        except ImportError:
+        # Imported here so that importing the AI package does not load torch
+        from .local_llm import get_local_engine, TRANSFORMERS_AVAILABLE
+        if not TRANSFORMERS_AVAILABLE:
             raise ImportError("Transformers package not installed. Install with: pip install transformers torch")
+        self.engine = get_local_engine(model_name, **engine_kwargs)
+    
+    def _generation_params(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'max_new_tokens': kwargs.get('max_new_tokens', kwargs.get('max_length', 200)),
+            'temperature': kwargs.get('temperature', 0.7)
+        }
+    
+    def _to_response(self, result) -> LLMResponse:
+        return LLMResponse(
+            content=result.text,
+            confidence=0.6,  # Local models typically have lower confidence
+            metadata={'model_name': self.model_name, 'batch_size': result.batch_size},
+            timestamp=datetime.now(),
+            model_used=self.model_name,
+            tokens_used=result.tokens_used
+        )
     
     def generate_response(self, prompt: str, **kwargs) -> LLMResponse:
         """Generate response using local model"""
         try:
-            inputs = self.tokenizer.encode(prompt, return_tensors="pt", truncation=True, max_length=512)
-            
-            with torch.no_grad():
-                outputs = self.model.generate(
-                    inputs,
-                    max_length=kwargs.get('max_length', 200),
-                    temperature=kwargs.get('temperature', 0.7),
-                    do_sample=True,
-                    pad_token_id=self.tokenizer.eos_token_id
-                )
-            
-            response_text = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            response_text = response_text[len(prompt):].strip()
-            
-            return LLMResponse(
-                content=response_text,
-                confidence=0.6,  # Local models typically have lower confidence
-                metadata={'model_name': self.model_name},
-                timestamp=datetime.now(),
-                model_used=self.model_name,
-                tokens_used=len(outputs[0])
-            )
+            return self._to_response(self.engine.generate(prompt, **self._generation_params(kwargs)))
             
         except Exception as e:
             self.logger.error(f"Local LLM error: {e}")
             raise
     
+    def generate_batch(self, prompts: List[str], **kwargs) -> List[LLMResponse]:
+        """Generate responses for several prompts in shared batches"""
+        results = self.engine.generate_many(prompts, **self._generation_params(kwargs))
+        return [self._to_response(result) for result in results]
+    
+    def stream_response(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Yield the response text as it is generated"""
+        return self.engine.stream(prompt, **self._generation_params(kwargs))
+    
     def get_model_info(self) -> Dict[str, Any]:
         """Get local model information"""
         return {
             'provider': 'Local',
             'model': self.model_name,
-            'max_tokens': 512,
+            'max_tokens': self.engine.max_input_tokens,
+            'supports_functions': False,
+            'supports_streaming': True
+        }
+
+class FakeLLMProvider(LLMProvider):
+    """Deterministic offline provider for tests and dry runs
+
+    Replies with ``responses[prompt]`` when given, ``response_fn(prompt)``
+    otherwise, or a fixed JSON insight. Tokens are counted as whitespace
+    separated words. ``latency`` simulates a slow API and the first
+    ``fail_times`` calls raise, to exercise retries.
+    """
+
+    def __init__(self, model: str = "fake-llm",
+                 responses: Dict[str, str] = None,
+                 response_fn=None,
+                 latency: float = 0.0,
+                 fail_times: int = 0,
+                 cost_per_1k_tokens: float = 0.002):
+        self.model = model
+        self.responses = responses or {}
+        self.response_fn = response_fn
+        self.latency = latency
+        self.fail_times = fail_times
+        self.cost_per_1k_tokens = cost_per_1k_tokens
+        self.calls = 0
+        self.prompts: List[str] = []
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def generate_response(self, prompt: str, **kwargs) -> LLMResponse:
+        """Generate a canned response"""
+        with self._lock:
+            self.calls += 1
+            self.prompts.append(prompt)
+            fail = self.calls <= self.fail_times
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise ConnectionError("Simulated provider failure")
+
+        if prompt in self.responses:
+            content = self.responses[prompt]
+        elif self.response_fn is not None:
+            content = self.response_fn(prompt)
+        else:
+            content = json.dumps({'signal_type': 'hold', 'confidence': 0.5, 'reasoning': 'fake response'})
+
+        tokens = len(prompt.split()) + len(content.split())
+        return LLMResponse(
+            content=content,
+            confidence=0.8,
+            metadata={'provider': 'fake'},
+            timestamp=datetime.now(),
+            model_used=self.model,
+            tokens_used=tokens,
+            cost=tokens * self.cost_per_1k_tokens / 1000
+        )
+
+    def get_model_info(self) -> Dict[str, Any]:
+        """Get fake model information"""
+        return {
+            'provider': 'Fake',
+            'model': self.model,
+            'max_tokens': 4096,
             'supports_functions': False
         }
 
 class LLMIntegration:
     """LangChain + LLM integration for trading system"""
     
-    def __init__(self, provider: str = "openai", api_key: str = None, 
-                 model: str = "gpt-3.5-turbo"):
+    def __init__(self, provider: Union[str, LLMProvider] = "openai", api_key: str = None, 
+                 model: str = "gpt-3.5-turbo",
+                 max_concurrency: int = 4,
+                 max_retries: int = 3,
+                 cache_size: int = 1024,
+                 cache_ttl: float = 3600,
+                 semantic_cache=None,
+                 context_builder=None):
+        from .llm_executor import LLMExecutor
+        from .context_builder import ContextBuilder
+
         self.logger = logging.getLogger(__name__)
         self.provider = self._initialize_provider(provider, api_key, model)
+        # All provider calls go through the executor's caches, retries and concurrency bound
+        self.executor = LLMExecutor(self.provider, max_concurrency=max_concurrency,
+                                    max_retries=max_retries, cache_size=cache_size,
+                                    cache_ttl=cache_ttl, semantic_cache=semantic_cache)
+        # Prompt data is summarized and retrieved within a token budget instead of serialized
+        self.context_builder = context_builder or ContextBuilder()
         
         # Initialize LangChain components
         self._init_langchain()
@@ -178,14 +267,18 @@ class LLMIntegration:
             'portfolio_optimization': self._get_portfolio_optimization_prompt()
         }
     
-    def _initialize_provider(self, provider: str, api_key: str, model: str) -> LLMProvider:
+    def _initialize_provider(self, provider: Union[str, LLMProvider], api_key: str, model: str) -> LLMProvider:
         """Initialize LLM provider"""
+        if isinstance(provider, LLMProvider):
+            return provider
         if provider.lower() == "openai":
             if not api_key:
                 raise ValueError("OpenAI API key required")
             return OpenAIProvider(api_key, model)
         elif provider.lower() == "local":
             return LocalLLMProvider(model)
+        elif provider.lower() == "fake":
+            return FakeLLMProvider(model)
         else:
             raise ValueError(f"Unsupported provider: {provider}")
     
@@ -210,7 +303,7 @@ class LLMIntegration:
         prompt = self._create_market_analysis_prompt(market_data, symbols)
         
         try:
-            response = self.provider.generate_response(prompt)
+            response = self.executor.generate(prompt, cache_scope=self._cache_scope(symbols))
             
             # Parse response to extract insights
             insight = self._parse_trading_insight(response.content, 'analysis', symbols)
@@ -220,6 +313,20 @@ class LLMIntegration:
             self.logger.error(f"Market analysis failed: {e}")
             return self._create_default_insight('analysis', symbols)
     
+    def analyze_market_data_batch(self, market_data: Dict[str, pd.DataFrame]) -> Dict[str, TradingInsight]:
+        """Analyze several symbols' market data with concurrent LLM calls"""
+        symbols = list(market_data)
+        prompts = [self._create_market_analysis_prompt(market_data[symbol], [symbol]) for symbol in symbols]
+        insights = {}
+        scopes = [self._cache_scope([symbol]) for symbol in symbols]
+        for symbol, response in zip(symbols, self.executor.generate_many(prompts, cache_scopes=scopes)):
+            if isinstance(response, Exception):
+                self.logger.error(f"Market analysis failed for {symbol}: {response}")
+                insights[symbol] = self._create_default_insight('analysis', [symbol])
+            else:
+                insights[symbol] = self._parse_trading_insight(response.content, 'analysis', [symbol])
+        return insights
+    
     def generate_trading_signals(self, factor_data: pd.DataFrame,
                                 price_data: pd.DataFrame,
                                 strategy_context: str = "") -> TradingInsight:
@@ -227,7 +334,7 @@ class LLMIntegration:
         prompt = self._create_signal_generation_prompt(factor_data, price_data, strategy_context)
         
         try:
-            response = self.provider.generate_response(prompt)
+            response = self.executor.generate(prompt)
             insight = self._parse_trading_insight(response.content, 'signal', 
                                                 list(factor_data.columns))
             return insight
@@ -240,10 +347,10 @@ class LLMIntegration:
                    market_conditions: Dict[str, Any]) -> TradingInsight:
         """Assess portfolio risk using LLM"""
         prompt = self._create_risk_assessment_prompt(portfolio_data, market_conditions)
+        symbols = list(portfolio_data.get('positions', {}).keys())
         
         try:
-            response = self.provider.generate_response(prompt)
-            symbols = list(portfolio_data.get('positions', {}).keys())
+            response = self.executor.generate(prompt, cache_scope=self._cache_scope(symbols))
             insight = self._parse_trading_insight(response.content, 'risk_warning', symbols)
             return insight
             
@@ -256,10 +363,10 @@ class LLMIntegration:
                           constraints: Dict[str, Any]) -> TradingInsight:
         """Generate portfolio optimization recommendations"""
         prompt = self._create_portfolio_optimization_prompt(current_weights, factor_scores, constraints)
+        symbols = list(current_weights.keys())
         
         try:
-            response = self.provider.generate_response(prompt)
-            symbols = list(current_weights.keys())
+            response = self.executor.generate(prompt, cache_scope=self._cache_scope(symbols))
             insight = self._parse_trading_insight(response.content, 'recommendation', symbols)
             return insight
             
@@ -273,7 +380,7 @@ class LLMIntegration:
         prompt = self._create_question_prompt(question, context_data)
         
         try:
-            response = self.provider.generate_response(prompt)
+            response = self.executor.generate(prompt)
             return response
             
         except Exception as e:
@@ -287,16 +394,21 @@ class LLMIntegration:
                 tokens_used=0
             )
     
+    @staticmethod
+    def _cache_scope(symbols: List[str]) -> str:
+        """Semantic cache scope: responses are never shared between different symbol sets"""
+        return ','.join(sorted(map(str, symbols)))
+    
     def _create_market_analysis_prompt(self, market_data: pd.DataFrame, 
                                      symbols: List[str]) -> str:
         """Create market analysis prompt"""
-        data_summary = market_data.describe().to_string()
+        context = self.context_builder.build(query=f"market news {' '.join(map(str, symbols))}",
+                                             frames={'Market data': market_data})
         
         return f"""
         Analyze the following market data for symbols {symbols}:
         
-        Market Data Summary:
-        {data_summary}
+        {context}
         
         Please provide:
         1. Market trend analysis
@@ -312,17 +424,13 @@ class LLMIntegration:
                                        price_data: pd.DataFrame,
                                        strategy_context: str) -> str:
         """Create signal generation prompt"""
-        factor_summary = factor_data.tail(5).to_string()
-        price_summary = price_data.tail(5).to_string()
+        context = self.context_builder.build(query=strategy_context or None,
+                                             frames={'Factor data': factor_data, 'Price data': price_data})
         
         return f"""
         Generate trading signals based on the following data:
         
-        Factor Data (last 5 periods):
-        {factor_summary}
-        
-        Price Data (last 5 periods):
-        {price_summary}
+        {context}
         
         Strategy Context: {strategy_context}
         
@@ -465,5 +573,6 @@ class LLMIntegration:
         return {
             'provider': self.provider.get_model_info()['provider'],
             'model': self.provider.get_model_info()['model'],
-            'timestamp': datetime.now()
+            'timestamp': datetime.now(),
+            **self.executor.get_stats()
         } 
\ No newline at end of file
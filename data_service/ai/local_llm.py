@@ -0,0 +1,350 @@
+"""
+Local LLM inference engine
+
+Loads a transformers causal LM once per process and serves every
+LocalLLMProvider that asks for the same model. Concurrent prompts are queued
+and generated together: requests arriving within ``batch_wait`` seconds are
+grouped by generation parameters and by prompt length, so a batch pads as
+little as possible. The system prompt is encoded and run through the model
+once; its key/value cache is reused as the prefix of every batch, with each
+prompt left-padded after the prefix. Single prompts can also be streamed
+token by token.
+"""
+
+import copy
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+import logging
+
+try:
+    import torch
+    from transformers import AutoTokenizer, AutoModelForCausalLM, TextIteratorStreamer
+    TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    TRANSFORMERS_AVAILABLE = False
+
+DEFAULT_SYSTEM_PROMPT = "You are a financial analyst and trading expert."
+
+# Process-wide models and engines, keyed by model name and device
+_models: Dict[Tuple[str, str], Tuple[Any, Any]] = {}
+_engines: Dict[Tuple[str, str, str], 'LocalInferenceEngine'] = {}
+_registry_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+def _default_device() -> str:
+    return 'cuda' if torch.cuda.is_available() else 'cpu'
+
+def load_local_model(model_name: str, device: str = None) -> Tuple[Any, Any]:
+    """Tokenizer and model for ``model_name``, loaded on first use and shared afterwards"""
+    if not TRANSFORMERS_AVAILABLE:
+        raise ImportError("Transformers package not installed. Install with: pip install transformers torch")
+    device = device or _default_device()
+    key = (model_name, device)
+    with _registry_lock:
+        if key not in _models:
+            logger.info(f"Loading local model {model_name} on {device}")
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            if tokenizer.pad_token is None:
+                tokenizer.pad_token = tokenizer.eos_token
+            model = AutoModelForCausalLM.from_pretrained(model_name).to(device)
+            model.eval()
+            _models[key] = (tokenizer, model)
+        return _models[key]
+
+def get_local_engine(model_name: str, device: str = None,
+                     system_prompt: str = DEFAULT_SYSTEM_PROMPT, **engine_kwargs) -> 'LocalInferenceEngine':
+    """Shared inference engine for a model, device and system prompt
+
+    ``engine_kwargs`` only apply when the engine is first created.
+    """
+    device = device or (_default_device() if TRANSFORMERS_AVAILABLE else 'cpu')
+    key = (model_name, device, system_prompt)
+    with _registry_lock:
+        engine = _engines.get(key)
+    if engine is None:
+        created = LocalInferenceEngine(model_name, device=device, system_prompt=system_prompt, **engine_kwargs)
+        with _registry_lock:
+            engine = _engines.setdefault(key, created)
+        if engine is not created:
+            created.close()
+    return engine
+
+def group_by_length(lengths: List[int], max_batch_size: int,
+                    max_padding_ratio: float = 0.25) -> List[List[int]]:
+    """Split prompt indices into batches of similar token length
+
+    Prompts are taken shortest first; a batch is closed when it is full or
+    when adding the next (longest so far) prompt would make padding more
+    than ``max_padding_ratio`` of the batch's tokens.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches: List[List[int]] = []
+    current: List[int] = []
+    real_tokens = 0
+    for index in order:
+        if current:
+            padded_tokens = lengths[index] * (len(current) + 1)
+            waste = padded_tokens - (real_tokens + lengths[index])
+            if len(current) >= max_batch_size or waste > max_padding_ratio * padded_tokens:
+                batches.append(current)
+                current, real_tokens = [], 0
+        current.append(index)
+        real_tokens += lengths[index]
+    if current:
+        batches.append(current)
+    return batches
+
+@dataclass
+class GenerationResult:
+    """Text generated for one prompt"""
+    text: str
+    prompt_tokens: int
+    completion_tokens: int
+    batch_size: int
+
+    @property
+    def tokens_used(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+@dataclass
+class _Request:
+    prompt_ids: List[int]
+    params: Tuple[int, float]
+    future: Future = field(default_factory=Future)
+
+class LocalInferenceEngine:
+    """Batched generation on one shared local model"""
+
+    def __init__(self, model_name: str,
+                 device: str = None,
+                 system_prompt: str = DEFAULT_SYSTEM_PROMPT,
+                 max_batch_size: int = 8,
+                 batch_wait: float = 0.02,
+                 max_padding_ratio: float = 0.25,
+                 max_input_tokens: int = 512,
+                 reuse_prefix: bool = True):
+        self.model_name = model_name
+        self.tokenizer, self.model = load_local_model(model_name, device)
+        self.device = self.model.device
+        self.system_prompt = system_prompt
+        self.max_batch_size = max_batch_size
+        self.batch_wait = batch_wait
+        self.max_padding_ratio = max_padding_ratio
+        self.max_input_tokens = max_input_tokens
+        self.reuse_prefix = reuse_prefix
+        self.logger = logging.getLogger(__name__)
+
+        self._model_lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self.stats = {'prompts': 0, 'batches': 0, 'prompt_tokens': 0, 'padding_tokens': 0,
+                      'completion_tokens': 0, 'prefix_tokens_reused': 0}
+
+        self._prefix_ids = self._encode_prefix()
+        self._prefix_cache = self._build_prefix_cache() if reuse_prefix else None
+
+        self._worker = threading.Thread(target=self._serve, name=f'local-llm-{model_name}', daemon=True)
+        self._worker.start()
+
+    def _encode_prefix(self) -> List[int]:
+        text = f"{self.system_prompt}\n\n" if self.system_prompt else ""
+        ids = self.tokenizer(text, add_special_tokens=True)['input_ids'] if text else []
+        if not ids and self.tokenizer.bos_token_id is not None:
+            ids = [self.tokenizer.bos_token_id]
+        return ids
+
+    def _build_prefix_cache(self):
+        """Key/value cache of the system prompt, computed once"""
+        if not self._prefix_ids:
+            return None
+        try:
+            prefix = torch.tensor([self._prefix_ids], device=self.device)
+            with torch.no_grad():
+                return self.model(prefix, use_cache=True).past_key_values
+        except Exception as e:
+            self.logger.warning(f"Prefix cache unavailable for {self.model_name}: {e}")
+            return None
+
+    def _encode(self, prompt: str) -> List[int]:
+        """Prompt tokens after the system prefix, keeping the most recent max_input_tokens"""
+        ids = self.tokenizer(prompt, add_special_tokens=False)['input_ids']
+        return ids[-self.max_input_tokens:] or [self.tokenizer.eos_token_id]
+
+    def submit(self, prompt: str, max_new_tokens: int = 200, temperature: float = 0.7) -> Future:
+        """Queue a prompt; the future resolves to a GenerationResult"""
+        request = _Request(self._encode(prompt), (int(max_new_tokens), float(temperature)))
+        self._queue.put(request)
+        return request.future
+
+    def generate(self, prompt: str, max_new_tokens: int = 200, temperature: float = 0.7) -> GenerationResult:
+        """Generate for one prompt, batched with whatever else is in flight"""
+        return self.submit(prompt, max_new_tokens, temperature).result()
+
+    def generate_many(self, prompts: List[str], max_new_tokens: int = 200,
+                      temperature: float = 0.7) -> List[GenerationResult]:
+        """Generate for several prompts; all are queued before waiting so they batch together"""
+        futures = [self.submit(prompt, max_new_tokens, temperature) for prompt in prompts]
+        return [future.result() for future in futures]
+
+    def _serve(self):
+        """Worker loop: collect requests for up to batch_wait seconds, then run them"""
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            pending = [request]
+            deadline = time.monotonic() + self.batch_wait
+            stop = False
+            while True:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                pending.append(request)
+            try:
+                self._run(pending)
+            except Exception as e:
+                # Never let a failure end the worker: fail the requests it left unanswered
+                self.logger.error(f"Local generation worker error: {e}")
+                for request in pending:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+            if stop:
+                return
+
+    def _run(self, pending: List[_Request]):
+        by_params: Dict[Tuple[int, float], List[_Request]] = {}
+        for request in pending:
+            by_params.setdefault(request.params, []).append(request)
+
+        for params, requests in by_params.items():
+            lengths = [len(request.prompt_ids) for request in requests]
+            for indices in group_by_length(lengths, self.max_batch_size, self.max_padding_ratio):
+                batch = [requests[i] for i in indices]
+                try:
+                    results = self._generate_batch(batch, *params)
+                except Exception as e:
+                    self.logger.error(f"Local generation failed for a batch of {len(batch)}: {e}")
+                    for request in batch:
+                        request.future.set_exception(e)
+                    continue
+                for request, result in zip(batch, results):
+                    request.future.set_result(result)
+
+    def _batch_inputs(self, batch: List[List[int]]):
+        """Prefix + left-padded prompts, so the prefix sits at the same positions in every row"""
+        prefix_length = len(self._prefix_ids)
+        width = max(len(ids) for ids in batch)
+        pad_id = self.tokenizer.pad_token_id
+        input_ids = torch.full((len(batch), prefix_length + width), pad_id, dtype=torch.long)
+        attention_mask = torch.zeros_like(input_ids)
+        if prefix_length:
+            input_ids[:, :prefix_length] = torch.tensor(self._prefix_ids)
+            attention_mask[:, :prefix_length] = 1
+        for row, ids in enumerate(batch):
+            input_ids[row, prefix_length + width - len(ids):] = torch.tensor(ids)
+            attention_mask[row, prefix_length + width - len(ids):] = 1
+        return input_ids.to(self.device), attention_mask.to(self.device), width
+
+    def _expanded_prefix_cache(self, batch_size: int):
+        """Copy of the prefix cache repeated along the batch dimension"""
+        cache = copy.deepcopy(self._prefix_cache)
+        if hasattr(cache, 'batch_repeat_interleave'):
+            cache.batch_repeat_interleave(batch_size)
+            return cache
+        # Legacy tuple-of-tuples format
+        return tuple(tuple(tensor.repeat_interleave(batch_size, dim=0) for tensor in layer) for layer in cache)
+
+    def _model_generate(self, input_ids, attention_mask, max_new_tokens: int, temperature: float,
+                        streamer=None):
+        kwargs = {
+            'input_ids': input_ids,
+            'attention_mask': attention_mask,
+            'max_new_tokens': max_new_tokens,
+            'do_sample': temperature > 0,
+            'pad_token_id': self.tokenizer.pad_token_id
+        }
+        if temperature > 0:
+            kwargs['temperature'] = temperature
+        if streamer is not None:
+            kwargs['streamer'] = streamer
+
+        with self._model_lock, torch.no_grad():
+            if self._prefix_cache is not None:
+                try:
+                    outputs = self.model.generate(
+                        past_key_values=self._expanded_prefix_cache(input_ids.shape[0]), **kwargs
+                    )
+                    self.stats['prefix_tokens_reused'] += len(self._prefix_ids) * input_ids.shape[0]
+                    return outputs
+                except Exception as e:
+                    # Some architectures reject a precomputed cache; fall back to full prompts
+                    self.logger.warning(f"Disabling prefix reuse for {self.model_name}: {e}")
+                    self._prefix_cache = None
+            return self.model.generate(**kwargs)
+
+    def _generate_batch(self, batch: List[_Request], max_new_tokens: int,
+                        temperature: float) -> List[GenerationResult]:
+        input_ids, attention_mask, width = self._batch_inputs([request.prompt_ids for request in batch])
+        outputs = self._model_generate(input_ids, attention_mask, max_new_tokens, temperature)
+
+        new_tokens = outputs[:, input_ids.shape[1]:]
+        texts = self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+        completion_counts = (new_tokens != self.tokenizer.pad_token_id).sum(dim=1).tolist()
+
+        prompt_tokens = [len(self._prefix_ids) + len(request.prompt_ids) for request in batch]
+        self.stats['prompts'] += len(batch)
+        self.stats['batches'] += 1
+        self.stats['prompt_tokens'] += sum(prompt_tokens)
+        self.stats['padding_tokens'] += sum(width - len(request.prompt_ids) for request in batch)
+        self.stats['completion_tokens'] += sum(completion_counts)
+
+        return [
+            GenerationResult(text=text.strip(), prompt_tokens=prompt, completion_tokens=int(completion),
+                             batch_size=len(batch))
+            for text, prompt, completion in zip(texts, prompt_tokens, completion_counts)
+        ]
+
+    def stream(self, prompt: str, max_new_tokens: int = 200, temperature: float = 0.7) -> Iterator[str]:
+        """Yield the completion of one prompt as text chunks while it is generated"""
+        input_ids, attention_mask, _ = self._batch_inputs([self._encode(prompt)])
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        errors: List[Exception] = []
+
+        def run():
+            try:
+                self._model_generate(input_ids, attention_mask, max_new_tokens, temperature, streamer=streamer)
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        for text in streamer:
+            if text:
+                yield text
+        thread.join()
+        if errors:
+            raise errors[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Batching and token statistics"""
+        stats = dict(self.stats)
+        stats['avg_batch_size'] = stats['prompts'] / stats['batches'] if stats['batches'] else 0.0
+        stats['queued'] = self._queue.qsize()
+        return stats
+
+    def close(self):
+        """Stop the worker after the queued requests are served"""
+        self._queue.put(None)
+        self._worker.join()
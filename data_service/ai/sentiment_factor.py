@@ -5,6 +5,16 @@ import logging
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 
+# Relative weight of each source in the weighted sentiment score
+SOURCE_WEIGHTS = {'news': 1.2, 'twitter': 0.8, 'reddit': 0.8}
+SOCIAL_SOURCES = ['twitter', 'reddit']
+
+FACTOR_COLUMNS = [
+    'symbol', 'timestamp', 'sentiment_score', 'sentiment_momentum', 'sentiment_volatility',
+    'news_volume', 'social_volume', 'sentiment_consensus', 'market_sentiment',
+    'sector_sentiment', 'sector_relative_sentiment', 'confidence'
+]
+
 @dataclass
 class SentimentFactor:
     """Sentiment factor data structure"""
@@ -231,28 +241,206 @@ class SentimentFactorCalculator:
     def calculate_sentiment_factor_matrix(self, 
                                         sentiment_data: pd.DataFrame,
                                         symbols: List[str],
-                                        lookback_period: int = 20) -> pd.DataFrame:
-        """Calculate sentiment factors for multiple symbols"""
-        factors = []
-        
-        for symbol in symbols:
-            factor = self.calculate_sentiment_factors(sentiment_data, symbol, lookback_period)
-            factors.append({
-                'symbol': factor.symbol,
-                'timestamp': factor.timestamp,
-                'sentiment_score': factor.sentiment_score,
-                'sentiment_momentum': factor.sentiment_momentum,
-                'sentiment_volatility': factor.sentiment_volatility,
-                'news_volume': factor.news_volume,
-                'social_volume': factor.social_volume,
-                'sentiment_consensus': factor.sentiment_consensus,
-                'market_sentiment': factor.market_sentiment,
-                'sector_sentiment': factor.sector_sentiment,
-                'confidence': factor.confidence
-            })
-        
-        return pd.DataFrame(factors)
-    
+                                        lookback_period: int = 20,
+                                        sectors: Optional[Dict[str, str]] = None,
+                                        as_of: Optional[datetime] = None) -> pd.DataFrame:
+        """Calculate sentiment factors for multiple symbols
+
+        All symbols are computed in one pass: the rows are sorted once by symbol
+        and timestamp and every factor is a segment reduction over the symbol
+        groups, so the cost is linear in the number of rows instead of
+        symbols x rows. Values match calculate_sentiment_factors, with recency
+        measured from ``as_of`` (default now). ``sectors`` maps symbols to
+        sectors; sector_sentiment is then the mean sentiment of the symbol's
+        sector and sector_relative_sentiment the symbol's mean minus it.
+        Without a mapping each symbol is its own sector. Symbols without data
+        get default (zero) factors.
+        """
+        as_of = pd.Timestamp(as_of if as_of is not None else datetime.now())
+        try:
+            rows = self._prepare_sentiment_rows(sentiment_data)
+            if rows.empty:
+                factors = pd.DataFrame(columns=FACTOR_COLUMNS)
+            else:
+                symbol_codes, symbol_index = pd.factorize(rows['symbol'], sort=True)
+                factors = self._reduce_sentiment_groups(
+                    rows, symbol_codes, np.zeros(len(rows), dtype=np.int64),
+                    np.array([as_of.to_datetime64()]), lookback_period, sectors
+                )
+                factors.insert(0, 'symbol', symbol_index)
+                factors.insert(1, 'timestamp', as_of)
+        except Exception as e:
+            self.logger.error(f"Error calculating sentiment factor matrix: {e}")
+            factors = pd.DataFrame(columns=FACTOR_COLUMNS)
+
+        factors = factors.set_index('symbol').reindex(list(symbols))
+        # Symbols without data get the default factor
+        missing = factors['timestamp'].isna().to_numpy()
+        factors.loc[missing, 'timestamp'] = as_of
+        factors.loc[missing, FACTOR_COLUMNS[2:]] = 0.0
+        factors[['news_volume', 'social_volume']] = factors[['news_volume', 'social_volume']].astype(int)
+        return factors.rename_axis('symbol').reset_index()[FACTOR_COLUMNS]
+
+    def calculate_sentiment_factor_panel(self,
+                                       sentiment_data: pd.DataFrame,
+                                       freq: str = 'D',
+                                       symbols: Optional[List[str]] = None,
+                                       lookback_period: int = 20,
+                                       sectors: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+        """Calculate a historical panel of sentiment factors, one row per time bucket and symbol
+
+        Rows are bucketed by ``freq`` (any pandas offset alias) into intervals
+        closed on the right and labelled by their end; the factors of a bucket
+        use only its rows, with recency measured from the bucket end and the
+        market and sector means taken over the bucket. Only (bucket, symbol)
+        pairs with data are returned, restricted to ``symbols`` if given.
+        """
+        try:
+            rows = self._prepare_sentiment_rows(sentiment_data)
+            if rows.empty:
+                return pd.DataFrame(columns=FACTOR_COLUMNS)
+
+            buckets = rows.groupby(pd.Grouper(key='timestamp', freq=freq, closed='right', label='right'))
+            bucket_ends = buckets.size().index.to_numpy()
+            # A row belongs to the first bucket ending at or after it
+            bucket_codes = np.searchsorted(bucket_ends, rows['timestamp'].to_numpy(), side='left')
+            symbol_codes, symbol_index = pd.factorize(rows['symbol'], sort=True)
+
+            # One group per (bucket, symbol) pair present in the data
+            pair_codes, pairs = pd.factorize(bucket_codes * len(symbol_index) + symbol_codes, sort=True)
+            factors = self._reduce_sentiment_groups(
+                rows, pair_codes, bucket_codes, bucket_ends, lookback_period, sectors
+            )
+            factors.insert(0, 'symbol', symbol_index[pairs % len(symbol_index)])
+            factors.insert(1, 'timestamp', bucket_ends[pairs // len(symbol_index)])
+
+            if symbols is not None:
+                factors = factors[factors['symbol'].isin(symbols)]
+            return factors[FACTOR_COLUMNS].reset_index(drop=True)
+
+        except Exception as e:
+            self.logger.error(f"Error calculating sentiment factor panel: {e}")
+            return pd.DataFrame(columns=FACTOR_COLUMNS)
+
+    def _prepare_sentiment_rows(self, sentiment_data: pd.DataFrame) -> pd.DataFrame:
+        """Columns the factor reductions need, with tz-aware timestamps converted to naive UTC"""
+        timestamps = pd.to_datetime(sentiment_data['timestamp'])
+        if timestamps.dt.tz is not None:
+            timestamps = timestamps.dt.tz_convert('UTC').dt.tz_localize(None)
+
+        rows = pd.DataFrame({
+            'symbol': sentiment_data['symbol'].to_numpy(),
+            'timestamp': timestamps.to_numpy(),
+            'sentiment_score': sentiment_data['sentiment_score'].to_numpy(dtype=float),
+            'confidence': (sentiment_data['confidence'].to_numpy(dtype=float)
+                           if 'confidence' in sentiment_data.columns else 0.5),
+            'source': (sentiment_data['source'].to_numpy()
+                       if 'source' in sentiment_data.columns else None)
+        })
+        return rows.dropna(subset=['symbol', 'timestamp'])
+
+    def _reduce_sentiment_groups(self,
+                                 rows: pd.DataFrame,
+                                 group_codes: np.ndarray,
+                                 market_codes: np.ndarray,
+                                 as_of: np.ndarray,
+                                 lookback_period: int,
+                                 sectors: Optional[Dict[str, str]]) -> pd.DataFrame:
+        """Sentiment factors of every group of rows as segment reductions
+
+        ``group_codes`` numbers the groups 0..n-1 (a symbol, or a symbol within a
+        time bucket); ``market_codes`` numbers the market the group belongs to
+        and indexes ``as_of``, the time recency is measured from.
+        """
+        # Sort by group, then time, so each group is one contiguous segment
+        order = np.lexsort((rows['timestamp'].to_numpy(), group_codes))
+        codes = group_codes[order]
+        markets = market_codes[order]
+        timestamps = rows['timestamp'].to_numpy()[order]
+        scores = rows['sentiment_score'].to_numpy()[order]
+        confidence = rows['confidence'].to_numpy()[order]
+        source = rows['source'].to_numpy()[order]
+        symbols = rows['symbol'].to_numpy()[order]
+
+        n_groups = int(codes.max()) + 1
+        sizes = np.bincount(codes, minlength=n_groups)
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+        def group_sum(values, mask=None):
+            if mask is not None:
+                return np.bincount(codes[mask], weights=values[mask], minlength=n_groups)
+            return np.bincount(codes, weights=values, minlength=n_groups)
+
+        # Recency- and source-weighted sentiment and confidence
+        hours_ago = (as_of[markets] - timestamps) / np.timedelta64(1, 'h')
+        recency = np.exp(-hours_ago / 24)
+        is_news = source == 'news'
+        is_social = np.isin(source, SOCIAL_SOURCES)
+        source_weight = np.where(is_news, SOURCE_WEIGHTS['news'], np.where(is_social, SOURCE_WEIGHTS['twitter'], 1.0))
+        weights = confidence * recency * source_weight
+
+        weight_sum = group_sum(weights)
+        weighted_score = group_sum(weights * scores)
+        recency_sum = group_sum(recency)
+        weighted_confidence = group_sum(recency * confidence)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sentiment_score = np.where(weight_sum == 0, 0.0, weighted_score / weight_sum)
+            group_confidence = np.where(recency_sum == 0, 0.0, weighted_confidence / recency_sum)
+
+        # Momentum (least-squares slope) and volatility over the last lookback_period rows
+        position = np.arange(len(codes)) - starts[codes]
+        tail_size = np.minimum(sizes, lookback_period)
+        tail = position >= (sizes - tail_size)[codes]
+        x = (position - (sizes - tail_size)[codes]).astype(float)
+        n = tail_size.astype(float)
+        sum_x = group_sum(x, tail)
+        sum_y = group_sum(scores, tail)
+        sum_xy = group_sum(x * scores, tail)
+        sum_xx = group_sum(x * x, tail)
+        tail_mean = sum_y / np.maximum(n, 1)
+        tail_squares = group_sum((scores - tail_mean[codes]) ** 2, tail)
+        enough = tail_size >= 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            momentum = np.where(enough, (n * sum_xy - sum_x * sum_y) / (n * sum_xx - sum_x ** 2), 0.0)
+            volatility = np.where(enough, np.sqrt(tail_squares / (n - 1)), 0.0)
+
+        # Consensus from the dispersion of all of the group's scores
+        group_mean = group_sum(scores) / sizes
+        squares = group_sum((scores - group_mean[codes]) ** 2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dispersion = np.where(sizes > 1, np.sqrt(squares / (sizes - 1)), np.nan)
+        consensus = 1.0 - np.minimum(dispersion, 1.0)
+
+        # Group mean relative to its market and sector
+        group_market = markets[starts]
+        n_markets = int(markets.max()) + 1
+        market_mean = (np.bincount(markets, weights=scores, minlength=n_markets)
+                       / np.maximum(np.bincount(markets, minlength=n_markets), 1))
+
+        if sectors:
+            sector_labels = pd.Series(symbols).map(sectors)
+            # Unmapped symbols form a sector of their own
+            sector_labels = sector_labels.where(sector_labels.notna(), '\x00' + pd.Series(symbols).astype(str))
+            sector_codes, sector_index = pd.factorize(sector_labels)
+            sector_keys, _ = pd.factorize(markets * len(sector_index) + sector_codes)
+            sector_mean = (np.bincount(sector_keys, weights=scores)
+                           / np.bincount(sector_keys))[sector_keys[starts]]
+        else:
+            sector_mean = group_mean
+
+        return pd.DataFrame({
+            'sentiment_score': sentiment_score,
+            'sentiment_momentum': momentum,
+            'sentiment_volatility': volatility,
+            'news_volume': np.bincount(codes, weights=is_news, minlength=n_groups).astype(int),
+            'social_volume': np.bincount(codes, weights=is_social, minlength=n_groups).astype(int),
+            'sentiment_consensus': consensus,
+            'market_sentiment': group_mean - market_mean[group_market],
+            'sector_sentiment': sector_mean,
+            'sector_relative_sentiment': group_mean - sector_mean,
+            'confidence': group_confidence
+        })
+
     def create_sentiment_signal(self, sentiment_factor: SentimentFactor,
                                threshold: float = 0.1) -> Dict[str, Any]:
         """Create trading signal based on sentiment factor"""
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Streaming Sentiment Aggregation
+Per-symbol exponentially decayed sentiment sums that update in O(1) per
+incoming SentimentData or SocialPost, so live sentiment factors never rescan
+the raw history. Each half-life keeps its own sums; a sum decays by half
+every ``half_life`` hours. The state can be snapshotted to plain JSON-ready
+dicts and restored.
+"""
+
+import math
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterable
+import logging
+
+import pandas as pd
+
+from .sentiment_factor import SOURCE_WEIGHTS, SOCIAL_SOURCES
+from .sentiment_analyzer import SentimentData
+from .social_media_monitor import SocialPost
+
+# Decayed sums kept per half-life
+SUM_FIELDS = ['weight', 'score', 'square', 'count', 'confidence', 'news', 'social', 'engagement']
+
+class DecayedSentimentState:
+    """Exponentially decayed sentiment sums of one symbol for several half-lives
+
+    ``weight``, ``score`` and ``square`` are the sums of w, w*s and w*s^2 over
+    scored observations (w = confidence x source weight), which give the
+    weighted mean and variance; ``count``, ``news``, ``social`` and
+    ``engagement`` are decayed volumes and ``confidence`` the decayed sum of
+    confidences.
+    """
+
+    def __init__(self, half_lives: List[float]):
+        self.half_lives = list(half_lives)
+        self.sums: List[List[float]] = [[0.0] * len(SUM_FIELDS) for _ in self.half_lives]
+        self.last_update: Optional[datetime] = None
+        self.observations = 0
+
+    def _decay(self, hours: float) -> List[float]:
+        return [0.5 ** (hours / half_life) for half_life in self.half_lives]
+
+    def update(self, timestamp: datetime, score: Optional[float], weight: float,
+               confidence: float, source: str, engagement: float = 0.0):
+        """Add one observation; ``score`` None counts volume only
+
+        Observations older than the last update are decayed to it instead of
+        decaying the state, so arrival order does not change the result.
+        """
+        if self.last_update is None:
+            self.last_update = timestamp
+        elapsed = (timestamp - self.last_update).total_seconds() / 3600
+        if elapsed > 0:
+            for sums, decay in zip(self.sums, self._decay(elapsed)):
+                for i in range(len(sums)):
+                    sums[i] *= decay
+            self.last_update = timestamp
+            factors = [1.0] * len(self.half_lives)
+        else:
+            factors = self._decay(-elapsed)
+
+        scored = score is not None and not math.isnan(score)
+        is_news = source == 'news'
+        is_social = source in SOCIAL_SOURCES
+        for sums, factor in zip(self.sums, factors):
+            if scored:
+                w = weight * factor
+                sums[0] += w
+                sums[1] += w * score
+                sums[2] += w * score * score
+            sums[3] += factor
+            sums[4] += factor * confidence
+            sums[5] += factor * is_news
+            sums[6] += factor * is_social
+            sums[7] += factor * engagement
+        self.observations += 1
+
+    def values(self, as_of: Optional[datetime] = None) -> Dict[float, Dict[str, float]]:
+        """Decayed factors per half-life, decayed forward to ``as_of`` (default: last update)"""
+        if self.last_update is None:
+            return {half_life: _empty_values() for half_life in self.half_lives}
+
+        elapsed = 0.0
+        if as_of is not None:
+            elapsed = max((as_of - self.last_update).total_seconds() / 3600, 0.0)
+
+        result = {}
+        for half_life, sums, decay in zip(self.half_lives, self.sums, self._decay(elapsed)):
+            weight, score, square, count, confidence, news, social, engagement = sums
+            mean = score / weight if weight > 0 else 0.0
+            variance = max(square / weight - mean * mean, 0.0) if weight > 0 else 0.0
+            std = math.sqrt(variance)
+            result[half_life] = {
+                'sentiment_score': mean,
+                'sentiment_volatility': std,
+                'sentiment_consensus': 1.0 - min(std, 1.0) if weight > 0 else 0.0,
+                'volume': count * decay,
+                'news_volume': news * decay,
+                'social_volume': social * decay,
+                'engagement': engagement * decay,
+                'confidence': confidence / count if count > 0 else 0.0
+            }
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'last_update': self.last_update.isoformat() if self.last_update else None,
+            'observations': self.observations,
+            'sums': [list(sums) for sums in self.sums]
+        }
+
+    @classmethod
+    def from_dict(cls, half_lives: List[float], data: Dict[str, Any]) -> 'DecayedSentimentState':
+        state = cls(half_lives)
+        state.last_update = datetime.fromisoformat(data['last_update']) if data.get('last_update') else None
+        state.observations = data.get('observations', 0)
+        state.sums = [[float(value) for value in sums] for sums in data['sums']]
+        return state
+
+def _empty_values() -> Dict[str, float]:
+    return {
+        'sentiment_score': 0.0, 'sentiment_volatility': 0.0, 'sentiment_consensus': 0.0,
+        'volume': 0.0, 'news_volume': 0.0, 'social_volume': 0.0, 'engagement': 0.0, 'confidence': 0.0
+    }
+
+class SentimentAggregator:
+    """Live per-symbol sentiment from streams of SentimentData and SocialPost
+
+    Weights follow SentimentFactorCalculator: confidence x source weight
+    (news 1.2, twitter/reddit 0.8). Social posts carry no confidence and use
+    ``post_confidence``; unscored posts (sentiment 0) add volume and
+    engagement only, as in SocialMediaMonitor.calculate_social_metrics.
+    """
+
+    def __init__(self, half_lives: List[float] = None, post_confidence: float = 1.0):
+        self.half_lives = list(half_lives or [1.0, 24.0, 168.0])
+        self.post_confidence = post_confidence
+        self.states: Dict[str, DecayedSentimentState] = {}
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def _state(self, symbol: str) -> DecayedSentimentState:
+        state = self.states.get(symbol)
+        if state is None:
+            state = self.states[symbol] = DecayedSentimentState(self.half_lives)
+        return state
+
+    def update(self, item: Any, symbol: str = None):
+        """Add a SentimentData or SocialPost (``symbol`` overrides the item's own)"""
+        symbol = symbol or item.symbol
+        if not symbol:
+            return
+
+        if isinstance(item, SocialPost):
+            source = item.platform
+            score = item.sentiment_score if item.sentiment_score != 0 else None
+            confidence = self.post_confidence
+            engagement = item.likes + item.retweets + item.replies
+        else:
+            source = item.source
+            score = item.sentiment_score
+            confidence = item.confidence
+            engagement = 0.0
+
+        weight = confidence * SOURCE_WEIGHTS.get(source, 1.0)
+        with self._lock:
+            self._state(symbol).update(item.timestamp, score, weight, confidence, source, engagement)
+
+    def update_many(self, items: Iterable[Any]):
+        """Add several SentimentData/SocialPost items"""
+        for item in items:
+            self.update(item)
+
+    def update_frame(self, sentiment_data: pd.DataFrame):
+        """Seed the state from a frame in SentimentFactorCalculator's long format"""
+        frame = sentiment_data.sort_values('timestamp', kind='stable')
+        has_confidence = 'confidence' in frame.columns
+        has_source = 'source' in frame.columns
+        for row in frame.itertuples(index=False):
+            confidence = row.confidence if has_confidence else 0.5
+            source = row.source if has_source else None
+            weight = confidence * SOURCE_WEIGHTS.get(source, 1.0)
+            with self._lock:
+                self._state(row.symbol).update(pd.Timestamp(row.timestamp).to_pydatetime(),
+                                               row.sentiment_score, weight, confidence, source)
+
+    def get_factors(self, symbol: str, as_of: Optional[datetime] = None) -> Dict[float, Dict[str, float]]:
+        """Current decayed factors of a symbol per half-life"""
+        with self._lock:
+            state = self.states.get(symbol)
+            if state is None:
+                return {half_life: _empty_values() for half_life in self.half_lives}
+            return state.values(as_of)
+
+    def factor_frame(self, half_life: float = None, as_of: Optional[datetime] = None) -> pd.DataFrame:
+        """One row of decayed factors per symbol for one half-life (default: the first)
+
+        market_sentiment is the symbol's score minus the average score of all symbols.
+        """
+        half_life = self.half_lives[0] if half_life is None else half_life
+        if half_life not in self.half_lives:
+            raise ValueError(f"Unknown half-life {half_life}; configured: {self.half_lives}")
+        as_of = as_of or datetime.now()
+
+        with self._lock:
+            rows = [{'symbol': symbol, **state.values(as_of)[half_life]}
+                    for symbol, state in self.states.items()]
+
+        frame = pd.DataFrame(rows, columns=['symbol'] + list(_empty_values()))
+        frame.insert(1, 'timestamp', as_of)
+        frame['market_sentiment'] = frame['sentiment_score'] - frame['sentiment_score'].mean()
+        return frame
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serializable copy of the full aggregator state"""
+        with self._lock:
+            return {
+                'half_lives': list(self.half_lives),
+                'post_confidence': self.post_confidence,
+                'fields': list(SUM_FIELDS),
+                'states': {symbol: state.to_dict() for symbol, state in self.states.items()}
+            }
+
+    def restore(self, snapshot: Dict[str, Any]):
+        """Replace the state with a snapshot"""
+        if snapshot.get('fields', SUM_FIELDS) != SUM_FIELDS:
+            raise ValueError(f"Snapshot fields {snapshot.get('fields')} do not match {SUM_FIELDS}")
+        half_lives = list(snapshot['half_lives'])
+        states = {symbol: DecayedSentimentState.from_dict(half_lives, data)
+                  for symbol, data in snapshot['states'].items()}
+        with self._lock:
+            self.half_lives = half_lives
+            self.post_confidence = snapshot.get('post_confidence', self.post_confidence)
+            self.states = states
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict[str, Any]) -> 'SentimentAggregator':
+        aggregator = cls(snapshot['half_lives'], snapshot.get('post_confidence', 1.0))
+        aggregator.restore(snapshot)
+        return aggregator
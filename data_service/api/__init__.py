@@ -1,6 +1,12 @@
 from .api_manager import APIManager
-from .api_documentation import APIDocumentation
-from .api_testing import APITesting
-from .api_gateway import APIGateway
 
-__all__ = ['APIManager', 'APIDocumentation', 'APITesting', 'APIGateway'] 
\ No newline at end of file
+try:
+    from .api_documentation import APIDocumentation
+    from .api_testing import APITesting
+    from .api_gateway import APIGateway
+except ImportError:
+    APIDocumentation = None
+    APITesting = None
+    APIGateway = None
+
+__all__ = ['APIManager', 'APIDocumentation', 'APITesting', 'APIGateway']
@@ -1,7 +1,11 @@
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import time
-from typing import Dict, List, Any, Optional, Callable
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Dict, List, Any, Optional, Callable, Tuple
 import logging
 from datetime import datetime, timedelta
 from dataclasses import dataclass
@@ -32,52 +36,262 @@ class APIResponse:
     endpoint: str
     response_time: float
 
+
+class TokenBucket:
+    """Token-bucket rate limiter refilled continuously at ``rate_limit`` tokens per minute"""
+    
+    def __init__(self, rate_limit: int, capacity: Optional[int] = None):
+        self.rate_limit = rate_limit
+        self.refill_rate = rate_limit / 60.0  # tokens per second
+        self.capacity = float(capacity if capacity is not None else rate_limit)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self, now: float):
+        """Add tokens accrued since the last update"""
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+            self.updated_at = now
+    
+    def _reserve(self, tokens: float = 1.0) -> float:
+        """Take tokens if available, otherwise return the seconds to wait for them"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            if self.refill_rate <= 0 or tokens > self.capacity:
+                return float('inf')
+            return (tokens - self.tokens) / self.refill_rate
+    
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take tokens without waiting"""
+        return self._reserve(tokens) == 0.0
+    
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Block until tokens are available or the timeout expires"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._reserve(tokens)
+            if wait == 0.0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if wait > remaining:
+                    return False
+            elif wait == float('inf'):
+                return False
+            time.sleep(wait)
+    
+    async def acquire_async(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Await until tokens are available or the timeout expires"""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            wait = self._reserve(tokens)
+            if wait == 0.0:
+                return True
+            if deadline is not None:
+                remaining = deadline - loop.time()
+                if wait > remaining:
+                    return False
+            elif wait == float('inf'):
+                return False
+            await asyncio.sleep(wait)
+    
+    @property
+    def available_tokens(self) -> float:
+        """Tokens currently available"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self.tokens
+
+class ResponseCache:
+    """Bounded LRU cache with per-entry expiry"""
+    
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Get a live entry and mark it as most recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key: str, value: Any, ttl: float):
+        """Store an entry, evicting the least recently used one when full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def delete(self, key: str):
+        """Remove a single entry"""
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self, prefix: Optional[str] = None):
+        """Remove all entries, or only those whose key starts with ``prefix``"""
+        with self._lock:
+            if prefix is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k.startswith(prefix)]:
+                    del self._entries[key]
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache hit/miss statistics"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups > 0 else 0
+        }
+
 class APIManager:
     """Intelligent API manager with rate limiting, caching, and monitoring"""
     
-    def __init__(self):
+    def __init__(self, cache_size: int = 1024, pool_size: int = 10,
+                 metrics_window: int = 1000):
         self.endpoints: Dict[str, APIEndpoint] = {}
-        self.rate_limiters: Dict[str, List[datetime]] = {}
-        self.response_cache: Dict[str, Dict[str, Any]] = {}
+        self.rate_limiters: Dict[str, TokenBucket] = {}
+        self.response_cache = ResponseCache(max_size=cache_size)
+        self.pool_size = pool_size
+        self.metrics_window = metrics_window
         self.logger = logging.getLogger(__name__)
         
+        # Pooled connections, one session per endpoint
+        self.sessions: Dict[str, requests.Session] = {}
+        self.async_sessions: Dict[str, Tuple[asyncio.AbstractEventLoop, aiohttp.ClientSession]] = {}
+        
+        # In-flight requests shared by identical concurrent callers
+        self._inflight: Dict[str, Future] = {}
+        self._async_inflight: Dict[Tuple[int, str], asyncio.Future] = {}
+        self._lock = threading.Lock()
+        
         # Performance monitoring
-        self.response_times: Dict[str, List[float]] = {}
+        self.response_times: Dict[str, deque] = {}
         self.error_counts: Dict[str, int] = {}
         self.success_counts: Dict[str, int] = {}
+        self.coalesced_counts: Dict[str, int] = {}
+        self.last_request_times: Dict[str, datetime] = {}
         
     def register_endpoint(self, name: str, endpoint: APIEndpoint):
         """Register a new API endpoint"""
         self.endpoints[name] = endpoint
-        self.rate_limiters[name] = []
-        self.response_times[name] = []
+        self.rate_limiters[name] = TokenBucket(endpoint.rate_limit)
+        self.response_times[name] = deque(maxlen=self.metrics_window)
         self.error_counts[name] = 0
         self.success_counts[name] = 0
+        self.coalesced_counts[name] = 0
+        
+        # Drop any pooled session built for a previous registration
+        session = self.sessions.pop(name, None)
+        if session is not None:
+            session.close()
         
         self.logger.info(f"Registered API endpoint: {name}")
     
     def make_request(self, endpoint_name: str, 
                     params: Dict[str, Any] = None,
                     use_cache: bool = True,
-                    cache_duration: int = 300) -> Optional[APIResponse]:
-        """Make a request to a registered endpoint"""
+                    cache_duration: int = 300,
+                    wait_for_rate_limit: bool = False) -> Optional[APIResponse]:
+        """Make a request to a registered endpoint
+        
+        Identical concurrent GET requests share a single in-flight call. With
+        ``wait_for_rate_limit`` the caller blocks for a token (up to the endpoint
+        timeout) instead of failing when the rate limit is exhausted.
+        """
         if endpoint_name not in self.endpoints:
             self.logger.error(f"Endpoint not found: {endpoint_name}")
             return None
         
         endpoint = self.endpoints[endpoint_name]
-        
-        # Check rate limiting
-        if not self._check_rate_limit(endpoint_name, endpoint.rate_limit):
-            self.logger.warning(f"Rate limit exceeded for {endpoint_name}")
-            return None
+        cache_key = self._generate_cache_key(endpoint_name, params)
         
         # Check cache
         if use_cache:
-            cached_response = self._get_cached_response(endpoint_name, params)
+            cached_response = self.response_cache.get(cache_key)
             if cached_response:
                 return cached_response
         
+        # Join an identical request that is already in flight
+        coalesce = endpoint.method.upper() == 'GET'
+        if coalesce:
+            with self._lock:
+                pending = self._inflight.get(cache_key)
+                if pending is None:
+                    pending = self._inflight[cache_key] = Future()
+                    is_leader = True
+                else:
+                    is_leader = False
+            if not is_leader:
+                self.coalesced_counts[endpoint_name] += 1
+                # Wait as long as the leader may take (its rate-limit wait plus the
+                # request); the leader always resolves the future when it finishes
+                try:
+                    return pending.result()
+                except Exception:
+                    return None
+        
+        response = None
+        try:
+            response = self._request_with_rate_limit(
+                endpoint_name, endpoint, params, wait_for_rate_limit
+            )
+            
+            # Cache response
+            if use_cache and response and response.status_code == 200:
+                self.response_cache.set(cache_key, response, cache_duration)
+            
+            return response
+        finally:
+            if coalesce:
+                with self._lock:
+                    self._inflight.pop(cache_key, None)
+                pending.set_result(response)
+    
+    def _request_with_rate_limit(self, endpoint_name: str, endpoint: APIEndpoint,
+                                 params: Dict[str, Any],
+                                 wait_for_rate_limit: bool) -> Optional[APIResponse]:
+        """Acquire a rate-limit token and execute the request"""
+        limiter = self.rate_limiters[endpoint_name]
+        if wait_for_rate_limit:
+            allowed = limiter.acquire(timeout=endpoint.timeout)
+        else:
+            allowed = limiter.try_acquire()
+        if not allowed:
+            self.logger.warning(f"Rate limit exceeded for {endpoint_name}")
+            return None
+        
+        self.last_request_times[endpoint_name] = datetime.now()
+        
         # Make request
         start_time = time.time()
         try:
@@ -86,20 +300,32 @@ class APIManager:
             
             # Update metrics
             self.response_times[endpoint_name].append(response_time)
-            self.success_counts[endpoint_name] += 1
-            
-            # Cache response
-            if use_cache and response and response.status_code == 200:
-                self._cache_response(endpoint_name, params, response, cache_duration)
+            if response is None:
+                self.error_counts[endpoint_name] += 1
+            else:
+                self.success_counts[endpoint_name] += 1
             
             return response
             
         except Exception as e:
-            response_time = time.time() - start_time
             self.error_counts[endpoint_name] += 1
             self.logger.error(f"Request failed for {endpoint_name}: {e}")
             return None
     
+    def _get_session(self, endpoint: APIEndpoint) -> requests.Session:
+        """Get the pooled HTTP session for an endpoint"""
+        session = self.sessions.get(endpoint.name)
+        if session is None:
+            with self._lock:
+                session = self.sessions.get(endpoint.name)
+                if session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self.sessions[endpoint.name] = session
+        return session
+    
     def _execute_request(self, endpoint: APIEndpoint, 
                         params: Dict[str, Any] = None) -> Optional[APIResponse]:
         """Execute HTTP request"""
@@ -109,16 +335,18 @@ class APIManager:
             if params:
                 request_params.update(params)
             
+            session = self._get_session(endpoint)
+            
             # Make request
             if endpoint.method.upper() == 'GET':
-                response = requests.get(
+                response = session.get(
                     endpoint.url,
                     headers=endpoint.headers,
                     params=request_params,
                     timeout=endpoint.timeout
                 )
             elif endpoint.method.upper() == 'POST':
-                response = requests.post(
+                response = session.post(
                     endpoint.url,
                     headers=endpoint.headers,
                     json=request_params,
@@ -146,121 +374,188 @@ class APIManager:
             self.logger.error(f"Request exception: {e}")
             return None
     
-    def _check_rate_limit(self, endpoint_name: str, rate_limit: int) -> bool:
-        """Check if request is within rate limit"""
-        now = datetime.now()
-        window_start = now - timedelta(minutes=1)
-        
-        # Remove old requests outside the window
-        self.rate_limiters[endpoint_name] = [
-            req_time for req_time in self.rate_limiters[endpoint_name]
-            if req_time > window_start
-        ]
-        
-        # Check if we can make another request
-        if len(self.rate_limiters[endpoint_name]) >= rate_limit:
-            return False
-        
-        # Add current request
-        self.rate_limiters[endpoint_name].append(now)
-        return True
+    def _check_rate_limit(self, endpoint_name: str, rate_limit: int = None) -> bool:
+        """Check if request is within rate limit, consuming a token if so"""
+        return self.rate_limiters[endpoint_name].try_acquire()
     
     def _get_cached_response(self, endpoint_name: str, 
                            params: Dict[str, Any] = None) -> Optional[APIResponse]:
         """Get cached response if available and not expired"""
-        cache_key = self._generate_cache_key(endpoint_name, params)
-        
-        if cache_key in self.response_cache:
-            cached = self.response_cache[cache_key]
-            if datetime.now() < cached['expires_at']:
-                return cached['response']
-            else:
-                # Remove expired cache
-                del self.response_cache[cache_key]
-        
-        return None
+        return self.response_cache.get(self._generate_cache_key(endpoint_name, params))
     
     def _cache_response(self, endpoint_name: str, params: Dict[str, Any],
                        response: APIResponse, duration: int):
         """Cache API response"""
-        cache_key = self._generate_cache_key(endpoint_name, params)
-        
-        self.response_cache[cache_key] = {
-            'response': response,
-            'expires_at': datetime.now() + timedelta(seconds=duration)
-        }
+        self.response_cache.set(self._generate_cache_key(endpoint_name, params), response, duration)
     
     def _generate_cache_key(self, endpoint_name: str, 
                           params: Dict[str, Any] = None) -> str:
         """Generate cache key for endpoint and parameters"""
         if params:
-            param_str = json.dumps(params, sort_keys=True)
+            param_str = json.dumps(params, sort_keys=True, default=str)
             return f"{endpoint_name}:{param_str}"
         return endpoint_name
     
+    async def _get_async_session(self, endpoint: APIEndpoint) -> aiohttp.ClientSession:
+        """Get the pooled aiohttp session for an endpoint on the running loop"""
+        loop = asyncio.get_running_loop()
+        entry = self.async_sessions.get(endpoint.name)
+        if entry is not None:
+            session_loop, session = entry
+            if session_loop is loop and not session.closed:
+                return session
+        
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.pool_size)
+        )
+        self.async_sessions[endpoint.name] = (loop, session)
+        if entry is not None:
+            await self._close_async_session(*entry)
+        return session
+    
+    async def _close_async_session(self, session_loop: asyncio.AbstractEventLoop,
+                                   session: aiohttp.ClientSession):
+        """Close a pooled aiohttp session, which may belong to another event loop"""
+        if session.closed:
+            return
+        try:
+            if session_loop is not asyncio.get_running_loop() and session_loop.is_running():
+                # Still serving another thread: close it there
+                asyncio.run_coroutine_threadsafe(session.close(), session_loop)
+            else:
+                await session.close()
+        except Exception as e:
+            self.logger.warning(f"Could not close pooled aiohttp session: {e}")
+    
     async def make_async_request(self, endpoint_name: str,
-                               params: Dict[str, Any] = None) -> Optional[APIResponse]:
-        """Make asynchronous request"""
+                               params: Dict[str, Any] = None,
+                               use_cache: bool = True,
+                               cache_duration: int = 300,
+                               wait_for_rate_limit: bool = True) -> Optional[APIResponse]:
+        """Make asynchronous request
+        
+        Callers await a rate-limit token by default, and identical concurrent GET
+        requests on the same event loop share one in-flight call.
+        """
         if endpoint_name not in self.endpoints:
             self.logger.error(f"Endpoint not found: {endpoint_name}")
             return None
         
         endpoint = self.endpoints[endpoint_name]
+        cache_key = self._generate_cache_key(endpoint_name, params)
+        
+        if use_cache:
+            cached_response = self.response_cache.get(cache_key)
+            if cached_response:
+                return cached_response
+        
+        coalesce = endpoint.method.upper() == 'GET'
+        if coalesce:
+            loop = asyncio.get_running_loop()
+            inflight_key = (id(loop), cache_key)
+            pending = self._async_inflight.get(inflight_key)
+            if pending is not None:
+                self.coalesced_counts[endpoint_name] += 1
+                return await asyncio.shield(pending)
+            pending = self._async_inflight[inflight_key] = loop.create_future()
         
-        # Check rate limiting
-        if not self._check_rate_limit(endpoint_name, endpoint.rate_limit):
+        response = None
+        try:
+            response = await self._async_request_with_rate_limit(
+                endpoint_name, endpoint, params, wait_for_rate_limit
+            )
+            
+            if use_cache and response and response.status_code == 200:
+                self.response_cache.set(cache_key, response, cache_duration)
+            
+            return response
+        finally:
+            if coalesce:
+                self._async_inflight.pop(inflight_key, None)
+                if not pending.done():
+                    pending.set_result(response)
+    
+    async def _async_request_with_rate_limit(self, endpoint_name: str, endpoint: APIEndpoint,
+                                             params: Dict[str, Any],
+                                             wait_for_rate_limit: bool) -> Optional[APIResponse]:
+        """Await a rate-limit token and execute the request"""
+        limiter = self.rate_limiters[endpoint_name]
+        if wait_for_rate_limit:
+            allowed = await limiter.acquire_async(timeout=endpoint.timeout)
+        else:
+            allowed = limiter.try_acquire()
+        if not allowed:
             self.logger.warning(f"Rate limit exceeded for {endpoint_name}")
             return None
         
+        self.last_request_times[endpoint_name] = datetime.now()
+        
         try:
-            async with aiohttp.ClientSession() as session:
-                start_time = time.time()
-                
-                # Prepare request
-                request_params = endpoint.params.copy()
-                if params:
-                    request_params.update(params)
-                
-                # Make request
-                if endpoint.method.upper() == 'GET':
-                    async with session.get(
-                        endpoint.url,
-                        headers=endpoint.headers,
-                        params=request_params,
-                        timeout=aiohttp.ClientTimeout(total=endpoint.timeout)
-                    ) as response:
-                        data = await response.json()
-                elif endpoint.method.upper() == 'POST':
-                    async with session.post(
-                        endpoint.url,
-                        headers=endpoint.headers,
-                        json=request_params,
-                        timeout=aiohttp.ClientTimeout(total=endpoint.timeout)
-                    ) as response:
-                        data = await response.json()
-                else:
-                    raise ValueError(f"Unsupported HTTP method: {endpoint.method}")
-                
-                response_time = time.time() - start_time
-                
-                # Update metrics
-                self.response_times[endpoint_name].append(response_time)
-                self.success_counts[endpoint_name] += 1
-                
-                return APIResponse(
-                    status_code=response.status,
-                    data=data,
-                    headers=dict(response.headers),
-                    timestamp=datetime.now(),
-                    endpoint=endpoint.name,
-                    response_time=response_time
+            session = await self._get_async_session(endpoint)
+            start_time = time.time()
+            
+            # Prepare request
+            request_params = endpoint.params.copy()
+            if params:
+                request_params.update(params)
+            
+            # Make request
+            if endpoint.method.upper() == 'GET':
+                request_context = session.get(
+                    endpoint.url,
+                    headers=endpoint.headers,
+                    params=request_params,
+                    timeout=aiohttp.ClientTimeout(total=endpoint.timeout)
+                )
+            elif endpoint.method.upper() == 'POST':
+                request_context = session.post(
+                    endpoint.url,
+                    headers=endpoint.headers,
+                    json=request_params,
+                    timeout=aiohttp.ClientTimeout(total=endpoint.timeout)
                 )
+            else:
+                raise ValueError(f"Unsupported HTTP method: {endpoint.method}")
+            
+            async with request_context as response:
+                try:
+                    data = await response.json(content_type=None)
+                except (aiohttp.ContentTypeError, ValueError):
+                    data = await response.text()
+            
+            response_time = time.time() - start_time
+            
+            # Update metrics
+            self.response_times[endpoint_name].append(response_time)
+            self.success_counts[endpoint_name] += 1
+            
+            return APIResponse(
+                status_code=response.status,
+                data=data,
+                headers=dict(response.headers),
+                timestamp=datetime.now(),
+                endpoint=endpoint.name,
+                response_time=response_time
+            )
                 
         except Exception as e:
             self.error_counts[endpoint_name] += 1
             self.logger.error(f"Async request failed for {endpoint_name}: {e}")
             return None
     
+    def close(self):
+        """Close pooled HTTP sessions"""
+        for session in self.sessions.values():
+            session.close()
+        self.sessions.clear()
+    
+    async def aclose(self):
+        """Close pooled HTTP sessions, including aiohttp sessions"""
+        self.close()
+        for session_loop, session in self.async_sessions.values():
+            await self._close_async_session(session_loop, session)
+        self.async_sessions.clear()
+    
     def get_performance_metrics(self) -> Dict[str, Any]:
         """Get API performance metrics"""
         metrics = {}
@@ -270,6 +565,7 @@ class APIManager:
             error_count = self.error_counts.get(endpoint_name, 0)
             success_count = self.success_counts.get(endpoint_name, 0)
             total_requests = error_count + success_count
+            limiter = self.rate_limiters.get(endpoint_name)
             
             metrics[endpoint_name] = {
                 'total_requests': total_requests,
@@ -278,19 +574,22 @@ class APIManager:
                 'avg_response_time': np.mean(response_times) if response_times else 0,
                 'min_response_time': min(response_times) if response_times else 0,
                 'max_response_time': max(response_times) if response_times else 0,
-                'current_rate_limit': len(self.rate_limiters.get(endpoint_name, []))
+                'available_tokens': limiter.available_tokens if limiter else 0,
+                'coalesced_requests': self.coalesced_counts.get(endpoint_name, 0)
             }
         
         return metrics
     
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get response cache statistics"""
+        return self.response_cache.get_stats()
+    
     def clear_cache(self, endpoint_name: str = None):
         """Clear response cache"""
         if endpoint_name:
             # Clear cache for specific endpoint
-            keys_to_remove = [k for k in self.response_cache.keys() 
-                            if k.startswith(endpoint_name)]
-            for key in keys_to_remove:
-                del self.response_cache[key]
+            self.response_cache.delete(endpoint_name)
+            self.response_cache.clear(prefix=f"{endpoint_name}:")
         else:
             # Clear all cache
             self.response_cache.clear()
@@ -318,5 +617,5 @@ class APIManager:
             'rate_limit': endpoint.rate_limit,
             'timeout': endpoint.timeout,
             'metrics': metrics,
-            'last_request': self.rate_limiters.get(endpoint_name, [])[-1] if self.rate_limiters.get(endpoint_name) else None
+            'last_request': self.last_request_times.get(endpoint_name)
         } 
\ No newline at end of file
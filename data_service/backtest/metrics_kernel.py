@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Performance Metrics Kernels
+Array-based drawdown, periodic return and rolling risk calculations used by
+PerformanceAnalyzer. Everything is a single pass of NumPy reductions or
+cumulative sums, so minute-bar equity curves with millions of points are cheap.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict
+
+def _as_float_array(values) -> np.ndarray:
+    """Convert a Series/array to a contiguous float64 array"""
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+def drawdown_series(equity) -> np.ndarray:
+    """Drawdown from the running peak, as a (negative) fraction of the peak
+
+    Missing values are ignored for the running peak, as with ``expanding().max()``.
+    """
+    equity = _as_float_array(equity)
+    peak = np.fmax.accumulate(equity, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (equity - peak) / peak
+
+def max_drawdown(equity) -> float:
+    """Largest peak-to-trough decline of an equity curve"""
+    drawdown = drawdown_series(equity)
+    if drawdown.size == 0 or np.isnan(drawdown).all():
+        return 0.0
+    return float(np.nanmin(drawdown))
+
+def find_drawdown_periods(drawdown) -> Dict[str, np.ndarray]:
+    """Locate drawdown periods by run-length encoding the underwater mask
+
+    A period starts at the first point below the peak and ends at the first point
+    back at the peak, or at the last point while it is still ongoing. Missing
+    values keep the state of the point before them. Returns arrays of start and
+    end indices, durations and the deepest drawdown within each period.
+    """
+    drawdown = _as_float_array(drawdown)
+    n = len(drawdown)
+    empty = np.array([], dtype=np.int64)
+    if n == 0:
+        return {'start_idx': empty, 'end_idx': empty, 'duration': empty,
+                'max_drawdown': np.array([], dtype=np.float64)}
+
+    missing = np.isnan(drawdown)
+    underwater = drawdown < 0
+    if missing.any():
+        last_valid = np.maximum.accumulate(np.where(missing, 0, np.arange(n)))
+        underwater = underwater[last_valid] & ~missing[last_valid]
+
+    edges = np.diff(np.concatenate(([0], underwater.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if len(starts) == 0:
+        return {'start_idx': empty, 'end_idx': empty, 'duration': empty,
+                'max_drawdown': np.array([], dtype=np.float64)}
+
+    # Segments run from one start to the next; the points between a recovery and
+    # the next start are at the peak (>= 0) so they never lower the minimum
+    filled = np.where(missing, 0.0, drawdown)
+    period_min = np.minimum.reduceat(filled, starts)
+
+    ends = np.minimum(ends, n - 1)
+    return {
+        'start_idx': starts,
+        'end_idx': ends,
+        'duration': ends - starts,
+        'max_drawdown': period_min
+    }
+
+def simple_returns(equity) -> np.ndarray:
+    """Period-over-period returns with a NaN first element, as ``pct_change``"""
+    equity = _as_float_array(equity)
+    returns = np.full(equity.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[1:] = equity[1:] / equity[:-1] - 1
+    return returns
+
+def compound_returns(returns: pd.Series, freq: str) -> pd.Series:
+    """Compound returns into calendar periods by summing log returns
+
+    Equivalent to ``resample(freq).apply(lambda x: (1 + x).prod() - 1)``.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_returns = np.log1p(returns.astype(np.float64))
+    return np.expm1(log_returns.resample(freq).sum())
+
+def _window_sums(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing window sums from a cumulative sum, aligned to the window end"""
+    csum = np.concatenate(([0.0], np.cumsum(values)))
+    return csum[window:] - csum[:-window]
+
+def rolling_risk_metrics(returns, window: int, periods_per_year: int = 252,
+                         risk_free_rate: float = 0.02) -> Dict[str, np.ndarray]:
+    """Rolling annualized volatility, Sharpe and Sortino ratios via cumulative sums
+
+    Volatility is the sample standard deviation of the window's returns and the
+    Sortino ratio uses the sample standard deviation of its negative returns, as
+    in PerformanceAnalyzer. Ratios use the arithmetic mean return annualized by
+    ``periods_per_year``. Windows that hold a NaN produce NaN.
+    """
+    returns = _as_float_array(returns)
+    n = len(returns)
+    result = {name: np.full(n, np.nan) for name in ('rolling_volatility', 'rolling_sharpe',
+                                                    'rolling_sortino')}
+    if window < 2 or n < window:
+        return result
+
+    missing = np.isnan(returns)
+    clean = np.where(missing, 0.0, returns)
+    # Centre before squaring to limit cancellation in the variance
+    shift = clean[~missing].mean() if (~missing).any() else 0.0
+    centred = np.where(missing, 0.0, clean - shift)
+
+    count = _window_sums(missing.astype(np.float64), window)
+    total = _window_sums(centred, window)
+    total_sq = _window_sums(centred * centred, window)
+
+    mean = total / window + shift
+    variance = np.maximum(total_sq - total * total / window, 0.0) / (window - 1)
+    volatility = np.sqrt(variance) * np.sqrt(periods_per_year)
+
+    negative = clean < 0
+    neg_count = _window_sums(negative.astype(np.float64), window)
+    neg_values = np.where(negative, clean, 0.0)
+    neg_total = _window_sums(neg_values, window)
+    neg_total_sq = _window_sums(neg_values * neg_values, window)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        neg_variance = np.maximum(neg_total_sq - neg_total * neg_total / neg_count, 0.0) / (neg_count - 1)
+        downside = np.where(neg_count > 1, np.sqrt(neg_variance), np.nan) * np.sqrt(periods_per_year)
+
+        excess = mean * periods_per_year - risk_free_rate
+        sharpe = np.where(volatility > 0, excess / volatility, 0.0)
+        sortino = np.where(downside > 0, excess / downside, 0.0)
+
+    valid = count == 0
+    result['rolling_volatility'][window - 1:] = np.where(valid, volatility, np.nan)
+    result['rolling_sharpe'][window - 1:] = np.where(valid, sharpe, np.nan)
+    result['rolling_sortino'][window - 1:] = np.where(valid, sortino, np.nan)
+    return result
+
+BATCH_METRICS = ['total_return', 'annualized_return', 'volatility', 'sharpe_ratio', 'sortino_ratio',
+                 'max_drawdown', 'calmar_ratio', 'hit_rate', 'var_95', 'cvar_95', 'var_99', 'cvar_99',
+                 'skewness', 'kurtosis', 'best_return', 'worst_return']
+
+def _tail_mean(returns: np.ndarray, threshold: np.ndarray) -> np.ndarray:
+    """Mean of each column's returns at or below its threshold"""
+    tail = returns <= threshold
+    count = tail.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(count > 0, np.where(tail, returns, 0.0).sum(axis=0) / count, 0.0)
+
+def batch_metrics(equity, periods_per_year: int = 252, risk_free_rate: float = 0.02,
+                  years: float = None) -> Dict[str, np.ndarray]:
+    """Performance metrics for every column of a (time x runs) equity array
+
+    Definitions follow PerformanceAnalyzer: volatility and the Sortino downside
+    deviation are annualized sample standard deviations, Sharpe and Sortino use
+    the annualized return in excess of ``risk_free_rate``. The annualized return
+    compounds over ``years`` when given, else over ``periods_per_year``.
+    Missing points are skipped.
+    """
+    equity = _as_float_array(equity)
+    if equity.ndim == 1:
+        equity = equity[:, None]
+    n_runs = equity.shape[1]
+    if len(equity) < 2:
+        return {name: np.full(n_runs, np.nan) for name in BATCH_METRICS}
+
+    valid = ~np.isnan(equity)
+    first = equity[valid.argmax(axis=0), np.arange(n_runs)]
+    last = equity[len(equity) - 1 - valid[::-1].argmax(axis=0), np.arange(n_runs)]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total_return = last / first - 1
+
+    returns = simple_returns(equity)[1:]
+    returns_valid = ~np.isnan(returns)
+    n_returns = returns_valid.sum(axis=0)
+    if years is None:
+        years = n_returns / periods_per_year
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        annualized_return = np.where(years > 0, (1 + total_return) ** (1 / years) - 1, 0.0)
+
+    all_valid = bool(returns_valid.all())
+    clean = returns if all_valid else np.where(returns_valid, returns, 0.0)
+    mean = clean.sum(axis=0) / np.maximum(n_returns, 1)
+    centred = clean - mean
+    if not all_valid:
+        centred[~returns_valid] = 0.0
+    squared = centred * centred
+    m2 = squared.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        std = np.sqrt(m2 / (n_returns - 1))
+        volatility = np.where(n_returns > 1, std * np.sqrt(periods_per_year), 0.0)
+
+        negative = clean < 0
+        n_negative = negative.sum(axis=0)
+        neg_values = np.where(negative, clean, 0.0)
+        neg_sum = neg_values.sum(axis=0)
+        neg_m2 = (neg_values * neg_values).sum(axis=0) - neg_sum * neg_sum / np.maximum(n_negative, 1)
+        neg_m2 = np.maximum(neg_m2, 0.0)
+        downside = np.where(n_negative > 1, np.sqrt(neg_m2 / (n_negative - 1)), 0.0) * np.sqrt(periods_per_year)
+
+        excess = annualized_return - risk_free_rate
+        sharpe_ratio = np.where(volatility > 0, excess / volatility, 0.0)
+        sortino_ratio = np.where(downside > 0, excess / downside, 0.0)
+
+        variance = m2 / n_returns
+        skewness = np.einsum('ij,ij->j', squared, centred) / n_returns / variance ** 1.5
+        kurtosis = np.einsum('ij,ij->j', squared, squared) / n_returns / variance ** 2 - 3
+        hit_rate = (clean > 0).sum(axis=0) / n_returns
+
+    drawdown = drawdown_series(equity)
+    max_dd = np.where(np.isnan(drawdown), 0.0, drawdown).min(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        calmar_ratio = np.where(max_dd != 0, annualized_return / np.abs(max_dd), 0.0)
+
+    if all_valid:
+        var_95, var_99 = np.percentile(returns, [5, 1], axis=0)
+        filled = returns
+    else:
+        var_95, var_99 = np.nanpercentile(returns, [5, 1], axis=0)
+        filled = np.where(returns_valid, returns, np.inf)
+
+    return {
+        'total_return': total_return,
+        'annualized_return': annualized_return,
+        'volatility': volatility,
+        'sharpe_ratio': sharpe_ratio,
+        'sortino_ratio': sortino_ratio,
+        'max_drawdown': max_dd,
+        'calmar_ratio': calmar_ratio,
+        'hit_rate': hit_rate,
+        'var_95': var_95,
+        'cvar_95': _tail_mean(filled, var_95),
+        'var_99': var_99,
+        'cvar_99': _tail_mean(filled, var_99),
+        'skewness': skewness,
+        'kurtosis': kurtosis,
+        'best_return': np.max(returns, axis=0) if all_valid else np.nanmax(returns, axis=0),
+        'worst_return': np.min(returns, axis=0) if all_valid else np.nanmin(returns, axis=0)
+    }
@@ -6,6 +6,8 @@ import seaborn as sns
 from datetime import datetime
 import logging
 
+from . import metrics_kernel
+
 class PerformanceAnalyzer:
     """Performance analysis and reporting for trading strategies"""
     
@@ -155,15 +157,16 @@ class PerformanceAnalyzer:
             return {}
         
         # Calculate drawdown series
-        peak = equity_curve['total_value'].expanding().max()
-        drawdown = (equity_curve['total_value'] - peak) / peak
+        drawdown_values = metrics_kernel.drawdown_series(equity_curve['total_value'])
+        drawdown = pd.Series(drawdown_values, index=equity_curve.index)
         
         # Find drawdown periods
         drawdown_periods = self._find_drawdown_periods(drawdown)
         
         # Calculate drawdown statistics
         max_drawdown = drawdown.min()
-        avg_drawdown = drawdown[drawdown < 0].mean() if len(drawdown[drawdown < 0]) > 0 else 0
+        underwater = drawdown_values[drawdown_values < 0]
+        avg_drawdown = underwater.mean() if len(underwater) > 0 else 0
         drawdown_duration = len(drawdown_periods)
         
         return {
@@ -176,35 +179,18 @@ class PerformanceAnalyzer:
     
     def _find_drawdown_periods(self, drawdown_series: pd.Series) -> List[Dict[str, Any]]:
         """Find individual drawdown periods"""
-        periods = []
-        in_drawdown = False
-        start_idx = None
-        
-        for i, dd in enumerate(drawdown_series):
-            if dd < 0 and not in_drawdown:
-                # Start of drawdown
-                in_drawdown = True
-                start_idx = i
-            elif dd >= 0 and in_drawdown:
-                # End of drawdown
-                in_drawdown = False
-                periods.append({
-                    'start_idx': start_idx,
-                    'end_idx': i,
-                    'duration': i - start_idx,
-                    'max_drawdown': drawdown_series.iloc[start_idx:i].min()
-                })
-        
-        # Handle ongoing drawdown
-        if in_drawdown:
-            periods.append({
-                'start_idx': start_idx,
-                'end_idx': len(drawdown_series) - 1,
-                'duration': len(drawdown_series) - 1 - start_idx,
-                'max_drawdown': drawdown_series.iloc[start_idx:].min()
-            })
-        
-        return periods
+        periods = metrics_kernel.find_drawdown_periods(drawdown_series)
+        
+        return [
+            {
+                'start_idx': int(start),
+                'end_idx': int(end),
+                'duration': int(duration),
+                'max_drawdown': float(depth)
+            }
+            for start, end, duration, depth in zip(periods['start_idx'], periods['end_idx'],
+                                                   periods['duration'], periods['max_drawdown'])
+        ]
     
     def _calculate_periodic_returns(self, results: Dict[str, Any]) -> Dict[str, pd.DataFrame]:
         """Calculate monthly and yearly returns"""
@@ -212,24 +198,93 @@ class PerformanceAnalyzer:
         if equity_curve.empty:
             return {}
         
-        # Calculate daily returns
-        equity_curve['returns'] = equity_curve['total_value'].pct_change()
-        
-        # Monthly returns
-        monthly_returns = equity_curve['returns'].resample('M').apply(
-            lambda x: (1 + x).prod() - 1
-        )
-        
-        # Yearly returns
-        yearly_returns = equity_curve['returns'].resample('Y').apply(
-            lambda x: (1 + x).prod() - 1
-        )
+        # Calculate period returns
+        returns = pd.Series(metrics_kernel.simple_returns(equity_curve['total_value']),
+                            index=equity_curve.index)
         
         return {
-            'monthly_returns': monthly_returns,
-            'yearly_returns': yearly_returns
+            'monthly_returns': metrics_kernel.compound_returns(returns, 'ME'),
+            'yearly_returns': metrics_kernel.compound_returns(returns, 'YE')
         }
     
+    def calculate_rolling_metrics(self, results: Dict[str, Any], window: int = 63,
+                                  periods_per_year: int = 252,
+                                  risk_free_rate: float = 0.02) -> pd.DataFrame:
+        """Rolling annualized volatility, Sharpe and Sortino ratios of the equity curve
+        
+        Use ``periods_per_year`` to annualize intraday curves, e.g. 252 * 390 for
+        minute bars.
+        """
+        equity_curve = results.get('equity_curve', pd.DataFrame())
+        if equity_curve.empty:
+            return pd.DataFrame()
+        
+        returns = metrics_kernel.simple_returns(equity_curve['total_value'])
+        metrics = metrics_kernel.rolling_risk_metrics(returns, window, periods_per_year, risk_free_rate)
+        return pd.DataFrame(metrics, index=equity_curve.index)
+    
+    def analyze_batch(self, equity_curves, chunk_size: int = 1000, periods_per_year: int = 252,
+                      risk_free_rate: float = 0.02, sort_by: Optional[str] = None) -> pd.DataFrame:
+        """Performance metrics for many equity curves at once
+        
+        ``equity_curves`` is a (time x runs) DataFrame or array, including a
+        np.memmap, evaluated ``chunk_size`` runs at a time, or an iterable of such
+        chunks for curves that do not fit in memory. With a DatetimeIndex the
+        annualized return compounds over calendar days as in BacktestEngine.
+        Returns one row per run with the columns of metrics_kernel.BATCH_METRICS.
+        """
+        if isinstance(equity_curves, (pd.DataFrame, np.ndarray)):
+            chunks = self._iter_run_chunks(equity_curves, chunk_size)
+        else:
+            chunks = iter(equity_curves)
+        
+        frames = []
+        offset = 0
+        for chunk in chunks:
+            if isinstance(chunk, pd.DataFrame):
+                runs = chunk.columns
+                years = self._elapsed_years(chunk.index)
+                values = chunk.to_numpy(dtype=np.float64)
+            else:
+                values = np.asarray(chunk, dtype=np.float64)
+                if values.ndim == 1:
+                    values = values[:, None]
+                runs = pd.RangeIndex(offset, offset + values.shape[1])
+                years = None
+            
+            metrics = metrics_kernel.batch_metrics(values, periods_per_year, risk_free_rate, years)
+            frames.append(pd.DataFrame(metrics, index=runs, columns=metrics_kernel.BATCH_METRICS))
+            offset += values.shape[1]
+        
+        if not frames:
+            return pd.DataFrame(columns=metrics_kernel.BATCH_METRICS)
+        
+        batch = pd.concat(frames)
+        batch.index.name = 'run'
+        if sort_by:
+            batch = batch.sort_values(sort_by, ascending=False, kind='stable')
+        
+        self.logger.info(f"Analyzed {len(batch)} equity curves")
+        return batch
+    
+    def _iter_run_chunks(self, equity_curves, chunk_size: int):
+        """Yield column slices of a (time x runs) frame or array"""
+        if equity_curves.ndim == 1:
+            yield equity_curves
+            return
+        for start in range(0, equity_curves.shape[1], chunk_size):
+            if isinstance(equity_curves, pd.DataFrame):
+                yield equity_curves.iloc[:, start:start + chunk_size]
+            else:
+                yield equity_curves[:, start:start + chunk_size]
+    
+    def _elapsed_years(self, index: pd.Index) -> Optional[float]:
+        """Calendar years spanned by a DatetimeIndex, or None for other indexes"""
+        if not isinstance(index, pd.DatetimeIndex) or len(index) < 2:
+            return None
+        days = (index[-1] - index[0]).days
+        return days / 365 if days > 0 else None
+    
     def generate_report(self, analysis: Dict[str, Any]) -> str:
         """Generate performance report as text"""
         report = []
@@ -298,7 +353,7 @@ class PerformanceAnalyzer:
         axes[1, 0].grid(True)
         
         # Monthly returns heatmap
-        monthly_returns = returns.resample('M').apply(lambda x: (1 + x).prod() - 1)
+        monthly_returns = metrics_kernel.compound_returns(returns, 'ME')
         monthly_returns_pivot = monthly_returns.groupby([monthly_returns.index.year, 
                                                        monthly_returns.index.month]).first()
         monthly_returns_pivot = monthly_returns_pivot.unstack()
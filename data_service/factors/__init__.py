@@ -3,5 +3,10 @@ from .factor_screener import FactorScreener
 from .factor_backtest import FactorBacktest
 from .stock_selector import StockSelector
 from .factor_optimizer import FactorOptimizer
+from .universe_factor_calculator import UniverseFactorCalculator
+from .rebalance_simulator import RebalanceSimulator
+from .walk_forward import WalkForwardOptimizer
+from .screening_expression import compile_screen, CompiledScreen, ScreeningExpressionError
 
-__all__ = ['FactorCalculator', 'FactorScreener', 'FactorBacktest', 'StockSelector', 'FactorOptimizer'] 
\ No newline at end of file
+__all__ = ['FactorCalculator', 'FactorScreener', 'FactorBacktest', 'StockSelector', 'FactorOptimizer',
+           'UniverseFactorCalculator', 'RebalanceSimulator', 'WalkForwardOptimizer', 'compile_screen', 'CompiledScreen', 'ScreeningExpressionError']
@@ -329,23 +329,24 @@ class FactorCalculator:
         if not factor_data:
             return factor_data
         
-        # Group by factor name
-        factor_groups = {}
-        for data in factor_data:
-            if data.factor_name not in factor_groups:
-                factor_groups[data.factor_name] = []
-            factor_groups[data.factor_name].append(data)
-        
-        # Rank each factor group
+        # Rank every factor group in one pass: stable descending order within each
+        # factor, groups in order of first appearance
+        names = [data.factor_name for data in factor_data]
+        group_codes, _ = pd.factorize(pd.Series(names))
+        values = np.array([data.factor_value for data in factor_data], dtype=float)
+        order = np.lexsort((np.arange(len(values)), -values, group_codes))
+        
+        group_sizes = np.bincount(group_codes)
+        sorted_codes = group_codes[order]
+        group_starts = np.concatenate(([0], np.cumsum(group_sizes)[:-1]))
+        ranks = np.arange(len(order)) - group_starts[sorted_codes] + 1
+        percentiles = ranks / group_sizes[sorted_codes] * 100
+        
         ranked_data = []
-        for factor_name, group in factor_groups.items():
-            # Sort by factor value
-            sorted_group = sorted(group, key=lambda x: x.factor_value, reverse=True)
-            
-            # Assign ranks and percentiles
-            for i, data in enumerate(sorted_group):
-                data.rank = i + 1
-                data.percentile = (i + 1) / len(sorted_group) * 100
-                ranked_data.append(data)
+        for position, index in enumerate(order):
+            data = factor_data[index]
+            data.rank = int(ranks[position])
+            data.percentile = float(percentiles[position])
+            ranked_data.append(data)
         
-        return ranked_data 
\ No newline at end of file
+        return ranked_data
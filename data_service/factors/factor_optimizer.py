@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from dataclasses import dataclass
 from scipy.optimize import minimize, differential_evolution
 import itertools
+from .walk_forward import WalkForwardOptimizer, WalkForwardResult
 
 @dataclass
 class OptimizationResult:
@@ -334,62 +335,61 @@ class FactorOptimizer:
                                     price_data: pd.DataFrame,
                                     factor_names: List[str],
                                     n_splits: int = 5,
-                                    objective_function: str = 'sharpe_ratio') -> OptimizationResult:
-        """Cross-validation optimization for factor weights"""
-        
-        # Split data into time periods
-        dates = sorted(factor_data['date'].unique())
-        split_size = len(dates) // n_splits
-        
-        cv_results = []
-        
-        for i in range(n_splits):
-            # Define train and test periods
-            start_idx = i * split_size
-            end_idx = (i + 1) * split_size
-            
-            train_dates = dates[start_idx:end_idx]
-            test_dates = dates[end_idx:min(end_idx + split_size, len(dates))]
-            
-            if not test_dates:
-                continue
-            
-            # Split data
-            train_data = factor_data[factor_data['date'].isin(train_dates)]
-            test_data = factor_data[factor_data['date'].isin(test_dates)]
-            
-            train_prices = price_data[price_data['date'].isin(train_dates)]
-            test_prices = price_data[price_data['date'].isin(test_dates)]
-            
-            # Optimize on training data
-            try:
-                train_result = self.optimize_factor_weights(
-                    train_data, train_prices, objective_function
-                )
-                
-                # Evaluate on test data
-                test_objective = self._evaluate_weights(
-                    test_data, test_prices, factor_names, 
-                    list(train_result.optimal_weights.values()), 
-                    objective_function
-                )
-                
-                cv_results.append({
-                    'train_result': train_result,
-                    'test_objective': test_objective
-                })
-                
-            except Exception as e:
-                self.logger.warning(f"CV iteration {i} failed: {e}")
-                continue
+                                    objective_function: str = 'sharpe_ratio',
+                                    embargo: int = 0,
+                                    n_jobs: int = 1) -> OptimizationResult:
+        """Cross-validation optimization for factor weights
+        
+        The dates are cut into ``n_splits`` blocks; each block is optimized and
+        tested on the block after it, skipping ``embargo`` dates in between.
+        Folds run serially unless ``n_jobs`` asks for worker processes, and the
+        training result of the fold with the best out-of-sample objective is
+        returned.
+        """
+        start_time = datetime.now()
         
-        if not cv_results:
-            raise ValueError("No successful cross-validation iterations")
+        engine = WalkForwardOptimizer(n_jobs=n_jobs, objective_function=objective_function)
+        with engine:
+            engine.prepare(factor_data, price_data, factor_names)
+            split_size = (engine.n_samples + 1) // n_splits
+            if split_size <= embargo:
+                raise ValueError("No successful cross-validation iterations")
+            result = engine.run(scheme='walk_forward', n_splits=n_splits - 1,
+                                train_size=split_size - embargo, test_size=split_size, embargo=embargo)
         
         # Select best result based on test performance
-        best_cv = max(cv_results, key=lambda x: x['test_objective'])
+        best_fold = max(result.folds, key=lambda fold: fold.out_of_sample_objective)
         
-        return best_cv['train_result']
+        return OptimizationResult(
+            optimal_weights=best_fold.weights,
+            objective_value=best_fold.in_sample_objective,
+            constraints_satisfied=True,
+            optimization_time=(datetime.now() - start_time).total_seconds(),
+            iterations=len(result.folds),
+            convergence=True
+        )
+    
+    def walk_forward_optimization(self, factor_data: pd.DataFrame,
+                                  price_data: pd.DataFrame,
+                                  factor_names: List[str] = None,
+                                  scheme: str = 'walk_forward',
+                                  n_splits: int = 5,
+                                  objective_function: str = 'sharpe_ratio',
+                                  method: str = 'scipy',
+                                  n_jobs: int = None,
+                                  **split_kwargs) -> WalkForwardResult:
+        """Walk-forward or purged k-fold optimization with a stitched out-of-sample equity curve
+        
+        Args:
+            scheme: 'walk_forward' or 'purged_kfold'
+            method: 'scipy' (SLSQP on the simplex) or 'grid'
+            n_jobs: Worker processes, all cores by default
+            **split_kwargs: train_size, test_size, expanding, embargo or purge
+        """
+        with WalkForwardOptimizer(n_jobs=n_jobs, objective_function=objective_function,
+                                  method=method) as engine:
+            return engine.run(factor_data, price_data, factor_names, scheme=scheme,
+                              n_splits=n_splits, **split_kwargs)
     
     def _evaluate_weights(self, factor_data: pd.DataFrame,
                          price_data: pd.DataFrame,
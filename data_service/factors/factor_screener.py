@@ -5,6 +5,8 @@ import logging
 from datetime import datetime
 from dataclasses import dataclass
 
+from .screening_expression import CompiledScreen, ScreeningExpressionError, compile_screen
+
 @dataclass
 class ScreeningCriteria:
     """Screening criteria for stock selection"""
@@ -32,9 +34,12 @@ class FactorScreener:
         self.logger = logging.getLogger(__name__)
         self.screening_criteria: List[ScreeningCriteria] = []
         self.custom_filters: Dict[str, Callable] = {}
+        self.saved_screens: Dict[str, CompiledScreen] = {}
     
     def add_criteria(self, criteria: ScreeningCriteria):
         """Add screening criteria"""
+        if isinstance(criteria, dict):
+            criteria = ScreeningCriteria(**criteria)
         self.screening_criteria.append(criteria)
         self.logger.info(f"Added screening criteria: {criteria.factor_name}")
     
@@ -43,116 +48,268 @@ class FactorScreener:
         self.custom_filters[name] = filter_func
         self.logger.info(f"Added custom filter: {name}")
     
-    def screen_stocks(self, factor_data: pd.DataFrame, 
-                     universe: List[str] = None) -> List[ScreeningResult]:
-        """Screen stocks based on criteria"""
-        results = []
+    def add_expression_filter(self, name: str, expression: str):
+        """Add a filter written in the screening expression language
+        
+        e.g. ``pe_ratio < 20 and roe > 15 and pct_rank(momentum_60d) > 80``. The
+        expression is parsed once and evaluated over whole factor columns.
+        """
+        self.custom_filters[name] = compile_screen(expression)
+        self.logger.info(f"Added expression filter: {name}")
+    
+    def save_screen(self, name: str, expression: str) -> CompiledScreen:
+        """Parse and store a named screen for later use with apply_screen"""
+        screen = compile_screen(expression)
+        self.saved_screens[name] = screen
+        return screen
+    
+    def apply_screen(self, screen: str, factor_data: pd.DataFrame,
+                     universe: List[str] = None) -> pd.Series:
+        """Evaluate a saved screen name or an expression over the universe
+        
+        Returns a boolean Series indexed by symbol. Raises ScreeningExpressionError
+        if the expression is invalid or references factors not in the data.
+        """
+        compiled = self.saved_screens.get(screen) or compile_screen(screen)
+        matrix = self.build_factor_matrix(factor_data, universe)
+        if matrix.empty:
+            return pd.Series(dtype=bool)
+        return pd.Series(compiled.evaluate(matrix), index=matrix.index, name=screen)
+    
+    def build_factor_matrix(self, factor_data: pd.DataFrame,
+                            universe: List[str] = None) -> pd.DataFrame:
+        """Pivot long factor data to a symbols x factors matrix
         
-        # Filter by universe if specified
+        When a symbol has several rows for a factor the last one wins. Symbols
+        keep their order of first appearance.
+        """
         if universe:
             factor_data = factor_data[factor_data['symbol'].isin(universe)]
         
         if factor_data.empty:
-            self.logger.warning("No factor data available for screening")
-            return results
+            return pd.DataFrame()
         
-        # Apply screening criteria
-        for symbol in factor_data['symbol'].unique():
-            symbol_data = factor_data[factor_data['symbol'] == symbol]
-            
-            result = self._evaluate_stock(symbol, symbol_data)
-            if result:
-                results.append(result)
-        
-        # Sort by score
-        results.sort(key=lambda x: x.score, reverse=True)
-        
-        # Assign ranks
-        for i, result in enumerate(results):
-            result.rank = i + 1
-        
-        self.logger.info(f"Screened {len(results)} stocks from {len(factor_data['symbol'].unique())} candidates")
-        return results
+        latest = factor_data.drop_duplicates(subset=['symbol', 'factor_name'], keep='last')
+        matrix = latest.pivot(index='symbol', columns='factor_name', values='factor_value')
+        matrix = matrix.reindex(pd.unique(factor_data['symbol']))
+        return matrix.apply(pd.to_numeric, errors='coerce')
     
-    def _evaluate_stock(self, symbol: str, symbol_data: pd.DataFrame) -> Optional[ScreeningResult]:
-        """Evaluate a single stock against all criteria"""
-        passed_criteria = []
-        failed_criteria = []
-        factor_values = {}
-        total_score = 0.0
-        total_weight = 0.0
-        
-        # Extract factor values
-        for _, row in symbol_data.iterrows():
-            factor_values[row['factor_name']] = row['factor_value']
-        
-        # Check each criterion
+    def calculate_percentile_ranks(self, matrix: pd.DataFrame) -> pd.DataFrame:
+        """Cross-sectional percentile of every value: share of the universe strictly below it"""
+        counts = matrix.notna().sum()
+        return (matrix.rank(method='min') - 1).div(counts.where(counts > 0)) * 100
+    
+    def uses_percentiles(self) -> bool:
+        """Whether any criterion is expressed as a percentile rank"""
+        return any(c.min_percentile is not None or c.max_percentile is not None
+                   for c in self.screening_criteria)
+    
+    def evaluate_universe(self, matrix: pd.DataFrame,
+                          percentiles: pd.DataFrame = None) -> Dict[str, Any]:
+        """Evaluate every criterion and custom filter as a column mask
+        
+        Returns the pass masks (one per check, in order), check names and weights,
+        the percentile ranks used, and the weighted score of every symbol: the
+        weight of passed checks divided by the weight of all checks. Percentile
+        ranks of ``matrix`` may be passed in when they are already computed.
+        """
+        n_symbols = len(matrix)
+        if percentiles is None and self.uses_percentiles():
+            percentiles = self.calculate_percentile_ranks(matrix)
+        
+        masks, names, weights = [], [], []
         for criteria in self.screening_criteria:
-            factor_value = factor_values.get(criteria.factor_name)
-            
-            if factor_value is None:
-                failed_criteria.append(f"{criteria.factor_name}: No data")
-                continue
-            
-            # Check value constraints
-            if criteria.min_value is not None and factor_value < criteria.min_value:
-                failed_criteria.append(f"{criteria.factor_name}: {factor_value} < {criteria.min_value}")
-                continue
-            
-            if criteria.max_value is not None and factor_value > criteria.max_value:
-                failed_criteria.append(f"{criteria.factor_name}: {factor_value} > {criteria.max_value}")
-                continue
+            if criteria.factor_name in matrix.columns:
+                values = matrix[criteria.factor_name].to_numpy(dtype=float)
+                mask = ~np.isnan(values)
+            else:
+                values = np.full(n_symbols, np.nan)
+                mask = np.zeros(n_symbols, dtype=bool)
             
-            # Check percentile constraints
-            if criteria.min_percentile is not None or criteria.max_percentile is not None:
-                percentile = self._calculate_percentile(factor_value, criteria.factor_name, symbol_data)
-                
-                if criteria.min_percentile is not None and percentile < criteria.min_percentile:
-                    failed_criteria.append(f"{criteria.factor_name}: {percentile:.1f}% < {criteria.min_percentile}%")
-                    continue
-                
-                if criteria.max_percentile is not None and percentile > criteria.max_percentile:
-                    failed_criteria.append(f"{criteria.factor_name}: {percentile:.1f}% > {criteria.max_percentile}%")
-                    continue
+            if criteria.min_value is not None:
+                mask &= values >= criteria.min_value
+            if criteria.max_value is not None:
+                mask &= values <= criteria.max_value
+            if (criteria.min_percentile is not None or criteria.max_percentile is not None) \
+                    and criteria.factor_name in matrix.columns:
+                ranks = percentiles[criteria.factor_name].to_numpy(dtype=float)
+                if criteria.min_percentile is not None:
+                    mask &= ranks >= criteria.min_percentile
+                if criteria.max_percentile is not None:
+                    mask &= ranks <= criteria.max_percentile
             
-            # Criterion passed
-            passed_criteria.append(criteria.factor_name)
-            total_score += criteria.weight
-            total_weight += criteria.weight
+            masks.append(mask)
+            names.append(criteria.factor_name)
+            weights.append(criteria.weight)
         
-        # Apply custom filters
         for filter_name, filter_func in self.custom_filters.items():
+            mask = self._apply_custom_filter(filter_name, filter_func, matrix)
+            if mask is None:
+                continue
+            masks.append(mask)
+            names.append(filter_name)
+            weights.append(1.0)
+        
+        if masks:
+            mask_matrix = np.column_stack(masks)
+            weight_array = np.asarray(weights, dtype=float)
+            total_weight = weight_array.sum()
+            scores = mask_matrix @ weight_array / total_weight if total_weight > 0 else np.zeros(n_symbols)
+        else:
+            mask_matrix = np.ones((n_symbols, 0), dtype=bool)
+            scores = np.zeros(n_symbols)
+        
+        return {
+            'masks': mask_matrix,
+            'names': names,
+            'weights': weights,
+            'percentiles': percentiles,
+            'scores': scores
+        }
+    
+    def _apply_custom_filter(self, filter_name: str, filter_func: Callable,
+                             matrix: pd.DataFrame) -> Optional[np.ndarray]:
+        """Evaluate a custom filter over the matrix
+        
+        Expression filters run column-wise; plain callables are called per symbol.
+        An expression filter on a factor that is absent from the whole universe
+        (e.g. no price_volatility data at all) is skipped and returns None.
+        """
+        mask = np.zeros(len(matrix), dtype=bool)
+        if isinstance(filter_func, CompiledScreen):
+            missing = filter_func.factors - set(matrix.columns)
+            if missing:
+                self.logger.warning(f"Skipping filter {filter_name}: no data for {', '.join(sorted(missing))}")
+                return None
             try:
-                if filter_func(symbol, factor_values):
-                    passed_criteria.append(filter_name)
-                    total_score += 1.0
-                    total_weight += 1.0
-                else:
-                    failed_criteria.append(filter_name)
+                return filter_func.evaluate(matrix)
+            except ScreeningExpressionError as e:
+                self.logger.error(f"Error in custom filter {filter_name}: {e}")
+                return mask
+        
+        rows = matrix.to_dict('index')
+        for i, (symbol, row) in enumerate(rows.items()):
+            factor_values = {k: v for k, v in row.items() if not pd.isna(v)}
+            try:
+                mask[i] = bool(filter_func(symbol, factor_values))
             except Exception as e:
                 self.logger.error(f"Error in custom filter {filter_name}: {e}")
-                failed_criteria.append(f"{filter_name}: Error")
+        return mask
+    
+    def screen_stocks(self, factor_data: pd.DataFrame, 
+                     universe: List[str] = None,
+                     top_n: int = None,
+                     passed_only: bool = False) -> List[ScreeningResult]:
+        """Screen stocks based on criteria
+        
+        All criteria are evaluated as masks over the whole universe; result objects
+        are only built for the symbols returned, i.e. those passing every check when
+        ``passed_only`` is set, and at most ``top_n`` of them.
+        """
+        matrix = self.build_factor_matrix(factor_data, universe)
+        
+        if matrix.empty:
+            self.logger.warning("No factor data available for screening")
+            return []
         
-        # Calculate final score
-        final_score = total_score / total_weight if total_weight > 0 else 0.0
+        return self.screen_matrix(matrix, top_n=top_n, passed_only=passed_only)
+    
+    def screen_matrix(self, matrix: pd.DataFrame,
+                      top_n: int = None,
+                      passed_only: bool = False,
+                      percentiles: pd.DataFrame = None,
+                      factor_rows: List[Dict[str, float]] = None) -> List[ScreeningResult]:
+        """Screen a prebuilt symbols x factors matrix, as returned by build_factor_matrix
+        
+        Percentile ranks and the per-symbol factor dicts (see factor_rows) may be
+        passed in when several screeners share one matrix.
+        """
+        if matrix.empty:
+            return []
+        
+        evaluation = self.evaluate_universe(matrix, percentiles)
+        scores = evaluation['scores']
+        masks = evaluation['masks']
+        
+        candidates = np.arange(len(matrix))
+        if passed_only:
+            candidates = candidates[masks.all(axis=1)]
+        
+        # Stable sort keeps first-appearance order among equal scores
+        order = candidates[np.argsort(-scores[candidates], kind='stable')]
+        if top_n is not None:
+            order = order[:top_n]
+        
+        if factor_rows is None:
+            factor_rows = dict(zip(order.tolist(), self.factor_rows(matrix, order)))
+        
+        results = [
+            self._build_result(matrix, evaluation, position, rank, dict(factor_rows[position]))
+            for rank, position in enumerate(order, start=1)
+        ]
+        
+        self.logger.info(f"Screened {len(results)} stocks from {len(matrix)} candidates")
+        return results
+    
+    def factor_rows(self, matrix: pd.DataFrame, positions: np.ndarray = None) -> List[Dict[str, float]]:
+        """Non-missing factor values of matrix rows as dicts, for all rows or the given positions"""
+        values = matrix.to_numpy(dtype=float)
+        if positions is not None:
+            values = values[positions]
+        columns = matrix.columns.tolist()
+        present = ~np.isnan(values)
+        return [
+            {columns[j]: float(row[j]) for j in np.flatnonzero(mask)}
+            for row, mask in zip(values, present)
+        ]
+    
+    def _build_result(self, matrix: pd.DataFrame, evaluation: Dict[str, Any],
+                      position: int, rank: int, factor_values: Dict[str, float]) -> ScreeningResult:
+        """Build the result object for one symbol from the evaluated masks"""
+        symbol = matrix.index[position]
+        
+        passed_criteria = []
+        failed_criteria = []
+        n_criteria = len(self.screening_criteria)
+        
+        for i, name in enumerate(evaluation['names']):
+            if evaluation['masks'][position, i]:
+                passed_criteria.append(name)
+            elif i < n_criteria:
+                failed_criteria.append(self._describe_failure(
+                    self.screening_criteria[i], factor_values, evaluation['percentiles'], symbol
+                ))
+            else:
+                failed_criteria.append(name)
         
         return ScreeningResult(
             symbol=symbol,
-            score=final_score,
+            score=float(evaluation['scores'][position]),
             passed_criteria=passed_criteria,
             failed_criteria=failed_criteria,
-            factor_values=factor_values
+            factor_values=factor_values,
+            rank=rank
         )
     
-    def _calculate_percentile(self, value: float, factor_name: str, 
-                            all_data: pd.DataFrame) -> float:
-        """Calculate percentile of a value within the factor distribution"""
-        factor_values = all_data[all_data['factor_name'] == factor_name]['factor_value'].dropna()
+    def _describe_failure(self, criteria: ScreeningCriteria, factor_values: Dict[str, float],
+                          percentiles: Optional[pd.DataFrame], symbol: str) -> str:
+        """Explain why a symbol failed a criterion"""
+        factor_value = factor_values.get(criteria.factor_name)
+        
+        if factor_value is None:
+            return f"{criteria.factor_name}: No data"
+        
+        if criteria.min_value is not None and factor_value < criteria.min_value:
+            return f"{criteria.factor_name}: {factor_value} < {criteria.min_value}"
         
-        if len(factor_values) == 0:
-            return 50.0
+        if criteria.max_value is not None and factor_value > criteria.max_value:
+            return f"{criteria.factor_name}: {factor_value} > {criteria.max_value}"
         
-        return (factor_values < value).mean() * 100
+        percentile = percentiles.at[symbol, criteria.factor_name]
+        if criteria.min_percentile is not None and percentile < criteria.min_percentile:
+            return f"{criteria.factor_name}: {percentile:.1f}% < {criteria.min_percentile}%"
+        
+        return f"{criteria.factor_name}: {percentile:.1f}% > {criteria.max_percentile}%"
     
     def create_value_screener(self, max_pe: float = 20.0, max_pb: float = 3.0, 
                             min_dividend_yield: float = 2.0) -> 'FactorScreener':
@@ -254,34 +411,20 @@ class FactorScreener:
     def add_market_cap_filter(self, min_market_cap: float = 1000000000,  # $1B
                             max_market_cap: float = None):
         """Add market cap filter"""
-        def market_cap_filter(symbol: str, factor_values: Dict[str, float]) -> bool:
-            market_cap = factor_values.get('market_cap', 0)
-            
-            if market_cap < min_market_cap:
-                return False
-            
-            if max_market_cap and market_cap > max_market_cap:
-                return False
-            
-            return True
+        expression = f"fillna(market_cap, 0) >= {min_market_cap!r}"
+        if max_market_cap:
+            expression += f" and fillna(market_cap, 0) <= {max_market_cap!r}"
         
-        self.add_custom_filter('market_cap_filter', market_cap_filter)
+        self.add_expression_filter('market_cap_filter', expression)
     
     def add_volatility_filter(self, max_volatility: float = 30.0):
         """Add volatility filter"""
-        def volatility_filter(symbol: str, factor_values: Dict[str, float]) -> bool:
-            volatility = factor_values.get('price_volatility', 100)
-            return volatility <= max_volatility
-        
-        self.add_custom_filter('volatility_filter', volatility_filter)
+        self.add_expression_filter('volatility_filter',
+                                   f"fillna(price_volatility, 100) <= {max_volatility!r}")
     
     def add_liquidity_filter(self, min_volume: float = 1000000):  # 1M shares
         """Add liquidity filter"""
-        def liquidity_filter(symbol: str, factor_values: Dict[str, float]) -> bool:
-            volume = factor_values.get('volume', 0)
-            return volume >= min_volume
-        
-        self.add_custom_filter('liquidity_filter', liquidity_filter)
+        self.add_expression_filter('liquidity_filter', f"fillna(volume, 0) >= {min_volume!r}")
     
     def export_results(self, results: List[ScreeningResult], 
                       filepath: str, format: str = 'csv'):
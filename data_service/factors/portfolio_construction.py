@@ -0,0 +1,309 @@
+"""
+Portfolio Construction
+Covariance-aware weighting on arrays: Ledoit-Wolf shrunk covariance, equal risk
+contribution and box-constrained minimum variance. The solvers accept a warm
+start so rebalancing a large portfolio every day only costs a few iterations.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Tuple
+
+def pivot_returns(price_data: pd.DataFrame, symbols: List[str] = None,
+                  lookback_period: int = None) -> pd.DataFrame:
+    """Pivot long price data (date, symbol, close) to a dates x symbols return frame"""
+    if symbols is not None:
+        price_data = price_data[price_data['symbol'].isin(symbols)]
+    prices = price_data.pivot_table(index='date', columns='symbol', values='close', aggfunc='last')
+    if symbols is not None:
+        prices = prices.reindex(columns=[s for s in symbols if s in prices.columns])
+    returns = prices.sort_index().pct_change(fill_method=None).iloc[1:]
+    if lookback_period is not None:
+        returns = returns.iloc[-lookback_period:]
+    return returns
+
+def _shrink(covariance: np.ndarray, pi_hat: float, n_obs: int) -> Tuple[np.ndarray, float]:
+    """Shrink a sample covariance toward the scaled identity (Ledoit-Wolf 2004)"""
+    n_assets = covariance.shape[0]
+    mu = np.trace(covariance) / n_assets
+    distance = np.sum(covariance * covariance) - 2 * mu * np.trace(covariance) + n_assets * mu * mu
+    if distance <= 0:
+        return covariance.copy(), 0.0
+    beta = min(max(pi_hat / n_obs, 0.0), distance)
+    shrinkage = beta / distance
+    shrunk = (1 - shrinkage) * covariance
+    shrunk[np.diag_indices(n_assets)] += shrinkage * mu
+    return shrunk, shrinkage
+
+def ledoit_wolf_covariance(returns) -> Tuple[np.ndarray, float]:
+    """Ledoit-Wolf shrunk covariance of a (time x assets) return array
+
+    Returns the covariance and the shrinkage intensity. Missing returns are
+    treated as zero after demeaning each asset over its observed returns.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    n_obs = len(returns)
+    if n_obs < 2:
+        raise ValueError("At least two return observations are required")
+
+    centred = returns - np.nanmean(returns, axis=0)
+    centred = np.where(np.isnan(centred), 0.0, centred)
+    covariance = centred.T @ centred / n_obs
+    # mean over t of ||x_t x_t' - S||^2 reduces to mean(||x_t||^4) - ||S||^2
+    norms = np.einsum('ij,ij->i', centred, centred)
+    pi_hat = np.mean(norms * norms) - np.sum(covariance * covariance)
+    return _shrink(covariance, pi_hat, n_obs)
+
+class RollingCovariance:
+    """Trailing-window Ledoit-Wolf covariance updated in O(assets^2) per step
+
+    Keeps running sums of returns and their cross products, so each new row
+    costs two rank-1 updates instead of a full (window x assets^2) product.
+    Missing returns count as zero. Sums are recomputed every ``resync``
+    steps to bound floating point drift.
+    """
+
+    def __init__(self, window: int, resync: int = 252):
+        self.window = window
+        self.resync = resync
+        self.rows: Optional[np.ndarray] = None
+        self.position = 0
+        self.count = 0
+        self.steps = 0
+        self.total: Optional[np.ndarray] = None
+        self.cross: Optional[np.ndarray] = None
+
+    def update(self, row) -> None:
+        """Push one row of asset returns"""
+        row = np.nan_to_num(np.asarray(row, dtype=np.float64))
+        if self.rows is None:
+            self.rows = np.zeros((self.window, len(row)))
+            self.total = np.zeros(len(row))
+            self.cross = np.zeros((len(row), len(row)))
+
+        old = self.rows[self.position]
+        if self.count == self.window:
+            self.total -= old
+            self.cross -= np.outer(old, old)
+        else:
+            self.count += 1
+        self.rows[self.position] = row
+        self.total += row
+        self.cross += np.outer(row, row)
+        self.position = (self.position + 1) % self.window
+
+        self.steps += 1
+        if self.steps % self.resync == 0:
+            window_rows = self.rows[:self.count]
+            self.total = window_rows.sum(axis=0)
+            self.cross = window_rows.T @ window_rows
+
+    @property
+    def ready(self) -> bool:
+        return self.count == self.window
+
+    def covariance(self) -> Tuple[np.ndarray, float]:
+        """Shrunk covariance of the current window and its shrinkage intensity"""
+        if self.count < 2:
+            raise ValueError("At least two return observations are required")
+        n_obs = self.count
+        mean = self.total / n_obs
+        covariance = self.cross / n_obs - np.outer(mean, mean)
+        centred = self.rows[:n_obs] - mean
+        norms = np.einsum('ij,ij->i', centred, centred)
+        pi_hat = np.mean(norms * norms) - np.sum(covariance * covariance)
+        return _shrink(covariance, pi_hat, n_obs)
+
+def project_capped_simplex(values: np.ndarray, lower, upper) -> np.ndarray:
+    """Euclidean projection onto {w : sum(w) = 1, lower <= w <= upper}
+
+    Sorts the breakpoints of the piecewise-linear sum of clipped values and
+    solves for the shift exactly, in O(n log n).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    lower = np.broadcast_to(np.asarray(lower, dtype=np.float64), values.shape)
+    upper = np.broadcast_to(np.asarray(upper, dtype=np.float64), values.shape)
+
+    breakpoints = np.concatenate((values - lower, values - upper))
+    slopes = np.concatenate((np.ones(len(values)), -np.ones(len(values))))
+    order = np.argsort(-breakpoints, kind='stable')
+    breakpoints = breakpoints[order]
+    slopes = np.cumsum(slopes[order])
+
+    # Sum of clipped values at each breakpoint, moving the shift downwards
+    sums = lower.sum() + np.concatenate(([0.0], np.cumsum(slopes[:-1] * -np.diff(breakpoints))))
+    index = np.searchsorted(sums, 1.0)
+    if index == 0:
+        shift = breakpoints[0]
+    elif index == len(sums):
+        shift = breakpoints[-1]
+    else:
+        k = index - 1
+        shift = breakpoints[k] - (1.0 - sums[k]) / slopes[k]
+    return np.clip(values - shift, lower, upper)
+
+def _feasible_bounds(n_assets: int, lower: float, upper: float) -> Tuple[float, float]:
+    """Relax bounds that cannot sum to one, e.g. a 5% cap on fewer than 20 names"""
+    lower = min(lower, 1.0 / n_assets)
+    upper = max(upper, 1.0 / n_assets)
+    return lower, upper
+
+def inverse_volatility(covariance: np.ndarray) -> np.ndarray:
+    """Weights proportional to inverse volatility"""
+    inverse_vol = 1 / np.sqrt(np.diag(covariance))
+    return inverse_vol / inverse_vol.sum()
+
+def equal_risk_contribution(covariance: np.ndarray, budgets: np.ndarray = None,
+                            initial: np.ndarray = None, tol: float = 1e-10,
+                            max_iter: int = 100) -> np.ndarray:
+    """Long-only weights whose risk contributions match the budgets (equal by default)
+
+    Minimizes 0.5 y'Cy - sum(b log y) with damped Newton steps (Spinu, 2013) and
+    normalizes y to sum to one.
+    """
+    n_assets = covariance.shape[0]
+    budgets = np.full(n_assets, 1.0 / n_assets) if budgets is None else budgets / np.sum(budgets)
+
+    if initial is not None and np.all(initial > 0):
+        y = np.asarray(initial, dtype=np.float64)
+        # Rescale so the warm start sits near the optimum's scale
+        y = y * np.sqrt(budgets.sum() / (y @ covariance @ y))
+    else:
+        y = inverse_volatility(covariance)
+        y = y * np.sqrt(1.0 / (y @ covariance @ y))
+
+    for _ in range(max_iter):
+        gradient = covariance @ y - budgets / y
+        hessian = covariance + np.diag(budgets / (y * y))
+        step = np.linalg.solve(hessian, gradient)
+        decrement = np.sqrt(max(gradient @ step, 0.0))
+        if decrement < tol:
+            break
+        y = y - step / (1 + decrement) if decrement > 0.3 else y - step
+
+    return y / y.sum()
+
+def _active_set_min_variance(covariance: np.ndarray, lower: float, upper: float,
+                             initial: np.ndarray, max_iter: int = 50) -> Optional[np.ndarray]:
+    """Minimum variance by solving the KKT system on the free names
+
+    Names at a bound are fixed, the rest solved in closed form with the budget
+    constraint; names that overshoot are clamped and bound names whose
+    multiplier has the wrong sign are released. Returns None when it does not
+    reach an optimum, so the caller can fall back to projected gradient.
+    """
+    at_lower = initial <= lower + 1e-12
+    at_upper = (initial >= upper - 1e-12) & ~at_lower
+
+    for _ in range(max_iter):
+        free = ~(at_lower | at_upper)
+        if not free.any():
+            return None
+        fixed = np.where(at_lower, lower, np.where(at_upper, upper, 0.0))
+
+        free_cov = covariance[np.ix_(free, free)]
+        rhs = np.column_stack((np.ones(free.sum()), covariance[np.ix_(free, ~free)] @ fixed[~free]))
+        try:
+            solved = np.linalg.solve(free_cov, rhs)
+        except np.linalg.LinAlgError:
+            return None
+        multiplier = (1 - fixed[~free].sum() + solved[:, 1].sum()) / solved[:, 0].sum()
+        free_weights = multiplier * solved[:, 0] - solved[:, 1]
+
+        below = free_weights < lower - 1e-12
+        above = free_weights > upper + 1e-12
+        if below.any() or above.any():
+            free_index = np.flatnonzero(free)
+            at_lower[free_index[below]] = True
+            at_upper[free_index[above]] = True
+            continue
+
+        weights = fixed
+        weights[free] = free_weights
+        gradient = covariance @ weights - multiplier
+        violation = np.where(at_lower, -gradient, 0.0) + np.where(at_upper, gradient, 0.0)
+        worst = int(np.argmax(violation))
+        if violation[worst] <= 1e-12:
+            return weights
+        at_lower[worst] = at_upper[worst] = False
+
+    return None
+
+def _projected_gradient_min_variance(covariance: np.ndarray, lower: float, upper: float,
+                                     initial: np.ndarray, tol: float, max_iter: int) -> np.ndarray:
+    """Minimum variance by accelerated projected gradient (FISTA) with adaptive restart"""
+    n_assets = covariance.shape[0]
+    vector = np.ones(n_assets) / np.sqrt(n_assets)
+    for _ in range(30):
+        vector = covariance @ vector
+        vector /= np.linalg.norm(vector)
+    lipschitz = 1.05 * float(vector @ covariance @ vector)
+    if lipschitz <= 0:
+        return np.full(n_assets, 1.0 / n_assets)
+
+    weights = project_capped_simplex(initial, lower, upper)
+    momentum = weights.copy()
+    t = 1.0
+    for _ in range(max_iter):
+        updated = project_capped_simplex(momentum - covariance @ momentum / lipschitz, lower, upper)
+        if np.max(np.abs(updated - weights)) < tol:
+            return updated
+        # Restart the momentum when it points against the last step (O'Donoghue & Candes)
+        if (momentum - updated) @ (updated - weights) > 0:
+            t = 1.0
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        momentum = updated + (t - 1) / t_next * (updated - weights)
+        weights, t = updated, t_next
+
+    return weights
+
+def minimum_variance(covariance: np.ndarray, lower: float = 0.0, upper: float = 1.0,
+                     initial: np.ndarray = None, tol: float = 1e-8,
+                     max_iter: int = 2000) -> np.ndarray:
+    """Long-only minimum variance weights within box constraints
+
+    Starts from ``initial`` (e.g. the previous rebalance) or inverse-volatility
+    weights and solves the KKT system over the free names, which takes a few
+    small linear solves when the set of names at a bound barely changes. Falls
+    back to accelerated projected gradient with the exact capped-simplex
+    projection if that does not settle.
+    """
+    n_assets = covariance.shape[0]
+    lower, upper = _feasible_bounds(n_assets, lower, upper)
+
+    start = inverse_volatility(covariance) if initial is None else np.asarray(initial, dtype=np.float64)
+    start = project_capped_simplex(start, lower, upper)
+
+    weights = _active_set_min_variance(covariance, lower, upper, start)
+    if weights is None:
+        weights = _projected_gradient_min_variance(covariance, lower, upper, start, tol, max_iter)
+    return weights
+
+def portfolio_weights(covariance: np.ndarray, method: str = 'erc', lower: float = 0.0,
+                      upper: float = 1.0, initial: np.ndarray = None) -> np.ndarray:
+    """Weights for a covariance matrix by method, projected onto the box constraints
+
+    Methods are 'erc' (equal risk contribution), 'min_variance' and
+    'inverse_volatility'. ERC and inverse-volatility weights that breach the
+    bounds are projected onto the nearest feasible portfolio.
+    """
+    n_assets = covariance.shape[0]
+    lower, upper = _feasible_bounds(n_assets, lower, upper)
+
+    if method == 'min_variance':
+        return minimum_variance(covariance, lower, upper, initial=initial)
+    if method == 'erc':
+        weights = equal_risk_contribution(covariance, initial=initial)
+    elif method == 'inverse_volatility':
+        weights = inverse_volatility(covariance)
+    else:
+        raise ValueError(f"Unknown weighting method: {method}")
+
+    if weights.min() < lower or weights.max() > upper:
+        weights = project_capped_simplex(weights, lower, upper)
+    return weights
+
+def risk_contributions(weights: np.ndarray, covariance: np.ndarray) -> np.ndarray:
+    """Share of portfolio variance contributed by each asset"""
+    marginal = covariance @ weights
+    return weights * marginal / (weights @ marginal)
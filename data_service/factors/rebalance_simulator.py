@@ -0,0 +1,246 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Any, Optional, Sequence
+import logging
+from dataclasses import dataclass, field
+
+from .stock_selector import StockSelector, SelectionResult
+from ..backtest import metrics_kernel
+
+_REBALANCE_PERIODS = {'weekly': 'W', 'monthly': 'M', 'quarterly': 'Q', 'yearly': 'Y'}
+
+@dataclass
+class SimulationResult:
+    """Result of a historical rebalancing simulation"""
+    selection_method: str
+    returns: pd.Series          # Gross daily portfolio returns
+    net_returns: pd.Series      # Returns after transaction costs
+    equity_curve: pd.Series     # Net portfolio value, starting at 1.0
+    weights: pd.DataFrame       # Target weights at each rebalance date
+    turnover: pd.Series         # Sum of absolute weight changes at each rebalance
+    costs: pd.Series            # Transaction cost charged at each rebalance
+    selections: List[SelectionResult] = field(default_factory=list)
+    metrics: Dict[str, float] = field(default_factory=dict)
+
+class RebalanceSimulator:
+    """Walk-forward simulation of StockSelector rebalancing over history
+
+    Factor data and prices are pivoted once into (dates x symbols) arrays. At
+    every rebalance date the selector's weighting runs on that date's factor
+    cross-section and the trailing returns window, using only data up to that
+    date. Between rebalances the weights drift with prices; each rebalance pays
+    ``transaction_cost`` per unit of turnover, as in StockSelector.rebalance_portfolio.
+    """
+
+    def __init__(self, selector: StockSelector = None,
+                 transaction_cost: float = 0.001,
+                 lookback_period: int = 252,
+                 periods_per_year: int = 252):
+        self.selector = selector or StockSelector()
+        self.transaction_cost = transaction_cost
+        self.lookback_period = lookback_period
+        self.periods_per_year = periods_per_year
+        self.logger = logging.getLogger(__name__)
+
+        self.returns: Optional[pd.DataFrame] = None
+        self.factor_matrix: Optional[np.ndarray] = None
+        self.factor_positions: Optional[np.ndarray] = None
+        self.factor_name: Optional[str] = None
+
+    def prepare(self, factor_data: pd.DataFrame, price_data: pd.DataFrame,
+                factor_name: str = None):
+        """Pivot factor values and prices once for repeated simulations"""
+        if factor_name is None:
+            factor_name = factor_data['factor_name'].iloc[0]
+
+        prices = price_data.pivot_table(index='date', columns='symbol', values='close', aggfunc='last')
+        prices.index = pd.to_datetime(prices.index)
+        prices = prices.sort_index()
+        self.returns = prices.pct_change(fill_method=None)
+
+        factors = factor_data[factor_data['factor_name'] == factor_name]
+        factor_panel = factors.pivot_table(index='date', columns='symbol', values='factor_value',
+                                           aggfunc='last')
+        factor_panel.index = pd.to_datetime(factor_panel.index)
+        factor_panel = factor_panel.sort_index().reindex(columns=prices.columns)
+
+        # Each price date uses the cross-section of the latest factor date on or before it
+        self.factor_matrix = factor_panel.to_numpy(dtype=np.float64)
+        self.factor_positions = np.searchsorted(factor_panel.index.values, prices.index.values,
+                                                side='right') - 1
+        self.factor_name = factor_name
+
+        self.logger.info(f"Prepared {len(prices)} dates x {prices.shape[1]} symbols for {factor_name}")
+
+    def run(self, factor_data: pd.DataFrame = None,
+            price_data: pd.DataFrame = None,
+            selection_method: str = 'top_n',
+            rebalance_frequency: str = None,
+            start_date=None,
+            end_date=None,
+            factor_name: str = None,
+            **kwargs) -> SimulationResult:
+        """Simulate rebalancing with one selection method
+
+        Pass factor and price data, or call prepare() once and reuse it across
+        runs. Extra keyword arguments go to StockSelector.select_weights.
+        """
+        if factor_data is not None and price_data is not None:
+            self.prepare(factor_data, price_data, factor_name)
+        if self.returns is None:
+            raise ValueError("No data prepared; pass factor_data and price_data or call prepare()")
+
+        frequency = rebalance_frequency or self.selector.rebalance_frequency
+        dates = self.returns.index
+        symbols = self.returns.columns
+        needs_returns = selection_method in ('risk_parity', 'min_variance')
+
+        rebalance_positions = self._rebalance_positions(dates, frequency, start_date, end_date,
+                                                        min_history=self.lookback_period if needs_returns else 0)
+        if len(rebalance_positions) == 0:
+            raise ValueError("No rebalance dates with factor data in the requested range")
+
+        last_position = self._last_position(dates, end_date)
+
+        returns = np.nan_to_num(self.returns.to_numpy(dtype=np.float64))
+        first = rebalance_positions[0]
+        gross = np.zeros(last_position - first)
+        cost_factor = np.ones(last_position - first)
+
+        held = np.zeros(len(symbols))
+        target_rows, turnover, costs, selections = [], [], [], []
+        value = 1.0
+
+        for k, position in enumerate(rebalance_positions):
+            target = self._target_weights(position, symbols, selection_method, kwargs)
+            change = float(np.abs(target - held).sum())
+            cost = change * self.transaction_cost
+
+            end = rebalance_positions[k + 1] if k + 1 < len(rebalance_positions) else last_position
+            segment_returns, held = self._drift(target, returns[position + 1:end + 1])
+            gross[position - first:end - first] = segment_returns
+            if end > position:
+                cost_factor[position - first] = 1 - cost
+
+            weights = {symbols[i]: float(target[i]) for i in np.flatnonzero(target)}
+            selections.append(SelectionResult(
+                date=dates[position],
+                selected_stocks=list(weights.keys()),
+                weights=weights,
+                portfolio_value=value,
+                rebalance_cost=cost
+            ))
+            value *= (1 - cost) * np.prod(1 + segment_returns)
+            target_rows.append(target)
+            turnover.append(change)
+            costs.append(cost)
+
+        index = dates[first + 1:last_position + 1]
+        rebalance_dates = dates[rebalance_positions]
+        net = (1 + gross) * cost_factor - 1
+        equity = pd.Series(np.cumprod(1 + net), index=index)
+
+        metrics = {}
+        if len(equity) > 1:
+            curve = np.concatenate(([1.0], equity.to_numpy()))
+            years = (index[-1] - dates[first]).days / 365
+            batch = metrics_kernel.batch_metrics(curve, self.periods_per_year,
+                                                 years=years if years > 0 else None)
+            metrics = {name: float(values[0]) for name, values in batch.items()}
+        metrics['avg_turnover'] = float(np.mean(turnover))
+        metrics['total_cost'] = float(np.sum(costs))
+
+        weight_frame = pd.DataFrame(np.vstack(target_rows), index=rebalance_dates, columns=symbols)
+        weight_frame = weight_frame.loc[:, (weight_frame != 0).any()]
+
+        self.logger.info(f"Simulated {selection_method} with {len(rebalance_positions)} rebalances "
+                         f"over {len(index)} periods")
+
+        return SimulationResult(
+            selection_method=selection_method,
+            returns=pd.Series(gross, index=index),
+            net_returns=pd.Series(net, index=index),
+            equity_curve=equity,
+            weights=weight_frame,
+            turnover=pd.Series(turnover, index=rebalance_dates),
+            costs=pd.Series(costs, index=rebalance_dates),
+            selections=selections,
+            metrics=metrics
+        )
+
+    def compare_methods(self, factor_data: pd.DataFrame = None,
+                        price_data: pd.DataFrame = None,
+                        methods: Sequence[str] = ('top_n', 'factor_weighted', 'risk_parity'),
+                        **kwargs) -> pd.DataFrame:
+        """Run several selection methods on the same prepared data and tabulate their metrics"""
+        if factor_data is not None and price_data is not None:
+            self.prepare(factor_data, price_data, kwargs.pop('factor_name', None))
+
+        rows = {}
+        for method in methods:
+            rows[method] = self.run(selection_method=method, **kwargs).metrics
+        return pd.DataFrame.from_dict(rows, orient='index')
+
+    def _rebalance_positions(self, dates: pd.DatetimeIndex, frequency: str,
+                             start_date=None, end_date=None, min_history: int = 0) -> np.ndarray:
+        """Positions of rebalance dates: the last trading date of each period"""
+        if frequency == 'daily':
+            positions = np.arange(len(dates))
+        elif frequency in _REBALANCE_PERIODS:
+            periods = dates.to_period(_REBALANCE_PERIODS[frequency])
+            is_last = np.append(periods[1:] != periods[:-1], True)
+            positions = np.flatnonzero(is_last)
+        else:
+            raise ValueError(f"Unknown rebalance frequency: {frequency}")
+
+        keep = self.factor_positions[positions] >= 0
+        keep &= positions >= max(min_history, 1)
+        if start_date is not None:
+            keep &= dates[positions] >= pd.Timestamp(start_date)
+        if end_date is not None:
+            keep &= dates[positions] <= pd.Timestamp(end_date)
+        positions = positions[keep]
+
+        # Nothing is held after the final date, so it never triggers a trade
+        return positions[positions < self._last_position(dates, end_date)]
+
+    def _last_position(self, dates: pd.DatetimeIndex, end_date=None) -> int:
+        """Position of the last simulated date"""
+        if end_date is None:
+            return len(dates) - 1
+        return int(np.searchsorted(dates.values, np.datetime64(pd.Timestamp(end_date)), side='right')) - 1
+
+    def _target_weights(self, position: int, symbols: pd.Index, selection_method: str,
+                        kwargs: Dict[str, Any]) -> np.ndarray:
+        """Selector weights for one date as a vector over all symbols"""
+        row = self.factor_matrix[self.factor_positions[position]]
+        valid = ~np.isnan(row)
+        factor_values = pd.Series(row[valid], index=symbols[valid])
+
+        window = None
+        if selection_method in ('risk_parity', 'min_variance'):
+            window = self.returns.iloc[position - self.lookback_period + 1:position + 1]
+
+        weights = self.selector.select_weights(factor_values, selection_method, returns=window, **kwargs)
+        target = np.zeros(len(symbols))
+        if weights:
+            target[symbols.get_indexer(list(weights.keys()))] = list(weights.values())
+        return target
+
+    def _drift(self, weights: np.ndarray, returns: np.ndarray):
+        """Portfolio returns over a holding period and the drifted end weights
+
+        Uninvested weight is held as cash at zero return.
+        """
+        if len(returns) == 0:
+            return np.zeros(0), weights
+
+        held = np.flatnonzero(weights)
+        cash = 1.0 - weights[held].sum()
+        growth = np.cumprod(1 + returns[:, held], axis=0)
+        values = growth @ weights[held] + cash
+        period_returns = values / np.concatenate(([1.0], values[:-1])) - 1
+
+        drifted = np.zeros_like(weights)
+        drifted[held] = weights[held] * growth[-1] / values[-1]
+        return period_returns, drifted
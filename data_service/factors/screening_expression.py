@@ -0,0 +1,310 @@
+"""
+Screening Expression Language
+Parses screens such as ``pe_ratio < 20 and roe > 15 and pct_rank(momentum_60d) > 80``
+into a validated tree that evaluates over whole factor columns at once.
+Compiled screens are cached by expression hash; numexpr is used for the
+arithmetic and comparisons when it is installed.
+"""
+
+import ast
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Callable, Any, Set, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    import numexpr
+    NUMEXPR_AVAILABLE = True
+except ImportError:
+    numexpr = None
+    NUMEXPR_AVAILABLE = False
+
+class ScreeningExpressionError(ValueError):
+    """Raised for expressions that cannot be parsed or reference unknown factors"""
+
+def _pct_rank(values: np.ndarray) -> np.ndarray:
+    """Share of the universe strictly below each value, in percent"""
+    series = pd.Series(values)
+    count = series.notna().sum()
+    if count == 0:
+        return np.full(len(values), np.nan)
+    return ((series.rank(method='min') - 1) / count * 100).to_numpy()
+
+def _zscore(values: np.ndarray) -> np.ndarray:
+    """Cross-sectional z-score, ignoring missing values"""
+    std = np.nanstd(values, ddof=1) if np.count_nonzero(~np.isnan(values)) > 1 else np.nan
+    if not std:
+        return np.full(len(values), np.nan)
+    return (values - np.nanmean(values)) / std
+
+def _fillna(values: np.ndarray, default: np.ndarray) -> np.ndarray:
+    return np.where(np.isnan(values), default, values)
+
+def _isnull(values: np.ndarray) -> np.ndarray:
+    return np.isnan(values)
+
+def _notnull(values: np.ndarray) -> np.ndarray:
+    return ~np.isnan(values)
+
+FUNCTIONS: Dict[str, Callable[..., np.ndarray]] = {
+    'pct_rank': _pct_rank,
+    'zscore': _zscore,
+    'abs': np.abs,
+    'log': np.log,
+    'fillna': _fillna,
+    'isnull': _isnull,
+    'notnull': _notnull,
+}
+
+_FUNCTION_ARITY = {'fillna': 2}
+
+_BINARY_OPS = {
+    ast.Add: ('+', np.add),
+    ast.Sub: ('-', np.subtract),
+    ast.Mult: ('*', np.multiply),
+    ast.Div: ('/', np.true_divide),
+}
+
+_BOOLEAN_FUNCTIONS = {'isnull', 'notnull'}
+
+_COMPARE_OPS = {
+    ast.Lt: ('<', np.less),
+    ast.LtE: ('<=', np.less_equal),
+    ast.Gt: ('>', np.greater),
+    ast.GtE: ('>=', np.greater_equal),
+    ast.Eq: ('==', np.equal),
+    ast.NotEq: ('!=', np.not_equal),
+}
+
+def _is_boolean(node: ast.AST) -> bool:
+    """Whether a node already evaluates to a boolean mask rather than numbers"""
+    if isinstance(node, (ast.BoolOp, ast.Compare)):
+        return True
+    if isinstance(node, ast.UnaryOp):
+        return isinstance(node.op, ast.Not)
+    return isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _BOOLEAN_FUNCTIONS
+
+class CompiledScreen:
+    """A parsed and validated screening expression
+
+    Evaluating it against a symbols x factors matrix returns one boolean per
+    symbol. Missing values never pass a comparison, and numeric operands of
+    ``and``/``or``/``not`` count as true where they are non-zero and not missing.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        try:
+            tree = ast.parse(expression.strip(), mode='eval')
+        except SyntaxError as e:
+            raise ScreeningExpressionError(f"Invalid screening expression '{expression}': {e.msg}")
+
+        self.factors: Set[str] = set()
+        self.calls: List[Callable[[Dict[str, np.ndarray]], np.ndarray]] = []
+        self._call_index: Dict[int, int] = {}
+        self._evaluate = self._compile(tree.body)
+        self._numexpr_source = self._to_numexpr(tree.body) if NUMEXPR_AVAILABLE else None
+
+    def _compile(self, node: ast.AST) -> Callable[[Dict[str, np.ndarray]], Any]:
+        """Turn a validated AST node into a column-wise evaluation function"""
+        if isinstance(node, ast.BoolOp):
+            parts = [self._compile_condition(value) for value in node.values]
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+
+            def evaluate_bool(columns):
+                result = np.asarray(parts[0](columns), dtype=bool)
+                for part in parts[1:]:
+                    result = combine(result, part(columns))
+                return result
+            return evaluate_bool
+
+        if isinstance(node, ast.UnaryOp):
+            if isinstance(node.op, ast.Not):
+                condition = self._compile_condition(node.operand)
+                return lambda columns: np.logical_not(condition(columns))
+            operand = self._compile(node.operand)
+            if isinstance(node.op, ast.USub):
+                return lambda columns: np.negative(operand(columns))
+            if isinstance(node.op, ast.UAdd):
+                return operand
+
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+            left, right = self._compile(node.left), self._compile(node.right)
+            func = _BINARY_OPS[type(node.op)][1]
+
+            def evaluate_binary(columns):
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    return func(left(columns), right(columns))
+            return evaluate_binary
+
+        if isinstance(node, ast.Compare):
+            operands = [self._compile(node.left)] + [self._compile(c) for c in node.comparators]
+            funcs = []
+            for op in node.ops:
+                if type(op) not in _COMPARE_OPS:
+                    raise ScreeningExpressionError(f"Unsupported comparison in '{self.expression}'")
+                funcs.append(_COMPARE_OPS[type(op)][1])
+
+            def evaluate_compare(columns):
+                values = [operand(columns) for operand in operands]
+                result = funcs[0](values[0], values[1])
+                for i in range(1, len(funcs)):
+                    result = np.logical_and(result, funcs[i](values[i], values[i + 1]))
+                return result
+            return evaluate_compare
+
+        if isinstance(node, ast.Call):
+            return self._compile_call(node)
+
+        if isinstance(node, ast.Name):
+            name = node.id
+            self.factors.add(name)
+            return lambda columns: columns[name]
+
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) \
+                and not isinstance(node.value, bool):
+            value = float(node.value)
+            return lambda columns: value
+
+        raise ScreeningExpressionError(
+            f"Unsupported syntax {type(node).__name__} in screening expression '{self.expression}'"
+        )
+
+    def _compile_condition(self, node: ast.AST) -> Callable[[Dict[str, np.ndarray]], Any]:
+        """Compile an operand of and/or/not, treating numbers as true where non-zero and not missing"""
+        part = self._compile(node)
+        if _is_boolean(node):
+            return part
+
+        def evaluate_truthy(columns):
+            return np.nan_to_num(np.asarray(part(columns), dtype=float), nan=0.0) != 0
+        return evaluate_truthy
+
+    def _compile_call(self, node: ast.Call) -> Callable[[Dict[str, np.ndarray]], Any]:
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+            raise ScreeningExpressionError(
+                f"Unknown function in '{self.expression}'; available: {', '.join(sorted(FUNCTIONS))}"
+            )
+        name = node.func.id
+        if len(node.args) != _FUNCTION_ARITY.get(name, 1):
+            raise ScreeningExpressionError(
+                f"{name}() takes {_FUNCTION_ARITY.get(name, 1)} argument(s) in '{self.expression}'"
+            )
+
+        func = FUNCTIONS[name]
+        args = [self._compile(arg) for arg in node.args]
+
+        def evaluate_call(columns):
+            values = [np.asarray(arg(columns), dtype=float) for arg in args]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return func(*values)
+
+        self._call_index[id(node)] = len(self.calls)
+        self.calls.append(evaluate_call)
+        return evaluate_call
+
+    def _to_numexpr(self, node: ast.AST) -> str:
+        """Render the tree as numexpr source; function calls become precomputed inputs"""
+        if isinstance(node, ast.BoolOp):
+            joiner = ' & ' if isinstance(node.op, ast.And) else ' | '
+            return '(' + joiner.join(self._numexpr_condition(v) for v in node.values) + ')'
+        if isinstance(node, ast.UnaryOp):
+            if isinstance(node.op, ast.Not):
+                return f'(~{self._numexpr_condition(node.operand)})'
+            prefix = '-' if isinstance(node.op, ast.USub) else ''
+            return f'({prefix}{self._to_numexpr(node.operand)})'
+        if isinstance(node, ast.BinOp):
+            symbol = _BINARY_OPS[type(node.op)][0]
+            return f'({self._to_numexpr(node.left)} {symbol} {self._to_numexpr(node.right)})'
+        if isinstance(node, ast.Compare):
+            operands = [node.left] + list(node.comparators)
+            parts = [
+                f'({self._to_numexpr(operands[i])} {_COMPARE_OPS[type(op)][0]} '
+                f'{self._to_numexpr(operands[i + 1])})'
+                for i, op in enumerate(node.ops)
+            ]
+            return '(' + ' & '.join(parts) + ')'
+        if isinstance(node, ast.Call):
+            return f'__call{self._call_index[id(node)]}'
+        if isinstance(node, ast.Name):
+            return f'__f_{node.id}'
+        return repr(float(node.value))
+
+    def _numexpr_condition(self, node: ast.AST) -> str:
+        """numexpr's &, | and ~ only take booleans; NaN is the one value not equal to itself"""
+        source = self._to_numexpr(node)
+        if _is_boolean(node):
+            return source
+        return f'(({source} != 0) & ({source} == {source}))'
+
+    def validate(self, columns) -> None:
+        """Raise if the expression references factors that are not available"""
+        missing = self.factors - set(columns)
+        if missing:
+            raise ScreeningExpressionError(
+                f"Unknown factor(s) {', '.join(sorted(missing))} in screening expression '{self.expression}'"
+            )
+
+    def evaluate(self, matrix: pd.DataFrame) -> np.ndarray:
+        """Evaluate over a symbols x factors matrix and return a boolean mask"""
+        self.validate(matrix.columns)
+        columns = {name: matrix[name].to_numpy(dtype=float) for name in self.factors}
+
+        result = None
+        if self._numexpr_source is not None:
+            try:
+                local_dict = {f'__f_{name}': values for name, values in columns.items()}
+                for i, call in enumerate(self.calls):
+                    local_dict[f'__call{i}'] = np.broadcast_to(call(columns), len(matrix))
+                result = numexpr.evaluate(self._numexpr_source, local_dict=local_dict)
+            except Exception:
+                # Backend limitations (e.g. constant division by zero) fall back to numpy
+                result = None
+        if result is None:
+            try:
+                result = self._evaluate(columns)
+            except Exception as e:
+                raise ScreeningExpressionError(f"Cannot evaluate screening expression '{self.expression}': {e}")
+
+        result = np.broadcast_to(np.asarray(result), len(matrix))
+        if result.dtype != bool:
+            # Numeric expressions pass where they are non-zero and not missing
+            result = np.nan_to_num(result.astype(float), nan=0.0) != 0
+        return result.copy()
+
+    def __call__(self, matrix: pd.DataFrame) -> np.ndarray:
+        return self.evaluate(matrix)
+
+    def __repr__(self) -> str:
+        return f"CompiledScreen({self.expression!r})"
+
+_SCREEN_CACHE: 'OrderedDict[str, CompiledScreen]' = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+_CACHE_SIZE = 512
+
+def compile_screen(expression: Union[str, CompiledScreen]) -> CompiledScreen:
+    """Parse an expression, reusing the cached compilation for the same expression hash"""
+    if isinstance(expression, CompiledScreen):
+        return expression
+
+    key = hashlib.sha256(expression.strip().encode()).hexdigest()
+    with _CACHE_LOCK:
+        screen = _SCREEN_CACHE.get(key)
+        if screen is not None:
+            _SCREEN_CACHE.move_to_end(key)
+            return screen
+
+    screen = CompiledScreen(expression)
+    with _CACHE_LOCK:
+        _SCREEN_CACHE[key] = screen
+        while len(_SCREEN_CACHE) > _CACHE_SIZE:
+            _SCREEN_CACHE.popitem(last=False)
+    return screen
+
+def clear_screen_cache() -> None:
+    """Drop all cached compiled screens"""
+    with _CACHE_LOCK:
+        _SCREEN_CACHE.clear()
@@ -5,6 +5,8 @@ import logging
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 
+from . import portfolio_construction
+
 @dataclass
 class Portfolio:
     """Portfolio data structure"""
@@ -56,8 +58,67 @@ class StockSelector:
             return self._select_factor_weighted(factor_data, price_data, **kwargs)
         elif selection_method == 'risk_parity':
             return self._select_risk_parity(factor_data, price_data, **kwargs)
+        elif selection_method == 'min_variance':
+            return self._select_risk_parity(factor_data, price_data, method='min_variance', **kwargs)
+        else:
+            raise ValueError(f"Unknown selection method: {selection_method}")
+    
+    def select_weights(self, factor_values: pd.Series,
+                       selection_method: str = 'top_n',
+                       returns: pd.DataFrame = None,
+                       n: int = None,
+                       method: str = 'erc') -> Dict[str, float]:
+        """Target weights for one cross-section of factor values indexed by symbol
+        
+        This is the weighting step of select_stocks without the date filtering, so
+        callers holding per-date cross-sections (e.g. RebalanceSimulator) can reuse
+        it. Risk parity and minimum variance need ``returns``: a trailing window of
+        returns with symbols as columns; names with a missing return in the window
+        are skipped.
+        """
+        values = factor_values.dropna()
+        if values.empty:
+            return {}
+        
+        if selection_method == 'min_variance':
+            selection_method, method = 'risk_parity', 'min_variance'
+        
+        if selection_method == 'equal_weight':
+            symbols = values.index.unique().to_numpy()
+            n = self.max_positions if n is None else n
+            if len(symbols) > n:
+                symbols = np.random.choice(symbols, n, replace=False)
+            return {symbol: 1.0 / len(symbols) for symbol in symbols}
+        
+        if selection_method == 'top_n':
+            n = self.max_positions if n is None else n
+        elif selection_method in ('factor_weighted', 'risk_parity'):
+            n = self.max_positions
         else:
             raise ValueError(f"Unknown selection method: {selection_method}")
+        
+        top = values.sort_values(ascending=False, kind='stable').head(n)
+        
+        if selection_method == 'top_n':
+            weights = dict.fromkeys(top.index, 1.0 / len(top))
+        elif selection_method == 'factor_weighted':
+            magnitude = top.abs()
+            weights = dict(zip(top.index, magnitude / magnitude.sum()))
+        else:
+            if returns is None:
+                raise ValueError("Risk-based weighting requires a returns window")
+            window = returns.reindex(columns=top.index)
+            window = window.loc[:, window.notna().all() & (window.std() > 0)]
+            if window.shape[1] == 0 or len(window) < 2:
+                return {}
+            covariance, shrinkage = portfolio_construction.ledoit_wolf_covariance(window.to_numpy())
+            weight_array = portfolio_construction.portfolio_weights(
+                covariance, method=method, upper=self.max_weight
+            )
+            self.logger.debug(f"Risk parity ({method}) on {window.shape[1]} names, shrinkage {shrinkage:.3f}")
+            weights = dict(zip(window.columns, weight_array))
+        
+        return self._apply_weight_constraints(weights)
     
     def _select_top_n(self, factor_data: pd.DataFrame,
                      price_data: pd.DataFrame,
@@ -165,20 +226,9 @@ class StockSelector:
                 portfolio_value=0.0
             )
         
-        # Select top stocks
-        latest_factors = latest_factors.sort_values('factor_value', ascending=False)
-        selected_factors = latest_factors.head(self.max_positions)
-        
-        # Calculate weights proportional to factor values
-        total_factor_value = selected_factors['factor_value'].abs().sum()
-        weights = {}
-        
-        for _, row in selected_factors.iterrows():
-            weight = abs(row['factor_value']) / total_factor_value
-            weights[row['symbol']] = weight
-        
-        # Apply weight constraints
-        weights = self._apply_weight_constraints(weights)
+        # Weights proportional to factor values of the top stocks
+        weights = self.select_weights(latest_factors.set_index('symbol')['factor_value'],
+                                      'factor_weighted')
         
         return SelectionResult(
             date=latest_date,
@@ -189,8 +239,16 @@ class StockSelector:
     
     def _select_risk_parity(self, factor_data: pd.DataFrame,
                           price_data: pd.DataFrame,
-                          lookback_period: int = 252) -> SelectionResult:
-        """Select stocks using risk parity approach"""
+                          lookback_period: int = 252,
+                          method: str = 'erc') -> SelectionResult:
+        """Select stocks using risk parity approach
+        
+        Weights come from the Ledoit-Wolf shrunk covariance of the last
+        ``lookback_period`` returns of the selected names: 'erc' gives equal risk
+        contributions, 'min_variance' the minimum variance portfolio and
+        'inverse_volatility' the previous inverse-volatility weights, all within
+        [0, max_weight].
+        """
         
         # Get latest factor values
         latest_date = factor_data['date'].max()
@@ -207,19 +265,16 @@ class StockSelector:
         # Select top stocks by factor value
         factor_name = latest_factors['factor_name'].iloc[0]
         latest_factors = latest_factors[latest_factors['factor_name'] == factor_name]
-        latest_factors = latest_factors.sort_values('factor_value', ascending=False)
-        selected_symbols = latest_factors.head(self.max_positions)['symbol'].tolist()
-        
-        # Calculate volatility for selected stocks
-        volatilities = {}
-        for symbol in selected_symbols:
-            symbol_prices = price_data[price_data['symbol'] == symbol]
-            if len(symbol_prices) >= lookback_period:
-                returns = symbol_prices['close'].pct_change().dropna()
-                volatility = returns.std() * np.sqrt(252)
-                volatilities[symbol] = volatility
-        
-        if not volatilities:
+        factor_values = latest_factors.set_index('symbol')['factor_value']
+        top_symbols = factor_values.sort_values(ascending=False, kind='stable').head(self.max_positions)
+        
+        # Pivot the selected names' prices once for the trailing returns window
+        returns = portfolio_construction.pivot_returns(price_data, top_symbols.index.tolist(),
+                                                       lookback_period)
+        
+        weights = self.select_weights(factor_values, 'risk_parity', returns=returns, method=method)
+        
+        if not weights:
             return SelectionResult(
                 date=latest_date,
                 selected_stocks=[],
@@ -227,13 +282,6 @@ class StockSelector:
                 portfolio_value=0.0
             )
         
-        # Calculate risk parity weights
-        total_risk = sum(1 / vol for vol in volatilities.values())
-        weights = {symbol: (1 / vol) / total_risk for symbol, vol in volatilities.items()}
-        
-        # Apply weight constraints
-        weights = self._apply_weight_constraints(weights)
-        
         return SelectionResult(
             date=latest_date,
             selected_stocks=list(weights.keys()),
@@ -243,27 +291,26 @@ class StockSelector:
     
     def _apply_weight_constraints(self, weights: Dict[str, float]) -> Dict[str, float]:
         """Apply minimum and maximum weight constraints"""
+        if not weights:
+            return {}
         
-        # Apply maximum weight constraint
-        for symbol in weights:
-            if weights[symbol] > self.max_weight:
-                weights[symbol] = self.max_weight
+        symbols = np.array(list(weights.keys()), dtype=object)
+        values = np.fromiter(weights.values(), dtype=np.float64, count=len(weights))
         
-        # Normalize weights
-        total_weight = sum(weights.values())
+        # Apply maximum weight constraint and normalize
+        values = np.minimum(values, self.max_weight)
+        total_weight = values.sum()
         if total_weight > 0:
-            weights = {symbol: weight / total_weight for symbol, weight in weights.items()}
-        
-        # Remove stocks below minimum weight
-        weights = {symbol: weight for symbol, weight in weights.items() 
-                  if weight >= self.min_weight}
+            values = values / total_weight
         
-        # Renormalize if needed
-        total_weight = sum(weights.values())
+        # Remove stocks below minimum weight and renormalize
+        keep = values >= self.min_weight
+        symbols, values = symbols[keep], values[keep]
+        total_weight = values.sum()
         if total_weight > 0:
-            weights = {symbol: weight / total_weight for symbol, weight in weights.items()}
+            values = values / total_weight
         
-        return weights
+        return dict(zip(symbols.tolist(), values.tolist()))
     
     def update_portfolio(self, selection_result: SelectionResult,
                         current_prices: Dict[str, float]) -> Dict[str, float]:
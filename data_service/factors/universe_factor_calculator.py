@@ -0,0 +1,346 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Any, Optional, Union
+import logging
+
+class UniverseFactorCalculator:
+    """Vectorized factor calculator for a whole universe on every date
+
+    Works on wide (dates x symbols) price and volume panels and computes the
+    same factors as FactorCalculator, but as cross-sectional arrays for every
+    date at once. Rolling-history factors (volatility, Sharpe, drawdown, VaR)
+    use a trailing ``volatility_window`` instead of the full series.
+    """
+
+    def __init__(self, momentum_periods: List[int] = None,
+                 volume_periods: List[int] = None,
+                 volatility_window: int = 252,
+                 relative_strength_period: int = 252,
+                 risk_free_rate: float = 0.02):
+        self.momentum_periods = momentum_periods or [20, 60, 252]
+        self.volume_periods = volume_periods or [20, 60]
+        self.volatility_window = volatility_window
+        self.relative_strength_period = relative_strength_period
+        self.risk_free_rate = risk_free_rate
+        self.logger = logging.getLogger(__name__)
+
+    def calculate_factors(self, prices: pd.DataFrame,
+                          volumes: pd.DataFrame = None,
+                          fundamentals: pd.DataFrame = None,
+                          market_prices: pd.Series = None) -> Dict[str, pd.DataFrame]:
+        """Calculate all factors as wide (dates x symbols) frames keyed by factor name
+
+        Args:
+            prices: Wide close prices, or long data with symbol/date/close columns
+            volumes: Wide volumes; taken from long ``prices`` when it has a volume column
+            fundamentals: One row per symbol (or per symbol and report date) with the
+                financial fields used by FactorCalculator, e.g. eps, net_income
+            market_prices: Market index closes indexed by date
+        """
+        if 'symbol' in prices.columns and 'close' in prices.columns:
+            if volumes is None and 'volume' in prices.columns:
+                volumes = self._to_wide(prices, 'volume')
+            prices = self._to_wide(prices, 'close')
+
+        prices = prices.sort_index().astype(np.float64)
+        if volumes is not None:
+            volumes = volumes.reindex(index=prices.index, columns=prices.columns).astype(np.float64)
+
+        factors: Dict[str, pd.DataFrame] = {}
+        factors.update(self.calculate_momentum_factors(prices))
+        factors.update(self.calculate_volatility_factors(prices))
+        factors.update(self.calculate_technical_factors(prices))
+
+        if volumes is not None:
+            factors.update(self.calculate_volume_factors(prices, volumes))
+
+        if market_prices is not None:
+            factors['relative_strength'] = self.calculate_relative_strength(prices, market_prices)
+
+        if fundamentals is not None:
+            factors.update(self.calculate_fundamental_factors(prices, fundamentals))
+
+        self.logger.info(f"Calculated {len(factors)} factors for "
+                         f"{prices.shape[1]} symbols x {prices.shape[0]} dates")
+        return factors
+
+    def _to_wide(self, data: pd.DataFrame, column: str) -> pd.DataFrame:
+        """Pivot long symbol/date data to a wide frame"""
+        data = data.assign(date=pd.to_datetime(data['date']))
+        return data.pivot_table(index='date', columns='symbol', values=column, aggfunc='last')
+
+    def calculate_momentum_factors(self, prices: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """Momentum and momentum acceleration for every date"""
+        factors = {}
+        for period in self.momentum_periods:
+            # FactorCalculator compares the latest price with prices.iloc[-period]
+            momentum = (prices / prices.shift(period - 1) - 1) * 100
+            factors[f'momentum_{period}d'] = momentum
+            previous = (prices.shift(period - 1) / prices.shift(2 * period - 1) - 1) * 100
+            factors[f'momentum_accel_{period}d'] = momentum - previous
+        return factors
+
+    def calculate_volume_factors(self, prices: pd.DataFrame,
+                                 volumes: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """Volume momentum and volume-price trend for every date"""
+        factors = {}
+        for period in self.volume_periods:
+            recent = volumes.rolling(period).mean()
+            prior = recent.shift(period)
+            volume_momentum = (recent / prior - 1) * 100
+            price_change = (prices / prices.shift(period - 1) - 1) * 100
+            factors[f'volume_momentum_{period}d'] = volume_momentum
+            factors[f'volume_price_trend_{period}d'] = volume_momentum * price_change
+        return factors
+
+    def calculate_volatility_factors(self, prices: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """Volatility, Sharpe ratio, max drawdown and VaR over the trailing window"""
+        window = self.volatility_window
+        returns = prices.pct_change()
+        rolling = returns.rolling(window, min_periods=window)
+
+        volatility = rolling.std() * np.sqrt(252) * 100
+        excess_return = rolling.mean() * 252 - self.risk_free_rate
+        sharpe = (excess_return / volatility).where(volatility > 0)
+
+        return {
+            'price_volatility': volatility,
+            'sharpe_ratio': sharpe,
+            'max_drawdown': self._rolling_max_drawdown(prices, window) * 100,
+            'var_95': rolling.quantile(0.05) * 100
+        }
+
+    def _rolling_max_drawdown(self, prices: pd.DataFrame, window: int) -> pd.DataFrame:
+        """Maximum drawdown inside each trailing window of ``window`` returns
+
+        The timeline is cut into blocks of ``window`` prices, so every trailing
+        window is a suffix of one block followed by a prefix of the next. With
+        prefix/suffix running max, min and drawdown per block, each window's
+        drawdown is the worse of the two parts and of the cross term
+        (prefix min / suffix max - 1). Cost is O(dates x symbols) for any window.
+        """
+        values = prices.to_numpy(dtype=np.float64)
+        n_dates, n_symbols = values.shape
+        result = np.full((n_dates, n_symbols), np.nan)
+        if window < 1 or n_dates <= window:
+            return pd.DataFrame(result, index=prices.index, columns=prices.columns)
+
+        n_blocks = -(-n_dates // window)
+        padded = np.full((n_blocks * window, n_symbols), np.nan)
+        padded[:n_dates] = values
+        blocks = padded.reshape(n_blocks, window, n_symbols)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            prefix_max = np.maximum.accumulate(blocks, axis=1)
+            prefix_min = np.minimum.accumulate(blocks, axis=1)
+            prefix_mdd = np.minimum.accumulate(blocks / prefix_max - 1, axis=1)
+
+            reverse = blocks[:, ::-1]
+            suffix_max = np.maximum.accumulate(reverse, axis=1)[:, ::-1]
+            suffix_min = np.minimum.accumulate(reverse, axis=1)[:, ::-1]
+            suffix_mdd = np.minimum.accumulate((suffix_min / blocks - 1)[:, ::-1], axis=1)[:, ::-1]
+
+            shape = (n_blocks * window, n_symbols)
+            prefix_min, prefix_mdd = prefix_min.reshape(shape), prefix_mdd.reshape(shape)
+            suffix_max, suffix_mdd = suffix_max.reshape(shape), suffix_mdd.reshape(shape)
+
+            # Window of `window` returns ending at t covers prices t - window + 1 .. t
+            ends = np.arange(window, n_dates)
+            starts = ends - window + 1
+            cross = prefix_min[ends] / suffix_max[starts] - 1
+            spanning = np.minimum(np.minimum(suffix_mdd[starts], prefix_mdd[ends]), cross)
+            aligned = (starts % window == 0)[:, None]
+            result[window:] = np.where(aligned, suffix_mdd[starts], spanning)
+
+        return pd.DataFrame(result, index=prices.index, columns=prices.columns)
+
+    def calculate_technical_factors(self, prices: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """RSI, MACD, moving averages and Bollinger Bands for every date"""
+        factors = {}
+
+        delta = prices.diff()
+        gain = delta.where(delta > 0, 0).rolling(14).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+        factors['rsi'] = 100 - (100 / (1 + gain / loss))
+
+        macd = prices.ewm(span=12).mean() - prices.ewm(span=26).mean()
+        signal = macd.ewm(span=9).mean()
+        factors['macd'] = macd
+        factors['macd_signal'] = signal
+        factors['macd_histogram'] = macd - signal
+
+        for window in [20, 50, 200]:
+            ma = prices.rolling(window).mean()
+            factors[f'ma_{window}'] = ma
+            factors[f'price_vs_ma{window}'] = (prices / ma - 1) * 100
+
+        std = prices.rolling(20).std()
+        bb_upper = factors['ma_20'] + 2 * std
+        bb_lower = factors['ma_20'] - 2 * std
+        factors['bb_upper'] = bb_upper
+        factors['bb_lower'] = bb_lower
+        factors['bb_position'] = (prices - bb_lower) / (bb_upper - bb_lower)
+
+        return factors
+
+    def calculate_relative_strength(self, prices: pd.DataFrame,
+                                    market_prices: pd.Series) -> pd.DataFrame:
+        """Stock return minus market return over the relative strength period"""
+        period = self.relative_strength_period
+        market = market_prices.reindex(prices.index).astype(np.float64)
+        stock_return = (prices / prices.shift(period - 1) - 1) * 100
+        market_return = (market / market.shift(period - 1) - 1) * 100
+        return stock_return.sub(market_return, axis=0)
+
+    def calculate_fundamental_factors(self, prices: pd.DataFrame,
+                                      fundamentals: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """Value, quality and size factors aligned to every date
+
+        Fundamentals with a ``date`` column are applied as of each report date and
+        carried forward; otherwise each symbol's row applies to all dates. The
+        daily close is used as the price unless a ``price`` column is given.
+        """
+        fields = self._align_fundamentals(prices, fundamentals)
+        price = fields.get('price', prices)
+
+        def ratio(numerator: pd.DataFrame, denominator: pd.DataFrame, scale: float = 1.0) -> pd.DataFrame:
+            # FactorCalculator skips a factor when either input is missing or zero
+            valid = (numerator != 0) & (denominator != 0)
+            return (numerator / denominator * scale).where(valid)
+
+        definitions = [
+            ('pe_ratio', None, 'eps', 1.0),
+            ('pb_ratio', None, 'book_value_per_share', 1.0),
+            ('ps_ratio', None, 'revenue_per_share', 1.0),
+            ('ev_ebitda', 'enterprise_value', 'ebitda', 1.0),
+            ('roe', 'net_income', 'shareholders_equity', 100.0),
+            ('roa', 'net_income', 'total_assets', 100.0),
+            ('debt_to_equity', 'total_debt', 'shareholders_equity', 1.0),
+            ('current_ratio', 'current_assets', 'current_liabilities', 1.0),
+            ('gross_margin', 'gross_profit', 'revenue', 100.0),
+            ('operating_margin', 'operating_income', 'revenue', 100.0),
+        ]
+
+        factors = {}
+        for name, numerator, denominator, scale in definitions:
+            if denominator not in fields or (numerator is not None and numerator not in fields):
+                continue
+            top = price if numerator is None else fields[numerator]
+            factors[name] = ratio(top, fields[denominator], scale)
+
+        if 'dividend_per_share' in fields:
+            factors['dividend_yield'] = ratio(fields['dividend_per_share'], price, 100.0)
+
+        for name in ['market_cap', 'enterprise_value']:
+            if name in fields:
+                factors[name] = fields[name].where(fields[name] != 0)
+
+        return factors
+
+    def _align_fundamentals(self, prices: pd.DataFrame,
+                            fundamentals: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """Expand fundamentals to wide frames on the price grid"""
+        numeric_columns = [
+            col for col in fundamentals.select_dtypes(include=[np.number]).columns
+            if col not in ('symbol', 'date')
+        ]
+
+        if 'date' in fundamentals.columns:
+            data = fundamentals.assign(date=pd.to_datetime(fundamentals['date']))
+            fields = {}
+            for column in numeric_columns:
+                wide = data.pivot_table(index='date', columns='symbol', values=column, aggfunc='last')
+                grid_dates = prices.index.union(wide.index)
+                fields[column] = (wide.reindex(grid_dates).ffill()
+                                  .reindex(index=prices.index, columns=prices.columns))
+            return fields
+
+        table = fundamentals.set_index('symbol') if 'symbol' in fundamentals.columns else fundamentals
+        table = table.reindex(prices.columns)
+        return {
+            column: pd.DataFrame(np.broadcast_to(table[column].to_numpy(dtype=np.float64),
+                                                 prices.shape),
+                                 index=prices.index, columns=prices.columns)
+            for column in numeric_columns
+        }
+
+    def rank_factors(self, factors: Dict[str, pd.DataFrame]) -> Dict[str, Dict[str, pd.DataFrame]]:
+        """Cross-sectional rank and percentile for every factor on every date
+
+        Follows FactorCalculator.rank_factors: rank 1 is the highest value and
+        percentile is rank / count * 100.
+        """
+        ranked = {}
+        for name, values in factors.items():
+            ranks = values.rank(axis=1, method='first', ascending=False)
+            counts = values.notna().sum(axis=1)
+            ranked[name] = {
+                'rank': ranks,
+                'percentile': ranks.div(counts.where(counts > 0), axis=0) * 100
+            }
+        return ranked
+
+    def to_long(self, factors: Dict[str, pd.DataFrame], include_ranks: bool = True,
+                dates: List[Any] = None) -> pd.DataFrame:
+        """Long symbol/date/factor_name/factor_value frame, as used by FactorBacktest"""
+        ranked = self.rank_factors(factors) if include_ranks else {}
+        frames = []
+
+        for name, values in factors.items():
+            if dates is not None:
+                values = values.loc[values.index.isin(pd.to_datetime(dates))]
+            matrix = values.to_numpy(dtype=np.float64)
+            date_idx, symbol_idx = np.nonzero(~np.isnan(matrix))
+
+            frame = {
+                'symbol': values.columns.to_numpy()[symbol_idx],
+                'date': values.index.to_numpy()[date_idx],
+                'factor_name': name,
+                'factor_value': matrix[date_idx, symbol_idx]
+            }
+            if include_ranks:
+                for key in ['rank', 'percentile']:
+                    extra = ranked[name][key].loc[values.index].to_numpy()
+                    frame[key] = extra[date_idx, symbol_idx]
+            frames.append(pd.DataFrame(frame))
+
+        if not frames:
+            return pd.DataFrame(columns=['symbol', 'date', 'factor_name', 'factor_value'])
+
+        result = pd.concat(frames, ignore_index=True)
+        if include_ranks:
+            result['rank'] = result['rank'].astype(int)
+        return result
+
+    def to_wide(self, factors: Dict[str, pd.DataFrame], dates: List[Any] = None) -> pd.DataFrame:
+        """(date, symbol) x factor frame for models and multi-factor screens"""
+        columns = {}
+        for name, values in factors.items():
+            if dates is not None:
+                values = values.loc[values.index.isin(pd.to_datetime(dates))]
+            columns[name] = values.stack(future_stack=True)
+        result = pd.DataFrame(columns)
+        result.index.names = ['date', 'symbol']
+        return result.dropna(how='all')
+
+    def calculate_factor_panel(self, prices: pd.DataFrame,
+                               volumes: pd.DataFrame = None,
+                               fundamentals: pd.DataFrame = None,
+                               market_prices: pd.Series = None,
+                               output: str = 'long',
+                               dates: List[Any] = None) -> pd.DataFrame:
+        """Calculate, rank and reshape all factors in one call
+
+        Args:
+            output: 'long' for FactorBacktest-ready rows with rank and percentile,
+                or 'wide' for a (date, symbol) x factor frame
+            dates: Optional subset of dates to emit, e.g. rebalance dates
+        """
+        factors = self.calculate_factors(prices, volumes, fundamentals, market_prices)
+
+        if output == 'long':
+            return self.to_long(factors, dates=dates)
+        elif output == 'wide':
+            return self.to_wide(factors, dates=dates)
+        else:
+            raise ValueError(f"Unknown output format: {output}")
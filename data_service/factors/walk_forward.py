@@ -0,0 +1,487 @@
+"""
+Walk-forward and purged k-fold optimization of factor weights
+
+The long factor and price frames are compacted once into a panel of valid
+(date, symbol) rows: factor exposures, the forward return to the next factor
+date and per-date row offsets. The composite return of a weight vector on
+every date is then one matrix product and two segment sums, the same quantity
+FactorOptimizer._calculate_composite_returns computes with nested loops.
+
+Folds run in worker processes that attach to the panel through shared memory
+instead of receiving copies. Each worker keeps the rows gathered for a fold's
+training dates, so repeated runs over the same folds (another objective, grid
+or optimizer) skip the preparation.
+"""
+
+import hashlib
+import itertools
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+
+# Panel arrays of the current process: set directly, or attached from shared memory in workers
+_PANEL: Dict[str, Any] = {}
+_FOLD_CACHE: "OrderedDict[Tuple[str, str], Dict[str, np.ndarray]]" = OrderedDict()
+_FOLD_CACHE_SIZE = 64
+_GRID_CHUNK_ELEMENTS = 1 << 23
+
+_PANEL_ARRAYS = ('exposures', 'forward_returns', 'offsets')
+
+@dataclass
+class FoldResult:
+    """Result of optimizing and testing one fold"""
+    fold: int
+    train_start: pd.Timestamp
+    train_end: pd.Timestamp
+    test_start: pd.Timestamp
+    test_end: pd.Timestamp
+    n_train: int
+    n_test: int
+    weights: Dict[str, float]
+    in_sample_objective: float
+    out_of_sample_objective: float
+
+@dataclass
+class WalkForwardResult:
+    """Out-of-sample result of a walk-forward or purged k-fold optimization"""
+    scheme: str
+    objective_function: str
+    folds: List[FoldResult]
+    oos_returns: pd.Series          # Stitched test-period composite returns, by realization date
+    equity_curve: pd.Series         # Compounded stitched returns, starting at 1.0
+    oos_objective: float            # Objective of the stitched returns
+    weight_table: pd.DataFrame      # Fold x factor optimal weights
+    robust_weights: Dict[str, float] = field(default_factory=dict)
+
+def walk_forward_splits(n_samples: int, n_splits: int = 5,
+                        train_size: int = None,
+                        test_size: int = None,
+                        expanding: bool = False,
+                        embargo: int = 0) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Consecutive test windows, each trained on the samples before it
+
+    With the defaults the samples are cut into ``n_splits + 1`` blocks and
+    every block after the first is tested on a model trained on the block
+    before it (or on all earlier blocks when ``expanding``). ``embargo``
+    samples between the end of training and the test window are left out.
+    """
+    if test_size is None:
+        test_size = n_samples // (n_splits + 1)
+    if train_size is None:
+        train_size = test_size
+    if test_size <= 0 or train_size <= 0:
+        raise ValueError("Not enough samples for the requested splits")
+
+    splits = []
+    test_start = train_size + embargo
+    while test_start < n_samples and len(splits) < n_splits:
+        test_end = min(test_start + test_size, n_samples)
+        train_end = test_start - embargo
+        train_start = 0 if expanding else max(0, train_end - train_size)
+        splits.append((np.arange(train_start, train_end), np.arange(test_start, test_end)))
+        test_start = test_end
+    return splits
+
+def purged_kfold_splits(n_samples: int, n_splits: int = 5,
+                        purge: int = 1,
+                        embargo: int = 0) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """K contiguous test folds, each trained on the rest with purging and embargo
+
+    A sample's label is its forward return, which spans ``purge`` samples, so
+    the ``purge`` training samples right before a test fold would overlap it
+    and are removed; ``embargo`` samples right after the test fold are removed
+    as well, against leakage through serial correlation.
+    """
+    if n_splits < 2 or n_samples < n_splits:
+        raise ValueError("Purged k-fold needs at least two folds and one sample per fold")
+
+    bounds = np.linspace(0, n_samples, n_splits + 1).astype(int)
+    samples = np.arange(n_samples)
+    splits = []
+    for test_start, test_end in zip(bounds[:-1], bounds[1:]):
+        keep = (samples < test_start - purge) | (samples >= test_end + embargo)
+        splits.append((samples[keep], samples[test_start:test_end]))
+    return splits
+
+def objective_value(returns: np.ndarray, objective_function: str = 'sharpe_ratio',
+                    periods_per_year: int = 252) -> np.ndarray:
+    """Annualized objective of each column of a (periods x candidates) return array
+
+    NaN marks periods without a return; formulas follow FactorOptimizer.
+    """
+    returns = np.asarray(returns, dtype=float)
+    squeeze = returns.ndim == 1
+    if squeeze:
+        returns = returns[:, None]
+
+    counts = np.sum(~np.isnan(returns), axis=0)
+    value = np.zeros(returns.shape[1])
+    usable = counts >= 2
+    if usable.any():
+        sample = returns[:, usable]
+        mean = np.nanmean(sample, axis=0)
+        if objective_function in ('sharpe_ratio', 'information_ratio'):
+            scale = np.nanstd(sample, axis=0, ddof=1)
+        elif objective_function == 'sortino_ratio':
+            downside = np.where(sample < 0, sample, np.nan)
+            enough = np.sum(~np.isnan(downside), axis=0) >= 2
+            scale = np.full(sample.shape[1], np.nan)
+            if enough.any():
+                scale[enough] = np.nanstd(downside[:, enough], axis=0, ddof=1)
+        else:
+            raise ValueError(f"Unknown objective function: {objective_function}")
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = mean / scale * np.sqrt(periods_per_year)
+        value[usable] = np.where(np.isfinite(ratio), ratio, 0.0)
+
+    return value[0] if squeeze else value
+
+def _panel_arrays() -> Dict[str, Any]:
+    if not _PANEL:
+        raise RuntimeError("No factor panel loaded in this process")
+    return _PANEL
+
+def _attach_panel(token: str, specs: Dict[str, Tuple[str, tuple, str]]):
+    """Process pool initializer: map the shared panel arrays without copying"""
+    _PANEL.clear()
+    handles = []
+    for name, (shm_name, shape, dtype) in specs.items():
+        handle = shared_memory.SharedMemory(name=shm_name)
+        handles.append(handle)
+        _PANEL[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=handle.buf)
+    _PANEL['token'] = token
+    _PANEL['handles'] = handles
+    _FOLD_CACHE.clear()
+
+def _fold_rows(samples: np.ndarray) -> Dict[str, np.ndarray]:
+    """Gather the panel rows of the given samples into contiguous arrays, cached per process"""
+    panel = _panel_arrays()
+    key = (panel['token'], hashlib.sha1(np.ascontiguousarray(samples, dtype=np.int64).tobytes()).hexdigest())
+    cached = _FOLD_CACHE.get(key)
+    if cached is not None:
+        _FOLD_CACHE.move_to_end(key)
+        return cached
+
+    offsets = panel['offsets']
+    lengths = offsets[samples + 1] - offsets[samples]
+    samples, lengths = samples[lengths > 0], lengths[lengths > 0]
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+    rows = np.arange(lengths.sum()) + np.repeat(offsets[samples] - starts, lengths)
+
+    exposures = panel['exposures'][rows]
+    forward_returns = panel['forward_returns'][rows]
+    prepared = {
+        'samples': samples,
+        'starts': starts,
+        'exposures': exposures,
+        # The numerator is linear in the weights, so its per-date factor sums are reused
+        'factor_returns': (np.add.reduceat(exposures * forward_returns[:, None], starts, axis=0)
+                           if len(starts) else np.zeros((0, exposures.shape[1])))
+    }
+    _FOLD_CACHE[key] = prepared
+    while len(_FOLD_CACHE) > _FOLD_CACHE_SIZE:
+        _FOLD_CACHE.popitem(last=False)
+    return prepared
+
+def _composite_returns(prepared: Dict[str, np.ndarray], weights: np.ndarray) -> np.ndarray:
+    """Composite returns per sample for one (factors,) or many (factors x k) weight vectors
+
+    The composite of a symbol is its weighted factor exposure; a date's return
+    is the composite-weighted forward return divided by the total absolute
+    composite, NaN where that total is zero.
+    """
+    if len(prepared['starts']) == 0:
+        return np.full((0,) + np.shape(weights)[1:], np.nan)
+    numerator = prepared['factor_returns'] @ weights
+    denominator = np.add.reduceat(np.abs(prepared['exposures'] @ weights), prepared['starts'], axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+def _optimize_fold(fold: int, train: np.ndarray, test: np.ndarray,
+                   config: Dict[str, Any]) -> Dict[str, Any]:
+    """Optimize weights on the training samples and evaluate them on the test samples"""
+    objective_function = config['objective_function']
+    periods_per_year = config['periods_per_year']
+    train_rows = _fold_rows(train)
+    n_factors = train_rows['exposures'].shape[1]
+
+    if config['method'] == 'grid':
+        # Score candidates in chunks so the rows x candidates composite stays small
+        candidates = config['candidates']
+        chunk = max(1, _GRID_CHUNK_ELEMENTS // max(len(train_rows['exposures']), 1))
+        scores = np.concatenate([
+            objective_value(_composite_returns(train_rows, candidates[i:i + chunk].T), objective_function,
+                            periods_per_year)
+            for i in range(0, len(candidates), chunk)
+        ])
+        weights = candidates[int(np.argmax(scores))]
+    elif config['method'] == 'scipy':
+        def loss(w):
+            return -objective_value(_composite_returns(train_rows, w), objective_function, periods_per_year)
+        result = minimize(
+            loss,
+            np.full(n_factors, 1.0 / n_factors),
+            method='SLSQP',
+            bounds=[(0.0, 1.0)] * n_factors,
+            constraints=[{'type': 'eq', 'fun': lambda w: np.sum(w) - 1.0}],
+            options={'maxiter': config['maxiter']}
+        )
+        weights = np.clip(result.x, 0.0, 1.0)
+        weights = weights / weights.sum() if weights.sum() > 0 else np.full(n_factors, 1.0 / n_factors)
+    else:
+        raise ValueError(f"Unknown optimization method: {config['method']}")
+
+    test_rows = _fold_rows(test)
+    test_returns = _composite_returns(test_rows, weights)
+    return {
+        'fold': fold,
+        'weights': weights,
+        'in_sample_objective': float(objective_value(_composite_returns(train_rows, weights),
+                                                     objective_function, periods_per_year)),
+        'out_of_sample_objective': float(objective_value(test_returns, objective_function, periods_per_year)),
+        'test_samples': test_rows['samples'],
+        'test_returns': test_returns
+    }
+
+class WalkForwardOptimizer:
+    """Parallel walk-forward / purged k-fold optimization of composite factor weights"""
+
+    def __init__(self, n_jobs: int = None,
+                 objective_function: str = 'sharpe_ratio',
+                 method: str = 'scipy',
+                 weight_grid: List[float] = None,
+                 periods_per_year: int = 252,
+                 maxiter: int = 1000):
+        self.n_jobs = n_jobs if n_jobs is not None else (os.cpu_count() or 1)
+        self.objective_function = objective_function
+        self.method = method
+        self.weight_grid = weight_grid or [0.0, 0.25, 0.5, 0.75, 1.0]
+        self.periods_per_year = periods_per_year
+        self.maxiter = maxiter
+        self.logger = logging.getLogger(__name__)
+
+        self.factor_names: List[str] = []
+        self.sample_dates: Optional[pd.DatetimeIndex] = None
+        self.realization_dates: Optional[pd.DatetimeIndex] = None
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._token: Optional[str] = None
+        self._shared: List[shared_memory.SharedMemory] = []
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def prepare(self, factor_data: pd.DataFrame, price_data: pd.DataFrame,
+                factor_names: List[str] = None) -> 'WalkForwardOptimizer':
+        """Compact the long frames into the panel of valid (date, symbol) rows
+
+        A sample is a factor date with a later factor date; its label is the
+        return from the close on that date to the close on the next one, using
+        the last price on or before each. Symbols need a factor row on the
+        date and both prices, missing factors count as zero exposure.
+        """
+        self.close()
+        if factor_names is None:
+            factor_names = list(pd.unique(factor_data['factor_name']))
+        self.factor_names = list(factor_names)
+
+        cube = factor_data.pivot_table(index=['date', 'symbol'], columns='factor_name',
+                                       values='factor_value', aggfunc='last')
+        cube.index = cube.index.set_levels(pd.to_datetime(cube.index.levels[0]), level=0)
+        cube = cube.reindex(columns=self.factor_names).fillna(0.0).sort_index()
+
+        dates = cube.index.get_level_values(0).unique().sort_values()
+        prices = price_data.pivot_table(index='date', columns='symbol', values='close', aggfunc='last')
+        prices.index = pd.to_datetime(prices.index)
+        prices = prices.sort_index().ffill()
+        asof = prices.reindex(prices.index.union(dates)).ffill().reindex(dates)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            forward = asof.shift(-1) / asof.where(asof > 0) - 1
+
+        sample_rows = cube.loc[dates[:-1]] if len(dates) > 1 else cube.iloc[:0]
+        date_codes = dates.get_indexer(sample_rows.index.get_level_values(0))
+        symbol_codes = forward.columns.get_indexer(sample_rows.index.get_level_values(1))
+        labels = np.full(len(sample_rows), np.nan)
+        priced = symbol_codes >= 0
+        labels[priced] = forward.to_numpy(dtype=float)[date_codes[priced], symbol_codes[priced]]
+        valid = np.isfinite(labels)
+
+        counts = np.bincount(date_codes[valid], minlength=max(len(dates) - 1, 0))
+        self._arrays = {
+            'exposures': np.ascontiguousarray(sample_rows.to_numpy(dtype=float)[valid]),
+            'forward_returns': np.ascontiguousarray(labels[valid]),
+            'offsets': np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        }
+        self.sample_dates = dates[:-1]
+        self.realization_dates = dates[1:]
+        self._token = uuid.uuid4().hex
+
+        self.logger.info(f"Prepared {len(self.sample_dates)} samples, {int(valid.sum())} rows, "
+                         f"{len(self.factor_names)} factors")
+        return self
+
+    @property
+    def n_samples(self) -> int:
+        return 0 if self.sample_dates is None else len(self.sample_dates)
+
+    def composite_returns(self, weights: Dict[str, float], samples: np.ndarray = None) -> pd.Series:
+        """Composite returns of fixed weights over all (or the given) samples, by realization date"""
+        self._load_local()
+        weight_array = np.array([weights.get(name, 0.0) for name in self.factor_names])
+        if samples is None:
+            samples = np.arange(self.n_samples)
+        prepared = _fold_rows(np.asarray(samples))
+        returns = _composite_returns(prepared, weight_array)
+        series = pd.Series(returns, index=self.realization_dates[prepared['samples']])
+        return series.dropna()
+
+    def run(self, factor_data: pd.DataFrame = None,
+            price_data: pd.DataFrame = None,
+            factor_names: List[str] = None,
+            scheme: str = 'walk_forward',
+            n_splits: int = 5,
+            **split_kwargs) -> WalkForwardResult:
+        """Optimize every fold in parallel and stitch the out-of-sample returns
+
+        Args:
+            scheme: 'walk_forward' (see walk_forward_splits) or 'purged_kfold'
+                (see purged_kfold_splits)
+            n_splits: Number of folds
+            **split_kwargs: train_size, test_size, expanding, embargo or purge
+        """
+        if factor_data is not None and price_data is not None:
+            self.prepare(factor_data, price_data, factor_names)
+        if self.sample_dates is None:
+            raise ValueError("No data prepared; pass factor_data and price_data or call prepare()")
+
+        if scheme == 'walk_forward':
+            splits = walk_forward_splits(self.n_samples, n_splits, **split_kwargs)
+        elif scheme == 'purged_kfold':
+            splits = purged_kfold_splits(self.n_samples, n_splits, **split_kwargs)
+        else:
+            raise ValueError(f"Unknown validation scheme: {scheme}")
+        if not splits:
+            raise ValueError("No folds could be formed from the prepared samples")
+
+        config = {
+            'objective_function': self.objective_function,
+            'method': self.method,
+            'periods_per_year': self.periods_per_year,
+            'maxiter': self.maxiter,
+            'candidates': self._grid_candidates() if self.method == 'grid' else None
+        }
+
+        if self.n_jobs > 1 and len(splits) > 1:
+            pool = self._get_pool()
+            futures = [pool.submit(_optimize_fold, i, train, test, config)
+                       for i, (train, test) in enumerate(splits)]
+            outcomes = [future.result() for future in futures]
+        else:
+            self._load_local()
+            outcomes = [_optimize_fold(i, train, test, config) for i, (train, test) in enumerate(splits)]
+
+        return self._assemble(scheme, splits, outcomes)
+
+    def _assemble(self, scheme: str, splits: List[Tuple[np.ndarray, np.ndarray]],
+                  outcomes: List[Dict[str, Any]]) -> WalkForwardResult:
+        """Build fold records, the stitched out-of-sample series and robust weights"""
+        folds = []
+        stitched = {}
+        for (train, test), outcome in zip(splits, outcomes):
+            folds.append(FoldResult(
+                fold=outcome['fold'],
+                train_start=self.sample_dates[train[0]] if len(train) else None,
+                train_end=self.sample_dates[train[-1]] if len(train) else None,
+                test_start=self.sample_dates[test[0]],
+                test_end=self.sample_dates[test[-1]],
+                n_train=len(train),
+                n_test=len(test),
+                weights=dict(zip(self.factor_names, outcome['weights'].tolist())),
+                in_sample_objective=outcome['in_sample_objective'],
+                out_of_sample_objective=outcome['out_of_sample_objective']
+            ))
+            for sample, value in zip(outcome['test_samples'], outcome['test_returns']):
+                if not np.isnan(value):
+                    stitched[int(sample)] = value
+
+        order = sorted(stitched)
+        oos_returns = pd.Series([stitched[s] for s in order], index=self.realization_dates[order],
+                                name='oos_return')
+        equity_curve = (1 + oos_returns).cumprod()
+
+        weight_table = pd.DataFrame([fold.weights for fold in folds], columns=self.factor_names)
+        # Per-factor median across folds is less sensitive to a single unstable fold
+        median = weight_table.median().clip(lower=0)
+        robust = median / median.sum() if median.sum() > 0 else weight_table.mean()
+
+        self.logger.info(f"{scheme}: {len(folds)} folds, {len(oos_returns)} out-of-sample periods")
+        return WalkForwardResult(
+            scheme=scheme,
+            objective_function=self.objective_function,
+            folds=folds,
+            oos_returns=oos_returns,
+            equity_curve=equity_curve,
+            oos_objective=float(objective_value(oos_returns.to_numpy(), self.objective_function,
+                                                self.periods_per_year)),
+            weight_table=weight_table,
+            robust_weights=robust.to_dict()
+        )
+
+    def _grid_candidates(self) -> np.ndarray:
+        """All normalized, non-zero weight combinations of the grid"""
+        grid = np.array(list(itertools.product(self.weight_grid, repeat=len(self.factor_names))), dtype=float)
+        totals = grid.sum(axis=1)
+        grid = grid[totals > 0] / totals[totals > 0, None]
+        return np.unique(np.round(grid, 12), axis=0)
+
+    def _load_local(self):
+        """Point this process's panel at the prepared arrays"""
+        if self._token is None:
+            raise ValueError("No data prepared; call prepare() first")
+        if _PANEL.get('token') != self._token:
+            _PANEL.clear()
+            _PANEL.update(self._arrays)
+            _PANEL['token'] = self._token
+            _FOLD_CACHE.clear()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Worker pool attached to the panel in shared memory, kept for repeated runs"""
+        if self._pool is None:
+            specs = {}
+            for name in _PANEL_ARRAYS:
+                array = self._arrays[name]
+                handle = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                np.ndarray(array.shape, dtype=array.dtype, buffer=handle.buf)[...] = array
+                self._shared.append(handle)
+                specs[name] = (handle.name, array.shape, array.dtype.str)
+            self._pool = ProcessPoolExecutor(max_workers=self.n_jobs, initializer=_attach_panel,
+                                             initargs=(self._token, specs))
+        return self._pool
+
+    def close(self):
+        """Shut the worker pool down and release the shared memory"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        for handle in self._shared:
+            handle.close()
+            handle.unlink()
+        self._shared = []
+
+    def __enter__(self) -> 'WalkForwardOptimizer':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
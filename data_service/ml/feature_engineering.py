@@ -10,6 +10,10 @@ from typing import Dict, List, Any, Optional, Tuple
 import logging
 from datetime import datetime, timedelta
 from dataclasses import dataclass
+import joblib
+
+from . import indicators
+from .panel_features import engineer_panel_features
 
 try:
     from sklearn.preprocessing import StandardScaler, MinMaxScaler, RobustScaler
@@ -371,6 +375,62 @@ class FeatureEngineer:
         
         return df
     
+    def engineer_panel_features(self, panel, config: FeatureConfig = None,
+                                dtype=np.float64) -> pd.DataFrame:
+        """Feature engineering for a whole (symbol, date) panel in one pass"""
+        if config is None:
+            config = FeatureConfig()
+        
+        df = engineer_panel_features(panel, config, dtype=dtype)
+        
+        # Apply PCA
+        if config.pca_features and SKLEARN_AVAILABLE:
+            df = self.apply_pca(df, config.n_pca_components)
+        
+        self.feature_names = df.columns.tolist()
+        
+        return df
+    
+    def transform_features(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Apply the already fitted scaler and PCA without refitting them"""
+        df = data.copy()
+        
+        if self.scaler is not None:
+            scaled_cols = list(self.scaler.feature_names_in_)
+            df[scaled_cols] = self.scaler.transform(df[scaled_cols])
+        
+        if self.pca is not None:
+            pca_cols = list(self.pca.feature_names_in_)
+            pca_values = np.full((len(df), self.pca.n_components_), np.nan)
+            # PCA cannot project rows with missing inputs (e.g. rolling warm-up)
+            valid = ~df[pca_cols].isna().any(axis=1).to_numpy()
+            if valid.any():
+                pca_values[valid] = self.pca.transform(df.loc[valid, pca_cols])
+            pca_df = pd.DataFrame(pca_values, index=df.index,
+                                  columns=[f'pca_{i+1}' for i in range(self.pca.n_components_)])
+            df = pd.concat([df, pca_df], axis=1)
+        
+        return df
+    
+    def save_transformers(self, filepath: str):
+        """Save the fitted scaler, PCA and feature selector"""
+        joblib.dump({
+            'scaler': self.scaler,
+            'pca': self.pca,
+            'feature_selector': self.feature_selector,
+            'feature_names': self.feature_names
+        }, filepath)
+        self.logger.info(f"Transformers saved to {filepath}")
+    
+    def load_transformers(self, filepath: str):
+        """Load transformers saved with save_transformers"""
+        state = joblib.load(filepath)
+        self.scaler = state['scaler']
+        self.pca = state['pca']
+        self.feature_selector = state['feature_selector']
+        self.feature_names = state['feature_names']
+        self.logger.info(f"Transformers loaded from {filepath}")
+    
     # Technical indicator calculation methods
     def _calculate_rsi(self, prices: pd.Series, period: int = 14) -> pd.Series:
         """Calculate RSI"""
@@ -427,12 +487,8 @@ class FeatureEngineer:
         if 'high' not in data.columns or 'low' not in data.columns or 'close' not in data.columns:
             return pd.Series()
         
-        typical_price = (data['high'] + data['low'] + data['close']) / 3
-        sma_tp = typical_price.rolling(window=period).mean()
-        mad = typical_price.rolling(window=period).apply(lambda x: np.mean(np.abs(x - x.mean())))
-        
-        cci = (typical_price - sma_tp) / (0.015 * mad)
-        return cci
+        cci = indicators.commodity_channel_index(data['high'], data['low'], data['close'], period)
+        return pd.Series(cci, index=data.index)
     
     def _calculate_atr(self, data: pd.DataFrame, period: int = 14) -> pd.Series:
         """Calculate Average True Range"""
@@ -453,54 +509,16 @@ class FeatureEngineer:
         if 'high' not in data.columns or 'low' not in data.columns:
             return pd.Series()
         
-        psar = pd.Series(index=data.index, dtype=float)
-        af = acceleration
-        ep = data['low'].iloc[0]
-        long = True
-        
-        for i in range(1, len(data)):
-            if long:
-                psar.iloc[i] = psar.iloc[i-1] + af * (ep - psar.iloc[i-1])
-                if data['low'].iloc[i] < psar.iloc[i]:
-                    long = False
-                    psar.iloc[i] = ep
-                    ep = data['high'].iloc[i]
-                    af = acceleration
-                else:
-                    if data['high'].iloc[i] > ep:
-                        ep = data['high'].iloc[i]
-                        af = min(af + acceleration, maximum)
-            else:
-                psar.iloc[i] = psar.iloc[i-1] + af * (ep - psar.iloc[i-1])
-                if data['high'].iloc[i] > psar.iloc[i]:
-                    long = True
-                    psar.iloc[i] = ep
-                    ep = data['low'].iloc[i]
-                    af = acceleration
-                else:
-                    if data['low'].iloc[i] < ep:
-                        ep = data['low'].iloc[i]
-                        af = min(af + acceleration, maximum)
-        
-        return psar
+        psar = indicators.parabolic_sar(data['high'], data['low'], acceleration, maximum)
+        return pd.Series(psar, index=data.index)
     
     def _calculate_obv(self, data: pd.DataFrame) -> pd.Series:
         """Calculate On-Balance Volume"""
         if 'close' not in data.columns or 'volume' not in data.columns:
             return pd.Series()
         
-        obv = pd.Series(index=data.index, dtype=float)
-        obv.iloc[0] = data['volume'].iloc[0]
-        
-        for i in range(1, len(data)):
-            if data['close'].iloc[i] > data['close'].iloc[i-1]:
-                obv.iloc[i] = obv.iloc[i-1] + data['volume'].iloc[i]
-            elif data['close'].iloc[i] < data['close'].iloc[i-1]:
-                obv.iloc[i] = obv.iloc[i-1] - data['volume'].iloc[i]
-            else:
-                obv.iloc[i] = obv.iloc[i-1]
-        
-        return obv
+        obv = indicators.on_balance_volume(data['close'], data['volume'])
+        return pd.Series(obv, index=data.index)
     
     def _calculate_vpt(self, data: pd.DataFrame) -> pd.Series:
         """Calculate Volume Price Trend"""
@@ -516,20 +534,5 @@ class FeatureEngineer:
         if 'high' not in data.columns or 'low' not in data.columns or 'close' not in data.columns or 'volume' not in data.columns:
             return pd.Series()
         
-        typical_price = (data['high'] + data['low'] + data['close']) / 3
-        money_flow = typical_price * data['volume']
-        
-        positive_flow = pd.Series(0, index=data.index)
-        negative_flow = pd.Series(0, index=data.index)
-        
-        for i in range(1, len(data)):
-            if typical_price.iloc[i] > typical_price.iloc[i-1]:
-                positive_flow.iloc[i] = money_flow.iloc[i]
-            elif typical_price.iloc[i] < typical_price.iloc[i-1]:
-                negative_flow.iloc[i] = money_flow.iloc[i]
-        
-        positive_mf = positive_flow.rolling(window=period).sum()
-        negative_mf = negative_flow.rolling(window=period).sum()
-        
-        mfi = 100 - (100 / (1 + positive_mf / negative_mf))
-        return mfi 
\ No newline at end of file
+        mfi = indicators.money_flow_index(data['high'], data['low'], data['close'], data['volume'], period)
+        return pd.Series(mfi, index=data.index)
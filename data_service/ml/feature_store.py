@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Feature Store
+Materializes FeatureEngineer feature sets once and serves them to every
+consumer. A feature set is identified by its name, the hash of its
+FeatureConfig and a data version; under that key each symbol has a manifest
+and append-only columnar part files (Parquet when pyarrow is installed,
+column-major .npy files otherwise). Daily runs append only the dates that are
+not stored yet, and reads with ``as_of`` return only what was known on that
+date, including the scaler/PCA fitted on data up to it.
+
+Materializing and compacting a feature set hold a lock file next to its
+data, so concurrent consumers (threads or processes) compute each new date
+once: the later ones wait, then find the dates already stored.
+
+PCA is never fitted while materializing: FeatureEngineer.engineer_features
+would refit it on whatever rows each call sees. It is fitted by
+fit_transformers on a fixed history and applied at read time instead.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, replace
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Union
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .feature_engineering import FeatureEngineer, FeatureConfig, SKLEARN_AVAILABLE
+
+if SKLEARN_AVAILABLE:
+    from sklearn.decomposition import PCA
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Bump when feature code changes in a way that alters stored values
+FEATURE_CODE_VERSION = 1
+
+_DATE_COLUMN = '__date__'
+
+def config_hash(config: FeatureConfig) -> str:
+    """Stable hash of a FeatureConfig (with PCA excluded) and the feature code version"""
+    values = asdict(replace(config, pca_features=False, n_pca_components=0))
+    payload = json.dumps({'config': values, 'code': FEATURE_CODE_VERSION}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+def _write_json(path: Path, payload: Dict[str, Any]):
+    """Write through a temporary file so readers never see a partial manifest"""
+    temporary = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+    with open(temporary, 'w') as handle:
+        json.dump(payload, handle, indent=1, default=str)
+    os.replace(temporary, path)
+
+class FeatureStore:
+    """Versioned, incrementally appended feature matrices per symbol"""
+
+    def __init__(self, root: Union[str, Path], storage_format: str = None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        if storage_format is None:
+            storage_format = 'parquet' if PYARROW_AVAILABLE else 'npy'
+        if storage_format == 'parquet' and not PYARROW_AVAILABLE:
+            raise ImportError("pyarrow is required for Parquet storage. Install with: pip install pyarrow")
+        if storage_format not in ('parquet', 'npy'):
+            raise ValueError(f"Unknown storage format: {storage_format}")
+        self.storage_format = storage_format
+        self.engineer = FeatureEngineer()
+        self._lock = threading.Lock()
+        self._set_locks: Dict[Path, threading.Lock] = {}
+        self.stats = {'materialized_rows': 0, 'computations': 0, 'skipped': 0, 'reads': 0}
+        self.logger = logging.getLogger(__name__)
+
+    def _set_path(self, name: str, config: FeatureConfig, data_version: str) -> Path:
+        return self.root / name / f"{config_hash(config)}-{data_version}"
+
+    @contextmanager
+    def _locked(self, set_path: Path, timeout: float = 600.0, stale_after: float = 3600.0):
+        """Exclusive access to a feature set across threads and processes
+
+        Threads of this store queue on an in-process lock; other processes are
+        kept out by a lock file created with O_EXCL. A lock file older than
+        ``stale_after`` seconds is assumed to belong to a crashed writer.
+        """
+        with self._lock:
+            set_lock = self._set_locks.setdefault(set_path, threading.Lock())
+        lock_file = set_path / '.lock'
+        with set_lock:
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    descriptor = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                    break
+                except FileExistsError:
+                    try:
+                        if time.time() - lock_file.stat().st_mtime > stale_after:
+                            self.logger.warning(f"Removing stale feature store lock {lock_file}")
+                            lock_file.unlink(missing_ok=True)
+                            continue
+                    except FileNotFoundError:
+                        continue
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"Timed out waiting for feature store lock {lock_file}")
+                    time.sleep(0.01)
+            try:
+                os.write(descriptor, str(os.getpid()).encode())
+                os.close(descriptor)
+                yield
+            finally:
+                lock_file.unlink(missing_ok=True)
+
+    def _manifest(self, symbol_path: Path) -> Dict[str, Any]:
+        path = symbol_path / 'manifest.json'
+        if not path.exists():
+            return {'columns': None, 'parts': []}
+        with open(path) as handle:
+            return json.load(handle)
+
+    def last_date(self, symbol: str, name: str = 'default', config: FeatureConfig = None,
+                  data_version: str = 'v1') -> Optional[pd.Timestamp]:
+        """Last materialized date of a symbol, None if nothing is stored"""
+        config = config or FeatureConfig()
+        parts = self._manifest(self._set_path(name, config, data_version) / symbol)['parts']
+        return pd.Timestamp(parts[-1]['end']) if parts else None
+
+    def materialize(self, data: pd.DataFrame, config: FeatureConfig = None, name: str = 'default',
+                    data_version: str = 'v1', symbol: str = None, warmup: int = None) -> int:
+        """Compute and append the features of dates that are not stored yet
+
+        Args:
+            data: OHLCV frame of one ``symbol`` indexed by date, or a long
+                panel indexed by (symbol, date)
+            warmup: Compute on only this many dates before the first new one
+                instead of the full history. Rolling, lag and window features
+                are exact once warmup covers their longest window; exponential
+                and cumulative ones (EMA, MACD, OBV, PVT) converge but are not
+                bit-identical. Default: the full history passed in.
+
+        Returns:
+            Number of rows appended
+        """
+        config = config or FeatureConfig()
+        set_path = self._set_path(name, config, data_version)
+        set_path.mkdir(parents=True, exist_ok=True)
+        with self._locked(set_path):
+            config_file = set_path / 'config.json'
+            if not config_file.exists():
+                _write_json(config_file, {'name': name, 'data_version': data_version, 'config': asdict(config),
+                                          'code_version': FEATURE_CODE_VERSION})
+            # Freshness is checked under the lock, so a concurrent consumer that
+            # already stored these dates makes this call a no-op
+            return self._materialize(data, config, set_path, name, data_version, symbol, warmup)
+
+    def _materialize(self, data: pd.DataFrame, config: FeatureConfig, set_path: Path, name: str,
+                     data_version: str, symbol: Optional[str], warmup: Optional[int]) -> int:
+        panel = symbol is None
+        frames = ({str(s): frame.droplevel(0) for s, frame in data.groupby(level=0, sort=False)} if panel
+                  else {str(symbol): data})
+        last_dates = {s: self.last_date(s, name, config, data_version) for s in frames}
+
+        new_start = None
+        for s, frame in frames.items():
+            dates = pd.DatetimeIndex(frame.index)
+            fresh = dates[dates > last_dates[s]] if last_dates[s] is not None else dates
+            if len(fresh):
+                new_start = fresh.min() if new_start is None else min(new_start, fresh.min())
+        if new_start is None:
+            with self._lock:
+                self.stats['skipped'] += 1
+            return 0
+
+        if warmup is not None:
+            all_dates = pd.DatetimeIndex(data.index.get_level_values(-1)).unique().sort_values()
+            cutoff = all_dates[max(all_dates.searchsorted(new_start) - warmup, 0)]
+            frames = {s: frame[frame.index >= cutoff] for s, frame in frames.items()}
+
+        raw_config = replace(config, pca_features=False)
+        if panel:
+            features = self.engineer.engineer_panel_features(pd.concat(frames, names=['symbol', 'date']), raw_config)
+            computed = {str(s): frame.droplevel(0) for s, frame in features.groupby(level=0, sort=False)}
+        else:
+            computed = {str(symbol): self.engineer.engineer_features(frames[str(symbol)], raw_config)}
+
+        appended = 0
+        for s, frame in computed.items():
+            appended += self._append(set_path / s, frame.select_dtypes(include=[np.number]))
+        with self._lock:
+            self.stats['computations'] += 1
+            self.stats['materialized_rows'] += appended
+        return appended
+
+    def _append(self, symbol_path: Path, frame: pd.DataFrame) -> int:
+        """Append the rows after the manifest's last date; the caller holds the set's lock"""
+        symbol_path.mkdir(parents=True, exist_ok=True)
+        manifest = self._manifest(symbol_path)
+        if manifest['parts']:
+            frame = frame[frame.index > pd.Timestamp(manifest['parts'][-1]['end'])]
+        if frame.empty:
+            return 0
+        columns = [str(c) for c in frame.columns]
+        if manifest['columns'] is None:
+            manifest['columns'] = columns
+        elif columns != manifest['columns']:
+            raise ValueError(f"Columns changed for {symbol_path}; use a new data_version or config")
+        self._write_part(symbol_path, frame, manifest)
+        return len(frame)
+
+    def _write_part(self, symbol_path: Path, frame: pd.DataFrame, manifest: Dict[str, Any]):
+        """Write one part file, then the manifest that lists it"""
+        frame = frame.sort_index()
+        number = manifest.get('next_part', len(manifest['parts']))
+        dates = pd.DatetimeIndex(frame.index).as_unit('ns').asi8
+        values = frame.to_numpy(dtype=np.float64)
+        if self.storage_format == 'parquet':
+            file_name = f"part-{number:05d}.parquet"
+            table = pa.table({_DATE_COLUMN: dates,
+                              **{c: values[:, i] for i, c in enumerate(manifest['columns'])}})
+            pq.write_table(table, symbol_path / file_name)
+        else:
+            file_name = f"part-{number:05d}.npy"
+            # Column-major, so each column is one contiguous run in the file
+            np.save(symbol_path / file_name, np.asfortranarray(values))
+            np.save(symbol_path / f"part-{number:05d}.dates.npy", dates)
+
+        manifest['parts'].append({
+            'file': file_name,
+            'start': str(frame.index.min()),
+            'end': str(frame.index.max()),
+            'rows': len(frame),
+            'written_at': datetime.now().isoformat()
+        })
+        manifest['next_part'] = number + 1
+        _write_json(symbol_path / 'manifest.json', manifest)
+
+    def _read_part(self, symbol_path: Path, part: Dict[str, Any], columns: List[str],
+                   all_columns: List[str]) -> pd.DataFrame:
+        path = symbol_path / part['file']
+        if path.suffix == '.parquet':
+            table = pq.read_table(path, columns=[_DATE_COLUMN] + columns)
+            frame = table.to_pandas()
+            index = pd.to_datetime(frame.pop(_DATE_COLUMN).to_numpy())
+            return pd.DataFrame(frame[columns].to_numpy(), index=index, columns=columns)
+        values = np.load(path, mmap_mode='r')
+        dates = np.load(symbol_path / part['file'].replace('.npy', '.dates.npy'))
+        positions = [all_columns.index(c) for c in columns]
+        return pd.DataFrame(np.array(values[:, positions]), index=pd.to_datetime(dates), columns=columns)
+
+    def read(self, symbols: Union[str, List[str]] = None, name: str = 'default', config: FeatureConfig = None,
+             data_version: str = 'v1', start=None, end=None, columns: List[str] = None,
+             as_of=None, transform: bool = False) -> pd.DataFrame:
+        """Stored features, point-in-time correct when ``as_of`` is given
+
+        Rows after ``as_of`` are excluded, and with ``transform`` the
+        transformers applied are the latest ones fitted on data up to
+        ``as_of``. A single symbol string returns a date-indexed frame;
+        a list (or None for all symbols) returns a (symbol, date) frame.
+        """
+        config = config or FeatureConfig()
+        set_path = self._set_path(name, config, data_version)
+        single = isinstance(symbols, str)
+        if symbols is None:
+            symbols = sorted(p.name for p in set_path.iterdir() if (p / 'manifest.json').exists()) \
+                if set_path.exists() else []
+        elif single:
+            symbols = [symbols]
+
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        if as_of is not None:
+            as_of = pd.Timestamp(as_of)
+            end = min(end, as_of) if end is not None else as_of
+
+        frames = {}
+        for symbol in symbols:
+            symbol_path = set_path / symbol
+            manifest = self._manifest(symbol_path)
+            if not manifest['parts']:
+                continue
+            wanted = columns or manifest['columns']
+            parts = [part for part in manifest['parts']
+                     if (start is None or pd.Timestamp(part['end']) >= start)
+                     and (end is None or pd.Timestamp(part['start']) <= end)]
+            if not parts:
+                continue
+            frame = pd.concat([self._read_part(symbol_path, part, list(wanted), manifest['columns'])
+                               for part in parts])
+            if start is not None:
+                frame = frame[frame.index >= start]
+            if end is not None:
+                frame = frame[frame.index <= end]
+            frame.index.name = 'date'
+            frames[symbol] = frame
+        self.stats['reads'] += 1
+
+        if single:
+            result = frames.get(symbols[0], pd.DataFrame(columns=columns or []))
+        elif frames:
+            result = pd.concat(frames, names=['symbol', 'date'])
+        else:
+            result = pd.DataFrame(columns=columns or [])
+
+        if transform and not result.empty:
+            engineer = self.load_transformers(name, config, data_version, as_of=as_of)
+            if engineer is None:
+                raise ValueError(f"No transformers fitted for {name} up to {as_of}")
+            result = engineer.transform_features(result)
+        return result
+
+    def get_features(self, data: pd.DataFrame, config: FeatureConfig = None, name: str = 'default',
+                     data_version: str = 'v1', symbol: str = None, **read_kwargs) -> pd.DataFrame:
+        """Features of the rows in ``data``, computed only for dates not stored yet
+
+        The drop-in replacement for FeatureEngineer.engineer_features /
+        engineer_panel_features for consumers that share a store.
+        """
+        self.materialize(data, config, name, data_version, symbol)
+        if symbol is not None:
+            dates = pd.DatetimeIndex(data.index)
+            return self.read(symbol, name, config, data_version, start=dates.min(), end=dates.max(), **read_kwargs)
+        symbols = [str(s) for s in data.index.get_level_values(0).unique()]
+        dates = pd.DatetimeIndex(data.index.get_level_values(-1))
+        return self.read(symbols, name, config, data_version, start=dates.min(), end=dates.max(), **read_kwargs)
+
+    def fit_transformers(self, fit_end, name: str = 'default', config: FeatureConfig = None,
+                         data_version: str = 'v1', symbols: List[str] = None,
+                         scaling: str = 'standard') -> FeatureEngineer:
+        """Fit the scaler (and PCA if the config asks for it) on stored rows up to ``fit_end`` and persist them"""
+        config = config or FeatureConfig()
+        fit_end = pd.Timestamp(fit_end)
+        history = self.read(symbols, name, config, data_version, end=fit_end)
+        if history.empty:
+            raise ValueError(f"No stored rows up to {fit_end} to fit transformers on")
+
+        engineer = FeatureEngineer()
+        scaled = engineer.scale_features(history, method=scaling)
+        engineer.feature_names = list(history.columns)
+        if config.pca_features and SKLEARN_AVAILABLE:
+            pca_cols = list(engineer.scaler.feature_names_in_)
+            complete = scaled[pca_cols].dropna()
+            if len(pca_cols) >= config.n_pca_components and len(complete) >= config.n_pca_components:
+                engineer.pca = PCA(n_components=config.n_pca_components).fit(complete)
+
+        directory = self._set_path(name, config, data_version) / 'transformers'
+        directory.mkdir(parents=True, exist_ok=True)
+        engineer.save_transformers(str(directory / f"{fit_end:%Y%m%dT%H%M%S}.joblib"))
+        return engineer
+
+    def load_transformers(self, name: str = 'default', config: FeatureConfig = None,
+                          data_version: str = 'v1', as_of=None) -> Optional[FeatureEngineer]:
+        """Latest persisted transformers fitted on data up to ``as_of`` (default: the latest of all)"""
+        config = config or FeatureConfig()
+        directory = self._set_path(name, config, data_version) / 'transformers'
+        if not directory.exists():
+            return None
+        fitted = sorted(directory.glob('*.joblib'))
+        if as_of is not None:
+            limit = f"{pd.Timestamp(as_of):%Y%m%dT%H%M%S}"
+            fitted = [path for path in fitted if path.stem <= limit]
+        if not fitted:
+            return None
+        engineer = FeatureEngineer()
+        engineer.load_transformers(str(fitted[-1]))
+        return engineer
+
+    def compact(self, name: str = 'default', config: FeatureConfig = None, data_version: str = 'v1',
+                symbols: List[str] = None) -> int:
+        """Merge each symbol's daily parts into one file; returns the number of symbols compacted"""
+        config = config or FeatureConfig()
+        set_path = self._set_path(name, config, data_version)
+        if symbols is None:
+            symbols = [p.name for p in set_path.iterdir() if (p / 'manifest.json').exists()]
+        compacted = 0
+        with self._locked(set_path):
+            for symbol in symbols:
+                symbol_path = set_path / symbol
+                manifest = self._manifest(symbol_path)
+                if len(manifest['parts']) < 2:
+                    continue
+                frame = self.read(symbol, name, config, data_version)
+                old_files = [part['file'] for part in manifest['parts']]
+                self._write_part(symbol_path, frame, {'columns': manifest['columns'], 'parts': [],
+                                                      'next_part': manifest.get('next_part', len(old_files))})
+                for file_name in old_files:
+                    (symbol_path / file_name).unlink(missing_ok=True)
+                    if file_name.endswith('.npy'):
+                        (symbol_path / file_name.replace('.npy', '.dates.npy')).unlink(missing_ok=True)
+                compacted += 1
+        return compacted
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Technical Indicator Kernels
+Array-based implementations of the indicators used by FeatureEngineer.
+Indicators with a closed form are vectorized; path-dependent ones run as
+tight loops over raw NumPy arrays and are JIT-compiled when numba is installed.
+Every kernel accepts 1-D series or 2-D (time x symbols) arrays, with time on axis 0.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Fallback decorator that leaves the function as plain Python"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+def _as_float_array(values) -> np.ndarray:
+    """Convert a Series/array to a contiguous float64 array"""
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+def _rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing rolling sum via cumulative sums, NaN for windows that are short or hold a NaN"""
+    n = len(values)
+    out = np.full(values.shape, np.nan)
+    if window <= 0 or n < window:
+        return out
+    missing = np.isnan(values)
+    zeros = np.zeros((1,) + values.shape[1:])
+    csum = np.concatenate((zeros, np.cumsum(np.where(missing, 0.0, values), axis=0)))
+    nan_count = np.concatenate((zeros, np.cumsum(missing, axis=0)))
+    sums = csum[window:] - csum[:-window]
+    sums[(nan_count[window:] - nan_count[:-window]) > 0] = np.nan
+    out[window - 1:] = sums
+    return out
+
+def on_balance_volume(close, volume) -> np.ndarray:
+    """On-Balance Volume: cumulative volume signed by the close-to-close move"""
+    close = _as_float_array(close)
+    volume = _as_float_array(volume)
+    if len(close) == 0:
+        return np.array([], dtype=np.float64)
+
+    direction = np.nan_to_num(np.sign(np.diff(close, axis=0)))
+    signed_volume = np.empty_like(volume)
+    signed_volume[0] = volume[0]
+    signed_volume[1:] = direction * volume[1:]
+    return np.cumsum(signed_volume, axis=0)
+
+def money_flow_index(high, low, close, volume, period: int = 14) -> np.ndarray:
+    """Money Flow Index from rolling sums of positive and negative money flow"""
+    high = _as_float_array(high)
+    low = _as_float_array(low)
+    close = _as_float_array(close)
+    volume = _as_float_array(volume)
+    n = len(close)
+    if n == 0:
+        return np.array([], dtype=np.float64)
+
+    typical_price = (high + low + close) / 3
+    money_flow = typical_price * volume
+
+    direction = np.zeros(typical_price.shape)
+    direction[1:] = np.nan_to_num(np.sign(np.diff(typical_price, axis=0)))
+    positive_flow = np.where(direction > 0, money_flow, 0.0)
+    negative_flow = np.where(direction < 0, money_flow, 0.0)
+
+    positive_mf = _rolling_sum(positive_flow, period)
+    negative_mf = _rolling_sum(negative_flow, period)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - (100 / (1 + positive_mf / negative_mf))
+
+def rolling_mean_abs_deviation(values, period: int) -> np.ndarray:
+    """Rolling mean absolute deviation around each window's own mean"""
+    values = _as_float_array(values)
+    n = len(values)
+    out = np.full(values.shape, np.nan)
+    if period <= 0 or n < period:
+        return out
+    means = np.lib.stride_tricks.sliding_window_view(values, period, axis=0).mean(axis=-1)
+    # Accumulate one window offset at a time so memory stays at one value per output
+    # rather than a (time x symbols x period) block of deviations
+    count = n - period + 1
+    total = np.zeros(means.shape)
+    for offset in range(period):
+        total += np.abs(values[offset:offset + count] - means)
+    out[period - 1:] = total / period
+    return out
+
+def commodity_channel_index(high, low, close, period: int = 20) -> np.ndarray:
+    """Commodity Channel Index"""
+    typical_price = (_as_float_array(high) + _as_float_array(low) + _as_float_array(close)) / 3
+    sma_tp = _rolling_sum(typical_price, period) / period
+    mad = rolling_mean_abs_deviation(typical_price, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (typical_price - sma_tp) / (0.015 * mad)
+
+@njit(cache=True)
+def _psar_kernel(high: np.ndarray, low: np.ndarray,
+                 acceleration: float, maximum: float) -> np.ndarray:
+    n = high.shape[0]
+    psar = np.empty(n)
+    if n == 0:
+        return psar
+
+    psar[0] = low[0]
+    ep = high[0]
+    af = acceleration
+    long = True
+
+    for i in range(1, n):
+        sar = psar[i - 1] + af * (ep - psar[i - 1])
+        if long:
+            if low[i] < sar:
+                long = False
+                sar = ep
+                ep = low[i]
+                af = acceleration
+            elif high[i] > ep:
+                ep = high[i]
+                af = min(af + acceleration, maximum)
+        else:
+            if high[i] > sar:
+                long = True
+                sar = ep
+                ep = high[i]
+                af = acceleration
+            elif low[i] < ep:
+                ep = low[i]
+                af = min(af + acceleration, maximum)
+        psar[i] = sar
+
+    return psar
+
+def _psar_column(high: np.ndarray, low: np.ndarray,
+                 acceleration: float, maximum: float) -> np.ndarray:
+    """Run the PSAR kernel from the first bar with both high and low present"""
+    psar = np.full(high.shape[0], np.nan)
+    valid = np.flatnonzero(~(np.isnan(high) | np.isnan(low)))
+    if len(valid) == 0:
+        return psar
+    start = valid[0]
+    psar[start:] = _psar_kernel(np.ascontiguousarray(high[start:]), np.ascontiguousarray(low[start:]),
+                                acceleration, maximum)
+    return psar
+
+def parabolic_sar(high, low, acceleration: float = 0.02, maximum: float = 0.2) -> np.ndarray:
+    """Parabolic SAR, starting in a long trend from the first bar's low
+
+    The first extreme point is the first bar's high. On a reversal the SAR
+    jumps to the previous extreme point and the new extreme point is the
+    reversing bar's low (turning short) or high (turning long). The
+    FeatureEngineer implementation this replaced started from the first low
+    and took the opposite price on reversals, and its values were all NaN.
+    """
+    high = _as_float_array(high)
+    low = _as_float_array(low)
+    if high.ndim == 1:
+        return _psar_column(high, low, float(acceleration), float(maximum))
+
+    psar = np.empty(high.shape)
+    for j in range(high.shape[1]):
+        psar[:, j] = _psar_column(high[:, j], low[:, j], float(acceleration), float(maximum))
+    return psar
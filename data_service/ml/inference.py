@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Batch Inference Service
+Scores PredictionModel / ClassificationModel models for many callers at once.
+Fitted models are reduced once to what scoring needs (scaler statistics as
+float32 arrays, linear models folded into a single weight vector, tree
+ensembles optionally compiled with treelite) and kept in a keyed LRU cache.
+Requests are converted to contiguous float32 arrays in the caller's thread,
+queued, and a worker concatenates whatever arrives within ``batch_wait``
+seconds for the same model into one predict call. Per-model latency from
+submission to result is kept for p50/p99 reporting.
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Tuple, Union, Callable
+import logging
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from .ml_models import PredictionModel, ClassificationModel
+
+try:
+    from sklearn.base import is_classifier
+except ImportError:
+    def is_classifier(model) -> bool:
+        return hasattr(model, 'classes_')
+
+try:
+    import treelite
+    import treelite.sklearn
+    import treelite.gtil
+    TREELITE_AVAILABLE = True
+except ImportError:
+    TREELITE_AVAILABLE = False
+
+ModelWrapper = Union[PredictionModel, ClassificationModel]
+
+def to_float32(X: Union[pd.DataFrame, np.ndarray], feature_columns: List[str] = None) -> np.ndarray:
+    """Features as a C-contiguous float32 matrix, columns in training order"""
+    if isinstance(X, pd.DataFrame):
+        if feature_columns is not None:
+            X = X[feature_columns]
+        return np.ascontiguousarray(X.to_numpy(dtype=np.float32))
+    X = np.asarray(X, dtype=np.float32)
+    if X.ndim == 1:
+        X = X[None, :]
+    return np.ascontiguousarray(X)
+
+class CompiledModel:
+    """A fitted model wrapper reduced to its scoring path
+
+    StandardScaler statistics become float32 arrays applied in place of
+    ``scaler.transform``; regressors with ``coef_`` are folded together with
+    the scaler into one weight vector and intercept; tree ensemble regressors
+    are compiled with treelite when it is installed. Everything else calls
+    the estimator's own predict on the scaled float32 matrix. Results equal
+    the wrapper's predict up to float32 rounding.
+    """
+
+    def __init__(self, wrapper: ModelWrapper, compile_trees: bool = True):
+        if wrapper.model is None:
+            raise ValueError("Model not trained. Call train() first.")
+        self.model = wrapper.model
+        self.model_type = wrapper.model_type
+        self.classification = isinstance(wrapper, ClassificationModel)
+        scaler = wrapper.scaler
+        self.feature_columns = wrapper.feature_columns
+        for source in (scaler, self.model):
+            if self.feature_columns is None and hasattr(source, 'feature_names_in_'):
+                self.feature_columns = list(source.feature_names_in_)
+
+        self._scaler = None
+        self._offset = self._scale = None
+        if scaler is not None:
+            if hasattr(scaler, 'scale_') and hasattr(scaler, 'mean_') and scaler.__class__.__name__ == 'StandardScaler':
+                self._offset = (scaler.mean_ if scaler.with_mean else np.zeros(scaler.n_features_in_)).astype(np.float32)
+                self._scale = (scaler.scale_ if scaler.with_std else np.ones(scaler.n_features_in_)).astype(np.float32)
+            else:
+                self._scaler = scaler
+        if self.feature_columns is not None:
+            self.n_features = len(self.feature_columns)
+        else:
+            self.n_features = getattr(scaler, 'n_features_in_', None) or getattr(self.model, 'n_features_in_', None)
+        # Estimators fitted on a DataFrame warn on bare arrays
+        self._model_columns = list(self.model.feature_names_in_) if hasattr(self.model, 'feature_names_in_') else None
+
+        self.kind = 'sklearn'
+        self._treelite = None
+        if not self.classification and hasattr(self.model, 'coef_') and np.ndim(self.model.coef_) == 1:
+            coef = np.asarray(self.model.coef_, dtype=np.float64)
+            intercept = float(np.ravel(self.model.intercept_)[0])
+            if self._scaler is None:
+                if self._scale is not None:
+                    # w . (x - m) / s + b = (w / s) . x + (b - w . m / s)
+                    intercept -= float(np.dot(coef, self._offset / self._scale))
+                    coef = coef / self._scale
+                self._weights = coef.astype(np.float32)
+                self._intercept = np.float32(intercept)
+                self.kind = 'linear'
+        elif compile_trees and TREELITE_AVAILABLE and not self.classification and hasattr(self.model, 'estimators_'):
+            try:
+                self._treelite = treelite.sklearn.import_model(self.model)
+                self.kind = 'treelite'
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"treelite export failed for {self.model_type}: {e}")
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        if self._scaler is not None:
+            return self._scaler.transform(X).astype(np.float32)
+        if self._scale is None:
+            return X
+        return (X - self._offset) / self._scale
+
+    def _estimator_input(self, X: np.ndarray):
+        return pd.DataFrame(X, columns=self._model_columns) if self._model_columns is not None else X
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        if self.kind == 'linear':
+            return X @ self._weights + self._intercept
+        scaled = self.transform(X)
+        if self.kind == 'treelite':
+            return np.asarray(treelite.gtil.predict(self._treelite, scaled)).reshape(len(X))
+        return self.model.predict(self._estimator_input(scaled))
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        if not hasattr(self.model, 'predict_proba'):
+            raise ValueError("Model does not support probability predictions")
+        return self.model.predict_proba(self._estimator_input(self.transform(X)))
+
+class ModelCache:
+    """LRU cache of compiled models, keyed by name and model identity or by file and mtime"""
+
+    def __init__(self, max_size: int = 32):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple, CompiledModel]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple, loader: Callable[[], CompiledModel]) -> CompiledModel:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = loader()
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def discard(self, name: str):
+        """Drop every entry of a model name"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == name]:
+                del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+@dataclass
+class _Request:
+    model: CompiledModel
+    name: str
+    proba: bool
+    features: np.ndarray
+    submitted: float = field(default_factory=time.perf_counter)
+    future: Future = field(default_factory=Future)
+
+class InferenceService:
+    """Micro-batched scoring of MLModelManager models for many concurrent callers"""
+
+    def __init__(self, manager=None,
+                 max_batch_rows: int = 8192,
+                 batch_wait: float = 0.002,
+                 cache_size: int = 32,
+                 compile_trees: bool = True,
+                 latency_window: int = 10000):
+        self.manager = manager
+        self.max_batch_rows = max_batch_rows
+        self.batch_wait = batch_wait
+        self.compile_trees = compile_trees
+        self.latency_window = latency_window
+        self.cache = ModelCache(cache_size)
+        self.logger = logging.getLogger(__name__)
+
+        self._models: Dict[str, Any] = {}
+        self._paths: Dict[str, str] = {}
+        self._stats_lock = threading.Lock()
+        self._latencies: Dict[str, deque] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._serve, name='ml-inference', daemon=True)
+        self._worker.start()
+
+    def register(self, name: str, model: ModelWrapper):
+        """Serve an in-memory model under a name (replaces any earlier one)"""
+        self.cache.discard(name)
+        self._paths.pop(name, None)
+        self._models[name] = model
+
+    def load(self, name: str, filepath: str):
+        """Serve a model saved with save_model; it is unpickled again only when the file changes"""
+        self.cache.discard(name)
+        self._models.pop(name, None)
+        self._paths[name] = str(filepath)
+
+    def _resolve(self, name: str) -> CompiledModel:
+        if name in self._paths:
+            path = self._paths[name]
+            key = (name, path, os.stat(path).st_mtime_ns)
+            return self.cache.get(key, lambda: self._load_file(path))
+
+        wrapper = self._models.get(name)
+        if wrapper is None and self.manager is not None:
+            wrapper = self.manager.models.get(name)
+        if wrapper is None:
+            raise ValueError(f"Model {name} not found")
+        # Retraining replaces wrapper.model and incremental updates bump chunks_fitted
+        key = (name, id(wrapper), id(wrapper.model), getattr(wrapper, 'chunks_fitted', 0))
+        return self.cache.get(key, lambda: CompiledModel(wrapper, self.compile_trees))
+
+    def _load_file(self, path: str) -> CompiledModel:
+        model_data = joblib.load(path)
+        # Classifiers are saved with their class labels; older files only have the estimator
+        if model_data.get('classes') is not None or is_classifier(model_data['model']):
+            wrapper = ClassificationModel()
+        else:
+            wrapper = PredictionModel()
+        wrapper.restore(model_data)
+        return CompiledModel(wrapper, self.compile_trees)
+
+    def submit(self, name: str, X: Union[pd.DataFrame, np.ndarray], proba: bool = False) -> Future:
+        """Queue one request; the future resolves to the predictions of its rows"""
+        model = self._resolve(name)
+        features = to_float32(X, model.feature_columns)
+        # Checked here, in the caller's thread, so one malformed request cannot break a shared batch
+        if features.ndim != 2 or (model.n_features is not None and features.shape[1] != model.n_features):
+            raise ValueError(f"Model {name} expects {model.n_features} features, got shape {features.shape}")
+        request = _Request(model, name, proba, features)
+        self._queue.put(request)
+        return request.future
+
+    def predict(self, name: str, X: Union[pd.DataFrame, np.ndarray]) -> np.ndarray:
+        """Predictions, batched with whatever else is in flight"""
+        return self.submit(name, X).result()
+
+    def predict_proba(self, name: str, X: Union[pd.DataFrame, np.ndarray]) -> np.ndarray:
+        """Class probabilities of a classification model"""
+        return self.submit(name, X, proba=True).result()
+
+    def predict_many(self, requests: List[Tuple[str, Union[pd.DataFrame, np.ndarray]]]) -> List[np.ndarray]:
+        """Several (name, X) requests; all are queued before waiting so they batch together"""
+        futures = [self.submit(name, X) for name, X in requests]
+        return [future.result() for future in futures]
+
+    def _serve(self):
+        """Worker loop: collect requests for up to batch_wait seconds, then run them"""
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            pending = [request]
+            deadline = time.monotonic() + self.batch_wait
+            stop = False
+            while True:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                pending.append(request)
+            try:
+                self._run(pending)
+            except Exception as e:
+                # Never let a failure end the worker: fail the requests it left unanswered
+                self.logger.error(f"Inference worker error: {e}")
+                for request in pending:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+            if stop:
+                return
+
+    def _run(self, pending: List[_Request]):
+        groups: Dict[Tuple[int, bool], List[_Request]] = {}
+        for request in pending:
+            groups.setdefault((id(request.model), request.proba), []).append(request)
+
+        for requests in groups.values():
+            batch: List[_Request] = []
+            rows = 0
+            for request in requests:
+                if batch and rows + len(request.features) > self.max_batch_rows:
+                    self._run_batch(batch)
+                    batch, rows = [], 0
+                batch.append(request)
+                rows += len(request.features)
+            if batch:
+                self._run_batch(batch)
+
+    def _run_batch(self, batch: List[_Request]):
+        model = batch[0].model
+        try:
+            features = batch[0].features if len(batch) == 1 else np.concatenate([r.features for r in batch])
+            output = model.predict_proba(features) if batch[0].proba else model.predict(features)
+        except Exception as e:
+            self.logger.error(f"Inference failed for {batch[0].name} ({len(batch)} requests): {e}")
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        finished = time.perf_counter()
+        offset = 0
+        for request in batch:
+            rows = len(request.features)
+            request.future.set_result(output[offset:offset + rows])
+            offset += rows
+        self._record(batch[0].name, batch, finished)
+
+    def _record(self, name: str, batch: List[_Request], finished: float):
+        with self._stats_lock:
+            latencies = self._latencies.get(name)
+            if latencies is None:
+                latencies = self._latencies[name] = deque(maxlen=self.latency_window)
+                self._counts[name] = {'requests': 0, 'rows': 0, 'batches': 0}
+            latencies.extend(finished - request.submitted for request in batch)
+            counts = self._counts[name]
+            counts['requests'] += len(batch)
+            counts['rows'] += sum(len(request.features) for request in batch)
+            counts['batches'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-model request counts, batch sizes and p50/p99 latency in milliseconds"""
+        with self._stats_lock:
+            models = {}
+            for name, latencies in self._latencies.items():
+                counts = dict(self._counts[name])
+                values = np.fromiter(latencies, dtype=float) * 1000
+                counts['avg_batch_requests'] = counts['requests'] / counts['batches'] if counts['batches'] else 0.0
+                counts['p50_ms'] = float(np.percentile(values, 50)) if len(values) else 0.0
+                counts['p99_ms'] = float(np.percentile(values, 99)) if len(values) else 0.0
+                models[name] = counts
+        return {
+            'models': models,
+            'cache_size': len(self.cache),
+            'cache_hits': self.cache.hits,
+            'cache_misses': self.cache.misses,
+            'queued': self._queue.qsize()
+        }
+
+    def close(self):
+        """Stop the worker after the queued requests are served"""
+        self._queue.put(None)
+        self._worker.join()
@@ -18,6 +18,7 @@ from pathlib import Path
 try:
     from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
     from sklearn.linear_model import LinearRegression, LogisticRegression, Ridge, Lasso
+    from sklearn.linear_model import SGDRegressor, SGDClassifier
     from sklearn.svm import SVR, SVC
     from sklearn.neural_network import MLPRegressor, MLPClassifier
     from sklearn.tree import DecisionTreeRegressor, DecisionTreeClassifier
@@ -25,7 +26,7 @@ try:
     from sklearn.ensemble import AdaBoostRegressor, AdaBoostClassifier
     from sklearn.neighbors import KNeighborsRegressor, KNeighborsClassifier
     from sklearn.preprocessing import StandardScaler, MinMaxScaler, RobustScaler
-    from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
+    from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV, TimeSeriesSplit
     from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
     from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
     from sklearn.metrics import classification_report, confusion_matrix
@@ -52,6 +53,8 @@ except ImportError:
     LIGHTGBM_AVAILABLE = False
     logging.warning("LightGBM not available. Install with: pip install lightgbm")
 
+from .out_of_core import FeatureChunkSource, ArrayFeatureSource, time_split_points, time_ordered_split
+
 @dataclass
 class ModelResult:
     """Model training/prediction result"""
@@ -78,14 +81,229 @@ class ModelConfig:
     scale_features: bool = True
     cross_validate: bool = True
     cv_folds: int = 5
+    split_method: str = 'time'  # 'time' (train on the past, test on the future) or 'random'
+    gap: int = 0  # distinct timestamps left out between training and test rows
+    time_column: Optional[str] = None  # defaults to a DatetimeIndex or datetime index level
+
+class _StreamingScore:
+    """R^2 or accuracy accumulated over chunks"""
+
+    def __init__(self, classification: bool):
+        self.classification = classification
+        self.rows = 0
+        self.correct = 0
+        self.target_sum = 0.0
+        self.target_square_sum = 0.0
+        self.squared_error = 0.0
+
+    def update(self, y_true: np.ndarray, y_pred: np.ndarray):
+        self.rows += len(y_true)
+        if self.classification:
+            self.correct += int(np.sum(y_true == y_pred))
+        else:
+            y_true = y_true.astype(float)
+            self.target_sum += float(y_true.sum())
+            self.target_square_sum += float(np.dot(y_true, y_true))
+            self.squared_error += float(np.sum((y_true - y_pred) ** 2))
+
+    def value(self) -> float:
+        if not self.rows:
+            return float('nan')
+        if self.classification:
+            return self.correct / self.rows
+        total = self.target_square_sum - self.target_sum ** 2 / self.rows
+        return 1.0 - self.squared_error / total if total > 0 else 0.0
+
+class IncrementalTrainingMixin:
+    """Out-of-core training and incremental updates shared by the model classes
+
+    Estimators with ``partial_fit`` (sgd, mlp) learn from one chunk at a
+    time; tree ensembles with ``warm_start`` (random_forest,
+    gradient_boosting) add ``trees_per_chunk`` trees or boosting stages per
+    chunk; XGBoost and LightGBM continue boosting from the previous booster.
+    The scaler is fitted with ``partial_fit`` over the training rows once and
+    then kept fixed, so later updates see inputs on the same scale.
+    """
+
+    _classification = False
+
+    def supports_incremental(self, model=None) -> bool:
+        """Whether the estimator can learn chunk by chunk"""
+        model = self.model if model is None else model
+        if hasattr(model, 'partial_fit'):
+            return True
+        if XGBOOST_AVAILABLE and isinstance(model, (XGBRegressor, XGBClassifier)):
+            return True
+        if LIGHTGBM_AVAILABLE and isinstance(model, (LGBMRegressor, LGBMClassifier)):
+            return True
+        params = model.get_params()
+        return 'warm_start' in params and 'n_estimators' in params
+
+    def _model_input(self, X: Union[pd.DataFrame, np.ndarray]) -> Union[pd.DataFrame, np.ndarray]:
+        """Features in training column order, scaled if a scaler was fitted"""
+        if self.feature_columns is not None and isinstance(X, pd.DataFrame):
+            X = X[self.feature_columns].to_numpy(dtype=np.float64)
+        return self.scaler.transform(X) if self.scaler is not None else X
+
+    def _fit_chunk(self, X: np.ndarray, y: np.ndarray, trees_per_chunk: int):
+        model = self.model
+        if hasattr(model, 'partial_fit'):
+            if self._classification:
+                model.partial_fit(X, y, classes=self.classes_)
+            else:
+                model.partial_fit(X, y)
+        elif XGBOOST_AVAILABLE and isinstance(model, (XGBRegressor, XGBClassifier)):
+            model.fit(X, y, xgb_model=model.get_booster() if self.chunks_fitted else None)
+        elif LIGHTGBM_AVAILABLE and isinstance(model, (LGBMRegressor, LGBMClassifier)):
+            model.fit(X, y, init_model=model.booster_ if self.chunks_fitted else None)
+        else:
+            n_estimators = trees_per_chunk
+            if self.chunks_fitted:
+                n_estimators += model.get_params()['n_estimators']
+            model.set_params(warm_start=True, n_estimators=n_estimators)
+            model.fit(X, y)
+        self.chunks_fitted += 1
+
+    def _scale_chunk(self, X: np.ndarray) -> Union[pd.DataFrame, np.ndarray]:
+        # float32 stores are widened so every chunk reaches the estimator with one dtype
+        X = np.asarray(X, dtype=np.float64)
+        # Models trained in memory by train() were fitted on named columns
+        first = self.scaler if self.scaler is not None else self.model
+        names = getattr(first, 'feature_names_in_', None)
+        if names is not None:
+            X = pd.DataFrame(X, columns=names)
+        return self.scaler.transform(X) if self.scaler is not None else X
+
+    def evaluate(self, source: FeatureChunkSource, start: int = 0, stop: int = None,
+                 chunk_size: int = 100_000, return_predictions: bool = False):
+        """R^2 (regression) or accuracy (classification) over rows [start, stop) of a source"""
+        if self.model is None:
+            raise ValueError("Model not trained. Call train() first.")
+        score = _StreamingScore(self._classification)
+        predictions = []
+        for X, y, _ in source.iter_chunks(chunk_size, start, stop):
+            y_pred = self.model.predict(self._scale_chunk(X))
+            score.update(y, y_pred)
+            if return_predictions:
+                predictions.append(y_pred)
+        if return_predictions:
+            return score.value(), (np.concatenate(predictions) if predictions else np.array([]))
+        return score.value()
+
+    def train_out_of_core(self, source: FeatureChunkSource, config: ModelConfig = None,
+                          chunk_size: int = 100_000, epochs: int = 1,
+                          trees_per_chunk: int = 10) -> ModelResult:
+        """Train from a chunked source without loading it into memory
+
+        The last ``config.test_size`` of the distinct timestamps (after a
+        ``config.gap`` embargo) is held out and scored chunk by chunk.
+        ``epochs`` > 1 repeats the pass for ``partial_fit`` estimators.
+        """
+        start_time = datetime.now()
+        if config is None:
+            config = ModelConfig(
+                model_type=self.model_type,
+                parameters={},
+                feature_columns=list(source.feature_columns),
+                target_column=source.target_column
+            )
+
+        train_stop, validation_start = time_split_points(source.times, config.test_size, config.gap)
+
+        self.model = self._create_model(config.model_type)
+        if config.parameters:
+            self.model.set_params(**config.parameters)
+        if not self.supports_incremental():
+            raise ValueError(f"Model type {config.model_type} supports neither partial_fit nor warm_start")
+        self.model_type = config.model_type
+        self.feature_columns = list(source.feature_columns)
+        self.chunks_fitted = 0
+
+        # One pass for the scaler statistics and the set of classes
+        self.scaler = StandardScaler() if config.scale_features else None
+        classes = set()
+        if self.scaler is not None or self._classification:
+            for X, y, _ in source.iter_chunks(chunk_size, 0, train_stop):
+                if self.scaler is not None:
+                    self.scaler.partial_fit(X)
+                if self._classification:
+                    classes.update(np.unique(y).tolist())
+        if self._classification:
+            self.classes_ = np.array(sorted(classes))
+
+        warm_start = not hasattr(self.model, 'partial_fit')
+        for epoch in range(1 if warm_start else epochs):
+            for X, y, _ in source.iter_chunks(chunk_size, 0, train_stop):
+                self._fit_chunk(self._scale_chunk(X), y, trees_per_chunk)
+
+        train_score = self.evaluate(source, 0, train_stop, chunk_size)
+        test_score, y_test_pred = self.evaluate(source, validation_start, None, chunk_size,
+                                                return_predictions=True)
+
+        feature_importance = None
+        if hasattr(self.model, 'feature_importances_'):
+            feature_importance = dict(zip(self.feature_columns, self.model.feature_importances_))
+
+        suffix = 'classifier' if self._classification else 'regressor'
+        return ModelResult(
+            model_name=f"{config.model_type}_{suffix}",
+            model_type='classification' if self._classification else 'regression',
+            training_score=train_score,
+            validation_score=test_score,
+            test_score=test_score,
+            predictions=y_test_pred,
+            feature_importance=feature_importance,
+            training_time=(datetime.now() - start_time).total_seconds()
+        )
+
+    def update(self, data: Union[FeatureChunkSource, pd.DataFrame], y: pd.Series = None,
+               chunk_size: int = 100_000, trees_per_chunk: int = 10) -> ModelResult:
+        """Incrementally fit new rows (e.g. the latest day) without refitting from scratch
+
+        ``validation_score`` is the score of the model before the update on
+        the new rows, i.e. a genuinely out-of-sample score; ``training_score``
+        is the score after it.
+        """
+        if self.model is None:
+            raise ValueError("Model not trained. Call train() first.")
+        if not self.supports_incremental():
+            raise ValueError(f"Model type {self.model_type} supports neither partial_fit nor warm_start")
+        start_time = datetime.now()
+        source = ArrayFeatureSource(data, y) if isinstance(data, pd.DataFrame) else data
+        expected = self.feature_columns
+        if expected is None and hasattr(self.model, 'feature_names_in_'):
+            expected = list(self.model.feature_names_in_)
+        if expected is None and self.scaler is not None and hasattr(self.scaler, 'feature_names_in_'):
+            expected = list(self.scaler.feature_names_in_)
+        if expected is not None and list(source.feature_columns) != list(expected):
+            raise ValueError("New rows do not have the columns the model was trained on")
+        if self._classification and self.classes_ is None:
+            self.classes_ = self.model.classes_
 
-class PredictionModel:
+        before_score = self.evaluate(source, chunk_size=chunk_size)
+        for X, y_chunk, _ in source.iter_chunks(chunk_size):
+            self._fit_chunk(self._scale_chunk(X), y_chunk, trees_per_chunk)
+        after_score = self.evaluate(source, chunk_size=chunk_size)
+
+        suffix = 'classifier' if self._classification else 'regressor'
+        return ModelResult(
+            model_name=f"{self.model_type}_{suffix}",
+            model_type='classification' if self._classification else 'regression',
+            training_score=after_score,
+            validation_score=before_score,
+            training_time=(datetime.now() - start_time).total_seconds()
+        )
+
+class PredictionModel(IncrementalTrainingMixin):
     """Regression model for price prediction"""
     
     def __init__(self, model_type: str = 'random_forest'):
         self.model_type = model_type
         self.model = None
         self.scaler = None
+        self.feature_columns: Optional[List[str]] = None  # set by out-of-core training
+        self.classes_: Optional[np.ndarray] = None
+        self.chunks_fitted = 0
         self.logger = logging.getLogger(__name__)
         
         if not SKLEARN_AVAILABLE:
@@ -97,6 +315,7 @@ class PredictionModel:
             'linear_regression': LinearRegression(),
             'ridge': Ridge(),
             'lasso': Lasso(),
+            'sgd': SGDRegressor(random_state=42),
             'random_forest': RandomForestRegressor(random_state=42),
             'gradient_boosting': GradientBoostingRegressor(random_state=42),
             'svr': SVR(),
@@ -139,10 +358,20 @@ class PredictionModel:
                 scale_features=True
             )
         
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=config.test_size, random_state=config.random_state
-        )
+        # Split data: by default the test rows are the most recent ones
+        if config.split_method == 'time':
+            X_train, X_test, y_train, y_test = time_ordered_split(
+                X, y, test_size=config.test_size, gap=config.gap, time_column=config.time_column
+            )
+            cv = TimeSeriesSplit(n_splits=config.cv_folds)
+        else:
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=config.test_size, random_state=config.random_state
+            )
+            cv = config.cv_folds
+        if config.time_column in X.columns:
+            X_train = X_train.drop(columns=[config.time_column])
+            X_test = X_test.drop(columns=[config.time_column])
         
         # Scale features if requested
         if config.scale_features:
@@ -150,6 +379,7 @@ class PredictionModel:
             X_train_scaled = self.scaler.fit_transform(X_train)
             X_test_scaled = self.scaler.transform(X_test)
         else:
+            self.scaler = None
             X_train_scaled = X_train
             X_test_scaled = X_test
         
@@ -162,6 +392,9 @@ class PredictionModel:
         
         # Train model
         self.model.fit(X_train_scaled, y_train)
+        self.feature_columns = None
+        self.classes_ = getattr(self.model, 'classes_', None)
+        self.chunks_fitted = 1
         
         # Make predictions
         y_train_pred = self.model.predict(X_train_scaled)
@@ -175,13 +408,13 @@ class PredictionModel:
         cv_score = None
         if config.cross_validate:
             cv_scores = cross_val_score(self.model, X_train_scaled, y_train, 
-                                      cv=config.cv_folds, scoring='r2')
+                                      cv=cv, scoring='r2')
             cv_score = cv_scores.mean()
         
         # Feature importance
         feature_importance = None
         if hasattr(self.model, 'feature_importances_'):
-            feature_importance = dict(zip(X.columns, self.model.feature_importances_))
+            feature_importance = dict(zip(X_train.columns, self.model.feature_importances_))
         
         training_time = (datetime.now() - start_time).total_seconds()
         
@@ -201,10 +434,7 @@ class PredictionModel:
         if self.model is None:
             raise ValueError("Model not trained. Call train() first.")
         
-        if self.scaler is not None:
-            X_scaled = self.scaler.transform(X)
-        else:
-            X_scaled = X
+        X_scaled = self._model_input(X)
         
         return self.model.predict(X_scaled)
     
@@ -216,7 +446,10 @@ class PredictionModel:
         model_data = {
             'model': self.model,
             'scaler': self.scaler,
-            'model_type': self.model_type
+            'model_type': self.model_type,
+            'feature_columns': self.feature_columns,
+            'classes': self.classes_,
+            'chunks_fitted': self.chunks_fitted
         }
         
         joblib.dump(model_data, filepath)
@@ -224,19 +457,30 @@ class PredictionModel:
     
     def load_model(self, filepath: str):
         """Load model from file"""
-        model_data = joblib.load(filepath)
+        self.restore(joblib.load(filepath))
+        self.logger.info(f"Model loaded from {filepath}")
+
+    def restore(self, model_data: Dict[str, Any]):
+        """Set the model from a dictionary written by save_model"""
         self.model = model_data['model']
         self.scaler = model_data['scaler']
         self.model_type = model_data['model_type']
-        self.logger.info(f"Model loaded from {filepath}")
+        self.feature_columns = model_data.get('feature_columns')
+        self.classes_ = model_data.get('classes')
+        self.chunks_fitted = model_data.get('chunks_fitted', 1)
 
-class ClassificationModel:
+class ClassificationModel(IncrementalTrainingMixin):
     """Classification model for signal generation"""
     
+    _classification = True
+    
     def __init__(self, model_type: str = 'random_forest'):
         self.model_type = model_type
         self.model = None
         self.scaler = None
+        self.feature_columns: Optional[List[str]] = None  # set by out-of-core training
+        self.classes_: Optional[np.ndarray] = None
+        self.chunks_fitted = 0
         self.logger = logging.getLogger(__name__)
         
         if not SKLEARN_AVAILABLE:
@@ -246,6 +490,7 @@ class ClassificationModel:
         """Create model instance"""
         models = {
             'logistic_regression': LogisticRegression(random_state=42),
+            'sgd': SGDClassifier(loss='log_loss', random_state=42),
             'random_forest': RandomForestClassifier(random_state=42),
             'gradient_boosting': GradientBoostingClassifier(random_state=42),
             'svc': SVC(random_state=42),
@@ -288,10 +533,20 @@ class ClassificationModel:
                 scale_features=True
             )
         
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=config.test_size, random_state=config.random_state, stratify=y
-        )
+        # Split data: by default the test rows are the most recent ones
+        if config.split_method == 'time':
+            X_train, X_test, y_train, y_test = time_ordered_split(
+                X, y, test_size=config.test_size, gap=config.gap, time_column=config.time_column
+            )
+            cv = TimeSeriesSplit(n_splits=config.cv_folds)
+        else:
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=config.test_size, random_state=config.random_state, stratify=y
+            )
+            cv = config.cv_folds
+        if config.time_column in X.columns:
+            X_train = X_train.drop(columns=[config.time_column])
+            X_test = X_test.drop(columns=[config.time_column])
         
         # Scale features if requested
         if config.scale_features:
@@ -299,6 +554,7 @@ class ClassificationModel:
             X_train_scaled = self.scaler.fit_transform(X_train)
             X_test_scaled = self.scaler.transform(X_test)
         else:
+            self.scaler = None
             X_train_scaled = X_train
             X_test_scaled = X_test
         
@@ -311,6 +567,9 @@ class ClassificationModel:
         
         # Train model
         self.model.fit(X_train_scaled, y_train)
+        self.feature_columns = None
+        self.classes_ = getattr(self.model, 'classes_', None)
+        self.chunks_fitted = 1
         
         # Make predictions
         y_train_pred = self.model.predict(X_train_scaled)
@@ -324,13 +583,13 @@ class ClassificationModel:
         cv_score = None
         if config.cross_validate:
             cv_scores = cross_val_score(self.model, X_train_scaled, y_train, 
-                                      cv=config.cv_folds, scoring='accuracy')
+                                      cv=cv, scoring='accuracy')
             cv_score = cv_scores.mean()
         
         # Feature importance
         feature_importance = None
         if hasattr(self.model, 'feature_importances_'):
-            feature_importance = dict(zip(X.columns, self.model.feature_importances_))
+            feature_importance = dict(zip(X_train.columns, self.model.feature_importances_))
         
         training_time = (datetime.now() - start_time).total_seconds()
         
@@ -350,10 +609,7 @@ class ClassificationModel:
         if self.model is None:
             raise ValueError("Model not trained. Call train() first.")
         
-        if self.scaler is not None:
-            X_scaled = self.scaler.transform(X)
-        else:
-            X_scaled = X
+        X_scaled = self._model_input(X)
         
         return self.model.predict(X_scaled)
     
@@ -362,10 +618,7 @@ class ClassificationModel:
         if self.model is None:
             raise ValueError("Model not trained. Call train() first.")
         
-        if self.scaler is not None:
-            X_scaled = self.scaler.transform(X)
-        else:
-            X_scaled = X
+        X_scaled = self._model_input(X)
         
         if hasattr(self.model, 'predict_proba'):
             return self.model.predict_proba(X_scaled)
@@ -380,7 +633,10 @@ class ClassificationModel:
         model_data = {
             'model': self.model,
             'scaler': self.scaler,
-            'model_type': self.model_type
+            'model_type': self.model_type,
+            'feature_columns': self.feature_columns,
+            'classes': self.classes_,
+            'chunks_fitted': self.chunks_fitted
         }
         
         joblib.dump(model_data, filepath)
@@ -388,11 +644,17 @@ class ClassificationModel:
     
     def load_model(self, filepath: str):
         """Load model from file"""
-        model_data = joblib.load(filepath)
+        self.restore(joblib.load(filepath))
+        self.logger.info(f"Model loaded from {filepath}")
+
+    def restore(self, model_data: Dict[str, Any]):
+        """Set the model from a dictionary written by save_model"""
         self.model = model_data['model']
         self.scaler = model_data['scaler']
         self.model_type = model_data['model_type']
-        self.logger.info(f"Model loaded from {filepath}")
+        self.feature_columns = model_data.get('feature_columns')
+        self.classes_ = model_data.get('classes')
+        self.chunks_fitted = model_data.get('chunks_fitted', 1)
 
 class MLModelManager:
     """Manager for multiple ML models"""
@@ -400,6 +662,8 @@ class MLModelManager:
     def __init__(self):
         self.models: Dict[str, Union[PredictionModel, ClassificationModel]] = {}
         self.results: Dict[str, ModelResult] = {}
+        self._inference_service = None
+        self._inference_kwargs: Dict[str, Any] = {}
         self.logger = logging.getLogger(__name__)
     
     def add_model(self, name: str, model: Union[PredictionModel, ClassificationModel]):
@@ -420,6 +684,25 @@ class MLModelManager:
         self.logger.info(f"Trained model {name}: {result.training_score:.4f}")
         return result
     
+    def search_models(self, X: pd.DataFrame, targets: Union[pd.Series, pd.DataFrame, Dict[str, pd.Series]],
+                      param_grid: Dict[str, Dict[str, List[Any]]], task: str = 'regression',
+                      horizons: Dict[str, int] = None, **search_kwargs):
+        """Search a model zoo in parallel and add the best model of each target
+
+        See ModelSearch for the walk-forward folds, per-target horizon
+        embargo, successive halving and checkpointing; ``search_kwargs`` are
+        passed to it. Returns the SearchResult with the full leaderboard.
+        """
+        from .model_search import ModelSearch
+
+        with ModelSearch(task=task, **search_kwargs) as search:
+            result = search.prepare(X, targets, horizons=horizons).run(param_grid)
+
+        for name, model in result.models.items():
+            self.add_model(name, model)
+            self.results[name] = result.results[name]
+        return result
+    
     def predict(self, name: str, X: pd.DataFrame) -> np.ndarray:
         """Make predictions with a specific model"""
         if name not in self.models:
@@ -427,6 +710,21 @@ class MLModelManager:
         
         return self.models[name].predict(X)
     
+    def get_inference_service(self, **service_kwargs):
+        """Shared micro-batching InferenceService over this manager's models, created on first use
+
+        Keyword arguments configure the service when it is created; later
+        calls must pass none or the same ones, since the service is shared.
+        """
+        if self._inference_service is None:
+            from .inference import InferenceService
+            self._inference_service = InferenceService(self, **service_kwargs)
+            self._inference_kwargs = service_kwargs
+        elif service_kwargs and service_kwargs != self._inference_kwargs:
+            raise ValueError(f"Inference service already created with {self._inference_kwargs}, "
+                             f"cannot reconfigure it with {service_kwargs}")
+        return self._inference_service
+    
     def get_best_model(self, metric: str = 'validation_score') -> Tuple[str, ModelResult]:
         """Get the best performing model"""
         if not self.results:
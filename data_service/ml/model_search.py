@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+Parallel Model Search
+Trains a zoo of (model type x hyperparameters x target horizon) candidates on
+time-ordered walk-forward folds. The feature matrix and targets are written
+once to .npy files that worker processes open as read-only memory maps, so
+every worker shares the same pages instead of receiving a copy. Each worker
+keeps the scaler and scaled features of the folds it has seen, and successive
+halving scores all candidates on the most recent part of every training window
+first and keeps only the best for the larger budgets. Each target's training
+rows end its horizon before the test window, so no training label is built
+from prices inside it. Every finished
+(candidate, fold, budget) evaluation is appended to a checkpoint file, so an
+interrupted search resumes where it stopped.
+"""
+
+import hashlib
+import itertools
+import json
+import logging
+import math
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .ml_models import PredictionModel, ClassificationModel, ModelResult, SKLEARN_AVAILABLE
+from .out_of_core import frame_times
+from ..factors.walk_forward import walk_forward_splits
+from ..strategies.result_cache import frame_fingerprint
+
+if SKLEARN_AVAILABLE:
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.metrics import r2_score, accuracy_score
+
+# Search data of the current process: set directly, or memory-mapped in workers
+_DATA: Dict[str, Any] = {}
+_FOLD_CACHE: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+_FOLD_CACHE_SIZE = 8
+
+@dataclass
+class SearchCandidate:
+    """One model configuration of the search"""
+    model_type: str
+    parameters: Dict[str, Any]
+    target: str
+
+    @property
+    def key(self) -> str:
+        payload = json.dumps([self.model_type, self.parameters, self.target], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+@dataclass
+class SearchResult:
+    """Outcome of a model search"""
+    leaderboard: pd.DataFrame          # One row per candidate at the last budget it reached
+    history: pd.DataFrame              # Mean fold score of every candidate at every budget
+    best: Dict[str, SearchCandidate]   # Best candidate per target
+    models: Dict[str, Union[PredictionModel, ClassificationModel]] = field(default_factory=dict)
+    results: Dict[str, ModelResult] = field(default_factory=dict)
+
+def expand_grid(param_grid: Dict[str, Dict[str, List[Any]]], targets: List[str]) -> List[SearchCandidate]:
+    """Every model type x parameter combination x target"""
+    candidates = []
+    for target in targets:
+        for model_type, grid in param_grid.items():
+            names = sorted(grid or {})
+            for values in itertools.product(*(grid[name] for name in names)):
+                candidates.append(SearchCandidate(model_type, dict(zip(names, values)), target))
+    return candidates
+
+def _attach_search_data(directory: str, token: str):
+    """Process pool initializer: memory-map the search arrays"""
+    _DATA.clear()
+    for name in ('features', 'targets'):
+        _DATA[name] = np.load(Path(directory) / f"{name}.npy", mmap_mode='r')
+    _DATA['token'] = token
+    _FOLD_CACHE.clear()
+
+def _fold_data(fold: int, fraction: float, train: Tuple[int, int], test: Tuple[int, int],
+               scale_features: bool) -> Dict[str, Any]:
+    """Fitted scaler and scaled features of a fold's training budget, cached per process"""
+    key = (_DATA['token'], train, test, fraction)
+    cached = _FOLD_CACHE.get(key)
+    if cached is not None:
+        _FOLD_CACHE.move_to_end(key)
+        return cached
+
+    train_start, train_stop = train
+    # A smaller budget keeps the most recent rows of the training window
+    train_start = max(train_start, train_stop - max(int(round((train_stop - train_start) * fraction)), 1))
+    X_train = np.asarray(_DATA['features'][train_start:train_stop], dtype=np.float64)
+    X_test = np.asarray(_DATA['features'][test[0]:test[1]], dtype=np.float64)
+    scaler = None
+    if scale_features:
+        scaler = StandardScaler()
+        X_train = scaler.fit_transform(X_train)
+        X_test = scaler.transform(X_test)
+    prepared = {'train': (train_start, train_stop), 'X_train': X_train, 'X_test': X_test, 'scaler': scaler}
+    _FOLD_CACHE[key] = prepared
+    while len(_FOLD_CACHE) > _FOLD_CACHE_SIZE:
+        _FOLD_CACHE.popitem(last=False)
+    return prepared
+
+def _evaluate_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Fit one candidate on one fold's training budget and score it on the fold's test rows"""
+    start_time = datetime.now()
+    prepared = _fold_data(task['fold'], task['fraction'], task['train'], task['test'], task['scale_features'])
+    targets = _DATA['targets']
+    train_start, train_stop = prepared['train']
+    y_train = np.asarray(targets[train_start:train_stop, task['target_index']])
+    y_test = np.asarray(targets[task['test'][0]:task['test'][1], task['target_index']])
+    # Forward-looking targets are undefined for the last rows of their horizon
+    train_rows, test_rows = np.isfinite(y_train), np.isfinite(y_test)
+
+    classification = task['task'] == 'classification'
+    y_train, y_test = y_train[train_rows], y_test[test_rows]
+    if classification:
+        y_train, y_test = y_train.astype(int), y_test.astype(int)
+    factory = ClassificationModel if classification else PredictionModel
+    model = factory(task['model_type'])._create_model(task['model_type'])
+    if task['parameters']:
+        model.set_params(**task['parameters'])
+    model.fit(prepared['X_train'][train_rows], y_train)
+
+    metric = accuracy_score if classification else r2_score
+    train_score = metric(y_train, model.predict(prepared['X_train'][train_rows]))
+    score = (metric(y_test, model.predict(prepared['X_test'][test_rows]))
+             if test_rows.any() else float('nan'))
+    return {
+        'key': task['key'],
+        'score': float(score),
+        'train_score': float(train_score),
+        'fit_time': (datetime.now() - start_time).total_seconds()
+    }
+
+class ModelSearch:
+    """Parallel walk-forward model zoo training with successive halving and checkpoints"""
+
+    CHECKPOINT_FILE = 'model_search.jsonl'
+
+    def __init__(self, task: str = 'regression',
+                 n_jobs: int = None,
+                 n_splits: int = 3,
+                 gap: int = 0,
+                 halving: bool = True,
+                 eta: int = 3,
+                 min_fraction: float = None,
+                 scale_features: bool = True,
+                 checkpoint_dir: str = None,
+                 work_dir: str = None):
+        if task not in ('regression', 'classification'):
+            raise ValueError(f"Unknown task: {task}")
+        self.task = task
+        self.n_jobs = n_jobs if n_jobs is not None else (os.cpu_count() or 1)
+        self.n_splits = n_splits
+        self.gap = gap
+        self.halving = halving
+        self.eta = eta
+        self.min_fraction = min_fraction
+        self.scale_features = scale_features
+        self.checkpoint_dir = Path(checkpoint_dir) if checkpoint_dir else None
+        self.logger = logging.getLogger(__name__)
+
+        self._owns_work_dir = work_dir is None
+        self.work_dir = Path(work_dir) if work_dir else None
+        self.feature_columns: List[str] = []
+        self.target_names: List[str] = []
+        self.horizons: Dict[str, int] = {}
+        # Row ranges of each target's (train, test) folds
+        self.folds: Dict[str, List[Tuple[Tuple[int, int], Tuple[int, int]]]] = {}
+        self._token: Optional[str] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def prepare(self, X: pd.DataFrame, targets: Union[pd.Series, pd.DataFrame, Dict[str, pd.Series]],
+                time_column: str = None, horizons: Dict[str, int] = None) -> 'ModelSearch':
+        """Write features and targets (one column per horizon) as memory-mappable arrays
+
+        Rows are put in time order and the walk-forward folds are cut between
+        distinct timestamps. The test windows are shared by all targets, but a
+        target's training rows stop its horizon plus ``gap`` timestamps before
+        each test window: a label ``h`` steps ahead is only known ``h`` steps
+        later. Horizons not given in ``horizons`` are inferred as the number of
+        trailing timestamps where the target is undefined.
+        """
+        self.close()
+        if isinstance(targets, pd.Series):
+            targets = targets.to_frame(targets.name or 'target')
+        elif isinstance(targets, dict):
+            targets = pd.DataFrame(targets)
+        targets = targets.reindex(X.index)
+
+        times = frame_times(X, time_column)
+        order = np.argsort(times, kind='stable')
+        if time_column is not None and time_column in X.columns:
+            X = X.drop(columns=[time_column])
+        self.feature_columns = list(X.columns)
+        self.target_names = [str(name) for name in targets.columns]
+        features = np.ascontiguousarray(X.to_numpy(dtype=np.float64)[order])
+        target_values = np.ascontiguousarray(targets.to_numpy(dtype=np.float64)[order])
+        times = times[order]
+
+        unique_times = np.unique(times)
+        horizons = horizons or {}
+        self.horizons = {}
+        for j, name in enumerate(self.target_names):
+            if name in horizons:
+                self.horizons[name] = int(horizons[name])
+                continue
+            defined = np.isfinite(target_values[:, j])
+            last = times[defined].max() if defined.any() else unique_times[-1]
+            self.horizons[name] = int(len(unique_times) - np.searchsorted(unique_times, last, side='right'))
+
+        digest = hashlib.sha256((frame_fingerprint(X) + frame_fingerprint(targets)).encode())
+        digest.update(repr((self.n_splits, self.gap, self.scale_features, sorted(self.horizons.items()))).encode())
+        self._token = digest.hexdigest()[:16]
+
+        if self.work_dir is None:
+            self.work_dir = Path(tempfile.mkdtemp(prefix='model_search_'))
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        np.save(self.work_dir / 'features.npy', features)
+        np.save(self.work_dir / 'targets.npy', target_values)
+        _attach_search_data(str(self.work_dir), self._token)
+
+        splits = walk_forward_splits(len(unique_times), self.n_splits, expanding=True, embargo=self.gap)
+        self.folds = {}
+        for name in self.target_names:
+            folds = []
+            for train, test in splits:
+                train = train[:max(len(train) - self.horizons[name], 0)]
+                if not len(train):
+                    continue
+                folds.append((
+                    (int(np.searchsorted(times, unique_times[train[0]], side='left')),
+                     int(np.searchsorted(times, unique_times[train[-1]], side='right'))),
+                    (int(np.searchsorted(times, unique_times[test[0]], side='left')),
+                     int(np.searchsorted(times, unique_times[test[-1]], side='right')))
+                ))
+            if not folds:
+                raise ValueError(f"Target {name} has a horizon of {self.horizons[name]} steps, "
+                                 f"longer than every training window")
+            self.folds[name] = folds
+        self.logger.info(f"Prepared {len(features)} rows, {len(self.feature_columns)} features, "
+                         f"{len(self.target_names)} targets, {len(splits)} folds, horizons {self.horizons}")
+        return self
+
+    def budgets(self, n_candidates: int) -> List[float]:
+        """Training-window fractions of the successive-halving rungs, ending at the full window"""
+        if not self.halving or n_candidates <= 1:
+            return [1.0]
+        rungs = 1 + int(math.floor(math.log(n_candidates, self.eta) + 1e-9))
+        fractions = [float(self.eta) ** -(rungs - 1 - rung) for rung in range(rungs)]
+        if self.min_fraction is not None:
+            fractions = sorted({max(fraction, self.min_fraction) for fraction in fractions})
+        return fractions
+
+    def run(self, param_grid: Dict[str, Dict[str, List[Any]]], targets: List[str] = None,
+            refit: bool = True) -> SearchResult:
+        """Evaluate the grid and return the leaderboard and the best model per target
+
+        Args:
+            param_grid: {model_type: {parameter: [values]}}, model types as
+                accepted by PredictionModel / ClassificationModel
+            targets: Target columns to search (default: all prepared targets)
+            refit: Fit the best candidate of each target on all rows
+        """
+        if self._token is None:
+            raise ValueError("No data prepared; call prepare() first")
+        targets = [str(t) for t in targets] if targets else self.target_names
+        candidates = expand_grid(param_grid, targets)
+        if not candidates:
+            raise ValueError("The parameter grid is empty")
+
+        completed = self._load_checkpoint()
+        alive = candidates
+        history = []
+        budgets = self.budgets(max(sum(c.target == t for c in candidates) for t in targets))
+        for rung, fraction in enumerate(budgets):
+            tasks = self._tasks(alive, fraction)
+            pending = [task for task in tasks if task['key'] not in completed]
+            self.logger.info(f"Rung {rung}: {len(alive)} candidates at {fraction:.3f} of the training window, "
+                             f"{len(tasks) - len(pending)} evaluations restored from checkpoint")
+            for outcome in self._execute(pending):
+                completed[outcome['key']] = outcome
+                self._append_checkpoint(outcome)
+
+            scores = {}
+            for candidate in alive:
+                outcomes = [completed[self._task_key(candidate, fold, fraction)]
+                            for fold in range(len(self.folds[candidate.target]))]
+                fold_scores = np.array([o['score'] for o in outcomes], dtype=float)
+                scores[candidate.key] = float(np.nanmean(fold_scores)) if np.isfinite(fold_scores).any() else -np.inf
+                history.append({
+                    'candidate': candidate.key, 'target': candidate.target, 'model_type': candidate.model_type,
+                    'parameters': candidate.parameters, 'rung': rung, 'fraction': fraction,
+                    'score': scores[candidate.key],
+                    'score_std': float(np.nanstd(fold_scores)) if np.isfinite(fold_scores).any() else np.nan,
+                    'train_score': float(np.nanmean([o['train_score'] for o in outcomes])),
+                    'fit_time': float(sum(o['fit_time'] for o in outcomes))
+                })
+
+            if rung < len(budgets) - 1:
+                # Halve within each target: scores of different horizons are not comparable
+                survivors = []
+                for target in targets:
+                    group = sorted((c for c in alive if c.target == target), key=lambda c: scores[c.key],
+                                   reverse=True)
+                    survivors.extend(group[:max(1, math.ceil(len(group) / self.eta))])
+                alive = survivors
+
+        history_frame = pd.DataFrame(history)
+        leaderboard = (history_frame.sort_values('rung').groupby('candidate').tail(1)
+                       .sort_values(['target', 'rung', 'score'], ascending=[True, False, False])
+                       .reset_index(drop=True))
+        lookup = {candidate.key: candidate for candidate in candidates}
+        best = {target: lookup[leaderboard.loc[leaderboard['target'] == target, 'candidate'].iloc[0]]
+                for target in targets}
+
+        result = SearchResult(leaderboard=leaderboard, history=history_frame, best=best)
+        if refit:
+            for target, candidate in best.items():
+                name, model, model_result = self._refit(candidate, leaderboard)
+                result.models[name] = model
+                result.results[name] = model_result
+        return result
+
+    def _task_key(self, candidate: SearchCandidate, fold: int, fraction: float) -> str:
+        return f"{self._token}|{candidate.key}|{fold}|{fraction:.6f}"
+
+    def _tasks(self, candidates: List[SearchCandidate], fraction: float) -> List[Dict[str, Any]]:
+        # Fold-major order, so consecutive tasks in a worker reuse its cached fold
+        tasks = []
+        for fold in range(max(len(folds) for folds in self.folds.values())):
+            for candidate in candidates:
+                folds = self.folds[candidate.target]
+                if fold >= len(folds):
+                    continue
+                train, test = folds[fold]
+                tasks.append({
+                    'key': self._task_key(candidate, fold, fraction),
+                    'task': self.task,
+                    'model_type': candidate.model_type,
+                    'parameters': candidate.parameters,
+                    'target_index': self.target_names.index(candidate.target),
+                    'fold': fold,
+                    'fraction': fraction,
+                    'train': train,
+                    'test': test,
+                    'scale_features': self.scale_features
+                })
+        return tasks
+
+    def _execute(self, tasks: List[Dict[str, Any]]):
+        """Yield task outcomes as they finish"""
+        if self.n_jobs > 1 and len(tasks) > 1:
+            pool = self._get_pool()
+            futures = [pool.submit(_evaluate_task, task) for task in tasks]
+            for future in as_completed(futures):
+                yield future.result()
+        else:
+            if _DATA.get('token') != self._token:
+                _attach_search_data(str(self.work_dir), self._token)
+            for task in tasks:
+                yield _evaluate_task(task)
+
+    def _refit(self, candidate: SearchCandidate, leaderboard: pd.DataFrame):
+        """Best candidate fitted on every row with a defined target, as a model object"""
+        start_time = datetime.now()
+        classification = self.task == 'classification'
+        factory = ClassificationModel if classification else PredictionModel
+        wrapper = factory(candidate.model_type)
+        features = np.load(self.work_dir / 'features.npy', mmap_mode='r')
+        y = np.load(self.work_dir / 'targets.npy', mmap_mode='r')[:, self.target_names.index(candidate.target)]
+        rows = np.isfinite(y)
+        X = np.asarray(features[rows], dtype=np.float64)
+        y = np.asarray(y[rows])
+        if classification:
+            y = y.astype(int)
+
+        wrapper.scaler = StandardScaler().fit(X) if self.scale_features else None
+        X_scaled = wrapper.scaler.transform(X) if wrapper.scaler is not None else X
+        wrapper.model = wrapper._create_model(candidate.model_type)
+        if candidate.parameters:
+            wrapper.model.set_params(**candidate.parameters)
+        wrapper.model.fit(X_scaled, y)
+        wrapper.feature_columns = list(self.feature_columns)
+        wrapper.classes_ = getattr(wrapper.model, 'classes_', None)
+        wrapper.chunks_fitted = 1
+
+        metric = accuracy_score if classification else r2_score
+        row = leaderboard[leaderboard['candidate'] == candidate.key].iloc[0]
+        feature_importance = None
+        if hasattr(wrapper.model, 'feature_importances_'):
+            feature_importance = dict(zip(self.feature_columns, wrapper.model.feature_importances_))
+        suffix = 'classifier' if classification else 'regressor'
+        name = f"{candidate.target}__{candidate.model_type}_{suffix}"
+        return name, wrapper, ModelResult(
+            model_name=f"{candidate.model_type}_{suffix}",
+            model_type=self.task,
+            training_score=float(metric(y, wrapper.model.predict(X_scaled))),
+            validation_score=float(row['score']),
+            feature_importance=feature_importance,
+            training_time=(datetime.now() - start_time).total_seconds()
+        )
+
+    def _load_checkpoint(self) -> Dict[str, Dict[str, Any]]:
+        """Finished evaluations of this data set from earlier runs"""
+        completed = {}
+        if self.checkpoint_dir is None:
+            return completed
+        path = self.checkpoint_dir / self.CHECKPOINT_FILE
+        if not path.exists():
+            return completed
+        with open(path) as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A run killed mid-write leaves a partial last line
+                    continue
+                if record.get('key', '').startswith(f"{self._token}|"):
+                    completed[record['key']] = record
+        return completed
+
+    def _append_checkpoint(self, outcome: Dict[str, Any]):
+        if self.checkpoint_dir is None:
+            return
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.checkpoint_dir / self.CHECKPOINT_FILE, 'a') as handle:
+            handle.write(json.dumps(outcome) + "\n")
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Worker pool with the search arrays memory-mapped, kept for repeated runs"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.n_jobs, initializer=_attach_search_data,
+                                             initargs=(str(self.work_dir), self._token))
+        return self._pool
+
+    def close(self):
+        """Shut the worker pool down and remove the search arrays"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        if _DATA.get('token') == self._token:
+            _DATA.clear()
+            _FOLD_CACHE.clear()
+        if self._owns_work_dir and self.work_dir is not None:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+            self.work_dir = None
+        self._token = None
+
+    def __enter__(self) -> 'ModelSearch':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
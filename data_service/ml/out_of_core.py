@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Out-of-core Training Data
+Feature matrices that live on disk and are read in row chunks, so models can
+be trained on more rows than fit in memory. Rows are stored in time order and
+every source exposes its timestamps, which is what time-ordered train /
+validation splits are computed from; a split never puts a later timestamp in
+training than in validation.
+"""
+
+import json
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple, Iterator, Iterable, Union
+import logging
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.dataset as pa_dataset
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+Chunk = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+def frame_times(frame: Union[pd.DataFrame, pd.Series], time_column: str = None) -> np.ndarray:
+    """Row timestamps as int64 nanoseconds
+
+    Taken from ``time_column`` if given, else a DatetimeIndex or the first
+    datetime level of a MultiIndex (panel features indexed by date and
+    symbol); frames without any time information use the row position.
+    """
+    if time_column is not None and isinstance(frame, pd.DataFrame) and time_column in frame.columns:
+        values = frame[time_column]
+    elif isinstance(frame.index, pd.DatetimeIndex):
+        values = frame.index
+    elif isinstance(frame.index, pd.MultiIndex):
+        values = None
+        for level in range(frame.index.nlevels):
+            level_values = frame.index.get_level_values(level)
+            if isinstance(level_values, pd.DatetimeIndex):
+                values = level_values
+                break
+        if values is None:
+            return np.arange(len(frame), dtype=np.int64)
+    else:
+        return np.arange(len(frame), dtype=np.int64)
+    return pd.DatetimeIndex(values).as_unit('ns').asi8.astype(np.int64, copy=False)
+
+def time_split_points(times: np.ndarray, validation_size: float = 0.2, gap: int = 0) -> Tuple[int, int]:
+    """Row positions (train_stop, validation_start) of a time-ordered split
+
+    ``times`` must be non-decreasing. The cut is made between distinct
+    timestamps so all rows of one date (every symbol of a panel) land on the
+    same side, and ``gap`` distinct timestamps before the validation period
+    are left out of training to keep overlapping labels from leaking.
+    """
+    times = np.asarray(times)
+    if len(times) == 0:
+        raise ValueError("Cannot split an empty data set")
+    if np.any(times[1:] < times[:-1]):
+        raise ValueError("Rows must be in time order for a time-ordered split")
+
+    unique_times = np.unique(times)
+    if len(unique_times) < 2:
+        raise ValueError("A time-ordered split needs at least two distinct timestamps")
+    cut = int(round(len(unique_times) * (1 - validation_size)))
+    cut = min(max(cut, 1), len(unique_times) - 1)
+    validation_start = int(np.searchsorted(times, unique_times[cut], side='left'))
+    train_stop = int(np.searchsorted(times, unique_times[max(cut - gap, 0)], side='left'))
+    if train_stop == 0:
+        raise ValueError(f"gap={gap} leaves no training rows")
+    return train_stop, validation_start
+
+def time_ordered_split(X: pd.DataFrame, y: pd.Series, test_size: float = 0.2, gap: int = 0,
+                       time_column: str = None) -> Tuple[pd.DataFrame, pd.DataFrame, pd.Series, pd.Series]:
+    """In-memory counterpart of train_test_split that trains on the past and tests on the future"""
+    times = frame_times(X, time_column)
+    order = np.argsort(times, kind='stable')
+    if np.any(order != np.arange(len(order))):
+        X, y, times = X.iloc[order], y.iloc[order], times[order]
+    train_stop, test_start = time_split_points(times, test_size, gap)
+    return X.iloc[:train_stop], X.iloc[test_start:], y.iloc[:train_stop], y.iloc[test_start:]
+
+class FeatureChunkSource(ABC):
+    """Time-ordered feature rows readable in chunks"""
+
+    feature_columns: List[str]
+    target_column: str
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of rows"""
+        pass
+
+    @property
+    @abstractmethod
+    def times(self) -> np.ndarray:
+        """int64 nanosecond timestamp of every row"""
+        pass
+
+    @abstractmethod
+    def iter_chunks(self, chunk_size: int = 100_000, start: int = 0, stop: int = None) -> Iterator[Chunk]:
+        """(X, y, times) arrays for consecutive row ranges of [start, stop)"""
+        pass
+
+class MemmapFeatureStore(FeatureChunkSource):
+    """Features, targets and timestamps in flat binary files read through memory maps
+
+    ``features.bin`` holds a row-major (rows x features) matrix, ``target.bin``
+    and ``times.bin`` one value per row, and ``meta.json`` the column names,
+    dtypes and row count. Rows can be appended, e.g. one day at a time, and
+    only the chunk being read is paged into memory.
+    """
+
+    META_FILE = 'meta.json'
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with open(self.path / self.META_FILE) as handle:
+            self.meta: Dict[str, Any] = json.load(handle)
+        self.feature_columns = self.meta['feature_columns']
+        self.target_column = self.meta['target_column']
+        self.time_column = self.meta.get('time_column')
+        self.dtype = np.dtype(self.meta['dtype'])
+        self.target_dtype = np.dtype(self.meta['target_dtype'])
+
+    @classmethod
+    def create(cls, path: Union[str, Path], feature_columns: List[str], target_column: str,
+               time_column: str = None, dtype: str = 'float32',
+               target_dtype: str = 'float64') -> 'MemmapFeatureStore':
+        """Empty store at ``path`` (any existing store there is replaced)"""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in ('features.bin', 'target.bin', 'times.bin'):
+            (path / name).write_bytes(b'')
+        meta = {
+            'feature_columns': list(feature_columns),
+            'target_column': target_column,
+            'time_column': time_column,
+            'dtype': np.dtype(dtype).str,
+            'target_dtype': np.dtype(target_dtype).str,
+            'rows': 0
+        }
+        with open(path / cls.META_FILE, 'w') as handle:
+            json.dump(meta, handle)
+        return cls(path)
+
+    @classmethod
+    def write(cls, path: Union[str, Path], frames: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+              feature_columns: List[str], target_column: str, time_column: str = None,
+              dtype: str = 'float32', target_dtype: str = 'float64') -> 'MemmapFeatureStore':
+        """Store a frame, or an iterable of time-ordered frames written one at a time"""
+        store = cls.create(path, feature_columns, target_column, time_column, dtype, target_dtype)
+        if isinstance(frames, pd.DataFrame):
+            frames = [frames]
+        for frame in frames:
+            store.append(frame)
+        return store
+
+    def append(self, frame: pd.DataFrame) -> int:
+        """Append rows at the end; they must not be older than the stored rows"""
+        if frame.empty:
+            return 0
+        times = frame_times(frame, self.time_column)
+        order = np.argsort(times, kind='stable')
+        if np.any(order != np.arange(len(order))):
+            frame, times = frame.iloc[order], times[order]
+        rows = len(self)
+        if rows and times[0] < self.times[rows - 1]:
+            raise ValueError("Appended rows are older than the last stored row")
+
+        features = np.ascontiguousarray(frame[self.feature_columns].to_numpy(dtype=self.dtype))
+        target = np.ascontiguousarray(frame[self.target_column].to_numpy(dtype=self.target_dtype))
+        for name, values in (('features.bin', features), ('target.bin', target), ('times.bin', times)):
+            with open(self.path / name, 'ab') as handle:
+                handle.write(values.tobytes())
+
+        self.meta['rows'] = rows + len(frame)
+        with open(self.path / self.META_FILE, 'w') as handle:
+            json.dump(self.meta, handle)
+        return len(frame)
+
+    def __len__(self) -> int:
+        return int(self.meta['rows'])
+
+    def _memmap(self, name: str, dtype: np.dtype, shape: Tuple[int, ...]) -> np.ndarray:
+        if not len(self):
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self.path / name, dtype=dtype, mode='r', shape=shape)
+
+    @property
+    def features(self) -> np.ndarray:
+        return self._memmap('features.bin', self.dtype, (len(self), len(self.feature_columns)))
+
+    @property
+    def target(self) -> np.ndarray:
+        return self._memmap('target.bin', self.target_dtype, (len(self),))
+
+    @property
+    def times(self) -> np.ndarray:
+        return self._memmap('times.bin', np.dtype(np.int64), (len(self),))
+
+    def iter_chunks(self, chunk_size: int = 100_000, start: int = 0, stop: int = None) -> Iterator[Chunk]:
+        stop = len(self) if stop is None else min(stop, len(self))
+        features, target, times = self.features, self.target, self.times
+        for begin in range(start, stop, chunk_size):
+            end = min(begin + chunk_size, stop)
+            yield (np.array(features[begin:end]), np.array(target[begin:end]), np.array(times[begin:end]))
+
+class ParquetFeatureSource(FeatureChunkSource):
+    """Time-ordered Parquet file or directory read in record batches (requires pyarrow)
+
+    Only the feature, target and time columns are read, one batch at a time.
+    """
+
+    def __init__(self, path: Union[str, Path], feature_columns: List[str], target_column: str,
+                 time_column: str):
+        if not PYARROW_AVAILABLE:
+            raise ImportError("pyarrow is required for Parquet feature sources. Install with: pip install pyarrow")
+        self.path = Path(path)
+        self.feature_columns = list(feature_columns)
+        self.target_column = target_column
+        self.time_column = time_column
+        self.dataset = pa_dataset.dataset(str(self.path), format='parquet')
+        self._times: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def times(self) -> np.ndarray:
+        if self._times is None:
+            column = self.dataset.to_table(columns=[self.time_column]).column(0).to_pandas()
+            self._times = frame_times(pd.DataFrame({self.time_column: column}), self.time_column)
+        return self._times
+
+    def iter_chunks(self, chunk_size: int = 100_000, start: int = 0, stop: int = None) -> Iterator[Chunk]:
+        stop = len(self) if stop is None else min(stop, len(self))
+        columns = self.feature_columns + [self.target_column, self.time_column]
+        offset = 0
+        for batch in self.dataset.to_batches(columns=columns, batch_size=chunk_size):
+            batch_start, offset = offset, offset + batch.num_rows
+            if offset <= start:
+                continue
+            if batch_start >= stop:
+                break
+            frame = batch.to_pandas().iloc[max(start - batch_start, 0):stop - batch_start]
+            yield (frame[self.feature_columns].to_numpy(dtype=np.float64),
+                   frame[self.target_column].to_numpy(),
+                   frame_times(frame, self.time_column))
+
+class ArrayFeatureSource(FeatureChunkSource):
+    """In-memory frame behind the chunk interface, for incremental updates from a DataFrame"""
+
+    def __init__(self, X: pd.DataFrame, y: pd.Series, time_column: str = None):
+        times = frame_times(X, time_column)
+        order = np.argsort(times, kind='stable')
+        self.feature_columns = [c for c in X.columns if c != time_column]
+        self.target_column = y.name
+        self._features = X[self.feature_columns].to_numpy(dtype=np.float64)[order]
+        self._target = y.to_numpy()[order]
+        self._times = times[order]
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    @property
+    def times(self) -> np.ndarray:
+        return self._times
+
+    def iter_chunks(self, chunk_size: int = 100_000, start: int = 0, stop: int = None) -> Iterator[Chunk]:
+        stop = len(self) if stop is None else min(stop, len(self))
+        for begin in range(start, stop, chunk_size):
+            end = min(begin + chunk_size, stop)
+            yield self._features[begin:end], self._target[begin:end], self._times[begin:end]
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Panel Feature Engineering
+Builds the FeatureEngineer feature set for many symbols in one pass. Each input
+field is pivoted once to a (dates x symbols) matrix, every feature is computed
+as a 2-D kernel over all symbols at the same time, and results are written into
+a single output matrix that is allocated up front.
+"""
+
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Callable, Tuple, Union
+import logging
+
+from . import indicators
+
+logger = logging.getLogger(__name__)
+
+PanelInput = Union[pd.DataFrame, Dict[str, pd.DataFrame]]
+FeatureFunc = Callable[['PanelWorkspace'], Union[pd.DataFrame, np.ndarray]]
+
+DEFAULT_ROLLING_WINDOWS = [5, 10, 20, 50]
+
+class PanelWorkspace:
+    """Wide (dates x symbols) input fields plus read access to computed features"""
+
+    def __init__(self, fields: Dict[str, pd.DataFrame], output: np.ndarray,
+                 column_positions: Dict[str, int]):
+        self.fields = fields
+        self.dates = next(iter(fields.values())).index
+        self.symbols = next(iter(fields.values())).columns
+        self.output = output
+        self.column_positions = column_positions
+        self._returns = None
+
+    def field(self, name: str) -> pd.DataFrame:
+        """Input field as a wide frame"""
+        return self.fields[name]
+
+    def feature(self, name: str) -> pd.DataFrame:
+        """Previously computed feature (or input field) as a wide frame"""
+        if name in self.fields:
+            return self.fields[name]
+        block = self._column_block(self.column_positions[name])
+        return pd.DataFrame(block.T, index=self.dates, columns=self.symbols)
+
+    @property
+    def returns(self) -> pd.DataFrame:
+        """Close-to-close returns, computed once"""
+        if self._returns is None:
+            self._returns = self.fields['close'].pct_change()
+        return self._returns
+
+    def nan(self) -> np.ndarray:
+        """All-NaN feature, used where the single-symbol path returns an empty Series"""
+        return np.full((len(self.dates), len(self.symbols)), np.nan)
+
+    def _column_block(self, position: int) -> np.ndarray:
+        """(symbols x dates) view of one output column"""
+        return self.output[:, position].reshape(len(self.symbols), len(self.dates))
+
+    def write(self, position: int, values: Union[pd.DataFrame, np.ndarray]):
+        """Write a (dates x symbols) result into an output column"""
+        if isinstance(values, pd.DataFrame):
+            values = values.to_numpy(dtype=np.float64)
+        self._column_block(position)[:] = values.T
+
+def to_wide_fields(panel: PanelInput) -> Tuple[Dict[str, pd.DataFrame], pd.Index]:
+    """Pivot panel input to wide (dates x symbols) frames per field
+
+    Accepts either a long frame indexed by a (symbol, date) MultiIndex or a dict
+    of wide frames keyed by field name. Returns the wide fields and the long
+    (symbol, date) index of the rows present in the input.
+    """
+    if isinstance(panel, dict):
+        if not panel:
+            raise ValueError("Panel input has no fields")
+        dates = None
+        symbols = None
+        for frame in panel.values():
+            dates = frame.index if dates is None else dates.union(frame.index)
+            symbols = frame.columns if symbols is None else symbols.union(frame.columns)
+        fields = {
+            name: frame.reindex(index=dates, columns=symbols).astype(np.float64)
+            for name, frame in panel.items()
+        }
+        return fields, pd.MultiIndex.from_product([symbols, dates], names=['symbol', 'date'])
+
+    if not isinstance(panel.index, pd.MultiIndex) or panel.index.nlevels != 2:
+        raise ValueError("Panel DataFrame must be indexed by a (symbol, date) MultiIndex")
+
+    numeric = panel.select_dtypes(include=[np.number])
+    wide = numeric.astype(np.float64).unstack(level=0)
+    symbols = wide.columns.get_level_values(1).unique()
+    fields = {
+        name: wide[name].reindex(columns=symbols)
+        for name in numeric.columns
+    }
+    return fields, panel.index
+
+def _feature_plan(fields: Dict[str, pd.DataFrame], config) -> List[Tuple[str, FeatureFunc]]:
+    """Ordered feature definitions matching FeatureEngineer.engineer_features"""
+    plan: List[Tuple[str, FeatureFunc]] = []
+    names = set(fields)
+
+    def add(name: str, func: FeatureFunc):
+        plan.append((name, func))
+        names.add(name)
+
+    has_close = 'close' in fields
+    has_volume = 'volume' in fields
+    has_hl = 'high' in fields and 'low' in fields
+    has_hlc = has_hl and has_close
+
+    if config.technical_indicators:
+        if has_close:
+            for window in [5, 10, 20, 50]:
+                add(f'sma_{window}', lambda ws, w=window: ws.field('close').rolling(w).mean())
+            for span in [5, 10, 20]:
+                add(f'ema_{span}', lambda ws, s=span: ws.field('close').ewm(span=s).mean())
+            add('price_vs_sma_20', lambda ws: (ws.field('close') / ws.feature('sma_20') - 1) * 100)
+            add('price_vs_ema_20', lambda ws: (ws.field('close') / ws.feature('ema_20') - 1) * 100)
+
+            add('rsi', lambda ws: _rsi(ws.field('close')))
+
+            add('macd', lambda ws: ws.field('close').ewm(span=12).mean() - ws.field('close').ewm(span=26).mean())
+            add('macd_signal', lambda ws: ws.feature('macd').ewm(span=9).mean())
+            add('macd_hist', lambda ws: ws.feature('macd') - ws.feature('macd_signal'))
+
+            add('bb_upper', lambda ws: ws.field('close').rolling(20).mean() + ws.field('close').rolling(20).std() * 2)
+            add('bb_middle', lambda ws: ws.field('close').rolling(20).mean())
+            add('bb_lower', lambda ws: ws.feature('bb_middle') - ws.field('close').rolling(20).std() * 2)
+            add('bb_width', lambda ws: (ws.feature('bb_upper') - ws.feature('bb_lower')) / ws.feature('bb_middle'))
+            add('bb_position', lambda ws: (ws.field('close') - ws.feature('bb_lower')) /
+                (ws.feature('bb_upper') - ws.feature('bb_lower')))
+
+            if has_hl:
+                add('stoch_k', lambda ws: 100 * ((ws.field('close') - ws.field('low').rolling(14).min()) /
+                                                  (ws.field('high').rolling(14).max() - ws.field('low').rolling(14).min())))
+                add('stoch_d', lambda ws: ws.feature('stoch_k').rolling(3).mean())
+                add('williams_r', lambda ws: -100 * ((ws.field('high').rolling(14).max() - ws.field('close')) /
+                                                     (ws.field('high').rolling(14).max() - ws.field('low').rolling(14).min())))
+                add('cci', lambda ws: indicators.commodity_channel_index(
+                    ws.field('high').to_numpy(), ws.field('low').to_numpy(), ws.field('close').to_numpy(), 20))
+                add('atr', lambda ws: _true_range(ws).rolling(14).mean())
+                add('psar', lambda ws: indicators.parabolic_sar(
+                    ws.field('high').to_numpy(), ws.field('low').to_numpy()))
+            else:
+                for name in ['stoch_k', 'stoch_d', 'williams_r', 'cci', 'atr', 'psar']:
+                    add(name, lambda ws: ws.nan())
+
+        if has_volume:
+            add('volume_sma_5', lambda ws: ws.field('volume').rolling(5).mean())
+            add('volume_sma_20', lambda ws: ws.field('volume').rolling(20).mean())
+            add('volume_ratio', lambda ws: ws.field('volume') / ws.feature('volume_sma_20'))
+            if has_close:
+                add('obv', lambda ws: indicators.on_balance_volume(
+                    ws.field('close').to_numpy(), ws.field('volume').to_numpy()))
+                add('vpt', lambda ws: (ws.returns * ws.field('volume')).cumsum())
+            else:
+                add('obv', lambda ws: ws.nan())
+                add('vpt', lambda ws: ws.nan())
+            if has_hlc:
+                add('mfi', lambda ws: indicators.money_flow_index(
+                    ws.field('high').to_numpy(), ws.field('low').to_numpy(),
+                    ws.field('close').to_numpy(), ws.field('volume').to_numpy(), 14))
+            else:
+                add('mfi', lambda ws: ws.nan())
+
+        if has_close:
+            for period in [5, 10, 20]:
+                add(f'roc_{period}', lambda ws, p=period: ws.field('close').pct_change(p) * 100)
+            for period in [5, 10]:
+                add(f'momentum_{period}', lambda ws, p=period: ws.field('close') - ws.field('close').shift(p))
+            add('proc', lambda ws: (ws.field('close') / ws.field('close').shift(1) - 1) * 100)
+
+    if config.statistical_features and has_close:
+        for window in [5, 10, 20]:
+            add(f'returns_mean_{window}', lambda ws, w=window: ws.returns.rolling(w).mean())
+            add(f'returns_std_{window}', lambda ws, w=window: ws.returns.rolling(w).std())
+            add(f'returns_skew_{window}', lambda ws, w=window: ws.returns.rolling(w).skew())
+            add(f'returns_kurt_{window}', lambda ws, w=window: ws.returns.rolling(w).kurt())
+            add(f'volatility_{window}', lambda ws, w=window: ws.feature(f'returns_std_{w}') * np.sqrt(252))
+            add(f'sharpe_{window}', lambda ws, w=window: ws.feature(f'returns_mean_{w}') / ws.feature(f'returns_std_{w}'))
+        for window in [10, 20]:
+            add(f'returns_q25_{window}', lambda ws, w=window: ws.returns.rolling(w).quantile(0.25))
+            add(f'returns_q75_{window}', lambda ws, w=window: ws.returns.rolling(w).quantile(0.75))
+            add(f'returns_iqr_{window}', lambda ws, w=window: ws.feature(f'returns_q75_{w}') - ws.feature(f'returns_q25_{w}'))
+        for window in [10, 20]:
+            add(f'returns_min_{window}', lambda ws, w=window: ws.returns.rolling(w).min())
+            add(f'returns_max_{window}', lambda ws, w=window: ws.returns.rolling(w).max())
+            add(f'returns_range_{window}', lambda ws, w=window: ws.feature(f'returns_max_{w}') - ws.feature(f'returns_min_{w}'))
+
+    if config.lag_features:
+        n_lags = config.n_lags
+        if has_close:
+            for lag in range(1, n_lags + 1):
+                add(f'close_lag_{lag}', lambda ws, k=lag: ws.field('close').shift(k))
+                add(f'returns_lag_{lag}', lambda ws, k=lag: ws.returns.shift(k))
+        if has_volume:
+            for lag in range(1, n_lags + 1):
+                add(f'volume_lag_{lag}', lambda ws, k=lag: ws.field('volume').shift(k))
+        for indicator in ['rsi', 'macd', 'bb_position', 'stoch_k', 'williams_r']:
+            if indicator in names:
+                for lag in range(1, n_lags + 1):
+                    add(f'{indicator}_lag_{lag}', lambda ws, i=indicator, k=lag: ws.feature(i).shift(k))
+
+    if config.rolling_features:
+        windows = config.n_rolling_windows or DEFAULT_ROLLING_WINDOWS
+        if has_close:
+            for window in windows:
+                add(f'close_rolling_mean_{window}', lambda ws, w=window: ws.field('close').rolling(w).mean())
+                add(f'close_rolling_std_{window}', lambda ws, w=window: ws.field('close').rolling(w).std())
+                add(f'close_rolling_min_{window}', lambda ws, w=window: ws.field('close').rolling(w).min())
+                add(f'close_rolling_max_{window}', lambda ws, w=window: ws.field('close').rolling(w).max())
+                add(f'close_rolling_p25_{window}', lambda ws, w=window: ws.field('close').rolling(w).quantile(0.25))
+                add(f'close_rolling_p75_{window}', lambda ws, w=window: ws.field('close').rolling(w).quantile(0.75))
+        if has_volume:
+            for window in windows:
+                add(f'volume_rolling_mean_{window}', lambda ws, w=window: ws.field('volume').rolling(w).mean())
+                add(f'volume_rolling_std_{window}', lambda ws, w=window: ws.field('volume').rolling(w).std())
+
+    if config.interaction_features:
+        if has_close and has_volume:
+            add('price_volume', lambda ws: ws.field('close') * ws.field('volume'))
+            add('price_volume_ratio', lambda ws: ws.field('close') / ws.field('volume'))
+            add('pvt', lambda ws: (ws.field('close') - ws.field('close').shift(1)) * ws.field('volume'))
+            add('pvt_cumsum', lambda ws: ws.feature('pvt').cumsum())
+        if 'rsi' in names and 'macd' in names:
+            add('rsi_macd', lambda ws: ws.feature('rsi') * ws.feature('macd'))
+            add('rsi_macd_ratio', lambda ws: ws.feature('rsi') / (ws.feature('macd') + 1e-8))
+        if 'bb_position' in names and 'rsi' in names:
+            add('bb_rsi', lambda ws: ws.feature('bb_position') * ws.feature('rsi'))
+
+    return plan
+
+def _rsi(prices: pd.DataFrame, period: int = 14) -> pd.DataFrame:
+    """RSI over every column, as in FeatureEngineer._calculate_rsi"""
+    delta = prices.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+def _true_range(ws: PanelWorkspace) -> pd.DataFrame:
+    """True range over every column, as in FeatureEngineer._calculate_atr"""
+    high, low, close = ws.field('high'), ws.field('low'), ws.field('close')
+    high_low = high - low
+    high_close = (high - close.shift()).abs()
+    low_close = (low - close.shift()).abs()
+    return np.maximum(high_low, np.maximum(high_close, low_close))
+
+def engineer_panel_features(panel: PanelInput, config=None,
+                            dtype=np.float64) -> pd.DataFrame:
+    """Compute the configured feature set for every symbol in a panel
+
+    Args:
+        panel: Long frame indexed by (symbol, date) with OHLCV columns, or a dict
+            of wide (dates x symbols) frames keyed by field name
+        config: FeatureConfig; PCA and feature selection are not applied here
+        dtype: Output dtype, e.g. np.float32 to halve memory on large universes
+
+    Returns:
+        Long frame indexed by (symbol, date), sorted by symbol then date, holding
+        the input fields followed by the same feature columns
+        FeatureEngineer.engineer_features produces.
+        Symbols are aligned on the union of dates, so a missing bar is NaN and
+        invalidates the rolling windows that contain it.
+    """
+    from .feature_engineering import FeatureConfig
+
+    if config is None:
+        config = FeatureConfig()
+
+    fields, row_index = to_wide_fields(panel)
+    plan = _feature_plan(fields, config)
+
+    columns = list(fields) + [name for name, _ in plan]
+    column_positions = {name: i for i, name in enumerate(columns)}
+    dates = next(iter(fields.values())).index
+    symbols = next(iter(fields.values())).columns
+
+    # One column-major allocation for the whole result; each column is a
+    # contiguous (symbols x dates) block in (symbol, date) row order
+    output = np.empty((len(symbols) * len(dates), len(columns)), dtype=dtype, order='F')
+    workspace = PanelWorkspace(fields, output, column_positions)
+
+    for name, frame in fields.items():
+        workspace.write(column_positions[name], frame)
+    for name, func in plan:
+        workspace.write(column_positions[name], func(workspace))
+
+    grid_index = pd.MultiIndex.from_product(
+        [symbols, dates], names=row_index.names if row_index.names[0] else ['symbol', 'date']
+    )
+    result = pd.DataFrame(output, index=grid_index, columns=columns, copy=False)
+
+    # Drop grid rows for (symbol, date) pairs that were not in the input
+    if len(row_index) != len(grid_index):
+        positions = grid_index.get_indexer(row_index)
+        result = result.iloc[np.sort(positions[positions >= 0])]
+
+    logger.info(f"Built {len(plan)} panel features for {len(symbols)} symbols x {len(dates)} dates")
+    return result
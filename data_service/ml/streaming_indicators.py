@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Streaming Technical Indicators
+Stateful indicators that update in O(1) per bar for live feature updates.
+Each one reproduces the value of its batch counterpart in FeatureEngineer
+(pandas rolling/ewm semantics) at the latest bar.
+"""
+
+import math
+from collections import deque
+from typing import Dict, Any, Optional, List
+
+def _bar_field(bar: Any, name: str) -> float:
+    """Read a field from a dict, Series or dataclass-like bar"""
+    if isinstance(bar, dict):
+        value = bar.get(name)
+    else:
+        value = getattr(bar, name, None)
+        if value is None and hasattr(bar, 'get'):
+            value = bar.get(name)
+    return float('nan') if value is None else float(value)
+
+def _is_nan(value: float) -> bool:
+    return value != value
+
+class RollingStats:
+    """Fixed-window rolling mean/std using Welford's add/remove updates
+
+    Matches pandas ``rolling(window).mean()`` and ``.std()`` (ddof=1): the
+    result is NaN until the window is full or while it holds a NaN.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values: deque = deque()
+        self.nan_count = 0
+        self.count = 0
+        self.mean_ = 0.0
+        self.m2 = 0.0
+
+    def _add(self, x: float):
+        self.count += 1
+        delta = x - self.mean_
+        self.mean_ += delta / self.count
+        self.m2 += delta * (x - self.mean_)
+
+    def _remove(self, x: float):
+        self.count -= 1
+        if self.count == 0:
+            self.mean_ = 0.0
+            self.m2 = 0.0
+            return
+        delta = x - self.mean_
+        self.mean_ -= delta / self.count
+        self.m2 -= delta * (x - self.mean_)
+
+    def update(self, x: float) -> float:
+        """Push a value and return the current mean"""
+        self.values.append(x)
+        if _is_nan(x):
+            self.nan_count += 1
+        else:
+            self._add(x)
+
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            if _is_nan(old):
+                self.nan_count -= 1
+            else:
+                self._remove(old)
+
+        return self.mean
+
+    @property
+    def ready(self) -> bool:
+        return len(self.values) == self.window and self.nan_count == 0
+
+    @property
+    def mean(self) -> float:
+        return self.mean_ if self.ready else float('nan')
+
+    @property
+    def std(self) -> float:
+        if not self.ready or self.window < 2:
+            return float('nan')
+        return math.sqrt(max(self.m2, 0.0) / (self.window - 1))
+
+class StreamingEMA:
+    """Exponential moving average matching pandas ``ewm(span=span).mean()`` (adjust=True)"""
+
+    def __init__(self, span: int):
+        self.span = span
+        self.decay = 1 - 2 / (span + 1)
+        self.numerator = 0.0
+        self.denominator = 0.0
+        self.value = float('nan')
+
+    def update(self, x: float) -> float:
+        """Push a value and return the current average"""
+        self.numerator *= self.decay
+        self.denominator *= self.decay
+        if not _is_nan(x):
+            self.numerator += x
+            self.denominator += 1.0
+            self.value = self.numerator / self.denominator
+        return self.value
+
+class StreamingRSI:
+    """RSI from rolling mean gains and losses, as in FeatureEngineer._calculate_rsi"""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.gains = RollingStats(period)
+        self.losses = RollingStats(period)
+        self.prev_price: Optional[float] = None
+        self.value = float('nan')
+
+    def update(self, price: float) -> float:
+        """Push a price and return the current RSI"""
+        delta = float('nan') if self.prev_price is None else price - self.prev_price
+        self.prev_price = price
+
+        # NaN deltas count as neither gain nor loss, as with Series.where
+        gain = self.gains.update(delta if delta > 0 else 0.0)
+        loss = self.losses.update(-delta if delta < 0 else 0.0)
+
+        if _is_nan(gain) or _is_nan(loss):
+            self.value = float('nan')
+        elif loss == 0:
+            self.value = 100.0 if gain > 0 else float('nan')
+        else:
+            self.value = 100 - (100 / (1 + gain / loss))
+        return self.value
+
+class StreamingMACD:
+    """MACD line, signal and histogram from streaming EMAs"""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal = StreamingEMA(signal)
+        self.macd = float('nan')
+        self.macd_signal = float('nan')
+        self.macd_hist = float('nan')
+
+    def update(self, price: float) -> Dict[str, float]:
+        """Push a price and return the current MACD values"""
+        self.macd = self.fast.update(price) - self.slow.update(price)
+        self.macd_signal = self.signal.update(self.macd)
+        self.macd_hist = self.macd - self.macd_signal
+        return {'macd': self.macd, 'macd_signal': self.macd_signal, 'macd_hist': self.macd_hist}
+
+class StreamingBollingerBands:
+    """Bollinger Bands from a rolling mean and sample standard deviation"""
+
+    def __init__(self, period: int = 20, std_dev: float = 2):
+        self.std_dev = std_dev
+        self.stats = RollingStats(period)
+
+    def update(self, price: float) -> Dict[str, float]:
+        """Push a price and return the current bands"""
+        self.stats.update(price)
+        middle = self.stats.mean
+        width = self.stats.std * self.std_dev
+        return {'bb_upper': middle + width, 'bb_middle': middle, 'bb_lower': middle - width}
+
+class StreamingATR:
+    """Average True Range as a rolling mean of true range, NaN on the first bar"""
+
+    def __init__(self, period: int = 14):
+        self.stats = RollingStats(period)
+        self.prev_close: Optional[float] = None
+        self.value = float('nan')
+
+    def update(self, high: float, low: float, close: float) -> float:
+        """Push a bar and return the current ATR"""
+        if self.prev_close is None:
+            true_range = float('nan')
+        else:
+            true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        self.value = self.stats.update(true_range)
+        return self.value
+
+class StreamingOBV:
+    """On-Balance Volume"""
+
+    def __init__(self):
+        self.prev_close: Optional[float] = None
+        self.value = float('nan')
+
+    def update(self, close: float, volume: float) -> float:
+        """Push a bar and return the current OBV"""
+        if self.prev_close is None:
+            self.value = volume
+        elif close > self.prev_close:
+            self.value += volume
+        elif close < self.prev_close:
+            self.value -= volume
+        self.prev_close = close
+        return self.value
+
+class StreamingIndicatorSet:
+    """Per-symbol bundle of streaming indicators updated from OHLCV bars
+
+    Values are keyed by the same column names FeatureEngineer produces.
+    """
+
+    def __init__(self, sma_windows: List[int] = None, ema_spans: List[int] = None,
+                 rsi_period: int = 14, bb_period: int = 20, atr_period: int = 14):
+        self.sma = {w: RollingStats(w) for w in (sma_windows or [5, 10, 20, 50])}
+        self.ema = {s: StreamingEMA(s) for s in (ema_spans or [5, 10, 20])}
+        self.rsi = StreamingRSI(rsi_period)
+        self.macd = StreamingMACD()
+        self.bollinger = StreamingBollingerBands(bb_period)
+        self.atr = StreamingATR(atr_period)
+        self.obv = StreamingOBV()
+        self.bars_seen = 0
+        self.values: Dict[str, float] = {}
+
+    def update(self, bar: Any) -> Dict[str, float]:
+        """Push an OHLCV bar (dict, Series or snapshot object) and return all values"""
+        close = _bar_field(bar, 'close')
+        high = _bar_field(bar, 'high')
+        low = _bar_field(bar, 'low')
+        volume = _bar_field(bar, 'volume')
+
+        values = {}
+        for window, stats in self.sma.items():
+            values[f'sma_{window}'] = stats.update(close)
+        for span, ema in self.ema.items():
+            values[f'ema_{span}'] = ema.update(close)
+        values['rsi'] = self.rsi.update(close)
+        values.update(self.macd.update(close))
+        values.update(self.bollinger.update(close))
+        values['atr'] = self.atr.update(high, low, close)
+        values['obv'] = self.obv.update(close, volume)
+
+        self.bars_seen += 1
+        self.values = values
+        return values
@@ -13,6 +13,7 @@ from collections import defaultdict
 from dataclasses import dataclass
 
 from .websocket_client import WebSocketClient, WebSocketMessage
+from ..ml.streaming_indicators import StreamingIndicatorSet
 
 @dataclass
 class MarketTick:
@@ -53,6 +54,9 @@ class RealTimeDataFeed:
         self.tick_data: Dict[str, List[MarketTick]] = defaultdict(list)
         self.snapshot_data: Dict[str, List[MarketSnapshot]] = defaultdict(list)
         
+        # Indicator state updated one snapshot at a time
+        self.indicator_states: Dict[str, StreamingIndicatorSet] = defaultdict(StreamingIndicatorSet)
+        
         # Callbacks
         self.tick_callbacks: List[Callable] = []
         self.snapshot_callbacks: List[Callable] = []
@@ -160,6 +164,7 @@ class RealTimeDataFeed:
                             
                             # Store snapshot
                             self.snapshot_data[symbol].append(snapshot)
+                            self.indicator_states[symbol].update(snapshot)
                             
                             # Notify callbacks
                             for callback in self.snapshot_callbacks:
@@ -272,6 +277,11 @@ class RealTimeDataFeed:
         snapshots = self.snapshot_data.get(symbol, [])
         return snapshots[-1] if snapshots else None
     
+    def get_latest_indicators(self, symbol: str) -> Dict[str, float]:
+        """Get indicator values as of the latest snapshot for symbol"""
+        state = self.indicator_states.get(symbol)
+        return dict(state.values) if state else {}
+    
     def get_tick_history(self, symbol: str, minutes: int = 60) -> List[MarketTick]:
         """Get tick history for symbol"""
         cutoff_time = datetime.now() - timedelta(minutes=minutes)
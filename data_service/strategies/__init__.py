@@ -2,5 +2,8 @@ from .strategy_base import StrategyBase, StrategyResult
 from .strategy_registry import StrategyRegistry
 from .strategy_runner import StrategyRunner
 from .strategy_optimizer import StrategyOptimizer
+from .result_cache import StrategyResultCache, frame_fingerprint
+from .strategy_context import StrategyContext
 
-__all__ = ['StrategyBase', 'StrategyResult', 'StrategyRegistry', 'StrategyRunner', 'StrategyOptimizer'] 
\ No newline at end of file
+__all__ = ['StrategyBase', 'StrategyResult', 'StrategyRegistry', 'StrategyRunner', 'StrategyOptimizer',
+           'StrategyResultCache', 'frame_fingerprint', 'StrategyContext'] 
\ No newline at end of file
@@ -2,11 +2,23 @@ from typing import Dict, List, Any
 import pandas as pd
 from datetime import datetime
 from .strategy_base import StrategyBase, StrategyResult
+from .strategy_context import StrategyContext
 from ..factors import FactorScreener, StockSelector
 
+def _strategy_context(factor_data: pd.DataFrame, price_data: pd.DataFrame,
+                      kwargs: Dict[str, Any]) -> StrategyContext:
+    """Shared context passed by the runner, or a private one for standalone calls"""
+    context = kwargs.get('context')
+    if context is None:
+        context = StrategyContext(factor_data, price_data)
+    return context
+
 class MomentumStrategy(StrategyBase):
     """Momentum strategy implementation"""
     
+    # 1.1: signals computed from the shared StrategyContext
+    version = "1.1"
+    
     def __init__(self):
         super().__init__(
             name="MomentumStrategy",
@@ -14,6 +26,7 @@ class MomentumStrategy(StrategyBase):
         )
         self.factor_screener = FactorScreener()
         self.stock_selector = StockSelector()
+        self.uses_context = True
     
     def get_parameter_schema(self) -> Dict[str, Any]:
         return {
@@ -44,6 +57,8 @@ class MomentumStrategy(StrategyBase):
                         price_data: pd.DataFrame,
                         **kwargs) -> StrategyResult:
         
+        context = _strategy_context(factor_data, price_data, kwargs)
+        
         # Get parameters
         lookback_period = self.parameters.get('lookback_period', 60)
         top_n = self.parameters.get('top_n', 20)
@@ -55,11 +70,11 @@ class MomentumStrategy(StrategyBase):
         )
         
         # Screen stocks
-        screening_results = momentum_screener.screen_stocks(factor_data)
+        screening_results = context.screen(momentum_screener)
         
         # Select top N stocks
-        selection_result = self.stock_selector.select_stocks(
-            factor_data, price_data,
+        selection_result = context.select(
+            self.stock_selector,
             selection_method='top_n',
             n=top_n,
             factor_name=f'momentum_{lookback_period}d'
@@ -81,6 +96,9 @@ class MomentumStrategy(StrategyBase):
 class ValueStrategy(StrategyBase):
     """Value strategy implementation"""
     
+    # 1.1: signals computed from the shared StrategyContext
+    version = "1.1"
+    
     def __init__(self):
         super().__init__(
             name="ValueStrategy",
@@ -88,6 +106,7 @@ class ValueStrategy(StrategyBase):
         )
         self.factor_screener = FactorScreener()
         self.stock_selector = StockSelector()
+        self.uses_context = True
     
     def get_parameter_schema(self) -> Dict[str, Any]:
         return {
@@ -103,6 +122,8 @@ class ValueStrategy(StrategyBase):
                         price_data: pd.DataFrame,
                         **kwargs) -> StrategyResult:
         
+        context = _strategy_context(factor_data, price_data, kwargs)
+        
         # Get parameters
         max_pe = self.parameters.get('max_pe', 15.0)
         max_pb = self.parameters.get('max_pb', 2.0)
@@ -124,11 +145,11 @@ class ValueStrategy(StrategyBase):
         })
         
         # Screen stocks
-        screening_results = value_screener.screen_stocks(factor_data)
+        screening_results = context.screen(value_screener)
         
         # Select stocks with factor-weighted approach
-        selection_result = self.stock_selector.select_stocks(
-            factor_data, price_data,
+        selection_result = context.select(
+            self.stock_selector,
             selection_method='factor_weighted',
             factor_name='pe_ratio'
         )
@@ -149,6 +170,9 @@ class ValueStrategy(StrategyBase):
 class QualityGrowthStrategy(StrategyBase):
     """Quality growth strategy implementation"""
     
+    # 1.1: signals computed from the shared StrategyContext
+    version = "1.1"
+    
     def __init__(self):
         super().__init__(
             name="QualityGrowthStrategy",
@@ -156,6 +180,7 @@ class QualityGrowthStrategy(StrategyBase):
         )
         self.factor_screener = FactorScreener()
         self.stock_selector = StockSelector()
+        self.uses_context = True
     
     def get_parameter_schema(self) -> Dict[str, Any]:
         return {
@@ -170,6 +195,8 @@ class QualityGrowthStrategy(StrategyBase):
                         price_data: pd.DataFrame,
                         **kwargs) -> StrategyResult:
         
+        context = _strategy_context(factor_data, price_data, kwargs)
+        
         # Get parameters
         min_roe = self.parameters.get('min_roe', 15.0)
         max_debt_equity = self.parameters.get('max_debt_equity', 0.5)
@@ -192,11 +219,11 @@ class QualityGrowthStrategy(StrategyBase):
         })
         
         # Screen stocks
-        screening_results = quality_screener.screen_stocks(factor_data)
+        screening_results = context.screen(quality_screener)
         
         # Select stocks
-        selection_result = self.stock_selector.select_stocks(
-            factor_data, price_data,
+        selection_result = context.select(
+            self.stock_selector,
             selection_method='factor_weighted',
             factor_name='roe'
         )
@@ -217,6 +244,9 @@ class QualityGrowthStrategy(StrategyBase):
 class MultiFactorStrategy(StrategyBase):
     """Multi-factor strategy implementation"""
     
+    # 1.1: signals computed from the shared StrategyContext
+    version = "1.1"
+    
     def __init__(self):
         super().__init__(
             name="MultiFactorStrategy",
@@ -224,6 +254,7 @@ class MultiFactorStrategy(StrategyBase):
         )
         self.factor_screener = FactorScreener()
         self.stock_selector = StockSelector()
+        self.uses_context = True
     
     def get_parameter_schema(self) -> Dict[str, Any]:
         return {
@@ -240,6 +271,8 @@ class MultiFactorStrategy(StrategyBase):
                         price_data: pd.DataFrame,
                         **kwargs) -> StrategyResult:
         
+        context = _strategy_context(factor_data, price_data, kwargs)
+        
         # Get parameters
         factor_weights = {
             'momentum_60d': self.parameters.get('momentum_weight', 0.3),
@@ -260,11 +293,11 @@ class MultiFactorStrategy(StrategyBase):
         multi_screener.add_market_cap_filter(min_market_cap=min_market_cap)
         
         # Screen stocks
-        screening_results = multi_screener.screen_stocks(factor_data)
+        screening_results = context.screen(multi_screener)
         
         # Select stocks with risk parity
-        selection_result = self.stock_selector.select_stocks(
-            factor_data, price_data,
+        selection_result = context.select(
+            self.stock_selector,
             selection_method='risk_parity'
         )
         
@@ -284,6 +317,9 @@ class MultiFactorStrategy(StrategyBase):
 class MeanReversionStrategy(StrategyBase):
     """Mean reversion strategy implementation"""
     
+    # 1.1: signals computed from the shared StrategyContext
+    version = "1.1"
+    
     def __init__(self):
         super().__init__(
             name="MeanReversionStrategy",
@@ -291,6 +327,7 @@ class MeanReversionStrategy(StrategyBase):
         )
         self.factor_screener = FactorScreener()
         self.stock_selector = StockSelector()
+        self.uses_context = True
     
     def get_parameter_schema(self) -> Dict[str, Any]:
         return {
@@ -305,6 +342,8 @@ class MeanReversionStrategy(StrategyBase):
                         price_data: pd.DataFrame,
                         **kwargs) -> StrategyResult:
         
+        context = _strategy_context(factor_data, price_data, kwargs)
+        
         # Get parameters
         rsi_oversold = self.parameters.get('rsi_oversold', 30.0)
         rsi_overbought = self.parameters.get('rsi_overbought', 70.0)
@@ -313,7 +352,7 @@ class MeanReversionStrategy(StrategyBase):
         momentum_max = self.parameters.get('momentum_range_max', 0.0)
         
         # Create custom screener
-        mean_reversion_screener = self.factor_screener()
+        mean_reversion_screener = FactorScreener()
         
         # Add RSI criteria (buy oversold)
         mean_reversion_screener.add_criteria({
@@ -334,11 +373,11 @@ class MeanReversionStrategy(StrategyBase):
         mean_reversion_screener.add_volatility_filter(max_volatility=max_volatility)
         
         # Screen stocks
-        screening_results = mean_reversion_screener.screen_stocks(factor_data)
+        screening_results = context.screen(mean_reversion_screener)
         
         # Select stocks with equal weights
-        selection_result = self.stock_selector.select_stocks(
-            factor_data, price_data,
+        selection_result = context.select(
+            self.stock_selector,
             selection_method='equal_weight'
         )
         
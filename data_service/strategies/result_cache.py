@@ -0,0 +1,177 @@
+"""
+Memoization of strategy results
+
+Results are keyed by a content fingerprint of the input frames together with
+the strategy class, its version and its canonicalized parameters, so the same
+inputs return the stored result without rerunning screening, selection and
+metrics. Entries live in a bounded in-memory LRU and, optionally, as pickle
+files in a cache directory shared between processes.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+import logging
+
+import numpy as np
+import pandas as pd
+
+def frame_fingerprint(frame: Optional[pd.DataFrame]) -> str:
+    """Content hash of a DataFrame: shape, columns, dtypes and row hashes of values and index"""
+    if frame is None:
+        return 'none'
+
+    digest = hashlib.sha256()
+    digest.update(repr(frame.shape).encode())
+    digest.update(repr([(str(name), str(dtype)) for name, dtype in frame.dtypes.items()]).encode())
+    try:
+        row_hashes = pd.util.hash_pandas_object(frame, index=True).to_numpy()
+        digest.update(np.ascontiguousarray(row_hashes).tobytes())
+    except TypeError:
+        # Unhashable cells (lists, dicts); fall back to the pickled frame
+        digest.update(pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL))
+    return digest.hexdigest()
+
+def _canonical(value: Any) -> Any:
+    """Convert a parameter value into a JSON-stable form"""
+    if isinstance(value, dict):
+        return {str(key): _canonical(val) for key, val in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(val) for val in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(_canonical(val) for val in value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, float):
+        return repr(value)
+    if value is None or isinstance(value, (str, int, bool)):
+        return value
+    return repr(value)
+
+def canonical_parameters(parameters: Optional[Dict[str, Any]]) -> str:
+    """Order-independent string form of a parameter dict"""
+    return json.dumps(_canonical(parameters or {}), sort_keys=True, separators=(',', ':'))
+
+def result_cache_key(strategy, factor_fingerprint: str, price_fingerprint: str) -> str:
+    """Cache key for one strategy configuration on one pair of input frames"""
+    strategy_class = type(strategy)
+    parts = [
+        f"{strategy_class.__module__}.{strategy_class.__qualname__}",
+        str(getattr(strategy, 'version', '')),
+        strategy.name,
+        canonical_parameters(strategy.parameters),
+        factor_fingerprint,
+        price_fingerprint
+    ]
+    return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+
+class StrategyResultCache:
+    """Bounded LRU cache of strategy results with an optional on-disk tier"""
+
+    def __init__(self, max_size: int = 256, cache_dir: Optional[str] = None):
+        self.max_size = max_size
+        self.cache_dir = cache_dir
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a copy of a stored result, checking memory before disk"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(value)
+
+        value = self._load(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, value)
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any):
+        """Store a copy of a result in memory and, if configured, on disk"""
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._store(key, value)
+        if self.cache_dir:
+            self._save(key, value)
+
+    def _store(self, key: str, value: Any):
+        """Insert into the LRU, evicting the least recently used entries (lock held)"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _load(self, key: str) -> Optional[Any]:
+        """Read an entry from the cache directory"""
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            self.logger.warning(f"Discarding unreadable cache entry {path}: {e}")
+            return None
+
+    def _save(self, key: str, value: Any):
+        """Write an entry atomically so concurrent readers never see a partial file"""
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except Exception as e:
+            self.logger.warning(f"Could not write cache entry {key}: {e}")
+
+    def clear(self, disk: bool = True):
+        """Remove all entries from memory and, optionally, from disk"""
+        with self._lock:
+            self._entries.clear()
+        if disk and self.cache_dir:
+            for filename in os.listdir(self.cache_dir):
+                if filename.endswith('.pkl'):
+                    os.remove(os.path.join(self.cache_dir, filename))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache hit/miss statistics"""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits + self.disk_hits) / lookups if lookups > 0 else 0
+        }
@@ -19,6 +19,11 @@ class StrategyResult:
 class StrategyBase(ABC):
     """Base class for all trading strategies"""
     
+    # Bump when signal logic changes so memoized results are not reused
+    version = "1.0"
+    # Whether generate_signals accepts a shared StrategyContext as ``context``
+    uses_context = False
+    
     def __init__(self, name: str, description: str = ""):
         self.name = name
         self.description = description
@@ -0,0 +1,146 @@
+from typing import Dict, List, Any, Callable, Optional
+import pandas as pd
+import threading
+import logging
+
+from ..factors import FactorScreener, StockSelector
+from ..factors.factor_screener import ScreeningResult
+from ..factors.stock_selector import SelectionResult
+from ..factors import portfolio_construction
+
+class StrategyContext:
+    """Per-run precomputed views of factor and price data shared by strategies
+
+    The long-format frames are pivoted once, on first use, into the matrices
+    that screening and selection need: the symbols x factors matrix (latest
+    value of every factor), its percentile ranks, the cross-section on the
+    latest factor date and the dates x symbols return history. Every strategy
+    run against the same context reads these instead of re-filtering the long
+    frames. Views are built lazily and at most once, also when strategies run
+    on several threads.
+    """
+
+    def __init__(self, factor_data: pd.DataFrame, price_data: pd.DataFrame):
+        self.factor_data = factor_data
+        self.price_data = price_data
+        self.logger = logging.getLogger(__name__)
+        self._views: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+        self._matrix_builder = FactorScreener()
+
+    def _cached(self, name: str, compute: Callable[[], Any]) -> Any:
+        """Compute a view once and keep it; concurrent callers wait for the first"""
+        if name in self._views:
+            return self._views[name]
+        with self._guard:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self._views:
+                self._views[name] = compute()
+        return self._views[name]
+
+    @property
+    def factor_matrix(self) -> pd.DataFrame:
+        """Symbols x factors matrix as screened by FactorScreener.screen_stocks"""
+        return self._cached('factor_matrix',
+                            lambda: self._matrix_builder.build_factor_matrix(self.factor_data))
+
+    @property
+    def percentile_ranks(self) -> pd.DataFrame:
+        """Cross-sectional percentile ranks of the factor matrix"""
+        return self._cached('percentile_ranks',
+                            lambda: self._matrix_builder.calculate_percentile_ranks(self.factor_matrix))
+
+    @property
+    def factor_rows(self) -> List[Dict[str, float]]:
+        """Non-missing factor values of every symbol in the factor matrix"""
+        return self._cached('factor_rows', lambda: self._matrix_builder.factor_rows(self.factor_matrix))
+
+    @property
+    def latest_date(self):
+        """Most recent factor date"""
+        return self._cached('latest_date', lambda: self.factor_data['date'].max())
+
+    @property
+    def latest_factors(self) -> pd.DataFrame:
+        """Long-format factor rows on the latest factor date"""
+        return self._cached('latest_factors',
+                            lambda: self.factor_data[self.factor_data['date'] == self.latest_date])
+
+    @property
+    def latest_matrix(self) -> pd.DataFrame:
+        """Symbols x factors matrix of the rows on the latest factor date"""
+        return self._cached('latest_matrix',
+                            lambda: self._matrix_builder.build_factor_matrix(self.latest_factors))
+
+    @property
+    def default_factor(self) -> Optional[str]:
+        """First factor in the data, the selectors' default"""
+        return self._cached('default_factor',
+                            lambda: self.factor_data['factor_name'].iloc[0] if len(self.factor_data) else None)
+
+    @property
+    def returns(self) -> pd.DataFrame:
+        """Dates x symbols simple returns for every symbol in the price data"""
+        return self._cached('returns', lambda: portfolio_construction.pivot_returns(self.price_data))
+
+    def cross_section(self, factor_name: str) -> pd.Series:
+        """Values of one factor on the latest date, indexed by symbol"""
+        matrix = self.latest_matrix
+        if factor_name not in matrix.columns:
+            return pd.Series(dtype=float)
+        return matrix[factor_name].dropna()
+
+    def return_window(self, symbols: List[str], lookback_period: int) -> pd.DataFrame:
+        """Trailing returns of the given symbols"""
+        returns = self.returns
+        columns = [symbol for symbol in symbols if symbol in returns.columns]
+        return returns[columns].iloc[-lookback_period:]
+
+    def screen(self, screener: FactorScreener, top_n: int = None,
+               passed_only: bool = False) -> List[ScreeningResult]:
+        """Screen the shared factor matrix with the given screener's criteria"""
+        percentiles = self.percentile_ranks if screener.uses_percentiles() else None
+        return screener.screen_matrix(self.factor_matrix, top_n=top_n, passed_only=passed_only,
+                                      percentiles=percentiles, factor_rows=self.factor_rows)
+
+    def select(self, selector: StockSelector,
+               selection_method: str = 'top_n',
+               factor_name: str = None,
+               n: int = None,
+               lookback_period: int = 252,
+               method: str = 'erc') -> SelectionResult:
+        """StockSelector.select_stocks on the shared latest cross-section and return history"""
+        if selection_method == 'equal_weight':
+            # Any factor row on the latest date makes a symbol eligible
+            values = pd.Series(1.0, index=self.latest_matrix.index)
+        else:
+            if factor_name is None:
+                factor_name = self._default_factor(selection_method)
+            values = self.cross_section(factor_name)
+
+        if values.empty:
+            self.logger.warning(f"No factor data found for {factor_name} on {self.latest_date}")
+            return SelectionResult(date=self.latest_date, selected_stocks=[], weights={}, portfolio_value=0.0)
+
+        returns = None
+        if selection_method in ('risk_parity', 'min_variance'):
+            top = values.sort_values(ascending=False, kind='stable').head(selector.max_positions)
+            returns = self.return_window(top.index.tolist(), lookback_period)
+
+        weights = selector.select_weights(values, selection_method, returns=returns, n=n, method=method)
+        return SelectionResult(
+            date=self.latest_date,
+            selected_stocks=list(weights.keys()),
+            weights=weights,
+            portfolio_value=1.0 if weights else 0.0
+        )
+
+    def _default_factor(self, selection_method: str) -> Optional[str]:
+        """Factor StockSelector.select_stocks would use when none is given"""
+        if selection_method in ('risk_parity', 'min_variance'):
+            # Risk parity ranks by the first factor present on the latest date
+            latest = self.latest_factors
+            return latest['factor_name'].iloc[0] if len(latest) else None
+        return self.default_factor
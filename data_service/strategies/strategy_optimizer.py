@@ -1,11 +1,21 @@
-from typing import Dict, List, Any, Optional, Callable
+from typing import Dict, List, Any, Optional, Callable, Tuple
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from scipy.optimize import minimize, differential_evolution
 from .strategy_base import StrategyBase, StrategyResult
 from .strategy_runner import StrategyRunner
+from ..factors.walk_forward import walk_forward_splits, purged_kfold_splits
+
+def _optimize_fold(strategy_name: str, train_window: Tuple[pd.DataFrame, pd.DataFrame],
+                   test_window: Tuple[pd.DataFrame, pd.DataFrame], parameter_grid: Dict[str, List[Any]],
+                   objective_function: str) -> Optional[Dict[str, Any]]:
+    """One walk-forward fold with a fresh optimizer; used as the task for process pools"""
+    optimizer = StrategyOptimizer()
+    optimizer.strategy_runner.use_cache = False
+    return optimizer._optimize_fold(strategy_name, train_window, test_window, parameter_grid, objective_function)
 
 class StrategyOptimizer:
     """Optimizer for strategy parameters"""
@@ -221,6 +231,20 @@ class StrategyOptimizer:
         Returns:
             Dict: Best result from grid search
         """
+        best_result = self._grid_search(strategy_name, factor_data, price_data,
+                                        parameter_grid, objective_function)
+        
+        if best_result:
+            self._log_optimization(best_result)
+        
+        return best_result
+    
+    def _grid_search(self, strategy_name: str,
+                     factor_data: pd.DataFrame,
+                     price_data: pd.DataFrame,
+                     parameter_grid: Dict[str, List[Any]],
+                     objective_function: str) -> Optional[Dict[str, Any]]:
+        """Best grid point on the given data, without logging it"""
         best_result = None
         best_objective = float('-inf')
         
@@ -270,11 +294,120 @@ class StrategyOptimizer:
                 self.logger.warning(f"Grid search iteration {i} failed: {e}")
                 continue
         
-        if best_result:
-            self._log_optimization(best_result)
-        
         return best_result
     
+    def walk_forward_optimization(self, strategy_name: str,
+                                  factor_data: pd.DataFrame,
+                                  price_data: pd.DataFrame,
+                                  parameter_grid: Dict[str, List[Any]],
+                                  scheme: str = 'walk_forward',
+                                  n_splits: int = 5,
+                                  objective_function: str = 'sharpe_ratio',
+                                  date_column: str = 'date',
+                                  n_jobs: int = 1,
+                                  **split_kwargs) -> Dict[str, Any]:
+        """
+        Grid search on time-ordered training windows, scored on the dates after them
+        
+        The distinct dates of ``factor_data`` are split with the same
+        walk-forward or purged k-fold scheme the factor weight optimizer uses,
+        so no fold picks its parameters with data from its test period.
+        
+        Args:
+            strategy_name: Name of the strategy
+            factor_data: Factor data with a date column
+            price_data: Price data; filtered by date too when it has the column
+            parameter_grid: Grid of parameter values to test
+            scheme: 'walk_forward' or 'purged_kfold'
+            n_splits: Number of folds
+            objective_function: Objective function
+            date_column: Name of the date column
+            n_jobs: Worker processes; folds are independent, so with more
+                than one they run in parallel. Workers look the strategy up
+                by name, so it must be registered in them too (inherited when
+                processes are forked)
+            **split_kwargs: train_size, test_size, expanding, purge or embargo
+            
+        Returns:
+            Dict: Per-fold parameters and objectives; the optimized parameters
+            are those of the most recent fold
+        """
+        if date_column not in factor_data.columns:
+            raise ValueError(f"Walk-forward optimization needs a '{date_column}' column in factor_data")
+        
+        factor_dates = pd.to_datetime(factor_data[date_column])
+        price_dates = pd.to_datetime(price_data[date_column]) if date_column in price_data.columns else None
+        dates = np.sort(factor_dates.unique())
+        
+        if scheme == 'walk_forward':
+            splits = walk_forward_splits(len(dates), n_splits=n_splits, **split_kwargs)
+        elif scheme == 'purged_kfold':
+            splits = purged_kfold_splits(len(dates), n_splits=n_splits, **split_kwargs)
+        else:
+            raise ValueError(f"Unknown validation scheme: {scheme}")
+        
+        def window(sample_dates):
+            factor_window = factor_data[factor_dates.isin(sample_dates).to_numpy()]
+            if price_dates is None:
+                return factor_window, price_data
+            return factor_window, price_data[price_dates.isin(sample_dates).to_numpy()]
+        
+        tasks = [(strategy_name, window(dates[train]), window(dates[test]), parameter_grid, objective_function)
+                 for train, test in splits]
+        if n_jobs > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks))) as pool:
+                outcomes = list(pool.map(_optimize_fold, *zip(*tasks)))
+        else:
+            outcomes = [self._optimize_fold(*task) for task in tasks]
+        
+        folds = []
+        for fold, ((train, test), outcome) in enumerate(zip(splits, outcomes)):
+            if outcome is None:
+                self.logger.warning(f"Walk-forward fold {fold} found no valid parameters")
+                continue
+            folds.append({
+                'fold': fold,
+                'train_start': pd.Timestamp(dates[train[0]]),
+                'train_end': pd.Timestamp(dates[train[-1]]),
+                'test_start': pd.Timestamp(dates[test[0]]),
+                'test_end': pd.Timestamp(dates[test[-1]]),
+                **outcome
+            })
+        
+        if not folds:
+            raise ValueError("No successful walk-forward folds")
+        
+        result = {
+            'strategy_name': strategy_name,
+            'optimization_method': scheme,
+            'objective_function': objective_function,
+            'optimized_parameters': folds[-1]['parameters'],
+            'objective_value': float(np.mean([f['out_of_sample_objective'] for f in folds])),
+            'optimization_success': True,
+            'iterations': len(folds),
+            'folds': folds
+        }
+        self._log_optimization(result)
+        
+        return result
+    
+    def _optimize_fold(self, strategy_name: str, train_window: Tuple[pd.DataFrame, pd.DataFrame],
+                       test_window: Tuple[pd.DataFrame, pd.DataFrame], parameter_grid: Dict[str, List[Any]],
+                       objective_function: str) -> Optional[Dict[str, Any]]:
+        """Grid search on the training window, scored on the test window"""
+        best = self._grid_search(strategy_name, *train_window, parameter_grid, objective_function)
+        if best is None:
+            return None
+        
+        test_result = self.strategy_runner.run_strategy(
+            strategy_name, *test_window, best['optimized_parameters']
+        )
+        return {
+            'parameters': best['optimized_parameters'],
+            'in_sample_objective': best['objective_value'],
+            'out_of_sample_objective': test_result.performance_metrics.get(objective_function, 0.0)
+        }
+    
     def _generate_combinations(self, param_values: List[List[Any]]) -> List[tuple]:
         """Generate all combinations of parameter values"""
         import itertools
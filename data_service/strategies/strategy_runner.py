@@ -1,69 +1,142 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Union
 import pandas as pd
+import numpy as np
 from datetime import datetime
 import logging
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
 from .strategy_base import StrategyBase, StrategyResult
 from .strategy_registry import strategy_registry
+from .result_cache import StrategyResultCache, frame_fingerprint, result_cache_key
+from .strategy_context import StrategyContext
+
+# Inputs shared by every task in a process pool, set once per worker
+_worker_inputs: Dict[str, pd.DataFrame] = {}
+
+def _init_worker(factor_data: pd.DataFrame, price_data: pd.DataFrame):
+    """Process pool initializer: receive the read-only input frames once"""
+    _worker_inputs['factor_data'] = factor_data
+    _worker_inputs['price_data'] = price_data
+    _worker_inputs['context'] = StrategyContext(factor_data, price_data)
+
+def _execute_strategy(strategy_name: str, parameters: Dict[str, Any],
+                      factor_data: pd.DataFrame = None,
+                      price_data: pd.DataFrame = None,
+                      started: Optional[Any] = None) -> StrategyResult:
+    """Run one strategy uncached; used as the task for process pools
+
+    When timeouts apply, the worker puts the strategy name on the ``started``
+    queue as it begins, since the pool marks tasks running when it queues them.
+    """
+    if started is not None:
+        started.put(strategy_name)
+    context = None
+    if factor_data is None:
+        factor_data = _worker_inputs['factor_data']
+        price_data = _worker_inputs['price_data']
+        context = _worker_inputs['context']
+    return StrategyRunner(use_cache=False).run_strategy(strategy_name, factor_data, price_data, parameters,
+                                                        context=context)
 
 class StrategyRunner:
     """Runner for executing trading strategies"""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[StrategyResultCache] = None,
+                 use_cache: bool = True,
+                 executor: Union[str, Executor] = 'thread',
+                 max_workers: Optional[int] = None,
+                 strategy_timeout: Optional[float] = None):
+        """
+        Args:
+            cache: Result cache; a private in-memory cache by default
+            use_cache: Whether results are memoized
+            executor: 'thread', 'process', 'serial' or an Executor instance
+                used when running several strategies
+            max_workers: Pool size for 'thread' and 'process'
+            strategy_timeout: Seconds each strategy may run, counted from
+                when a worker starts it, before it is reported as failed.
+                Timed-out runs cannot be interrupted and keep their worker
+                until they return; until then the strategy is not started
+                again, so at most one such run per strategy is left behind
+        """
         self.logger = logging.getLogger(__name__)
         self.execution_history: List[Dict[str, Any]] = []
+        self.result_cache = cache if cache is not None else StrategyResultCache()
+        self.use_cache = use_cache
+        self.executor = executor
+        self.max_workers = max_workers
+        self.strategy_timeout = strategy_timeout
+        self.last_errors: Dict[str, str] = {}
+        self._instance_locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        # Timed-out runs still executing in a worker, by strategy name
+        self._orphaned: Dict[str, Future] = {}
     
     def run_strategy(self, strategy_name: str, 
                     factor_data: pd.DataFrame,
                     price_data: pd.DataFrame,
-                    parameters: Dict[str, Any] = None) -> StrategyResult:
+                    parameters: Dict[str, Any] = None,
+                    use_cache: Optional[bool] = None,
+                    context: Optional[StrategyContext] = None) -> StrategyResult:
         """
         Run a single strategy
         
+        Results are memoized by strategy version, effective parameters and a
+        content fingerprint of both frames, so identical calls skip execution.
+        
         Args:
             strategy_name: Name of the strategy to run
             factor_data: Factor data
             price_data: Price data
             parameters: Strategy parameters
+            use_cache: Override the runner's caching setting for this call
+            context: Precomputed views of the two frames to share with other runs
             
         Returns:
             StrategyResult: Strategy execution result
         """
+        use_cache = self.use_cache if use_cache is None else use_cache
+        fingerprints = None
+        if use_cache:
+            fingerprints = (frame_fingerprint(factor_data), frame_fingerprint(price_data))
+        return self._run_strategy(strategy_name, factor_data, price_data, parameters, fingerprints, context)
+    
+    def _run_strategy(self, strategy_name: str,
+                      factor_data: pd.DataFrame,
+                      price_data: pd.DataFrame,
+                      parameters: Optional[Dict[str, Any]],
+                      fingerprints: Optional[Tuple[str, str]],
+                      context: Optional[StrategyContext] = None) -> StrategyResult:
+        """Run a strategy, consulting the cache when input fingerprints are given"""
         start_time = datetime.now()
         
         try:
-            # Get strategy instance
-            if strategy_name in strategy_registry:
-                strategy = strategy_registry.get_strategy(strategy_name)
+            # Registered instances carry state, so concurrent runs of one take turns
+            if strategy_name in strategy_registry.list_instances():
+                lock = self._instance_lock(strategy_name)
             else:
-                strategy = strategy_registry.create_strategy(strategy_name, parameters)
+                lock = None
             
-            # Set parameters if provided
-            if parameters:
-                strategy.set_parameters(parameters)
-            
-            # Preprocess data
-            processed_factor_data, processed_price_data = strategy.preprocess_data(
-                factor_data, price_data
-            )
-            
-            # Generate signals
-            result = strategy.generate_signals(processed_factor_data, processed_price_data)
-            
-            # Calculate performance metrics
-            performance_metrics = strategy.calculate_performance_metrics(
-                result, processed_price_data
-            )
-            result.performance_metrics.update(performance_metrics)
-            
-            # Postprocess result
-            result = strategy.postprocess_result(result)
+            if lock is not None:
+                with lock:
+                    result, cached = self._execute(strategy_name, factor_data, price_data,
+                                                   parameters, fingerprints, context)
+            else:
+                result, cached = self._execute(strategy_name, factor_data, price_data,
+                                               parameters, fingerprints, context)
             
             execution_time = datetime.now() - start_time
             
             # Log execution
-            self._log_execution(strategy_name, result, execution_time, parameters)
+            self._log_execution(strategy_name, result, execution_time, parameters, cached=cached)
             
-            self.logger.info(f"Strategy {strategy_name} executed successfully in {execution_time}")
+            if cached:
+                self.logger.info(f"Strategy {strategy_name} served from cache in {execution_time}")
+            else:
+                self.logger.info(f"Strategy {strategy_name} executed successfully in {execution_time}")
             
             return result
             
@@ -71,41 +144,274 @@ class StrategyRunner:
             self.logger.error(f"Error executing strategy {strategy_name}: {e}")
             raise
     
+    def _execute(self, strategy_name: str,
+                 factor_data: pd.DataFrame,
+                 price_data: pd.DataFrame,
+                 parameters: Optional[Dict[str, Any]],
+                 fingerprints: Optional[Tuple[str, str]],
+                 context: Optional[StrategyContext]) -> Tuple[StrategyResult, bool]:
+        """Resolve the strategy and run its pipeline; returns the result and whether it was cached"""
+        strategy = self._resolve_strategy(strategy_name, parameters)
+        
+        cache_key = None
+        if fingerprints is not None:
+            cache_key = result_cache_key(strategy, *fingerprints)
+            cached_result = self.result_cache.get(cache_key)
+            if cached_result is not None:
+                return cached_result, True
+        
+        # Preprocess data
+        processed_factor_data, processed_price_data = strategy.preprocess_data(
+            factor_data, price_data
+        )
+        
+        # Generate signals, sharing precomputed views unless preprocessing changed the data
+        if strategy.uses_context:
+            if context is None or processed_factor_data is not factor_data \
+                    or processed_price_data is not price_data:
+                context = StrategyContext(processed_factor_data, processed_price_data)
+            result = strategy.generate_signals(processed_factor_data, processed_price_data,
+                                               context=context)
+        else:
+            result = strategy.generate_signals(processed_factor_data, processed_price_data)
+        
+        # Calculate performance metrics
+        performance_metrics = strategy.calculate_performance_metrics(
+            result, processed_price_data
+        )
+        result.performance_metrics.update(performance_metrics)
+        
+        # Postprocess result
+        result = strategy.postprocess_result(result)
+        
+        if cache_key is not None:
+            self.result_cache.set(cache_key, result)
+        
+        return result, False
+    
+    def _resolve_strategy(self, strategy_name: str,
+                          parameters: Optional[Dict[str, Any]]) -> StrategyBase:
+        """Get the registered instance or create one, with parameters applied"""
+        if strategy_name in strategy_registry.list_instances():
+            strategy = strategy_registry.get_strategy(strategy_name)
+        else:
+            strategy = strategy_registry.create_strategy(strategy_name, parameters)
+        
+        # Set parameters if provided
+        if parameters:
+            strategy.set_parameters(parameters)
+        
+        return strategy
+    
+    def _instance_lock(self, strategy_name: str) -> threading.Lock:
+        """Lock guarding one registered strategy instance"""
+        with self._locks_guard:
+            return self._instance_locks.setdefault(strategy_name, threading.Lock())
+    
+    def run_concurrently(self, strategy_configs: List[Dict[str, Any]],
+                         factor_data: pd.DataFrame,
+                         price_data: pd.DataFrame,
+                         timeout: Optional[float] = None) -> Tuple[Dict[str, StrategyResult], Dict[str, str]]:
+        """
+        Run strategies on the configured executor
+        
+        The input frames are shared read-only: threads use them and one
+        StrategyContext directly, process pools receive them once per worker
+        and build a context there. A strategy that raises or
+        runs longer than ``timeout`` seconds after a worker starts it is
+        reported in the error dict without affecting the others. Timed-out
+        threads and worker processes cannot be interrupted; their results are
+        discarded when they finish, and a strategy with such a run still in
+        progress is reported as failed instead of being started again.
+        
+        Args:
+            strategy_configs: Dicts with 'name' and optional 'parameters'
+            factor_data: Factor data
+            price_data: Price data
+            timeout: Per-strategy time limit, defaults to ``strategy_timeout``
+            
+        Returns:
+            Tuple: (results by strategy name, error messages by strategy name)
+        """
+        timeout = self.strategy_timeout if timeout is None else timeout
+        configs = [(config['name'], config.get('parameters') or {}) for config in strategy_configs]
+        fingerprints = None
+        if self.use_cache:
+            fingerprints = (frame_fingerprint(factor_data), frame_fingerprint(price_data))
+        
+        context = StrategyContext(factor_data, price_data)
+        results: Dict[str, StrategyResult] = {}
+        errors: Dict[str, str] = {}
+        
+        # A new run would wait on the instance lock the timed-out one holds
+        with self._locks_guard:
+            busy = {strategy_name for strategy_name, _ in configs if strategy_name in self._orphaned}
+        for strategy_name in busy:
+            errors[strategy_name] = "Previous run timed out and is still running"
+        configs = [(strategy_name, parameters) for strategy_name, parameters in configs
+                   if strategy_name not in busy]
+        
+        if self.executor == 'serial' or len(configs) <= 1:
+            for strategy_name, parameters in configs:
+                try:
+                    results[strategy_name] = self._run_strategy(strategy_name, factor_data, price_data,
+                                                                parameters, fingerprints, context)
+                except Exception as e:
+                    errors[strategy_name] = str(e)
+            return results, errors
+        
+        use_processes = self.executor == 'process' or isinstance(self.executor, ProcessPoolExecutor)
+        owns_executor = isinstance(self.executor, str)
+        if self.executor == 'thread':
+            executor = ThreadPoolExecutor(max_workers=self.max_workers or len(configs))
+        elif self.executor == 'process':
+            executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                           initargs=(factor_data, price_data))
+        elif isinstance(self.executor, Executor):
+            executor = self.executor
+        else:
+            raise ValueError(f"Unknown executor: {self.executor}")
+        
+        futures = {}
+        cache_keys = {}
+        timed_out = False
+        manager = None
+        started_queue = None
+        if use_processes and timeout is not None:
+            manager = multiprocessing.Manager()
+            started_queue = manager.Queue()
+        try:
+            for strategy_name, parameters in configs:
+                if not use_processes:
+                    future = executor.submit(self._run_strategy, strategy_name, factor_data,
+                                             price_data, parameters, fingerprints, context)
+                    futures[future] = strategy_name
+                    continue
+                
+                # Workers run uncached; look results up and store them here
+                if fingerprints is not None:
+                    try:
+                        strategy = self._resolve_strategy(strategy_name, parameters)
+                    except Exception as e:
+                        errors[strategy_name] = str(e)
+                        continue
+                    cache_keys[strategy_name] = result_cache_key(strategy, *fingerprints)
+                    cached_result = self.result_cache.get(cache_keys[strategy_name])
+                    if cached_result is not None:
+                        results[strategy_name] = cached_result
+                        continue
+                if owns_executor:
+                    future = executor.submit(_execute_strategy, strategy_name, parameters,
+                                             started=started_queue)
+                else:
+                    future = executor.submit(_execute_strategy, strategy_name, parameters,
+                                             factor_data, price_data, started_queue)
+                futures[future] = strategy_name
+            
+            timed_out = self._collect(futures, timeout, results, errors, started_queue)
+            for strategy_name, key in cache_keys.items():
+                if strategy_name in results and strategy_name not in errors:
+                    self.result_cache.set(key, results[strategy_name])
+        finally:
+            if owns_executor:
+                executor.shutdown(wait=not timed_out, cancel_futures=True)
+            if manager is not None:
+                manager.shutdown()
+        
+        return results, errors
+    
+    def _collect(self, futures: Dict[Any, str], timeout: Optional[float],
+                 results: Dict[str, StrategyResult], errors: Dict[str, str],
+                 started_queue: Optional[Any] = None) -> bool:
+        """Gather finished futures, failing any that run past the timeout; returns whether any timed out
+        
+        A run's time counts from when its future is running or, for process
+        pools, from when its worker reports on ``started_queue``.
+        """
+        pending = set(futures)
+        started: Dict[Any, float] = {}
+        begun = set()
+        timed_out = False
+        
+        while pending:
+            done, pending = wait(pending, timeout=0.05 if timeout is not None else None,
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                strategy_name = futures[future]
+                try:
+                    results[strategy_name] = future.result()
+                except Exception as e:
+                    self.logger.error(f"Strategy {strategy_name} failed: {e}")
+                    errors[strategy_name] = str(e)
+            
+            if timeout is None:
+                continue
+            now = time.monotonic()
+            while started_queue is not None:
+                try:
+                    begun.add(started_queue.get_nowait())
+                except queue.Empty:
+                    break
+            for future in list(pending):
+                if started_queue is not None:
+                    running = futures[future] in begun
+                else:
+                    running = future.running()
+                if running:
+                    started.setdefault(future, now)
+                if future in started and now - started[future] > timeout:
+                    future.cancel()
+                    pending.discard(future)
+                    timed_out = True
+                    strategy_name = futures[future]
+                    self.logger.error(f"Strategy {strategy_name} timed out after {timeout}s")
+                    errors[strategy_name] = f"Timed out after {timeout}s"
+                    self._track_orphan(strategy_name, future)
+        
+        return timed_out
+    
+    def _track_orphan(self, strategy_name: str, future: Future):
+        """Remember a timed-out run until its worker really finishes it"""
+        with self._locks_guard:
+            self._orphaned[strategy_name] = future
+        
+        def release(done: Future):
+            with self._locks_guard:
+                if self._orphaned.get(strategy_name) is done:
+                    del self._orphaned[strategy_name]
+        future.add_done_callback(release)
+    
     def run_multiple_strategies(self, strategy_configs: List[Dict[str, Any]],
                               factor_data: pd.DataFrame,
-                              price_data: pd.DataFrame) -> Dict[str, StrategyResult]:
+                              price_data: pd.DataFrame,
+                              timeout: Optional[float] = None) -> Dict[str, StrategyResult]:
         """
-        Run multiple strategies
+        Run multiple strategies concurrently
         
         Args:
             strategy_configs: List of strategy configurations
             factor_data: Factor data
             price_data: Price data
+            timeout: Per-strategy time limit in seconds
             
         Returns:
-            Dict: Strategy results
+            Dict: Strategy results, None for strategies that failed
         """
-        results = {}
+        results, errors = self.run_concurrently(strategy_configs, factor_data, price_data, timeout)
+        self.last_errors = errors
         
-        for config in strategy_configs:
-            strategy_name = config['name']
-            parameters = config.get('parameters', {})
-            
-            try:
-                result = self.run_strategy(strategy_name, factor_data, price_data, parameters)
-                results[strategy_name] = result
-                
-            except Exception as e:
-                self.logger.error(f"Failed to run strategy {strategy_name}: {e}")
-                results[strategy_name] = None
+        for strategy_name, error in errors.items():
+            self.logger.error(f"Failed to run strategy {strategy_name}: {error}")
         
-        return results
+        return {config['name']: results.get(config['name']) if config['name'] not in errors else None
+                for config in strategy_configs}
     
     def run_strategy_ensemble(self, strategy_names: List[str],
                             factor_data: pd.DataFrame,
                             price_data: pd.DataFrame,
                             ensemble_method: str = 'equal_weight',
-                            ensemble_parameters: Dict[str, Any] = None) -> StrategyResult:
+                            ensemble_parameters: Dict[str, Any] = None,
+                            timeout: Optional[float] = None) -> StrategyResult:
         """
         Run ensemble of strategies
         
@@ -115,18 +421,20 @@ class StrategyRunner:
             price_data: Price data
             ensemble_method: Method for combining strategies
             ensemble_parameters: Parameters for ensemble method
+            timeout: Per-strategy time limit in seconds
             
         Returns:
             StrategyResult: Ensemble result
         """
         # Run individual strategies
-        individual_results = {}
-        for strategy_name in strategy_names:
-            try:
-                result = self.run_strategy(strategy_name, factor_data, price_data)
-                individual_results[strategy_name] = result
-            except Exception as e:
-                self.logger.warning(f"Strategy {strategy_name} failed: {e}")
+        results, errors = self.run_concurrently([{'name': name} for name in strategy_names],
+                                                factor_data, price_data, timeout)
+        self.last_errors = errors
+        for strategy_name, error in errors.items():
+            self.logger.warning(f"Strategy {strategy_name} failed: {error}")
+        
+        individual_results = {name: results[name] for name in strategy_names
+                              if name in results and name not in errors}
         
         if not individual_results:
             raise ValueError("No strategies executed successfully")
@@ -141,19 +449,29 @@ class StrategyRunner:
         else:
             raise ValueError(f"Unknown ensemble method: {ensemble_method}")
     
+    def _selection_matrix(self, individual_results: Dict[str, StrategyResult]) -> Tuple[List[str], np.ndarray]:
+        """Symbols in first-appearance order and a strategies x symbols selection mask"""
+        selections = [result.selected_stocks for result in individual_results.values()]
+        symbols = list(dict.fromkeys(stock for selected in selections for stock in selected))
+        
+        counts = np.fromiter((len(selected) for selected in selections), dtype=np.int64,
+                             count=len(selections))
+        columns = pd.Index(symbols).get_indexer([stock for selected in selections for stock in selected])
+        selected = np.zeros((len(selections), len(symbols)), dtype=bool)
+        selected[np.repeat(np.arange(len(selections)), counts), columns] = True
+        return symbols, selected
+    
     def _combine_equal_weight(self, individual_results: Dict[str, StrategyResult]) -> StrategyResult:
         """Combine strategies with equal weights"""
-        all_stocks = set()
-        for result in individual_results.values():
-            all_stocks.update(result.selected_stocks)
+        symbols, selected = self._selection_matrix(individual_results)
         
-        # Equal weight for each stock
-        weight_per_stock = 1.0 / len(all_stocks) if all_stocks else 0
-        weights = {stock: weight_per_stock for stock in all_stocks}
+        # Equal weight for each stock in the union of selections
+        weight_per_stock = 1.0 / len(symbols) if symbols else 0
+        weights = {stock: weight_per_stock for stock in symbols}
         
         return StrategyResult(
             strategy_name="Ensemble_EqualWeight",
-            selected_stocks=list(all_stocks),
+            selected_stocks=symbols,
             weights=weights,
             parameters={'ensemble_method': 'equal_weight'},
             execution_time=datetime.now(),
@@ -166,25 +484,19 @@ class StrategyRunner:
         """Combine strategies weighted by performance"""
         # This is a simplified implementation
         # In practice, you might want to use historical performance or other metrics
+        symbols, selected = self._selection_matrix(individual_results)
         
-        all_stocks = set()
-        stock_scores = {}
-        
-        for strategy_name, result in individual_results.items():
-            # Use strategy performance as weight (simplified)
-            strategy_weight = 1.0 / len(individual_results)
-            
-            for stock in result.selected_stocks:
-                all_stocks.add(stock)
-                stock_scores[stock] = stock_scores.get(stock, 0) + strategy_weight
+        # Use strategy performance as weight (simplified: equal per strategy)
+        strategy_weights = np.full(len(individual_results), 1.0 / len(individual_results))
+        stock_scores = strategy_weights @ selected
         
         # Normalize weights
-        total_score = sum(stock_scores.values())
-        weights = {stock: score / total_score for stock, score in stock_scores.items()}
+        total_score = stock_scores.sum()
+        weights = dict(zip(symbols, (stock_scores / total_score).tolist())) if total_score > 0 else {}
         
         return StrategyResult(
             strategy_name="Ensemble_PerformanceWeight",
-            selected_stocks=list(all_stocks),
+            selected_stocks=symbols,
             weights=weights,
             parameters={'ensemble_method': 'performance_weight'},
             execution_time=datetime.now(),
@@ -195,19 +507,15 @@ class StrategyRunner:
     def _combine_voting(self, individual_results: Dict[str, StrategyResult],
                        parameters: Dict[str, Any]) -> StrategyResult:
         """Combine strategies using voting mechanism"""
-        vote_threshold = parameters.get('vote_threshold', 0.5)
-        
-        stock_votes = {}
-        for result in individual_results.values():
-            for stock in result.selected_stocks:
-                stock_votes[stock] = stock_votes.get(stock, 0) + 1
+        vote_threshold = (parameters or {}).get('vote_threshold', 0.5)
+        symbols, selected = self._selection_matrix(individual_results)
         
         # Select stocks that receive enough votes
         num_strategies = len(individual_results)
         min_votes = int(num_strategies * vote_threshold)
         
-        selected_stocks = [stock for stock, votes in stock_votes.items() 
-                          if votes >= min_votes]
+        stock_votes = selected.sum(axis=0)
+        selected_stocks = [symbols[i] for i in np.flatnonzero(stock_votes >= min_votes)]
         
         # Equal weight for selected stocks
         weight_per_stock = 1.0 / len(selected_stocks) if selected_stocks else 0
@@ -224,7 +532,8 @@ class StrategyRunner:
         )
     
     def _log_execution(self, strategy_name: str, result: StrategyResult,
-                      execution_time: datetime, parameters: Dict[str, Any]):
+                      execution_time: datetime, parameters: Dict[str, Any],
+                      cached: bool = False):
         """Log strategy execution"""
         log_entry = {
             'strategy_name': strategy_name,
@@ -232,7 +541,8 @@ class StrategyRunner:
             'duration': execution_time,
             'num_stocks': len(result.selected_stocks),
             'parameters': parameters,
-            'performance_metrics': result.performance_metrics
+            'performance_metrics': result.performance_metrics,
+            'cached': cached
         }
         
         self.execution_history.append(log_entry)
@@ -247,4 +557,13 @@ class StrategyRunner:
     def clear_history(self):
         """Clear execution history"""
         self.execution_history.clear()
-        self.logger.info("Execution history cleared") 
\ No newline at end of file
+        self.logger.info("Execution history cleared")
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get result cache hit/miss statistics"""
+        return self.result_cache.get_stats()
+    
+    def clear_cache(self, disk: bool = True):
+        """Drop memoized strategy results"""
+        self.result_cache.clear(disk=disk)
+        self.logger.info("Strategy result cache cleared") 
\ No newline at end of file
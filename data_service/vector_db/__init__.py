@@ -1,6 +1,18 @@
 from .vector_store import VectorStore
-from .embedding_manager import EmbeddingManager
-from .search_engine import SearchEngine
-from .document_processor import DocumentProcessor
 
-__all__ = ['VectorStore', 'EmbeddingManager', 'SearchEngine', 'DocumentProcessor'] 
\ No newline at end of file
+try:
+    from .embedding_manager import EmbeddingManager
+except ImportError:
+    EmbeddingManager = None
+
+try:
+    from .search_engine import SearchEngine
+except ImportError:
+    SearchEngine = None
+
+try:
+    from .document_processor import DocumentProcessor
+except ImportError:
+    DocumentProcessor = None
+
+__all__ = ['VectorStore', 'EmbeddingManager', 'SearchEngine', 'DocumentProcessor'] 
@@ -25,12 +25,15 @@ class VectorStore:
     def __init__(self, db_path: str = "vector_store.db"):
         self.db_path = db_path
         self.logger = logging.getLogger(__name__)
+        # Per-collection (ids, unit-normalized embedding matrix), rebuilt after changes
+        self._index_cache: Dict[str, Tuple[List[str], np.ndarray]] = {}
         self._init_database()
         
     def _init_database(self):
         """Initialize vector database"""
         try:
-            self.conn = sqlite3.connect(self.db_path)
+            # Callers serialize access; the connection may be used from worker threads
+            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
             self._create_tables()
             self.logger.info("Vector database initialized")
         except Exception as e:
@@ -123,6 +126,7 @@ class VectorStore:
             ''', (document.id, collection))
             
             self.conn.commit()
+            self._index_cache.clear()
             self.logger.info(f"Document {document.id} added to collection {collection}")
             return True
             
@@ -164,6 +168,60 @@ class VectorStore:
                       top_k: int = 10,
                       similarity_threshold: float = 0.5) -> List[Tuple[VectorDocument, float]]:
         """Search for similar documents"""
+        try:
+            ids, matrix = self._collection_index(collection)
+        except ValueError:
+            # Embeddings of different dimensions cannot be stacked
+            return self._search_similar_scan(query_embedding, collection, top_k, similarity_threshold)
+        except Exception as e:
+            self.logger.error(f"Error searching documents: {e}")
+            return []
+        
+        if not ids:
+            return []
+        
+        # Cosine similarity against the whole collection at once
+        query = np.asarray(query_embedding, dtype=float)
+        norm = np.linalg.norm(query)
+        similarities = matrix @ (query / norm) if norm > 0 else np.zeros(len(ids))
+        candidates = np.flatnonzero(similarities >= similarity_threshold)
+        best = candidates[np.argsort(-similarities[candidates], kind='stable')[:top_k]]
+        
+        results = []
+        for index in best:
+            document = self.get_document(ids[index])
+            if document is not None:
+                results.append((document, float(similarities[index])))
+        return results
+    
+    def _collection_index(self, collection: str) -> Tuple[List[str], np.ndarray]:
+        """Ids and unit-normalized embeddings of a collection, cached until documents change"""
+        cached = self._index_cache.get(collection)
+        if cached is not None:
+            return cached
+        
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT e.id, e.embedding_data
+            FROM embeddings e
+            JOIN document_collections dc ON e.id = dc.document_id
+            WHERE dc.collection_name = ?
+        ''', (collection,))
+        rows = cursor.fetchall()
+        ids = [row[0] for row in rows]
+        if rows:
+            matrix = np.vstack([np.asarray(pickle.loads(row[1]), dtype=float).ravel() for row in rows])
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+        else:
+            matrix = np.zeros((0, 0))
+        
+        self._index_cache[collection] = (ids, matrix)
+        return ids, matrix
+    
+    def _search_similar_scan(self, query_embedding: np.ndarray, collection: str,
+                             top_k: int, similarity_threshold: float) -> List[Tuple[VectorDocument, float]]:
+        """Row-by-row search, for collections with mixed embedding dimensions"""
         try:
             cursor = self.conn.cursor()
             
@@ -235,6 +293,7 @@ class VectorStore:
             cursor.execute('DELETE FROM documents WHERE id = ?', (document_id,))
             
             self.conn.commit()
+            self._index_cache.clear()
             self.logger.info(f"Document {document_id} deleted")
             return True
             
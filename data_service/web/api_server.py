@@ -15,6 +15,7 @@ import logging
 from datetime import datetime, timedelta
 import asyncio
 import json
+import os
 
 # Import our trading system modules
 try:
@@ -107,7 +108,12 @@ class APIServer:
             self.factor_screener = FactorScreener()
             self.factor_backtest = FactorBacktest()
             self.strategy_registry = StrategyRegistry()
-            self.llm_integration = LLMIntegration()
+            # LLM_PROVIDER=local serves from the process-wide local model shared with other components
+            self.llm_integration = LLMIntegration(
+                provider=os.getenv('LLM_PROVIDER', 'openai'),
+                api_key=os.getenv('OPENAI_API_KEY'),
+                model=os.getenv('LLM_MODEL', 'gpt-3.5-turbo')
+            )
             self.nlp_processor = NLPProcessor()
             self.sentiment_calculator = SentimentFactorCalculator()
             self.yahoo_fetcher = YahooFetcher()
@@ -0,0 +1,146 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+from data_service.api.api_manager import (
+    APIManager,
+    APIEndpoint,
+    APIResponse,
+    TokenBucket,
+    ResponseCache
+)
+
+class TestAPIManager(unittest.TestCase):
+    """Test cases for APIManager pooling, rate limiting and caching"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.manager = APIManager(cache_size=2)
+        self.manager.register_endpoint('quote', APIEndpoint(
+            name='quote',
+            url='https://example.com/quote',
+            method='GET',
+            headers={},
+            params={},
+            rate_limit=60
+        ))
+
+    def _fake_response(self, delay: float = 0.0):
+        def execute(endpoint, params=None):
+            time.sleep(delay)
+            return APIResponse(200, {'params': params}, {}, None, endpoint.name, delay)
+        return execute
+
+    def test_token_bucket(self):
+        """Test token bucket refuses once empty and refills over time"""
+        bucket = TokenBucket(rate_limit=600, capacity=2)
+        self.assertTrue(bucket.try_acquire())
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+        self.assertTrue(bucket.acquire(timeout=1.0))
+
+    def test_async_token_bucket(self):
+        """Test callers can await a token instead of failing"""
+        bucket = TokenBucket(rate_limit=600, capacity=1)
+        self.assertTrue(bucket.try_acquire())
+        self.assertTrue(asyncio.run(bucket.acquire_async(timeout=1.0)))
+        self.assertFalse(asyncio.run(bucket.acquire_async(timeout=0.01)))
+
+    def test_response_cache_lru_and_ttl(self):
+        """Test the cache evicts least recently used and expired entries"""
+        cache = ResponseCache(max_size=2)
+        cache.set('a', 1, ttl=60)
+        cache.set('b', 2, ttl=60)
+        cache.get('a')
+        cache.set('c', 3, ttl=60)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+
+        cache.set('d', 4, ttl=0)
+        self.assertIsNone(cache.get('d'))
+        self.assertEqual(cache.get_stats()['evictions'], 2)
+
+    def test_cached_request(self):
+        """Test repeated requests are served from the cache"""
+        with patch.object(self.manager, '_execute_request',
+                          side_effect=self._fake_response()) as execute:
+            first = self.manager.make_request('quote', {'symbol': 'AAPL'})
+            second = self.manager.make_request('quote', {'symbol': 'AAPL'})
+
+        self.assertIs(first, second)
+        self.assertEqual(execute.call_count, 1)
+
+    def test_concurrent_requests_coalesce(self):
+        """Test identical concurrent requests share one in-flight call"""
+        results = []
+        with patch.object(self.manager, '_execute_request',
+                          side_effect=self._fake_response(delay=0.2)) as execute:
+            threads = [
+                threading.Thread(target=lambda: results.append(
+                    self.manager.make_request('quote', {'symbol': 'AAPL'}, use_cache=False)))
+                for _ in range(5)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(execute.call_count, 1)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(r is results[0] for r in results))
+
+    def test_followers_wait_for_a_slow_leader(self):
+        """Test a coalesced caller gets the leader's response even past the endpoint timeout"""
+        self.manager.endpoints['quote'].timeout = 0.1
+        results = []
+        with patch.object(self.manager, '_execute_request',
+                          side_effect=self._fake_response(delay=0.3)) as execute:
+            threads = [
+                threading.Thread(target=lambda: results.append(self.manager.make_request(
+                    'quote', {'symbol': 'AAPL'}, use_cache=False, wait_for_rate_limit=True)))
+                for _ in range(3)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(execute.call_count, 1)
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(r is not None and r is results[0] for r in results))
+
+    def test_async_session_from_another_loop_is_closed(self):
+        """Test a session left by a finished event loop is closed when it is replaced"""
+        endpoint = self.manager.endpoints['quote']
+        first = asyncio.run(self.manager._get_async_session(endpoint))
+        second = asyncio.run(self.manager._get_async_session(endpoint))
+        self.assertIsNot(first, second)
+        self.assertTrue(first.closed)
+        self.assertFalse(second.closed)
+
+        async def reuse_and_close():
+            session = await self.manager._get_async_session(endpoint)
+            await self.manager.aclose()
+            return session
+        third = asyncio.run(reuse_and_close())
+        self.assertTrue(second.closed)
+        self.assertTrue(third.closed)
+
+    def test_session_reuse(self):
+        """Test the endpoint session is created once and reused"""
+        session = Mock()
+        session.get.return_value = Mock(
+            status_code=200, headers={}, json=Mock(return_value={}),
+            elapsed=Mock(total_seconds=Mock(return_value=0.01))
+        )
+        with patch('data_service.api.api_manager.requests.Session', return_value=session) as factory:
+            self.manager.make_request('quote', {'symbol': 'AAPL'}, use_cache=False)
+            self.manager.make_request('quote', {'symbol': 'MSFT'}, use_cache=False)
+
+        self.assertEqual(factory.call_count, 1)
+        self.assertEqual(session.get.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+
+from data_service.ai.context_builder import ContextBuilder, estimate_tokens, summarize_frame
+from data_service.ai.llm_integration import LLMIntegration, FakeLLMProvider
+from data_service.vector_db.vector_store import VectorStore
+
+class TestContextBuilder(unittest.TestCase):
+    """Test cases for retrieval and token-budgeted prompt context"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.now = datetime(2024, 6, 3, 12, 0)
+        self.store = VectorStore(':memory:')
+        self.builder = ContextBuilder(self.store, token_budget=300, top_k=3, max_document_tokens=40)
+        self.builder.add_documents([
+            {'id': 'a', 'content': 'Apple earnings beat estimates as iPhone sales grow', 'timestamp': self.now - timedelta(hours=2)},
+            {'id': 'b', 'content': 'Apple earnings beat estimates as iPhone sales grow strongly', 'timestamp': self.now - timedelta(hours=3)},
+            {'id': 'c', 'content': 'Apple earnings miss estimates as iPhone sales slow', 'timestamp': self.now - timedelta(days=30)},
+            {'id': 'd', 'content': 'Oil prices fall on rising crude inventories', 'timestamp': self.now - timedelta(hours=1)},
+            {'id': 'e', 'content': 'Apple announces iPhone sales and services revenue record ' * 30, 'timestamp': self.now}
+        ])
+
+    def test_retrieval_ranks_dedups_and_truncates(self):
+        """Test relevance, recency ranking, near-duplicate removal and per-document caps"""
+        documents = self.builder.retrieve('Apple earnings iPhone sales', as_of=self.now)
+        ids = [document.id for document in documents]
+
+        self.assertNotIn('d', ids)
+        self.assertEqual(len({'a', 'b'} & set(ids)), 1)
+        self.assertLess(ids.index('a' if 'a' in ids else 'b'), ids.index('c') if 'c' in ids else len(ids))
+
+        section = self.builder.document_section('Apple earnings iPhone sales', as_of=self.now)
+        for line in section.text.splitlines():
+            self.assertLessEqual(estimate_tokens(line), 40 + 15)
+
+    def test_prompt_size_is_flat_in_history(self):
+        """Test that prompts stay within budget however long the frames are"""
+        rng = np.random.default_rng(0)
+        llm = LLMIntegration(provider=FakeLLMProvider(), context_builder=self.builder)
+        sizes = []
+        for rows in (50, 5_000, 50_000):
+            index = pd.date_range('2000-01-01', periods=rows, freq='h')
+            frame = pd.DataFrame({'close': 100 + rng.normal(size=rows).cumsum(),
+                                  'volume': rng.uniform(1e5, 1e6, rows)}, index=index)
+            prompt = llm._create_market_analysis_prompt(frame, ['AAPL'])
+            sizes.append(estimate_tokens(prompt))
+            self.assertIn('Market data', prompt)
+
+        self.assertLess(max(sizes) - min(sizes), 20)
+        self.assertIn('rows', summarize_frame(frame, 'x'))
+        context = self.builder.build('Apple earnings', frames={'Market data': frame}, as_of=self.now)
+        self.assertLessEqual(estimate_tokens(context), 300 + 5)
+
+if __name__ == '__main__':
+    unittest.main()
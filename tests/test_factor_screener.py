@@ -0,0 +1,120 @@
+import unittest
+import pandas as pd
+import numpy as np
+
+from data_service.factors.factor_screener import FactorScreener, ScreeningCriteria
+from data_service.factors.screening_expression import (
+    compile_screen, CompiledScreen, ScreeningExpressionError, NUMEXPR_AVAILABLE
+)
+
+class TestFactorScreener(unittest.TestCase):
+    """Test cases for the vectorized factor screener"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        rows = []
+        for symbol, pe, roe in [('AAPL', 25.0, 30.0), ('MSFT', 15.0, 20.0),
+                                ('TSLA', 60.0, 5.0), ('NVDA', 10.0, 40.0)]:
+            rows.append((symbol, '2024-01-01', 'pe_ratio', pe))
+            rows.append((symbol, '2024-01-01', 'roe', roe))
+        # A later row for the same factor overrides the earlier one
+        rows.append(('TSLA', '2024-01-02', 'roe', 12.0))
+        self.factor_data = pd.DataFrame(rows, columns=['symbol', 'date', 'factor_name', 'factor_value'])
+
+    def test_scores_and_failures(self):
+        """Test weighted scores, ranks and failure messages"""
+        screener = FactorScreener()
+        screener.add_criteria(ScreeningCriteria('pe_ratio', max_value=20.0, weight=2.0))
+        screener.add_criteria({'factor_name': 'roe', 'min_value': 15.0})
+
+        results = screener.screen_stocks(self.factor_data)
+        by_symbol = {r.symbol: r for r in results}
+
+        self.assertEqual([r.symbol for r in results], ['MSFT', 'NVDA', 'AAPL', 'TSLA'])
+        self.assertEqual([r.rank for r in results], [1, 2, 3, 4])
+        self.assertAlmostEqual(by_symbol['AAPL'].score, 1 / 3)
+        self.assertEqual(by_symbol['AAPL'].failed_criteria, ['pe_ratio: 25.0 > 20.0'])
+        self.assertEqual(by_symbol['TSLA'].failed_criteria,
+                         ['pe_ratio: 60.0 > 20.0', 'roe: 12.0 < 15.0'])
+        self.assertEqual(by_symbol['TSLA'].score, 0.0)
+
+    def test_cross_sectional_percentile(self):
+        """Test percentile criteria rank against the whole universe"""
+        screener = FactorScreener()
+        screener.add_criteria(ScreeningCriteria('roe', min_percentile=50.0))
+        screener.add_custom_filter('cheap', lambda symbol, values: values['pe_ratio'] < 20)
+
+        results = screener.screen_stocks(self.factor_data, passed_only=True)
+
+        self.assertEqual([r.symbol for r in results], ['NVDA'])
+        percentiles = screener.calculate_percentile_ranks(screener.build_factor_matrix(self.factor_data))
+        np.testing.assert_allclose(percentiles['roe'].to_numpy(), [50.0, 25.0, 0.0, 75.0])
+
+    def test_expression_filter(self):
+        """Test expression screens match the equivalent column logic"""
+        screener = FactorScreener()
+        screener.save_screen('quality_value', 'pe_ratio < 30 and pct_rank(roe) >= 50')
+
+        mask = screener.apply_screen('quality_value', self.factor_data)
+
+        self.assertEqual(list(mask[mask].index), ['AAPL', 'NVDA'])
+        self.assertIs(compile_screen('pe_ratio < 30 and pct_rank(roe) >= 50'),
+                      screener.saved_screens['quality_value'])
+
+        screener.add_expression_filter('low_pe', 'not pe_ratio > 20')
+        results = screener.screen_stocks(self.factor_data, passed_only=True)
+        self.assertEqual([r.symbol for r in results], ['MSFT', 'NVDA'])
+
+    def test_filters_on_missing_factors_are_skipped(self):
+        """Test volatility and liquidity filters are skipped when the data has no such factor"""
+        screener = FactorScreener()
+        screener.add_criteria(ScreeningCriteria('pe_ratio', max_value=20.0))
+        screener.add_volatility_filter()
+        screener.add_liquidity_filter()
+
+        results = screener.screen_stocks(self.factor_data, passed_only=True)
+        self.assertEqual([r.symbol for r in results], ['MSFT', 'NVDA'])
+        self.assertEqual(results[0].score, 1.0)
+        self.assertEqual(results[0].passed_criteria, ['pe_ratio'])
+
+        # With the factor present the filter applies again, missing values included
+        with_volume = pd.concat([self.factor_data, pd.DataFrame(
+            [('MSFT', '2024-01-01', 'volume', 5e6)], columns=self.factor_data.columns)])
+        results = screener.screen_stocks(with_volume, passed_only=True)
+        self.assertEqual([r.symbol for r in results], ['MSFT'])
+
+    def test_invalid_expressions(self):
+        """Test unsafe syntax and unknown factors are rejected"""
+        screener = FactorScreener()
+        for expression in ["__import__('os')", 'pe_ratio.real > 1', 'pe_ratio <']:
+            with self.assertRaises(ScreeningExpressionError):
+                compile_screen(expression)
+        with self.assertRaises(ScreeningExpressionError):
+            screener.apply_screen('dividend_yield > 2', self.factor_data)
+
+    def test_numeric_boolean_operands_agree_across_backends(self):
+        """Test and/or/not on numeric factors treat missing as false on numpy and numexpr alike"""
+        matrix = pd.DataFrame({'pe_ratio': [0.0, 12.0, np.nan, 25.0], 'roe': [5.0, np.nan, 8.0, 0.0]},
+                              index=['A', 'B', 'C', 'D'])
+        expected = {
+            'not pe_ratio': [True, False, True, False],
+            'pe_ratio and roe': [False, False, False, False],
+            'pe_ratio or roe': [True, True, True, True],
+            'pe_ratio / 0 > 1': [False, True, False, True],
+            'not isnull(pe_ratio) and roe > 1': [True, False, False, False],
+        }
+        for expression, mask in expected.items():
+            screen = CompiledScreen(expression)
+            self.assertEqual(list(screen.evaluate(matrix)), mask, expression)
+            screen._numexpr_source = None
+            self.assertEqual(list(screen.evaluate(matrix)), mask, expression)
+        if NUMEXPR_AVAILABLE:
+            self.assertIsNotNone(CompiledScreen('pe_ratio and roe')._numexpr_source)
+
+        screener = FactorScreener()
+        screener.add_expression_filter('numeric', 'pe_ratio and roe > 1')
+        results = screener.screen_stocks(self.factor_data, passed_only=True)
+        self.assertEqual(len(results), 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import pandas as pd
+import numpy as np
+
+from data_service.ml.feature_engineering import FeatureEngineer, FeatureConfig
+
+class TestPanelFeatures(unittest.TestCase):
+    """Test cases for panel-wide feature engineering"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        rng = np.random.default_rng(1)
+        dates = pd.date_range('2023-01-01', periods=120, freq='D')
+        frames = []
+        for symbol in ['AAPL', 'MSFT', 'TSLA']:
+            close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates))))
+            frames.append(pd.DataFrame({
+                'open': close,
+                'high': close * 1.01,
+                'low': close * 0.99,
+                'close': close,
+                'volume': rng.integers(1000, 5000, len(dates)).astype(float)
+            }, index=pd.MultiIndex.from_product([[symbol], dates], names=['symbol', 'date'])))
+        self.panel = pd.concat(frames)
+        self.engineer = FeatureEngineer()
+        self.config = FeatureConfig(interaction_features=True)
+
+    def test_panel_matches_single_symbol(self):
+        """Test panel features equal the per-symbol pipeline"""
+        panel_features = self.engineer.engineer_panel_features(self.panel, self.config)
+
+        for symbol in ['AAPL', 'MSFT', 'TSLA']:
+            single = self.engineer.engineer_features(self.panel.loc[symbol], self.config)
+            self.assertEqual(list(single.columns), list(panel_features.columns))
+            np.testing.assert_allclose(panel_features.loc[symbol].values, single.values,
+                                       rtol=1e-9, equal_nan=True)
+
+    def test_wide_input_and_missing_rows(self):
+        """Test dict-of-wide-frames input and that absent rows are dropped"""
+        wide = {field: self.panel[field].unstack(level=0) for field in ['close', 'volume']}
+        from_wide = self.engineer.engineer_panel_features(wide, self.config)
+        self.assertEqual(len(from_wide), len(self.panel))
+
+        sparse = self.panel.drop(self.panel.index[:10])
+        features = self.engineer.engineer_panel_features(sparse, self.config)
+        self.assertEqual(len(features), len(sparse))
+        self.assertTrue(features.index.isin(sparse.index).all())
+
+if __name__ == '__main__':
+    unittest.main()
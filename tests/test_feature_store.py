@@ -0,0 +1,101 @@
+import unittest
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import numpy as np
+
+from data_service.ml.feature_engineering import FeatureEngineer, FeatureConfig
+from data_service.ml.feature_store import FeatureStore
+
+class TestFeatureStore(unittest.TestCase):
+    """Test cases for the versioned feature store"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        rng = np.random.default_rng(4)
+        self.dates = pd.date_range('2023-01-01', periods=160, freq='D')
+        frames = []
+        for symbol in ['AAPL', 'MSFT']:
+            close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(self.dates))))
+            frames.append(pd.DataFrame({
+                'open': close,
+                'high': close * 1.01,
+                'low': close * 0.99,
+                'close': close,
+                'volume': rng.integers(1000, 5000, len(self.dates)).astype(float)
+            }, index=pd.MultiIndex.from_product([[symbol], self.dates], names=['symbol', 'date'])))
+        self.panel = pd.concat(frames)
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = FeatureStore(self.directory.name)
+        self.config = FeatureConfig(interaction_features=True)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_incremental_appends_match_full_computation(self):
+        """Test daily appends give the features of one full run and up-to-date data is not recomputed"""
+        cutoff = self.dates[120]
+        history = self.panel[self.panel.index.get_level_values('date') < cutoff]
+        self.assertEqual(self.store.materialize(history, self.config), 240)
+        self.assertEqual(self.store.materialize(history, self.config), 0)
+        self.assertEqual(self.store.stats['skipped'], 1)
+        for day in self.dates[120:123]:
+            upto = self.panel[self.panel.index.get_level_values('date') <= day]
+            self.assertEqual(self.store.materialize(upto, self.config), 2)
+        self.assertEqual(self.store.last_date('AAPL', config=self.config), self.dates[122])
+
+        expected = FeatureEngineer().engineer_panel_features(
+            self.panel[self.panel.index.get_level_values('date') <= self.dates[122]], self.config)
+        stored = self.store.read(config=self.config)
+        self.assertEqual(list(stored.columns), list(expected.columns))
+        np.testing.assert_allclose(stored.values, expected.values, rtol=1e-9, equal_nan=True)
+
+        self.assertEqual(self.store.compact(config=self.config), 2)
+        pd.testing.assert_frame_equal(self.store.read(config=self.config), stored)
+
+        # Another config or data version is a separate feature set
+        self.assertIsNone(self.store.last_date('AAPL', config=FeatureConfig()))
+        self.assertIsNone(self.store.last_date('AAPL', config=self.config, data_version='v2'))
+
+    def test_point_in_time_reads_and_transformers(self):
+        """Test as_of reads exclude later rows and use transformers fitted before as_of"""
+        config = FeatureConfig(pca_features=True, n_pca_components=3)
+        single = self.panel.loc['AAPL']
+        features = self.store.get_features(single, config, symbol='AAPL')
+        self.assertEqual(len(features), len(single))
+        self.assertNotIn('pca_1', features.columns)
+
+        early = self.store.fit_transformers(self.dates[79], config=config)
+        self.store.fit_transformers(self.dates[139], config=config)
+
+        as_of = self.dates[100]
+        known = self.store.read('AAPL', config=config, as_of=as_of, transform=True)
+        self.assertEqual(known.index.max(), as_of)
+        expected = early.transform_features(self.store.read('AAPL', config=config, end=as_of))
+        pd.testing.assert_frame_equal(known, expected)
+        self.assertIn('pca_3', known.columns)
+
+        with self.assertRaises(ValueError):
+            self.store.read('AAPL', config=config, as_of=self.dates[50], transform=True)
+
+    def test_concurrent_consumers_compute_once(self):
+        """Test consumers racing on the same new dates compute and store them once"""
+        single = self.panel.loc['AAPL']
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            appended = list(pool.map(lambda _: self.store.materialize(single, self.config, symbol='AAPL'), range(4)))
+        self.assertEqual(sorted(appended), [0, 0, 0, len(single)])
+        self.assertEqual(self.store.stats['computations'], 1)
+        self.assertEqual(len(self.store.read('AAPL', config=self.config)), len(single))
+
+        # Separate store objects stand in for separate processes: only the lock file serializes them
+        stores = [FeatureStore(self.directory.name) for _ in range(4)]
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(lambda store: store.materialize(self.panel, self.config), stores))
+        self.assertEqual(sum(store.stats['computations'] for store in stores), 1)
+        stored = self.store.read(config=self.config)
+        self.assertEqual(len(stored), len(self.panel))
+        self.assertFalse(stored.index.duplicated().any())
+        self.assertEqual(self.store.compact(config=self.config), 0)
+
+if __name__ == '__main__':
+    unittest.main()
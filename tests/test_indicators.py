@@ -0,0 +1,71 @@
+import unittest
+import pandas as pd
+import numpy as np
+
+from data_service.ml import indicators
+from data_service.ml.feature_engineering import FeatureEngineer
+
+class TestIndicators(unittest.TestCase):
+    """Test cases for the array-based indicator kernels"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        rng = np.random.default_rng(0)
+        close = 100 + np.cumsum(rng.normal(0, 1, 200))
+        self.data = pd.DataFrame({
+            'high': close + 1,
+            'low': close - 1,
+            'close': close,
+            'volume': rng.integers(100, 1000, 200).astype(float)
+        })
+
+    def test_obv_matches_definition(self):
+        """Test OBV adds volume on up moves and subtracts it on down moves"""
+        obv = indicators.on_balance_volume([10, 11, 11, 9], [100, 50, 30, 20])
+        np.testing.assert_allclose(obv, [100, 150, 150, 130])
+
+    def test_mfi_matches_rolling_reference(self):
+        """Test MFI equals the pandas rolling-sum formulation"""
+        d = self.data
+        tp = (d['high'] + d['low'] + d['close']) / 3
+        flow = tp * d['volume']
+        direction = np.sign(tp.diff()).fillna(0)
+        pos = flow.where(direction > 0, 0.0).rolling(14).sum()
+        neg = flow.where(direction < 0, 0.0).rolling(14).sum()
+        expected = 100 - 100 / (1 + pos / neg)
+
+        actual = indicators.money_flow_index(d['high'], d['low'], d['close'], d['volume'])
+        np.testing.assert_allclose(actual, expected.values, equal_nan=True)
+
+    def test_cci_matches_rolling_apply(self):
+        """Test CCI equals the rolling-apply mean absolute deviation version"""
+        d = self.data
+        tp = (d['high'] + d['low'] + d['close']) / 3
+        mad = tp.rolling(20).apply(lambda x: np.mean(np.abs(x - x.mean())))
+        expected = (tp - tp.rolling(20).mean()) / (0.015 * mad)
+
+        actual = indicators.commodity_channel_index(d['high'], d['low'], d['close'])
+        np.testing.assert_allclose(actual, expected.values, equal_nan=True)
+
+        # A time x symbols panel gives each column's own series result
+        panel = np.column_stack([tp.values, tp.values[::-1]])
+        mad_panel = indicators.rolling_mean_abs_deviation(panel, 20)
+        np.testing.assert_allclose(mad_panel[:, 0], mad.values, equal_nan=True)
+        np.testing.assert_allclose(mad_panel[:, 1], indicators.rolling_mean_abs_deviation(tp.values[::-1], 20),
+                                   equal_nan=True)
+
+    def test_psar_reversal(self):
+        """Test a reversal jumps to the extreme point and restarts from the reversing bar's low"""
+        high = np.array([10.0, 11.0, 12.0, 9.0, 8.0])
+        low = np.array([9.0, 10.0, 11.0, 7.0, 6.0])
+        # Long from the first low with the extreme point at the highs, then short at bar 3 with EP = 7
+        np.testing.assert_allclose(indicators.parabolic_sar(high, low), [9.0, 9.02, 9.0992, 12.0, 11.9])
+
+    def test_psar_has_values(self):
+        """Test PSAR produces values on every bar"""
+        psar = FeatureEngineer()._calculate_psar(self.data)
+        self.assertEqual(len(psar), len(self.data))
+        self.assertFalse(psar.isna().any())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import numpy as np
+
+from data_service.ml.ml_models import PredictionModel, ClassificationModel, ModelConfig, MLModelManager
+from data_service.ml.inference import InferenceService, _Request
+
+class TestInferenceService(unittest.TestCase):
+    """Test cases for the micro-batched inference service"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        rng = np.random.default_rng(3)
+        dates = pd.date_range('2022-01-01', periods=400, freq='D')
+        self.X = pd.DataFrame(rng.normal(size=(400, 5)), index=dates, columns=[f'f{i}' for i in range(5)])
+        y = (self.X['f0'] - 0.5 * self.X['f1'] + rng.normal(scale=0.1, size=400)).rename('target')
+
+        self.manager = MLModelManager()
+        for model_type in ['ridge', 'random_forest']:
+            model = PredictionModel(model_type)
+            model.train(self.X, y, ModelConfig(model_type=model_type, parameters={},
+                                               feature_columns=list(self.X.columns), target_column='target',
+                                               cross_validate=False))
+            self.manager.add_model(f'{model_type}_regressor', model)
+        classifier = ClassificationModel('logistic_regression')
+        classifier.train(self.X, (y > 0).astype(int), ModelConfig(
+            model_type='logistic_regression', parameters={}, feature_columns=list(self.X.columns),
+            target_column='target', cross_validate=False))
+        self.manager.add_model('logistic_regression_classifier', classifier)
+        self.service = self.manager.get_inference_service(batch_wait=0.005)
+
+    def tearDown(self):
+        self.service.close()
+
+    def test_matches_model_predictions(self):
+        """Test batched predictions equal each model's own predict up to float32 rounding"""
+        # Columns out of order: the service selects them by name
+        sample = self.X.iloc[:50]
+        reordered = sample[list(reversed(sample.columns))]
+        for name in ['ridge_regressor', 'random_forest_regressor']:
+            np.testing.assert_allclose(self.service.predict(name, reordered), self.manager.predict(name, sample),
+                                       atol=1e-4)
+        classifier = self.manager.models['logistic_regression_classifier']
+        np.testing.assert_allclose(self.service.predict_proba('logistic_regression_classifier', reordered),
+                                   classifier.predict_proba(sample), atol=1e-5)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = f'{directory}/ridge_regressor.joblib'
+            self.manager.models['ridge_regressor'].save_model(path)
+            self.service.load('ridge_from_disk', path)
+            first = self.service.predict('ridge_from_disk', sample)
+            misses = self.service.cache.misses
+            np.testing.assert_allclose(self.service.predict('ridge_from_disk', sample), first)
+            self.assertEqual(self.service.cache.misses, misses)
+
+            # The kind of model comes from the file contents, not its name
+            misleading = f'{directory}/ridge_classifier.joblib'
+            self.manager.models['ridge_regressor'].save_model(misleading)
+            self.service.load('regressor', misleading)
+            np.testing.assert_allclose(self.service.predict('regressor', sample), first)
+            renamed = f'{directory}/signals.joblib'
+            classifier.save_model(renamed)
+            self.service.load('classifier', renamed)
+            np.testing.assert_allclose(self.service.predict_proba('classifier', sample),
+                                       classifier.predict_proba(sample), atol=1e-5)
+
+        self.assertIs(self.manager.get_inference_service(), self.service)
+        self.assertIs(self.manager.get_inference_service(batch_wait=0.005), self.service)
+        with self.assertRaises(ValueError):
+            self.manager.get_inference_service(batch_wait=0.1)
+
+    def test_concurrent_callers_are_batched(self):
+        """Test single-row requests from many threads share batches and report latency"""
+        rows = [self.X.iloc[[i]] for i in range(200)]
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            outputs = list(pool.map(lambda row: self.service.predict('random_forest_regressor', row), rows))
+
+        expected = self.manager.predict('random_forest_regressor', self.X.iloc[:200])
+        np.testing.assert_allclose(np.concatenate(outputs), expected, atol=1e-4)
+        stats = self.service.get_stats()['models']['random_forest_regressor']
+        self.assertEqual(stats['requests'], 200)
+        self.assertLess(stats['batches'], 200)
+        self.assertGreater(stats['p99_ms'], 0.0)
+        self.assertGreaterEqual(stats['p99_ms'], stats['p50_ms'])
+
+    def test_malformed_requests_do_not_stop_the_worker(self):
+        """Test a wrong feature width fails in the caller and a failing batch only fails its own futures"""
+        with self.assertRaises(ValueError):
+            self.service.predict('ridge_regressor', np.zeros((2, 3)))
+
+        # Requests that bypass submit's check: the batch concatenation fails in the worker
+        model = self.service._resolve('random_forest_regressor')
+        bad = [_Request(model, 'random_forest_regressor', False, np.zeros((2, width), dtype=np.float32))
+               for width in (3, 4)]
+        for request in bad:
+            self.service._queue.put(request)
+        for request in bad:
+            with self.assertRaises(ValueError):
+                request.future.result(timeout=5)
+
+        self.assertTrue(self.service._worker.is_alive())
+        output = self.service.submit('random_forest_regressor', self.X.iloc[:3]).result(timeout=5)
+        self.assertEqual(len(output), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import json
+import numpy as np
+import pandas as pd
+
+from data_service.ai.llm_integration import LLMIntegration, FakeLLMProvider
+from data_service.ai.langchain_agent import LangChainAgent
+
+class TestLangChainAgent(unittest.TestCase):
+    """Test cases for concurrent, memoized agent tools and compressed prompts"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        rng = np.random.default_rng(3)
+        dates = pd.bdate_range('2023-01-02', periods=300)
+        self.market_data = {
+            f'S{i}': pd.DataFrame({
+                'close': 100 * np.cumprod(1 + rng.normal(0, 0.01, len(dates))),
+                'volume': rng.integers(1_000, 5_000, len(dates)).astype(float)
+            }, index=dates)
+            for i in range(12)
+        }
+        self.sentiment_data = pd.DataFrame({
+            'symbol': rng.choice(list(self.market_data), 200),
+            'timestamp': pd.date_range('2024-01-01', periods=200, freq='h'),
+            'sentiment_score': rng.uniform(-1, 1, 200),
+            'source': rng.choice(['news', 'twitter'], 200)
+        })
+        self.provider = FakeLLMProvider(response_fn=lambda prompt: json.dumps(
+            {'strategy_name': 'Momentum', 'signal': 'buy', 'confidence': 0.6}))
+        self.agent = LangChainAgent(LLMIntegration(provider=self.provider), max_workers=4)
+
+    def test_tool_memoization_by_data_version(self):
+        """Test that tool outputs are reused until the symbol's data changes"""
+        self.agent.register_data('S0', self.market_data['S0'])
+        calls = [(tool, 'S0') for tool in self.agent.tool_functions]
+        first = self.agent.run_tools(calls)
+        self.assertEqual(self.agent.run_tools(calls), first)
+        self.assertEqual(self.agent.get_tool_stats()['cache_hits'], len(calls))
+
+        risk = json.loads(first[3])
+        close = self.market_data['S0']['close']
+        self.assertAlmostEqual(risk['max_drawdown'], round(float((close / close.cummax() - 1).min()), 4))
+
+        self.agent.register_data('S0', self.market_data['S0'].iloc[:100])
+        self.assertNotEqual(self.agent.run_tool('risk_assessment', 'S0'), first[3])
+
+    def test_identical_data_keeps_cache_hits(self):
+        """Test re-registering the same frames on every call still hits the tool cache"""
+        self.agent.generate_strategy_recommendations(self.market_data, self.sentiment_data)
+        stats = self.agent.get_tool_stats()
+        self.agent.generate_strategy_recommendations(self.market_data, self.sentiment_data)
+        repeated = self.agent.get_tool_stats()
+
+        tool_calls = len(self.market_data) * len(self.agent.tool_functions)
+        self.assertEqual(repeated['cache_hits'] - stats['cache_hits'], tool_calls)
+        self.assertEqual(repeated['cache_size'], stats['cache_size'])
+
+    def test_universe_report(self):
+        """Test batched recommendations and prompts that do not grow with history"""
+        report = self.agent.generate_universe_report(self.market_data, self.sentiment_data,
+                                                     {'total_value': 1e6, 'cash': 1e5},
+                                                     {'total_return': 0.1})
+        self.assertIsInstance(report, str)
+        # One call per symbol, one market analysis and one report
+        self.assertEqual(self.provider.calls, len(self.market_data) + 2)
+
+        short = {symbol: frame.iloc[-60:] for symbol, frame in self.market_data.items()}
+        recommendations = self.agent.generate_strategy_recommendations(short, self.sentiment_data)
+        self.assertEqual(recommendations['S3'].signal, 'buy')
+        self.assertEqual(recommendations['S3'].symbols, ['S3'])
+
+        # Prompts carry summary statistics, so their size does not depend on the number of rows
+        long_prompt, short_prompt = [prompt for prompt in self.provider.prompts if 'analysis of S3' in prompt]
+        self.assertLess(abs(len(long_prompt) - len(short_prompt)), 200)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import unittest
+import asyncio
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+from data_service.ai.llm_integration import LLMIntegration, FakeLLMProvider
+from data_service.ai.llm_executor import LLMExecutor, SemanticResponseCache, PromptCache
+
+class StatusError(Exception):
+    """Provider error carrying an HTTP status, as SDK exceptions do"""
+
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+class SlowWriteCache(PromptCache):
+    """Exact-match cache whose writes take a while, widening the window after a provider call"""
+
+    def set(self, key, response):
+        time.sleep(0.2)
+        super().set(key, response)
+
+class CountingProvider(FakeLLMProvider):
+    """Fake provider that records the peak number of simultaneous calls"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.active = 0
+        self.peak = 0
+        self._count_lock = threading.Lock()
+
+    def generate_response(self, prompt, **kwargs):
+        with self._count_lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            return super().generate_response(prompt, **kwargs)
+        finally:
+            with self._count_lock:
+                self.active -= 1
+
+class TestLLMExecutor(unittest.TestCase):
+    """Test cases for the cached, retried and concurrency-bounded LLM layer"""
+
+    def test_concurrency_cache_and_savings(self):
+        """Test the concurrency bound, exact-match hits and saved tokens"""
+        provider = CountingProvider(latency=0.05)
+        executor = LLMExecutor(provider, max_concurrency=3)
+        prompts = [f"Analyze symbol S{i}" for i in range(12)]
+
+        first = executor.generate_many(prompts)
+        self.assertLessEqual(provider.peak, 3)
+        self.assertGreater(provider.peak, 1)
+
+        # Whitespace differences still hit the exact-match cache
+        second = asyncio.run(executor.agenerate_many(["  " + p.replace(" ", "\n  ") for p in prompts]))
+        self.assertEqual(provider.calls, 12)
+        self.assertEqual([r.content for r in first], [r.content for r in second])
+        self.assertTrue(all(r.metadata['cache'] == 'exact' for r in second))
+
+        stats = executor.get_stats()
+        self.assertEqual(stats['exact_cache_hits'], 12)
+        self.assertEqual(stats['tokens_saved'], stats['tokens_used'])
+        self.assertAlmostEqual(stats['cost_saved'], stats['cost'])
+        executor.close()
+
+    def test_retries_dedup_and_ttl(self):
+        """Test backoff retries, in-flight sharing and cache expiry"""
+        provider = FakeLLMProvider(fail_times=2)
+        executor = LLMExecutor(provider, max_retries=3, backoff_base=0.01, cache_ttl=0.2)
+        response = executor.generate("risk check")
+        self.assertEqual(provider.calls, 3)
+        self.assertEqual(executor.get_stats()['retries'], 2)
+
+        failing = LLMExecutor(FakeLLMProvider(fail_times=5), max_retries=1, backoff_base=0.01)
+        with self.assertRaises(ConnectionError):
+            failing.generate("risk check")
+        self.assertEqual(failing.get_stats()['failures'], 1)
+
+        slow = FakeLLMProvider(latency=0.2)
+        shared = LLMExecutor(slow, max_concurrency=4, cache_size=0)
+        results = shared.generate_many(["same prompt"] * 4)
+        self.assertEqual(slow.calls, 1)
+        self.assertEqual(shared.get_stats()['deduplicated'], 3)
+        self.assertEqual(len({r.content for r in results}), 1)
+
+        time.sleep(0.25)
+        executor.generate("risk check")
+        self.assertEqual(provider.calls, 4)
+        self.assertEqual(response.content, executor.generate("risk check").content)
+
+    def test_semantic_cache_and_integration(self):
+        """Test similar-prompt hits and usage stats through LLMIntegration"""
+        provider = FakeLLMProvider(response_fn=lambda prompt: f"answer to: {prompt[:30]}")
+        semantic = SemanticResponseCache(similarity_threshold=0.8, max_size=2)
+        llm = LLMIntegration(provider=provider, semantic_cache=semantic)
+
+        data = pd.DataFrame({'close': [100.0, 101.0, 102.5], 'volume': [1e6, 1.1e6, 0.9e6]})
+        llm.analyze_market_data(data, ['AAPL'])
+        insight = llm.analyze_market_data(data.round(0), ['AAPL'])
+        self.assertEqual(provider.calls, 1)
+        self.assertEqual(insight.insight_type, 'analysis')
+
+        stats = llm.get_usage_stats()
+        self.assertEqual(stats['provider'], 'Fake')
+        self.assertEqual(stats['semantic_cache_hits'], 1)
+        self.assertGreater(stats['tokens_saved'], 0)
+
+        # A dissimilar prompt for the same symbol stays below the threshold
+        history = pd.DataFrame({'close': np.linspace(50, 300, 300), 'volume': np.linspace(1e7, 9e7, 300)})
+        llm.analyze_market_data(history, ['AAPL'])
+        self.assertEqual(provider.calls, 2)
+        self.assertEqual(llm.get_usage_stats()['semantic_cache_hits'], 1)
+
+        # The same data for another symbol never reuses a response
+        other = llm.analyze_market_data(data, ['MSFT'])
+        self.assertEqual(provider.calls, 3)
+        self.assertEqual(other.symbols, ['MSFT'])
+        self.assertEqual(llm.get_usage_stats()['semantic_cache_hits'], 1)
+
+        # Unrelated prompts miss and the oldest entries are evicted
+        batch = llm.analyze_market_data_batch({'X': data.head(1), 'Y': data * 1000})
+        self.assertEqual(set(batch), {'X', 'Y'})
+        self.assertEqual(provider.calls, 5)
+        self.assertLessEqual(len(semantic), 2)
+        self.assertGreater(semantic.evictions, 0)
+
+    def test_scopes_retry_policy_and_handoff(self):
+        """Test other scopes cannot hide a hit, only transient errors retry and duplicates never refetch"""
+        semantic = SemanticResponseCache(similarity_threshold=0.5)
+        executor = LLMExecutor(FakeLLMProvider(response_fn=lambda prompt: prompt), semantic_cache=semantic)
+        executor.generate("analyze trend momentum volume breakout for apple", cache_scope='AAPL')
+        # Closer to the query than the AAPL prompt, but for other symbols
+        for i in range(6):
+            executor.generate(f"analyze trend momentum volume breakout for apple today {i}", cache_scope=f'S{i}')
+        hit = executor.generate("analyze trend momentum volume breakout for apple today", cache_scope='AAPL')
+        self.assertEqual(hit.metadata['cache'], 'semantic')
+        self.assertEqual(hit.content, "analyze trend momentum volume breakout for apple")
+
+        for error, calls in [(StatusError(401), 1), (ValueError("bad request"), 1),
+                             (StatusError(503), 3), (TimeoutError(), 3)]:
+            provider = FakeLLMProvider()
+
+            def failing(prompt, error=error, provider=provider, **kwargs):
+                provider.calls += 1
+                raise error
+            provider.generate_response = failing
+            with self.assertRaises(type(error)):
+                LLMExecutor(provider, max_retries=2, backoff_base=0.01).generate("risk check")
+            self.assertEqual(provider.calls, calls, repr(error))
+
+        provider = FakeLLMProvider(latency=0.05)
+        executor = LLMExecutor(provider)
+        executor.cache = SlowWriteCache()
+        owner = threading.Thread(target=executor.generate, args=("risk check",))
+        owner.start()
+        time.sleep(0.15)
+        duplicate = executor.generate("risk check")
+        owner.join()
+        self.assertEqual(provider.calls, 1)
+        self.assertIn(duplicate.metadata['cache'], ('inflight', 'exact'))
+
+if __name__ == '__main__':
+    unittest.main()
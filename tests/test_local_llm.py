@@ -0,0 +1,141 @@
+import unittest
+from types import SimpleNamespace
+
+from data_service.ai import local_llm
+from data_service.ai.local_llm import group_by_length, LocalInferenceEngine, TRANSFORMERS_AVAILABLE
+
+if TRANSFORMERS_AVAILABLE:
+    import torch
+
+class StubTokenizer:
+    """One token per character; ids 0-2 are pad, eos and bos"""
+
+    pad_token_id, eos_token_id, bos_token_id = 0, 1, 2
+
+    def __call__(self, text, add_special_tokens=True):
+        ids = [ord(c) for c in text]
+        return {'input_ids': [self.bos_token_id] + ids if add_special_tokens else ids}
+
+    def decode(self, ids, skip_special_tokens=True, **kwargs):
+        return ''.join(chr(i) for i in ids if i > 2)
+
+    def batch_decode(self, rows, skip_special_tokens=True):
+        return [self.decode(row.tolist()) for row in rows]
+
+class StubModel:
+    """Completes each row with its last prompt characters reversed and records every generate call"""
+
+    device = 'cpu'
+
+    def __init__(self):
+        self.calls = []
+        self.reject_cache = False
+
+    def __call__(self, input_ids, use_cache=True):
+        layer = (torch.zeros(1, 1, input_ids.shape[1], 2), torch.zeros(1, 1, input_ids.shape[1], 2))
+        return SimpleNamespace(past_key_values=(layer,))
+
+    def generate(self, input_ids, attention_mask, max_new_tokens, pad_token_id, past_key_values=None,
+                 streamer=None, **kwargs):
+        if past_key_values is not None and self.reject_cache:
+            raise ValueError("precomputed caches are not supported")
+        self.calls.append({'batch_size': input_ids.shape[0],
+                           'cache_batch_size': past_key_values[0][0].shape[0] if past_key_values else None})
+        if (input_ids == ord('!')).any():
+            raise RuntimeError("cannot complete '!'")
+
+        completions = torch.full((input_ids.shape[0], max_new_tokens), pad_token_id, dtype=torch.long)
+        for row in range(input_ids.shape[0]):
+            tokens = input_ids[row][attention_mask[row].bool()][-max_new_tokens:].flip(0)
+            completions[row, :len(tokens)] = tokens
+        if streamer is not None:
+            streamer.put(input_ids.cpu())
+            for token in completions[0]:
+                streamer.put(token.reshape(1))
+            streamer.end()
+        return torch.cat([input_ids, completions], dim=1)
+
+class TestLocalLLM(unittest.TestCase):
+    """Test cases for the local inference engine's batching"""
+
+    def test_group_by_length(self):
+        """Test padding-aware grouping of prompts into batches"""
+        lengths = [50, 12, 10, 11, 48, 300, 9, 52]
+        batches = group_by_length(lengths, max_batch_size=3, max_padding_ratio=0.25)
+
+        self.assertEqual(sorted(i for batch in batches for i in batch), list(range(len(lengths))))
+        for batch in batches:
+            self.assertLessEqual(len(batch), 3)
+            width = max(lengths[i] for i in batch)
+            padding = sum(width - lengths[i] for i in batch)
+            self.assertLessEqual(padding, 0.25 * width * len(batch))
+        # Short, medium and the one long prompt never share a batch
+        self.assertEqual(batches, [[6, 2, 3], [1], [4, 0, 7], [5]])
+
+@unittest.skipUnless(TRANSFORMERS_AVAILABLE, "torch and transformers are not installed")
+class TestLocalInferenceEngine(unittest.TestCase):
+    """Test cases for queued generation on a stub model and tokenizer"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.model = StubModel()
+        local_llm._models[('stub', 'cpu')] = (StubTokenizer(), self.model)
+        self.engine = LocalInferenceEngine('stub', device='cpu', batch_wait=0.1)
+
+    def tearDown(self):
+        self.engine.close()
+        local_llm._models.pop(('stub', 'cpu'), None)
+
+    def test_queued_prompts_share_batches_and_the_prefix_cache(self):
+        """Test concurrent prompts are batched by length on top of the reused system prompt"""
+        prompts = [f"prompt number {i:02d}" for i in range(6)] + ['x' * 60]
+        results = self.engine.generate_many(prompts, max_new_tokens=4, temperature=0)
+
+        # Left padding keeps every row's last prompt token next to its completion
+        self.assertEqual([r.text for r in results], [p[-4:][::-1].strip() for p in prompts])
+        self.assertEqual([r.batch_size for r in results], [6] * 6 + [1])
+        self.assertEqual(sorted(call['batch_size'] for call in self.model.calls), [1, 6])
+        for call in self.model.calls:
+            self.assertEqual(call['cache_batch_size'], call['batch_size'])
+
+        prefix_length = len(self.engine._prefix_ids)
+        self.assertEqual(results[0].prompt_tokens, prefix_length + len(prompts[0]))
+        stats = self.engine.get_stats()
+        self.assertEqual(stats['prompts'], 7)
+        self.assertEqual(stats['batches'], 2)
+        self.assertEqual(stats['prefix_tokens_reused'], prefix_length * 7)
+
+        # A model that rejects the cache falls back to full prompts
+        self.model.reject_cache = True
+        self.assertEqual(self.engine.generate("one more", max_new_tokens=3).text, "ero")
+        self.assertIsNone(self.engine._prefix_cache)
+
+    def test_failures_stay_with_their_batch(self):
+        """Test a failing batch or worker pass only fails its own requests"""
+        good = self.engine.submit("short prompt", max_new_tokens=2)
+        bad = self.engine.submit("a much longer prompt that ends badly!", max_new_tokens=2)
+        self.assertEqual(good.result().text, "tp")
+        with self.assertRaises(RuntimeError):
+            bad.result()
+
+        run = self.engine._run
+        failures = []
+
+        def fail_once(pending):
+            if not failures:
+                failures.append(len(pending))
+                raise RuntimeError("worker bug")
+            run(pending)
+        self.engine._run = fail_once
+        with self.assertRaises(RuntimeError):
+            self.engine.generate("first")
+        # The worker survived and serves the next request
+        self.assertEqual(self.engine.generate("second", max_new_tokens=3).text, "dno")
+
+    def test_stream(self):
+        """Test a streamed completion matches the generated text"""
+        chunks = list(self.engine.stream("stream me please", max_new_tokens=5))
+        self.assertEqual(''.join(chunks), "esael")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import unittest
+import tempfile
+import pandas as pd
+import numpy as np
+
+from data_service.ml.ml_models import PredictionModel, ClassificationModel, ModelConfig, MLModelManager
+from data_service.ml.out_of_core import FeatureChunkSource, MemmapFeatureStore, time_ordered_split
+from data_service.ml.model_search import ModelSearch
+
+class TestOutOfCoreTraining(unittest.TestCase):
+    """Test cases for time-ordered splits and chunked, incremental training"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        rng = np.random.default_rng(0)
+        dates = pd.date_range('2022-01-01', periods=100, freq='D')
+        index = pd.MultiIndex.from_product([dates, ['AAPL', 'MSFT', 'TSLA', 'NVDA']], names=['date', 'symbol'])
+        self.X = pd.DataFrame(rng.normal(size=(len(index), 3)), index=index, columns=['f1', 'f2', 'f3'])
+        noise = rng.normal(scale=0.1, size=len(index))
+        self.y = pd.Series(2 * self.X['f1'] - self.X['f2'] + noise, index=index, name='target')
+        self.directory = tempfile.TemporaryDirectory()
+        frame = self.X.assign(target=self.y)
+        # Written one month at a time, as a nightly job appends days
+        self.store = MemmapFeatureStore.write(
+            self.directory.name, (frame.iloc[start:start + 120] for start in range(0, len(frame), 120)),
+            ['f1', 'f2', 'f3'], 'target'
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_time_ordered_split(self):
+        """Test test rows are strictly later than training rows and dates are not split"""
+        shuffled = self.X.sample(frac=1, random_state=0)
+        X_train, X_test, _, _ = time_ordered_split(shuffled, self.y.loc[shuffled.index], test_size=0.2, gap=2)
+        train_dates = X_train.index.get_level_values('date')
+        test_dates = X_test.index.get_level_values('date')
+        self.assertEqual(test_dates.nunique(), 20)
+        self.assertEqual(train_dates.nunique(), 78)
+        self.assertLess(train_dates.max(), test_dates.min())
+
+        result = PredictionModel('ridge').train(self.X, self.y, ModelConfig(
+            model_type='ridge', parameters={}, feature_columns=['f1', 'f2', 'f3'], target_column='target'))
+        self.assertGreater(result.test_score, 0.95)
+
+    def test_out_of_core_and_incremental_update(self):
+        """Test chunked training matches in-memory quality and daily updates extend the model"""
+        self.assertEqual(len(self.store), 400)
+        np.testing.assert_allclose(self.store.features[:, 0], self.X['f1'].values, rtol=1e-6)
+
+        class NoChunks(FeatureChunkSource):
+            def __len__(self):
+                return 0
+        with self.assertRaises(TypeError):
+            NoChunks()
+
+        model = PredictionModel('sgd')
+        result = model.train_out_of_core(self.store, chunk_size=64, epochs=5)
+        self.assertGreater(result.validation_score, 0.95)
+        self.assertEqual(len(result.predictions), 80)
+
+        forest = PredictionModel('random_forest')
+        forest.train_out_of_core(self.store, chunk_size=100, trees_per_chunk=5)
+        self.assertEqual(len(forest.model.estimators_), 20)
+        update = forest.update(self.X.iloc[-8:], self.y.iloc[-8:], trees_per_chunk=5)
+        self.assertEqual(len(forest.model.estimators_), 25)
+        self.assertFalse(np.isnan(update.validation_score))
+        self.assertEqual(len(forest.predict(self.X.iloc[:5])), 5)
+
+        with self.assertRaises(ValueError):
+            self.store.append(self.X.iloc[:4].assign(target=self.y.iloc[:4]))
+
+        labels = (self.y > 0).astype(int).rename('target')
+        classifier_store = MemmapFeatureStore.write(self.directory.name + '/labels', self.X.assign(target=labels),
+                                                    ['f1', 'f2', 'f3'], 'target')
+        classifier = ClassificationModel('sgd')
+        result = classifier.train_out_of_core(classifier_store, chunk_size=50, epochs=3)
+        self.assertGreater(result.validation_score, 0.85)
+        self.assertEqual(classifier.predict_proba(self.X.iloc[:3]).shape, (3, 2))
+
+class TestModelSearch(unittest.TestCase):
+    """Test cases for the parallel model zoo search"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        rng = np.random.default_rng(2)
+        dates = pd.date_range('2022-01-01', periods=90, freq='D')
+        index = pd.MultiIndex.from_product([dates, ['AAPL', 'MSFT', 'TSLA']], names=['date', 'symbol'])
+        self.X = pd.DataFrame(rng.normal(size=(len(index), 3)), index=index, columns=['f1', 'f2', 'f3'])
+        next_day = pd.Series(self.X['f1'] - self.X['f3'] + rng.normal(scale=0.2, size=len(index)), index=index)
+        self.targets = {'h1': next_day, 'h5': next_day.groupby(level='symbol').shift(-4)}
+        self.grid = {
+            'ridge': {'alpha': [0.1, 10.0]},
+            'random_forest': {'n_estimators': [5, 10], 'max_depth': [2]},
+            'knn': {'n_neighbors': [3, 15]}
+        }
+
+    def test_parallel_matches_serial_and_halving(self):
+        """Test worker processes give the serial leaderboard and halving prunes per target"""
+        with ModelSearch(n_jobs=1, n_splits=3) as search:
+            serial = search.prepare(self.X, self.targets).run(self.grid)
+        with ModelSearch(n_jobs=2, n_splits=3) as search:
+            parallel = search.prepare(self.X, self.targets).run(self.grid)
+
+        pd.testing.assert_frame_equal(serial.leaderboard.drop(columns=['fit_time']),
+                                      parallel.leaderboard.drop(columns=['fit_time']))
+        self.assertEqual(sorted(serial.history['fraction'].unique()), [1 / 3, 1.0])
+        for target in ['h1', 'h5']:
+            final = serial.leaderboard[(serial.leaderboard['target'] == target) & (serial.leaderboard['rung'] == 1)]
+            self.assertEqual(len(final), 2)
+            self.assertEqual(serial.best[target].key, final.iloc[0]['candidate'])
+        self.assertIn(serial.best['h1'].model_type, ['ridge', 'random_forest', 'knn'])
+
+    def test_checkpoint_resume_and_manager(self):
+        """Test a rerun restores finished evaluations and the manager keeps the best models"""
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            with ModelSearch(n_jobs=1, checkpoint_dir=checkpoint_dir) as search:
+                first = search.prepare(self.X, self.targets).run(self.grid, refit=False)
+            with open(f"{checkpoint_dir}/{ModelSearch.CHECKPOINT_FILE}") as handle:
+                evaluations = len(handle.readlines())
+            with ModelSearch(n_jobs=1, checkpoint_dir=checkpoint_dir) as search:
+                resumed = search.prepare(self.X, self.targets).run(self.grid, refit=False)
+            with open(f"{checkpoint_dir}/{ModelSearch.CHECKPOINT_FILE}") as handle:
+                self.assertEqual(len(handle.readlines()), evaluations)
+            pd.testing.assert_frame_equal(first.leaderboard, resumed.leaderboard)
+
+        manager = MLModelManager()
+        manager.search_models(self.X, self.targets['h1'].rename('h1'), self.grid, n_jobs=1)
+        self.assertEqual(len(manager.models), 1)
+        name = next(iter(manager.models))
+        self.assertTrue(name.startswith('h1__') and name.endswith('_regressor'))
+        self.assertEqual(len(manager.predict(name, self.X.iloc[:4])), 4)
+
+    def test_targets_are_embargoed_by_their_horizon(self):
+        """Test training labels never reach into the test window, which a leaky search would reward"""
+        horizon, delay, n_symbols, n_dates = 30, 3, 8, 120
+        rng = np.random.default_rng(1)
+        base = rng.normal(size=n_dates + n_symbols * delay + horizon + 5)
+        dates = pd.date_range('2022-01-01', periods=n_dates, freq='D')
+        frames = []
+        for k in range(n_symbols):
+            # Symbol k repeats symbol 0 with a delay of k * delay days, shorter than the horizon in total
+            i = np.arange(n_dates) + (n_symbols - k) * delay + 2
+            frame = pd.DataFrame({'f0': base[i], 'f1': base[i - 1], 'f2': base[i - 2]},
+                                 index=pd.MultiIndex.from_product([dates, [f'S{k}']], names=['date', 'symbol']))
+            frame['fwd'] = [base[j + 1:j + 1 + horizon].sum() for j in i]
+            frames.append(frame)
+        panel = pd.concat(frames).sort_index()
+        target = panel.pop('fwd')
+        target[target.index.get_level_values('date') >= dates[-horizon]] = np.nan
+        grid = {'ridge': {'alpha': [1.0]}, 'knn': {'n_neighbors': [1]}}
+
+        winners = {}
+        for name, horizons in [('embargoed', None), ('leaky', {'fwd': 0})]:
+            with ModelSearch(n_jobs=1, n_splits=n_dates // delay - 1, halving=False) as search:
+                result = search.prepare(panel, {'fwd': target}, horizons=horizons).run(grid, refit=False)
+                winners[name] = result.best['fwd'].model_type
+                if horizons is None:
+                    self.assertEqual(search.horizons, {'fwd': horizon})
+                    times = panel.index.get_level_values('date').sort_values()
+                    for (train_start, train_stop), (test_start, _) in search.folds['fwd']:
+                        self.assertLessEqual(times[train_stop - 1] + pd.Timedelta(days=horizon), times[test_start])
+        # Nearest neighbours only look good when they can copy labels built from test-window values
+        self.assertEqual(winners, {'embargoed': 'ridge', 'leaky': 'knn'})
+
+        with ModelSearch(n_jobs=1, n_splits=3) as search:
+            search.prepare(self.X, self.targets)
+            self.assertEqual(search.horizons, {'h1': 0, 'h5': 4})
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
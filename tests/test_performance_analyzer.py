@@ -0,0 +1,90 @@
+import unittest
+import pandas as pd
+import numpy as np
+
+from data_service.backtest.performance_analyzer import PerformanceAnalyzer
+from data_service.backtest import metrics_kernel
+
+class TestPerformanceAnalyzer(unittest.TestCase):
+    """Test cases for PerformanceAnalyzer and its metrics kernels"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.analyzer = PerformanceAnalyzer()
+        rng = np.random.default_rng(5)
+        dates = pd.date_range('2020-01-01', periods=800, freq='D')
+        values = 100 * np.exp(np.cumsum(rng.normal(0.0002, 0.01, len(dates))))
+        self.results = {'equity_curve': pd.DataFrame({'total_value': values}, index=dates)}
+
+    def test_drawdown_periods(self):
+        """Test run-length encoded drawdown periods, including an ongoing one"""
+        equity = [100, 90, 95, 100, 110, np.nan, 99, 120, 100]
+        drawdown = pd.Series(metrics_kernel.drawdown_series(equity))
+
+        periods = self.analyzer._find_drawdown_periods(drawdown)
+
+        self.assertEqual([(p['start_idx'], p['end_idx'], p['duration']) for p in periods],
+                         [(1, 3, 2), (6, 7, 1), (8, 8, 0)])
+        self.assertAlmostEqual(periods[0]['max_drawdown'], -0.1)
+        self.assertAlmostEqual(periods[1]['max_drawdown'], -0.1)
+        self.assertAlmostEqual(periods[2]['max_drawdown'], -1 / 6)
+
+    def test_periodic_returns(self):
+        """Test log-sum compounding matches compounding each period's returns"""
+        periodic = self.analyzer._calculate_periodic_returns(self.results)
+
+        returns = self.results['equity_curve']['total_value'].pct_change()
+        expected = returns.resample('ME').apply(lambda x: (1 + x).prod() - 1)
+        np.testing.assert_allclose(periodic['monthly_returns'], expected)
+        self.assertEqual(len(periodic['yearly_returns']), 3)
+
+    def test_rolling_metrics(self):
+        """Test cumulative-sum rolling metrics against pandas rolling windows"""
+        rolling = self.analyzer.calculate_rolling_metrics(self.results, window=21)
+
+        returns = self.results['equity_curve']['total_value'].pct_change()
+        volatility = returns.rolling(21).std() * np.sqrt(252)
+        sharpe = (returns.rolling(21).mean() * 252 - 0.02) / volatility
+        np.testing.assert_allclose(rolling['rolling_volatility'], volatility)
+        np.testing.assert_allclose(rolling['rolling_sharpe'], sharpe)
+
+    def test_batch_matches_single_analysis(self):
+        """Test batch metrics agree with the single-curve analysis of each run"""
+        rng = np.random.default_rng(9)
+        dates = self.results['equity_curve'].index
+        curves = pd.DataFrame(1000 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(dates), 5)), axis=0)),
+                              index=dates, columns=list('abcde'))
+
+        batch = self.analyzer.analyze_batch(curves, chunk_size=2)
+
+        days = (dates[-1] - dates[0]).days
+        for run in curves.columns:
+            equity = curves[run]
+            total_return = equity.iloc[-1] / equity.iloc[0] - 1
+            results = {
+                'equity_curve': pd.DataFrame({'total_value': equity}),
+                'initial_capital': equity.iloc[0],
+                'final_value': equity.iloc[-1],
+                'annualized_return': (1 + total_return) ** (365 / days) - 1,
+                'max_drawdown': metrics_kernel.max_drawdown(equity)
+            }
+            expected = {**self.analyzer._calculate_basic_metrics(results),
+                        **self.analyzer._calculate_risk_metrics(results)}
+            for name in ['total_return', 'volatility', 'sharpe_ratio', 'sortino_ratio',
+                         'var_95', 'cvar_99', 'max_drawdown', 'calmar_ratio']:
+                self.assertAlmostEqual(batch.loc[run, name], expected[name], places=10, msg=name)
+
+    def test_batch_chunks(self):
+        """Test chunked iterables give the same metrics as one array"""
+        rng = np.random.default_rng(4)
+        curves = np.exp(np.cumsum(rng.normal(0, 0.01, (300, 6)), axis=0))
+        curves[50, 2] = np.nan
+
+        whole = self.analyzer.analyze_batch(curves, sort_by='sharpe_ratio')
+        chunked = self.analyzer.analyze_batch(iter([curves[:, :4], curves[:, 4:]]))
+
+        pd.testing.assert_frame_equal(whole.sort_index(), chunked)
+        self.assertTrue(whole['sharpe_ratio'].is_monotonic_decreasing)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import pandas as pd
+import numpy as np
+
+from data_service.factors import portfolio_construction
+from data_service.factors.stock_selector import StockSelector
+
+class TestPortfolioConstruction(unittest.TestCase):
+    """Test cases for covariance-aware portfolio construction"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        rng = np.random.default_rng(11)
+        factors = rng.normal(0, 0.01, (300, 2))
+        loadings = rng.normal(1, 0.4, (30, 2))
+        self.returns = factors @ loadings.T + rng.normal(0, 0.01, (300, 30)) * rng.uniform(0.5, 2, 30)
+
+    def test_ledoit_wolf(self):
+        """Test the closed form and the rolling estimator agree"""
+        covariance, shrinkage = portfolio_construction.ledoit_wolf_covariance(self.returns[-100:])
+        self.assertTrue(0 < shrinkage < 1)
+
+        rolling = portfolio_construction.RollingCovariance(100, resync=37)
+        for row in self.returns:
+            rolling.update(row)
+        rolling_covariance, rolling_shrinkage = rolling.covariance()
+        np.testing.assert_allclose(rolling_covariance, covariance, atol=1e-14)
+        self.assertAlmostEqual(rolling_shrinkage, shrinkage)
+
+    def test_equal_risk_contribution(self):
+        """Test ERC weights give every asset the same risk contribution"""
+        covariance, _ = portfolio_construction.ledoit_wolf_covariance(self.returns)
+        weights = portfolio_construction.equal_risk_contribution(covariance)
+
+        contributions = portfolio_construction.risk_contributions(weights, covariance)
+        np.testing.assert_allclose(contributions, 1 / 30, rtol=1e-8)
+        warm = portfolio_construction.equal_risk_contribution(covariance, initial=weights[::-1])
+        np.testing.assert_allclose(warm, weights, rtol=1e-8)
+
+    def test_minimum_variance_box(self):
+        """Test minimum variance respects the box and beats feasible alternatives"""
+        covariance, _ = portfolio_construction.ledoit_wolf_covariance(self.returns)
+        weights = portfolio_construction.minimum_variance(covariance, 0.0, 0.06)
+
+        self.assertAlmostEqual(weights.sum(), 1.0)
+        self.assertLessEqual(weights.max(), 0.06 + 1e-12)
+        self.assertGreaterEqual(weights.min(), 0.0)
+        variance = weights @ covariance @ weights
+        rng = np.random.default_rng(0)
+        for _ in range(50):
+            other = portfolio_construction.project_capped_simplex(
+                weights + rng.normal(0, 0.01, 30), 0.0, 0.06
+            )
+            self.assertGreaterEqual(other @ covariance @ other, variance - 1e-15)
+
+    def test_selector_risk_parity(self):
+        """Test StockSelector risk parity pivots prices once and caps weights"""
+        symbols = [f'S{i}' for i in range(30)]
+        dates = pd.bdate_range('2022-01-03', periods=301)
+        prices = 100 * np.exp(np.cumsum(np.vstack([np.zeros(30), self.returns]), axis=0))
+        price_data = pd.DataFrame({
+            'date': np.repeat(dates, 30),
+            'symbol': np.tile(symbols, len(dates)),
+            'close': prices.ravel()
+        })
+        factor_data = pd.DataFrame({'date': dates[-1], 'symbol': symbols,
+                                    'factor_name': 'momentum', 'factor_value': np.arange(30.0)})
+
+        selector = StockSelector(max_positions=25, min_weight=0.0, max_weight=0.06)
+        result = selector.select_stocks(factor_data, price_data, 'risk_parity', lookback_period=250)
+
+        self.assertEqual(len(result.weights), 25)
+        self.assertNotIn('S0', result.weights)
+        self.assertAlmostEqual(sum(result.weights.values()), 1.0)
+        self.assertLessEqual(max(result.weights.values()), 0.06 + 1e-12)
+
+if __name__ == '__main__':
+    unittest.main()
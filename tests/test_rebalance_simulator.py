@@ -0,0 +1,77 @@
+import unittest
+import pandas as pd
+import numpy as np
+
+from data_service.factors.rebalance_simulator import RebalanceSimulator
+from data_service.factors.stock_selector import StockSelector
+
+class TestRebalanceSimulator(unittest.TestCase):
+    """Test cases for the historical rebalancing simulator"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        rng = np.random.default_rng(21)
+        self.dates = pd.bdate_range('2020-01-01', periods=320)
+        self.symbols = [f'S{i}' for i in range(20)]
+        self.returns = rng.normal(0.0003, 0.015, (len(self.dates), 20))
+        self.returns[0] = 0
+        prices = 100 * np.cumprod(1 + self.returns, axis=0)
+        n_dates = len(self.dates)
+        self.price_data = pd.DataFrame({
+            'date': np.repeat(self.dates, 20),
+            'symbol': np.tile(self.symbols, n_dates),
+            'close': prices.ravel()
+        })
+        self.factor_data = pd.DataFrame({
+            'date': np.repeat(self.dates, 20),
+            'symbol': np.tile(self.symbols, n_dates),
+            'factor_name': 'momentum',
+            'factor_value': rng.normal(size=n_dates * 20)
+        })
+        self.selector = StockSelector(max_positions=5, min_weight=0.0, max_weight=0.3)
+
+    def test_matches_daily_reference(self):
+        """Test drift, turnover and costs against a day-by-day reference loop"""
+        simulator = RebalanceSimulator(self.selector, transaction_cost=0.002)
+        result = simulator.run(self.factor_data, self.price_data, 'top_n', rebalance_frequency='monthly')
+
+        periods = self.dates.to_period('M')
+        rebalance_days = [t for t in range(len(self.dates) - 1) if periods[t] != periods[t + 1]]
+        weights = np.zeros(20)
+        value, equity = 1.0, []
+        for t in range(rebalance_days[0], len(self.dates) - 1):
+            if t in rebalance_days:
+                selection = self.selector.select_stocks(
+                    self.factor_data[self.factor_data['date'] <= self.dates[t]], self.price_data, 'top_n'
+                )
+                target = np.zeros(20)
+                for symbol, weight in selection.weights.items():
+                    target[self.symbols.index(symbol)] = weight
+                value *= 1 - np.abs(target - weights).sum() * 0.002
+                weights = target
+            day_return = self.returns[t + 1]
+            portfolio_return = weights @ day_return
+            value *= 1 + portfolio_return
+            weights = weights * (1 + day_return) / (1 + portfolio_return)
+            equity.append(value)
+
+        np.testing.assert_allclose(result.equity_curve.to_numpy(), equity)
+        self.assertEqual(len(result.selections), len(rebalance_days))
+        self.assertAlmostEqual(result.turnover.iloc[0], 1.0)
+
+    def test_compare_methods(self):
+        """Test walk-forward comparison of methods on one prepared dataset"""
+        simulator = RebalanceSimulator(self.selector, lookback_period=60)
+        simulator.prepare(self.factor_data, self.price_data)
+
+        table = simulator.compare_methods(rebalance_frequency='weekly')
+        risk_parity = simulator.run(selection_method='risk_parity', rebalance_frequency='weekly')
+
+        self.assertEqual(list(table.index), ['top_n', 'factor_weighted', 'risk_parity'])
+        self.assertIn('avg_turnover', table.columns)
+        # Risk parity waits for a full lookback window before the first trade
+        self.assertGreaterEqual(self.dates.get_loc(risk_parity.weights.index[0]), 60)
+        np.testing.assert_allclose(risk_parity.weights.sum(axis=1), 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
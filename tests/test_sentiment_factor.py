@@ -0,0 +1,75 @@
+import unittest
+import pandas as pd
+import numpy as np
+from datetime import datetime, timedelta
+
+from data_service.ai.sentiment_factor import SentimentFactorCalculator
+
+class TestSentimentFactorCalculator(unittest.TestCase):
+    """Test cases for the vectorized sentiment factor matrix and panel"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        rng = np.random.default_rng(5)
+        n_rows = 600
+        now = datetime.now()
+        self.symbols = [f'S{i}' for i in range(15)]
+        self.sentiment_data = pd.DataFrame({
+            'symbol': rng.choice(self.symbols, n_rows),
+            'timestamp': [now - timedelta(hours=float(h)) for h in rng.uniform(0, 120, n_rows)],
+            'sentiment_score': rng.uniform(-1, 1, n_rows),
+            'confidence': rng.uniform(0, 1, n_rows),
+            'source': rng.choice(['news', 'twitter', 'reddit', 'blog'], n_rows)
+        })
+        # A symbol with a single observation has no dispersion
+        self.sentiment_data.loc[n_rows] = ['SOLO', now, 0.4, 0.9, 'news']
+        self.calculator = SentimentFactorCalculator()
+
+    def test_matrix_matches_per_symbol_factors(self):
+        """Test the one-pass matrix against calculate_sentiment_factors"""
+        symbols = self.symbols + ['SOLO', 'NODATA']
+        matrix = self.calculator.calculate_sentiment_factor_matrix(self.sentiment_data, symbols, lookback_period=10)
+
+        self.assertEqual(matrix['symbol'].tolist(), symbols)
+        for symbol in symbols:
+            factor = self.calculator.calculate_sentiment_factors(self.sentiment_data, symbol, lookback_period=10)
+            row = matrix[matrix['symbol'] == symbol].iloc[0]
+            for name in ['sentiment_score', 'sentiment_momentum', 'sentiment_volatility', 'news_volume',
+                         'social_volume', 'sentiment_consensus', 'market_sentiment', 'sector_sentiment',
+                         'confidence']:
+                expected = getattr(factor, name)
+                if np.isnan(expected):
+                    self.assertTrue(np.isnan(row[name]), (symbol, name))
+                else:
+                    self.assertAlmostEqual(row[name], expected, places=6, msg=(symbol, name))
+
+        no_data = matrix[matrix['symbol'] == 'NODATA'].iloc[0]
+        self.assertEqual(no_data['news_volume'], 0)
+        self.assertEqual(no_data['sentiment_consensus'], 0.0)
+
+    def test_sectors_and_panel(self):
+        """Test sector means and per-bucket factors"""
+        sectors = {symbol: 'tech' if i % 2 else 'energy' for i, symbol in enumerate(self.symbols)}
+        matrix = self.calculator.calculate_sentiment_factor_matrix(self.sentiment_data, self.symbols,
+                                                                   sectors=sectors)
+        data = self.sentiment_data
+        tech_mean = data[data['symbol'].map(sectors) == 'tech']['sentiment_score'].mean()
+        row = matrix[matrix['symbol'] == 'S1'].iloc[0]
+        self.assertAlmostEqual(row['sector_sentiment'], tech_mean)
+        self.assertAlmostEqual(row['sector_relative_sentiment'],
+                               data[data['symbol'] == 'S1']['sentiment_score'].mean() - tech_mean)
+
+        panel = self.calculator.calculate_sentiment_factor_panel(data, freq='D', symbols=['S0', 'S1'])
+        self.assertEqual(set(panel['symbol']), {'S0', 'S1'})
+
+        # Each bucket's factors are those of a snapshot at its end over its rows only
+        for _, row in panel[panel['symbol'] == 'S0'].iterrows():
+            bucket_end = row['timestamp']
+            in_bucket = data[(data['timestamp'] > bucket_end - pd.Timedelta('1D'))
+                             & (data['timestamp'] <= bucket_end)]
+            snapshot = self.calculator.calculate_sentiment_factor_matrix(in_bucket, ['S0'], as_of=bucket_end)
+            for name in ['sentiment_score', 'sentiment_momentum', 'news_volume', 'market_sentiment', 'confidence']:
+                self.assertAlmostEqual(row[name], snapshot[name].iloc[0], msg=name)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import json
+import numpy as np
+from datetime import datetime, timedelta
+
+from data_service.ai.sentiment_analyzer import SentimentData
+from data_service.ai.social_media_monitor import SocialPost
+from data_service.ai.sentiment_stream import SentimentAggregator
+
+class TestSentimentAggregator(unittest.TestCase):
+    """Test cases for the streaming decayed sentiment aggregator"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        rng = np.random.default_rng(11)
+        self.start = datetime(2024, 3, 1, 9, 0)
+        self.items = [
+            SentimentData(timestamp=self.start + timedelta(minutes=float(m)), symbol='AAPL',
+                          sentiment_score=float(s), confidence=float(c), source=str(src),
+                          text='', keywords=[])
+            for m, s, c, src in zip(rng.uniform(0, 600, 80), rng.uniform(-1, 1, 80),
+                                    rng.uniform(0.1, 1, 80), rng.choice(['news', 'twitter', 'blog'], 80))
+        ]
+
+    def reference(self, half_life, as_of):
+        """Decayed weighted mean and std recomputed from the full history"""
+        weights_map = {'news': 1.2, 'twitter': 0.8}
+        decay = np.array([0.5 ** ((as_of - i.timestamp).total_seconds() / 3600 / half_life) for i in self.items])
+        w = decay * np.array([i.confidence * weights_map.get(i.source, 1.0) for i in self.items])
+        scores = np.array([i.sentiment_score for i in self.items])
+        mean = np.sum(w * scores) / np.sum(w)
+        std = np.sqrt(np.sum(w * (scores - mean) ** 2) / np.sum(w))
+        news = np.sum(decay * np.array([i.source == 'news' for i in self.items]))
+        return mean, std, news
+
+    def test_matches_full_recompute_out_of_order(self):
+        """Test O(1) updates in arrival order against a recompute over all items"""
+        aggregator = SentimentAggregator(half_lives=[2.0, 24.0])
+        aggregator.update_many(self.items)  # Not sorted by timestamp
+        as_of = self.start + timedelta(hours=12)
+
+        factors = aggregator.get_factors('AAPL', as_of=as_of)
+        for half_life in (2.0, 24.0):
+            mean, std, news = self.reference(half_life, as_of)
+            self.assertAlmostEqual(factors[half_life]['sentiment_score'], mean)
+            self.assertAlmostEqual(factors[half_life]['sentiment_volatility'], std)
+            self.assertAlmostEqual(factors[half_life]['news_volume'], news)
+
+    def test_snapshot_restore_and_posts(self):
+        """Test that a restored snapshot continues exactly like the original"""
+        aggregator = SentimentAggregator(half_lives=[6.0])
+        aggregator.update_many(self.items[:40])
+        restored = SentimentAggregator.from_snapshot(json.loads(json.dumps(aggregator.snapshot())))
+
+        post = SocialPost(id='1', text='to the moon', author='a', platform='reddit',
+                          timestamp=self.start + timedelta(hours=11), likes=5, retweets=1,
+                          replies=2, sentiment_score=0.0, symbol='AAPL')
+        for target in (aggregator, restored):
+            target.update_many(self.items[40:])
+            target.update(post)
+
+        as_of = self.start + timedelta(hours=12)
+        self.assertEqual(aggregator.get_factors('AAPL', as_of), restored.get_factors('AAPL', as_of))
+        mean, _, _ = self.reference(6.0, as_of)
+        # The unscored post adds engagement but does not move the score
+        factors = restored.get_factors('AAPL', as_of)[6.0]
+        self.assertAlmostEqual(factors['sentiment_score'], mean)
+        self.assertAlmostEqual(factors['engagement'], 8 * 0.5 ** (1 / 6))
+
+        frame = restored.factor_frame(as_of=as_of)
+        self.assertEqual(frame['symbol'].tolist(), ['AAPL'])
+        self.assertAlmostEqual(frame['market_sentiment'].iloc[0], 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
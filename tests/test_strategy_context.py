@@ -0,0 +1,96 @@
+import unittest
+import pandas as pd
+import numpy as np
+
+from data_service.factors import FactorScreener, StockSelector
+from data_service.strategies import StrategyBase, StrategyRunner
+from data_service.strategies.result_cache import result_cache_key
+from data_service.strategies.strategy_context import StrategyContext
+from data_service.strategies.strategy_registry import strategy_registry
+from data_service.strategies.builtin_strategies import (
+    MomentumStrategy, ValueStrategy, QualityGrowthStrategy, MultiFactorStrategy,
+    MeanReversionStrategy, register_builtin_strategies
+)
+
+FACTORS = {
+    'momentum_60d': (5, 10), 'momentum_20d': (-5, 10), 'pe_ratio': (15, 5), 'pb_ratio': (2, 1),
+    'dividend_yield': (2, 1), 'roe': (15, 5), 'debt_to_equity': (0.5, 0.3), 'current_ratio': (1.5, 0.5),
+    'rsi': (40, 15), 'price_volatility': (30, 10), 'market_cap': (5e9, 3e9)
+}
+
+class TestStrategyContext(unittest.TestCase):
+    """Test cases for the shared strategy precomputation context"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        rng = np.random.default_rng(3)
+        symbols = [f'S{i:03d}' for i in range(120)]
+        dates = pd.bdate_range('2023-01-02', periods=300)
+        frames = []
+        for name, (mean, std) in FACTORS.items():
+            values = rng.normal(mean, std, (3, len(symbols)))
+            frames.append(pd.DataFrame({
+                'date': np.repeat(dates[-3:], len(symbols)),
+                'symbol': np.tile(symbols, 3),
+                'factor_name': name,
+                'factor_value': values.ravel()
+            }))
+        self.factor_data = pd.concat(frames).sort_values('date', kind='stable').reset_index(drop=True)
+        prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(dates), len(symbols))), axis=0))
+        self.price_data = pd.DataFrame({
+            'date': np.repeat(dates, len(symbols)),
+            'symbol': np.tile(symbols, len(dates)),
+            'close': prices.ravel()
+        })
+
+    def test_matches_direct_screening_and_selection(self):
+        """Test context-backed builtins give the same results as the long-frame path"""
+        context = StrategyContext(self.factor_data, self.price_data)
+        selector = StockSelector()
+        expected = {
+            MomentumStrategy: selector.select_stocks(self.factor_data, self.price_data, 'top_n',
+                                                     n=20, factor_name='momentum_60d'),
+            ValueStrategy: selector.select_stocks(self.factor_data, self.price_data, 'factor_weighted',
+                                                  factor_name='pe_ratio'),
+            MultiFactorStrategy: selector.select_stocks(self.factor_data, self.price_data, 'risk_parity')
+        }
+        for strategy_class, selection in expected.items():
+            result = strategy_class().generate_signals(self.factor_data, self.price_data, context=context)
+            self.assertEqual(result.selected_stocks, selection.selected_stocks)
+            for symbol, weight in selection.weights.items():
+                self.assertAlmostEqual(result.weights[symbol], weight)
+
+        screened = MomentumStrategy().generate_signals(self.factor_data, self.price_data,
+                                                       context=context).metadata['screening_results']
+        direct = FactorScreener().create_momentum_screener(min_momentum=5.0).screen_stocks(self.factor_data)
+        self.assertEqual([(r.symbol, r.score, r.factor_values) for r in screened],
+                         [(r.symbol, r.score, r.factor_values) for r in direct])
+        self.assertIs(context.factor_matrix, context.factor_matrix)
+
+    def test_runner_shares_context(self):
+        """Test all builtins run through the runner on one context"""
+        register_builtin_strategies()
+        try:
+            runner = StrategyRunner(use_cache=False)
+            names = ['MomentumStrategy', 'ValueStrategy', 'QualityGrowthStrategy',
+                     'MultiFactorStrategy', 'MeanReversionStrategy']
+            results = runner.run_multiple_strategies([{'name': name} for name in names],
+                                                     self.factor_data, self.price_data)
+            self.assertEqual(runner.last_errors, {})
+            self.assertEqual(len(results['MomentumStrategy'].selected_stocks), 20)
+            self.assertTrue(results['MeanReversionStrategy'].metadata['screening_results'])
+
+            # Results cached before the move to the shared context are not reused
+            for strategy_class in (MomentumStrategy, ValueStrategy, QualityGrowthStrategy,
+                                   MultiFactorStrategy, MeanReversionStrategy):
+                strategy = strategy_class()
+                current = result_cache_key(strategy, 'factors', 'prices')
+                strategy.version = StrategyBase.version
+                self.assertNotEqual(result_cache_key(strategy, 'factors', 'prices'), current)
+        finally:
+            for name in ['MomentumStrategy', 'ValueStrategy', 'QualityGrowthStrategy',
+                         'MultiFactorStrategy', 'MeanReversionStrategy']:
+                strategy_registry.remove_strategy(name)
+
+if __name__ == '__main__':
+    unittest.main()
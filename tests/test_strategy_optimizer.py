@@ -0,0 +1,91 @@
+import unittest
+from datetime import datetime
+import pandas as pd
+import numpy as np
+
+from data_service.strategies import StrategyBase, StrategyResult
+from data_service.strategies.strategy_optimizer import StrategyOptimizer
+from data_service.strategies.strategy_registry import strategy_registry
+
+class TrackingStrategy(StrategyBase):
+    """Scores best when its threshold matches the mean factor value it is shown"""
+
+    def __init__(self):
+        super().__init__(name='Tracking')
+        self.parameters = {'threshold': 0.0}
+        self.seen = []
+
+    def generate_signals(self, factor_data, price_data, **kwargs):
+        self.seen.append((factor_data['date'].min(), factor_data['date'].max()))
+        error = abs(self.parameters['threshold'] - factor_data['factor_value'].mean())
+        return StrategyResult(
+            strategy_name=self.name,
+            selected_stocks=['S0'],
+            weights={'S0': 1.0},
+            parameters=dict(self.parameters),
+            execution_time=datetime.now(),
+            performance_metrics={'sharpe_ratio': -error},
+            metadata={}
+        )
+
+class TestStrategyOptimizer(unittest.TestCase):
+    """Test cases for time-ordered strategy parameter optimization"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        dates = pd.date_range('2024-01-01', periods=60, freq='D')
+        # The factor level drifts up by 1 every 10 days
+        self.factor_data = pd.DataFrame({
+            'date': np.repeat(dates, 2),
+            'symbol': ['S0', 'S1'] * 60,
+            'factor_value': np.repeat(np.arange(60) // 10, 2).astype(float)
+        })
+        self.price_data = self.factor_data[['date', 'symbol']].assign(close=1.0)
+        self.strategy = TrackingStrategy()
+        strategy_registry.register_instance(self.strategy)
+        self.optimizer = StrategyOptimizer()
+        self.optimizer.strategy_runner.use_cache = False
+
+    def tearDown(self):
+        strategy_registry.remove_strategy('Tracking')
+
+    def test_walk_forward_never_trains_on_test_dates(self):
+        """Test each fold picks parameters from earlier dates and is scored on later ones"""
+        result = self.optimizer.walk_forward_optimization(
+            'Tracking', self.factor_data, self.price_data, {'threshold': [0, 1, 2, 3, 4, 5]},
+            n_splits=5, embargo=2
+        )
+
+        folds = result['folds']
+        self.assertEqual(len(folds), 5)
+        for fold in folds:
+            self.assertLess(fold['train_end'], fold['test_start'] - pd.Timedelta(days=2))
+        # Trained on days 0-9 the best threshold is 0; the next block averages higher
+        self.assertEqual(folds[0]['parameters'], {'threshold': 0})
+        self.assertEqual(folds[0]['in_sample_objective'], 0.0)
+        self.assertLess(folds[0]['out_of_sample_objective'], 0.0)
+        self.assertEqual(result['optimized_parameters'], folds[-1]['parameters'])
+        self.assertIs(self.optimizer.get_optimization_history('Tracking')[-1], result)
+
+        # Grid runs only ever see one 10-day training window; the last test block is 8 days
+        grid_windows = [window for window in self.strategy.seen if window[1] - window[0] == pd.Timedelta(days=9)]
+        self.assertEqual(len(grid_windows), 5 * 6 + 4)
+
+        purged = self.optimizer.walk_forward_optimization(
+            'Tracking', self.factor_data, self.price_data, {'threshold': [0, 1, 2, 3, 4, 5]},
+            scheme='purged_kfold', n_splits=3, purge=2
+        )
+        self.assertEqual(len(purged['folds']), 3)
+
+    def test_parallel_folds_match_serial(self):
+        """Test folds run in worker processes give the same per-fold results"""
+        grid = {'threshold': [0, 1, 2, 3, 4, 5]}
+        serial = self.optimizer.walk_forward_optimization('Tracking', self.factor_data, self.price_data,
+                                                          grid, n_splits=5, embargo=2)
+        parallel = self.optimizer.walk_forward_optimization('Tracking', self.factor_data, self.price_data,
+                                                            grid, n_splits=5, embargo=2, n_jobs=2)
+        self.assertEqual(parallel['folds'], serial['folds'])
+        self.assertEqual(parallel['objective_value'], serial['objective_value'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import tempfile
+from datetime import datetime
+import pandas as pd
+import numpy as np
+
+from data_service.strategies import StrategyBase, StrategyResult, StrategyRunner, StrategyResultCache
+from data_service.strategies.strategy_registry import strategy_registry
+
+class CountingStrategy(StrategyBase):
+    """Top-n strategy that counts how often it actually runs"""
+
+    def __init__(self):
+        super().__init__(name="CountingStrategy")
+        self.parameters = {'top_n': 2}
+        self.calls = 0
+
+    def generate_signals(self, factor_data, price_data, **kwargs):
+        self.calls += 1
+        top = factor_data.nlargest(self.parameters['top_n'], 'factor_value')['symbol'].tolist()
+        return StrategyResult(
+            strategy_name=self.name,
+            selected_stocks=top,
+            weights={symbol: 1 / len(top) for symbol in top},
+            parameters=dict(self.parameters),
+            execution_time=datetime.now(),
+            performance_metrics={},
+            metadata={}
+        )
+
+class TestStrategyResultCache(unittest.TestCase):
+    """Test cases for strategy result memoization"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.strategy = CountingStrategy()
+        strategy_registry.register_instance(self.strategy)
+        self.factor_data = pd.DataFrame({
+            'symbol': ['A', 'B', 'C', 'D'],
+            'factor_name': 'momentum',
+            'factor_value': [0.1, 0.4, 0.3, 0.2]
+        })
+        self.price_data = pd.DataFrame({
+            'date': pd.bdate_range('2024-01-01', periods=4),
+            'symbol': 'A',
+            'close': np.arange(4.0)
+        })
+
+    def tearDown(self):
+        strategy_registry.remove_strategy('CountingStrategy')
+
+    def test_memoizes_identical_calls(self):
+        """Test identical inputs hit the cache and changed inputs miss"""
+        runner = StrategyRunner()
+        first = runner.run_strategy('CountingStrategy', self.factor_data, self.price_data)
+        second = runner.run_strategy('CountingStrategy', self.factor_data.copy(), self.price_data.copy())
+
+        self.assertEqual(self.strategy.calls, 1)
+        self.assertEqual(second.selected_stocks, ['B', 'C'])
+        # Callers get their own copy of the stored result
+        second.weights.clear()
+        self.assertEqual(runner.run_strategy('CountingStrategy', self.factor_data, self.price_data).weights,
+                         first.weights)
+
+        runner.run_strategy('CountingStrategy', self.factor_data, self.price_data, {'top_n': np.int64(3)})
+        changed = self.factor_data.copy()
+        changed.loc[0, 'factor_value'] = 0.5
+        runner.run_strategy('CountingStrategy', changed, self.price_data, {'top_n': 3})
+
+        self.assertEqual(self.strategy.calls, 3)
+        stats = runner.get_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (2, 3))
+        self.assertTrue(runner.get_execution_history()[1]['cached'])
+
+    def test_disk_cache_shared_between_runners(self):
+        """Test results written by one runner are read back by another"""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            StrategyRunner(StrategyResultCache(cache_dir=cache_dir)).run_strategy(
+                'CountingStrategy', self.factor_data, self.price_data)
+            runner = StrategyRunner(StrategyResultCache(cache_dir=cache_dir))
+            result = runner.run_strategy('CountingStrategy', self.factor_data, self.price_data)
+
+            self.assertEqual(self.strategy.calls, 1)
+            self.assertEqual(result.selected_stocks, ['B', 'C'])
+            self.assertEqual(runner.get_cache_stats()['disk_hits'], 1)
+
+            runner.run_strategy('CountingStrategy', self.factor_data, self.price_data, use_cache=False)
+            self.assertEqual(self.strategy.calls, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+import time
+from datetime import datetime
+import pandas as pd
+import numpy as np
+
+from data_service.strategies import StrategyBase, StrategyResult, StrategyRunner
+from data_service.strategies.strategy_registry import strategy_registry
+
+class SleepyStrategy(StrategyBase):
+    """Picks fixed symbols after sleeping, or raises when told to"""
+
+    def __init__(self, name: str, symbols, delay: float = 0.0, fail: bool = False):
+        super().__init__(name=name)
+        self.symbols = symbols
+        self.delay = delay
+        self.fail = fail
+
+    def generate_signals(self, factor_data, price_data, **kwargs):
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("no data")
+        return StrategyResult(
+            strategy_name=self.name,
+            selected_stocks=list(self.symbols),
+            weights={symbol: 1 / len(self.symbols) for symbol in self.symbols},
+            parameters={},
+            execution_time=datetime.now(),
+            performance_metrics={},
+            metadata={}
+        )
+
+class TestStrategyRunner(unittest.TestCase):
+    """Test cases for concurrent strategy execution and ensembles"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        rng = np.random.default_rng(5)
+        self.symbols = [f'S{i}' for i in range(40)]
+        self.selections = {f'Sleepy{i}': list(rng.choice(self.symbols, 8, replace=False)) for i in range(6)}
+        for name, symbols in self.selections.items():
+            strategy_registry.register_instance(SleepyStrategy(name, symbols, delay=0.1))
+        strategy_registry.register_instance(SleepyStrategy('Broken', ['S0'], fail=True))
+        strategy_registry.register_instance(SleepyStrategy('Slow', ['S1'], delay=1.0))
+        self.factor_data = pd.DataFrame({'symbol': self.symbols, 'factor_value': np.arange(40.0)})
+        self.price_data = pd.DataFrame({'symbol': self.symbols, 'close': np.ones(40)})
+
+    def tearDown(self):
+        for name in list(self.selections) + ['Broken', 'Slow']:
+            strategy_registry.remove_strategy(name)
+
+    def test_concurrent_with_isolated_failures(self):
+        """Test strategies overlap in time and failures or timeouts stay per strategy"""
+        runner = StrategyRunner(use_cache=False, strategy_timeout=0.4)
+        configs = [{'name': name} for name in list(self.selections) + ['Broken', 'Slow']]
+
+        start = time.perf_counter()
+        results = runner.run_multiple_strategies(configs, self.factor_data, self.price_data)
+        elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 0.6)
+        self.assertIsNone(results['Broken'])
+        self.assertIsNone(results['Slow'])
+        self.assertIn('Timed out', runner.last_errors['Slow'])
+        self.assertEqual(results['Sleepy3'].selected_stocks, self.selections['Sleepy3'])
+
+    def test_timed_out_run_blocks_restart(self):
+        """Test a strategy whose timed-out run is still going is not started a second time"""
+        runner = StrategyRunner(use_cache=False, strategy_timeout=0.2)
+        configs = [{'name': 'Slow'}, {'name': 'Sleepy0'}]
+        runner.run_multiple_strategies(configs, self.factor_data, self.price_data)
+        self.assertIn('Timed out', runner.last_errors['Slow'])
+
+        start = time.perf_counter()
+        results = runner.run_multiple_strategies(configs, self.factor_data, self.price_data)
+        self.assertLess(time.perf_counter() - start, 0.2)
+        self.assertIn('still running', runner.last_errors['Slow'])
+        self.assertEqual(results['Sleepy0'].selected_stocks, self.selections['Sleepy0'])
+
+    def test_process_timeout_counts_from_start(self):
+        """Test a process task queued behind another is timed from when its worker starts it"""
+        for name in ('Half0', 'Half1'):
+            strategy_registry.register_instance(SleepyStrategy(name, ['S2'], delay=0.5))
+        self.addCleanup(lambda: [strategy_registry.remove_strategy(name) for name in ('Half0', 'Half1')])
+        runner = StrategyRunner(use_cache=False, executor='process', max_workers=1, strategy_timeout=0.8)
+
+        results = runner.run_multiple_strategies([{'name': 'Half0'}, {'name': 'Half1'}],
+                                                 self.factor_data, self.price_data)
+        self.assertEqual(runner.last_errors, {})
+        self.assertEqual(results['Half1'].selected_stocks, ['S2'])
+
+    def test_combine_matches_dict_counting(self):
+        """Test the matrix combine steps against straightforward vote counting"""
+        runner = StrategyRunner(use_cache=False, executor='serial')
+        names = list(self.selections) + ['Broken']
+        votes = {}
+        for symbols in self.selections.values():
+            for symbol in symbols:
+                votes[symbol] = votes.get(symbol, 0) + 1
+
+        voting = runner.run_strategy_ensemble(names, self.factor_data, self.price_data, 'voting',
+                                              {'vote_threshold': 0.3})
+        expected = {symbol for symbol, count in votes.items() if count >= int(6 * 0.3)}
+        self.assertEqual(set(voting.selected_stocks), expected)
+
+        weighted = runner.run_strategy_ensemble(names, self.factor_data, self.price_data, 'performance_weight')
+        total = sum(votes.values())
+        for symbol, count in votes.items():
+            self.assertAlmostEqual(weighted.weights[symbol], count / total)
+
+        equal = runner.run_strategy_ensemble(names, self.factor_data, self.price_data)
+        self.assertEqual(set(equal.selected_stocks), set(votes))
+        self.assertEqual(equal.performance_metrics['num_strategies'], 6)
+
+    def test_process_pool(self):
+        """Test the process executor returns results and fills the parent cache"""
+        runner = StrategyRunner(executor='process', max_workers=2)
+        names = ['Sleepy0', 'Sleepy1', 'Broken']
+        results = runner.run_multiple_strategies([{'name': name} for name in names],
+                                                 self.factor_data, self.price_data)
+
+        self.assertEqual(results['Sleepy1'].selected_stocks, self.selections['Sleepy1'])
+        self.assertIsNone(results['Broken'])
+        runner.run_multiple_strategies([{'name': 'Sleepy0'}], self.factor_data, self.price_data)
+        self.assertEqual(runner.get_cache_stats()['hits'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
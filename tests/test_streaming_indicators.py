@@ -0,0 +1,48 @@
+import unittest
+import pandas as pd
+import numpy as np
+
+from data_service.ml.feature_engineering import FeatureEngineer
+from data_service.ml.streaming_indicators import StreamingIndicatorSet, RollingStats
+
+class TestStreamingIndicators(unittest.TestCase):
+    """Test cases for streaming indicators against their batch versions"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        rng = np.random.default_rng(7)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 300)))
+        self.data = pd.DataFrame({
+            'high': close * (1 + np.abs(rng.normal(0, 0.005, 300))),
+            'low': close * (1 - np.abs(rng.normal(0, 0.005, 300))),
+            'close': close,
+            'volume': rng.integers(100, 1000, 300).astype(float)
+        })
+
+    def test_matches_batch_indicators(self):
+        """Test every streamed value equals the batch value at the same bar"""
+        batch = FeatureEngineer().create_technical_indicators(self.data)
+        state = StreamingIndicatorSet()
+
+        streamed = pd.DataFrame([state.update(bar) for bar in self.data.to_dict('records')])
+
+        for column in streamed.columns:
+            np.testing.assert_allclose(streamed[column].values, batch[column].values,
+                                       rtol=1e-8, atol=1e-8, equal_nan=True, err_msg=column)
+
+    def test_rolling_stats_with_nan(self):
+        """Test windows holding a NaN are NaN, like pandas rolling"""
+        values = [1.0, 2.0, np.nan, 4.0, 5.0, 6.0, 7.0]
+        stats = RollingStats(3)
+        means, stds = [], []
+        for value in values:
+            stats.update(value)
+            means.append(stats.mean)
+            stds.append(stats.std)
+
+        series = pd.Series(values)
+        np.testing.assert_allclose(means, series.rolling(3).mean(), equal_nan=True)
+        np.testing.assert_allclose(stds, series.rolling(3).std(), equal_nan=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import pandas as pd
+import numpy as np
+
+from data_service.factors.factor_calculator import FactorCalculator, FactorData
+from data_service.factors.universe_factor_calculator import UniverseFactorCalculator
+
+class TestUniverseFactorCalculator(unittest.TestCase):
+    """Test cases for the universe-level factor calculator"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        rng = np.random.default_rng(3)
+        dates = pd.bdate_range('2020-01-01', periods=300)
+        symbols = ['AAPL', 'MSFT', 'TSLA', 'NVDA']
+        self.prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (300, 4)), axis=0)),
+                                   index=dates, columns=symbols)
+        self.volumes = pd.DataFrame(rng.integers(1000, 5000, (300, 4)).astype(float),
+                                    index=dates, columns=symbols)
+        self.fundamentals = pd.DataFrame({
+            'symbol': symbols,
+            'eps': [5.0, 8.0, 0.0, 2.0],
+            'net_income': [50.0, 60.0, 70.0, 80.0],
+            'shareholders_equity': [500.0, 300.0, 700.0, 400.0],
+            'market_cap': [2e12, 2.5e12, 6e11, 1e12]
+        })
+
+    def test_matches_single_symbol_calculator(self):
+        """Test the last date equals FactorCalculator run on each full series"""
+        calculator = UniverseFactorCalculator(volatility_window=len(self.prices) - 1)
+        factors = calculator.calculate_factors(self.prices, self.volumes, self.fundamentals)
+        single_calculator = FactorCalculator()
+        fundamentals = self.fundamentals.set_index('symbol')
+
+        for symbol in self.prices.columns:
+            financial = dict(fundamentals.loc[symbol], price=self.prices[symbol].iloc[-1])
+            expected = single_calculator.calculate_all_factors(
+                symbol, self.prices[symbol], self.volumes[symbol], financial_data=financial
+            )
+            for name, value in expected.items():
+                if name in factors:
+                    self.assertAlmostEqual(factors[name][symbol].iloc[-1], value, places=6, msg=name)
+
+    def test_long_output_ranks(self):
+        """Test long output is ranked per date like FactorCalculator.rank_factors"""
+        calculator = UniverseFactorCalculator()
+        panel = calculator.calculate_factor_panel(self.prices, self.volumes,
+                                                  dates=[self.prices.index[-1]])
+
+        momentum = panel[panel['factor_name'] == 'momentum_20d'].sort_values('rank')
+        self.assertEqual(list(momentum['rank']), [1, 2, 3, 4])
+        self.assertTrue(momentum['factor_value'].is_monotonic_decreasing)
+        self.assertEqual(list(momentum['percentile']), [25.0, 50.0, 75.0, 100.0])
+
+    def test_rank_factors_order(self):
+        """Test vectorized rank_factors keeps the stable per-factor ordering"""
+        data = [FactorData('S', None, name, value)
+                for name, value in zip(['x', 'y', 'x', 'x', 'y'], [1, 5, 3, 3, 2])]
+        ranked = FactorCalculator().rank_factors(data)
+
+        self.assertEqual([(d.factor_name, d.factor_value, d.rank) for d in ranked],
+                         [('x', 3, 1), ('x', 3, 2), ('x', 1, 3), ('y', 5, 1), ('y', 2, 2)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import pandas as pd
+import numpy as np
+
+from data_service.factors.factor_optimizer import FactorOptimizer, OptimizationResult
+from data_service.factors.walk_forward import (
+    WalkForwardOptimizer, walk_forward_splits, purged_kfold_splits, objective_value
+)
+
+def make_data(n_symbols: int, n_days: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    symbols = [f'S{i}' for i in range(n_symbols)]
+    dates = pd.bdate_range('2021-01-01', periods=n_days)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (n_days, n_symbols)), axis=0))
+    price_data = pd.DataFrame({
+        'date': np.repeat(dates, n_symbols),
+        'symbol': np.tile(symbols, n_days),
+        'close': prices.ravel()
+    })
+    frames = []
+    for name in ['momentum', 'value', 'quality']:
+        frames.append(pd.DataFrame({
+            'date': np.repeat(dates, n_symbols),
+            'symbol': np.tile(symbols, n_days),
+            'factor_name': name,
+            'factor_value': rng.normal(size=n_days * n_symbols)
+        }))
+    factor_data = pd.concat(frames).sort_values(['date', 'symbol'], kind='stable').reset_index(drop=True)
+    # Drop some rows so symbols come and go
+    factor_data = factor_data.drop(index=rng.choice(len(factor_data), len(factor_data) // 20, replace=False))
+    return factor_data, price_data
+
+class TestWalkForward(unittest.TestCase):
+    """Test cases for walk-forward and purged k-fold optimization"""
+
+    def test_composite_returns_match_optimizer(self):
+        """Test the compacted panel reproduces FactorOptimizer's composite returns"""
+        factor_data, price_data = make_data(12, 25)
+        names = ['momentum', 'value', 'quality']
+        weights = np.array([0.5, 0.3, 0.2])
+        optimizer = FactorOptimizer()
+        expected = optimizer._calculate_composite_returns(factor_data, price_data, names, weights)
+
+        engine = WalkForwardOptimizer(n_jobs=1).prepare(factor_data, price_data, names)
+        returns = engine.composite_returns(dict(zip(names, weights)))
+
+        np.testing.assert_allclose(returns.to_numpy(), expected.to_numpy())
+        self.assertAlmostEqual(objective_value(returns.to_numpy()),
+                               optimizer._calculate_sharpe_ratio(factor_data, price_data, names, weights))
+
+    def test_splits(self):
+        """Test purging, embargo and ordering of the fold schemes"""
+        for train, test in purged_kfold_splits(100, 4, purge=2, embargo=3):
+            excluded = set(range(test[0] - 2, test[-1] + 4))
+            self.assertEqual(set(train), set(range(100)) - excluded)
+
+        splits = walk_forward_splits(100, 4, embargo=2, expanding=True)
+        tests = np.concatenate([test for _, test in splits])
+        self.assertTrue(np.all(np.diff(tests) == 1))
+        for train, test in splits:
+            self.assertEqual(train[0], 0)
+            self.assertEqual(test[0] - train[-1], 3)
+
+    def test_parallel_run_matches_serial(self):
+        """Test folds in worker processes on shared memory give the serial result"""
+        factor_data, price_data = make_data(30, 120, seed=1)
+        serial = WalkForwardOptimizer(n_jobs=1).run(factor_data, price_data, scheme='purged_kfold',
+                                                    n_splits=4, embargo=2)
+        with WalkForwardOptimizer(n_jobs=2) as engine:
+            parallel = engine.run(factor_data, price_data, scheme='purged_kfold', n_splits=4, embargo=2)
+
+        pd.testing.assert_frame_equal(parallel.weight_table, serial.weight_table)
+        pd.testing.assert_series_equal(parallel.oos_returns, serial.oos_returns)
+        np.testing.assert_allclose(serial.equity_curve, np.cumprod(1 + serial.oos_returns))
+        self.assertAlmostEqual(sum(serial.robust_weights.values()), 1.0)
+
+        result = FactorOptimizer().cross_validation_optimization(
+            factor_data, price_data, ['momentum', 'value', 'quality'], n_splits=4, n_jobs=1)
+        self.assertIsInstance(result, OptimizationResult)
+        self.assertEqual(result.iterations, 3)
+
+if __name__ == '__main__':
+    unittest.main()